@@ -6,11 +6,27 @@ backend_dir = Path(__file__).parent.parent
 if str(backend_dir) not in sys.path:
     sys.path.insert(0, str(backend_dir))
 
-from fastapi import FastAPI
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 import uvicorn
 
+from logging_config import configurar_logging
+
+# Antes que el resto: los módulos loguean desde que se importan
+configurar_logging()
+
 from api.routers import register_routers
+from api import metricas, perfilado
+from api.middleware import ContextoRequestMiddleware, MetricasMiddleware, PerfiladoMiddleware, TrazasMiddleware
+from jobs import planificador, gestor_holds
+from database import cola_escritura, pool_lectura
+from database.errores import BaseDatosOcupadaError, PresupuestoSQLExcedidoError
+import trazas
 
 
 app = FastAPI(
@@ -33,9 +49,92 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos los headers
 )
 
+# Trazas por capas de las requests muestreadas o pedidas con X-Trazar (adentro del request id)
+app.add_middleware(TrazasMiddleware)
+
+# Scope de la request disponible para las métricas de la capa de datos
+app.add_middleware(ContextoRequestMiddleware)
+
+# Perfil cProfile de una request con X-Perfilar (solo administradores)
+app.add_middleware(PerfiladoMiddleware)
+
+# Latencia, status, tamaños y SQL por ruta para GET /metrics (el más externo: mide todo lo demás)
+app.add_middleware(MetricasMiddleware)
+
 # Registrar todos los routers (cada uno ya define su propio prefix)
 register_routers(app)
 
+# Endpoints envueltos para que PerfiladoMiddleware pueda activar cProfile en su hilo
+perfilado.instrumentar_rutas(app)
+
+# Servicios y repositories envueltos para registrar sus tramos en las requests trazadas
+trazas.instrumentar_capas()
+
+
+@app.exception_handler(BaseDatosOcupadaError)
+async def base_datos_ocupada(request: Request, exc: BaseDatosOcupadaError):
+    """La base siguió bloqueada tras los reintentos: 503 para que el cliente reintente."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+def _base_ocupada_en_cadena(exc: BaseException) -> Optional[BaseDatosOcupadaError]:
+    """El BaseDatosOcupadaError que originó la excepción, si lo hay (siguiendo __cause__/__context__)."""
+    vistas = set()
+    while exc is not None and id(exc) not in vistas:
+        if isinstance(exc, BaseDatosOcupadaError):
+            return exc
+        vistas.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_excepcion(request: Request, exc: StarletteHTTPException):
+    """
+    Los routers convierten cualquier excepción en un 500 (`except Exception`):
+    si el origen fue la base ocupada, se responde 503 igual que sin envolver.
+    """
+    if exc.status_code == 500:
+        ocupada = _base_ocupada_en_cadena(exc)
+        if ocupada is not None:
+            return await base_datos_ocupada(request, ocupada)
+    return await http_exception_handler(request, exc)
+
+
+@app.exception_handler(PresupuestoSQLExcedidoError)
+async def presupuesto_sql_excedido(request: Request, exc: PresupuestoSQLExcedidoError):
+    """Solo con DETECTOR_N1=error: la request hizo demasiadas sentencias (posible N+1)."""
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+
+@app.on_event("startup")
+def iniciar_tareas_periodicas():
+    """Registra las tareas en segundo plano y arranca el planificador."""
+    from services import plantillas_service
+    from jobs import mantenimiento_bd, backup_bd, replicacion_bd, archivo_turnos, changelog_bd
+
+    planificador.registrar(
+        "materializar_turnos",
+        plantillas_service.materializar_horizonte,
+        intervalo_segundos=plantillas_service.INTERVALO_GENERACION_MINUTOS * 60,
+    )
+    mantenimiento_bd.registrar_tareas(planificador)
+    backup_bd.registrar_tareas(planificador)
+    replicacion_bd.registrar_tareas(planificador)
+    archivo_turnos.registrar_tareas(planificador)
+    changelog_bd.registrar_tareas(planificador)
+    planificador.iniciar()
+    gestor_holds.iniciar()
+
+
+@app.on_event("shutdown")
+def detener_tareas_periodicas():
+    planificador.detener()
+    gestor_holds.detener()
+    cola_escritura.detener()
+    pool_lectura.cerrar()
+
+
 @app.get("/")
 def root():
     return {
@@ -47,7 +146,13 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    """Estado de la API y última corrida de las tareas en segundo plano (incluye mantenimiento de la BD)."""
+    return {"status": "ok", "tareas": planificador.estado()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato de texto de Prometheus (ver api.metricas)."""
+    return PlainTextResponse(metricas.exportar(), media_type=metricas.CONTENT_TYPE)
 
 # Línea final para ejecutar la app
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Métricas de las requests HTTP en formato de exposición de texto de Prometheus.
+
+`MetricasMiddleware` (api.middleware) llama a `metricas_http.registrar()` al
+terminar cada request con la duración, el status, los bytes recibidos y
+enviados y lo que acumuló su ContadorSQL (database.contador_sql). GET /metrics
+devuelve `exportar()`.
+
+Las series se etiquetan con la plantilla de la ruta (`/api/turnos/{turno_id}`),
+no con el path, para que la cantidad de series quede acotada; las requests que
+no matchean ninguna ruta van todas a la etiqueta `(sin ruta)`. Las sentencias
+que corren en el hilo de la cola de escritura no se atribuyen a la request.
+
+Sin dependencias externas: cada request cuesta una búsqueda binaria por
+histograma y un lock al final.
+"""
+
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Límites superiores de los buckets de cada histograma (el +Inf es implícito)
+BUCKETS_DURACION_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BUCKETS_SENTENCIAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+RUTA_DESCONOCIDA = "(sin ruta)"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(etiquetas: Iterable[Tuple[str, str]]) -> str:
+    partes = [f'{nombre}="{_escapar(str(valor))}"' for nombre, valor in etiquetas]
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    """Histograma acumulativo de Prometheus (no thread-safe: lo protege el registro)."""
+
+    __slots__ = ('limites', 'cuentas', 'suma', 'total')
+
+    def __init__(self, limites: Sequence[float]):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.cuentas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre: str, etiquetas: Etiquetas) -> List[str]:
+        lineas = []
+        acumulado = 0
+        for limite, cuenta in zip(list(self.limites) + [float("inf")], self.cuentas):
+            acumulado += cuenta
+            le = _formatear_etiquetas(etiquetas + (("le", _numero(limite)),))
+            lineas.append(f"{nombre}_bucket{le} {acumulado}")
+        base = _formatear_etiquetas(etiquetas)
+        lineas.append(f"{nombre}_sum{base} {_numero(self.suma)}")
+        lineas.append(f"{nombre}_count{base} {self.total}")
+        return lineas
+
+
+class MetricasHTTP:
+    """Registro de métricas por ruta (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._requests: Dict[Etiquetas, int] = {}
+            self._duracion: Dict[Etiquetas, Histograma] = {}
+            self._bytes_request: Dict[Etiquetas, Histograma] = {}
+            self._bytes_response: Dict[Etiquetas, Histograma] = {}
+            self._sentencias: Dict[Etiquetas, Histograma] = {}
+            self._segundos_sql: Dict[Etiquetas, float] = {}
+            self._en_curso = 0
+
+    def iniciar_request(self) -> None:
+        with self._lock:
+            self._en_curso += 1
+
+    def registrar(self, metodo: str, ruta: Optional[str], status: int, duracion: float,
+                  bytes_request: int, bytes_response: int, sentencias: int, segundos_sql: float) -> None:
+        """Cierra una request iniciada con iniciar_request()."""
+        ruta_metodo = (("method", metodo), ("route", ruta or RUTA_DESCONOCIDA))
+        con_status = ruta_metodo + (("status", str(status)),)
+        with self._lock:
+            self._en_curso -= 1
+            self._requests[con_status] = self._requests.get(con_status, 0) + 1
+            for tabla, limites, valor in (
+                (self._duracion, BUCKETS_DURACION_S, duracion),
+                (self._bytes_request, BUCKETS_BYTES, bytes_request),
+                (self._bytes_response, BUCKETS_BYTES, bytes_response),
+                (self._sentencias, BUCKETS_SENTENCIAS, sentencias),
+            ):
+                histograma = tabla.get(ruta_metodo)
+                if histograma is None:
+                    histograma = tabla[ruta_metodo] = Histograma(limites)
+                histograma.observar(valor)
+            self._segundos_sql[ruta_metodo] = self._segundos_sql.get(ruta_metodo, 0.0) + segundos_sql
+
+    def lineas(self) -> List[str]:
+        """Líneas de texto de Prometheus de las métricas HTTP."""
+        lineas: List[str] = []
+
+        def encabezado(nombre, tipo, ayuda):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+        with self._lock:
+            encabezado("http_requests_total", "counter", "Requests atendidas por método, ruta y status.")
+            for etiquetas, cuenta in sorted(self._requests.items()):
+                lineas.append(f"http_requests_total{_formatear_etiquetas(etiquetas)} {cuenta}")
+
+            encabezado("http_requests_in_flight", "gauge", "Requests en curso.")
+            lineas.append(f"http_requests_in_flight {self._en_curso}")
+
+            for nombre, tabla, ayuda in (
+                ("http_request_duration_seconds", self._duracion, "Duración de las requests en segundos."),
+                ("http_request_size_bytes", self._bytes_request, "Tamaño del cuerpo recibido en bytes."),
+                ("http_response_size_bytes", self._bytes_response, "Tamaño del cuerpo enviado en bytes."),
+                ("http_request_sql_statements", self._sentencias, "Sentencias SQL ejecutadas por request."),
+            ):
+                encabezado(nombre, "histogram", ayuda)
+                for etiquetas, histograma in sorted(tabla.items()):
+                    lineas.extend(histograma.lineas(nombre, etiquetas))
+
+            encabezado("http_request_sql_seconds_total", "counter",
+                       "Tiempo total en SQL de las requests (incluye esperas por bloqueo).")
+            for etiquetas, segundos in sorted(self._segundos_sql.items()):
+                lineas.append(f"http_request_sql_seconds_total{_formatear_etiquetas(etiquetas)} {_numero(segundos)}")
+        return lineas
+
+
+# Instancia compartida por el proceso
+metricas_http = MetricasHTTP()
+
+
+def _lineas_proceso() -> List[str]:
+    """Métricas de otros componentes del proceso (contención SQLite y SSE)."""
+    from database.contencion import contencion
+    from services.eventos_turnos import bus_turnos
+
+    resumen = contencion.resumen()
+    eventos = bus_turnos.estadisticas()
+    valores = (
+        ("sqlite_busy_events_total", "counter", "Sentencias que encontraron la base bloqueada.", resumen['eventos']),
+        ("sqlite_busy_retries_total", "counter", "Reintentos por base bloqueada.", resumen['reintentos']),
+        ("sqlite_busy_exhausted_total", "counter", "Sentencias que agotaron los reintentos.", resumen['agotados']),
+        ("sqlite_busy_wait_seconds_total", "counter", "Tiempo esperando la base bloqueada.", resumen['espera_total_s']),
+        ("sse_subscribers", "gauge", "Suscriptores conectados a /api/turnos/stream.", eventos['suscriptores']),
+        ("sse_events_published_total", "counter", "Eventos de turnos publicados.", eventos['eventos_publicados']),
+        ("sse_subscribers_dropped_total", "counter", "Suscriptores descartados por no consumir.",
+         eventos['suscriptores_descartados']),
+    )
+    lineas = []
+    for nombre, tipo, ayuda, valor in valores:
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre} {_numero(valor)}"]
+    return lineas
+
+
+def exportar() -> str:
+    """Todas las métricas en formato de exposición de texto 0.0.4."""
+    return "\n".join(metricas_http.lineas() + _lineas_proceso()) + "\n"
@@ -0,0 +1,234 @@
+"""Middlewares ASGI de la API."""
+
+import cProfile
+import re
+import time
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+
+import trazas
+from api import perfilado, presupuesto_sql
+from api.metricas import metricas_http
+from database.contador_sql import ContadorSQL, sql_request_actual
+from database.contencion import request_actual
+from logging_config import request_id_actual
+
+HEADER_REQUEST_ID = b"x-request-id"
+HEADER_TRAZAR = b"x-trazar"
+HEADER_TRAZA = b"x-traza"
+_REQUEST_ID_VALIDO = re.compile(r"^[\w.-]{1,64}$")
+
+
+class ContextoRequestMiddleware:
+    """
+    Publica el scope de la request en curso en `database.contencion.request_actual`,
+    para que las métricas de la capa de datos se atribuyan al endpoint, y su
+    request id en `logging_config.request_id_actual` para los logs. El id se
+    toma del header X-Request-ID si viene uno válido (o se genera) y se
+    devuelve en la respuesta.
+
+    Es un middleware ASGI puro: el contextvar se hereda en el threadpool donde
+    corren los endpoints sincrónicos, y el router completa scope['route'] antes
+    de llamar al endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for nombre, valor in scope.get("headers", []):
+            if nombre == HEADER_REQUEST_ID:
+                request_id = valor.decode("latin-1")
+                break
+        if request_id is None or not _REQUEST_ID_VALIDO.match(request_id):
+            request_id = uuid.uuid4().hex[:16]
+
+        async def send_con_id(mensaje):
+            if mensaje["type"] == "http.response.start":
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []), (HEADER_REQUEST_ID, request_id.encode())]}
+            await send(mensaje)
+
+        token = request_actual.set(scope)
+        token_id = request_id_actual.set(request_id)
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            request_id_actual.reset(token_id)
+            request_actual.reset(token)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada request para GET /metrics (ver api.metricas): duración, status,
+    bytes del cuerpo recibido y enviado, y sentencias/tiempo SQL a través de
+    `database.contador_sql.sql_request_actual`.
+
+    Los bytes se cuentan sobre los mensajes ASGI, así que valen también para
+    cuerpos sin Content-Length (streaming).
+
+    Con el detector de N+1 habilitado (api.presupuesto_sql) engancha un
+    DetectorN1 al contador y agrega el header X-SQL-Sentencias. En modo
+    estricto, si hubo una violación la respuesta se reemplaza por un 500
+    aunque algún `except Exception` del camino se haya tragado el error.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        detector = presupuesto_sql.DetectorN1(scope) if presupuesto_sql.detector_habilitado() else None
+        contador = ContadorSQL(detector.verificar if detector else None)
+        medidas = {'status': 500, 'recibidos': 0, 'enviados': 0, 'reemplazada': False}
+
+        async def receive_medido():
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                medidas['recibidos'] += len(mensaje.get("body", b""))
+            return mensaje
+
+        async def send_medido(mensaje):
+            if medidas['reemplazada']:
+                return
+            if mensaje["type"] == "http.response.start":
+                if detector is not None and detector.estricto and detector.violaciones:
+                    # Se descarta la respuesta original (y el resto de sus mensajes)
+                    medidas['reemplazada'] = True
+                    inicio_error, cuerpo_error = detector.respuesta_error(contador.sentencias)
+                    medidas['status'] = inicio_error["status"]
+                    medidas['enviados'] += len(cuerpo_error["body"])
+                    await send(inicio_error)
+                    await send(cuerpo_error)
+                    return
+                medidas['status'] = mensaje["status"]
+                if detector is not None:
+                    encabezados = list(mensaje.get("headers", []))
+                    encabezados.append((presupuesto_sql.HEADER_SENTENCIAS, str(contador.sentencias).encode()))
+                    mensaje = {**mensaje, "headers": encabezados}
+            elif mensaje["type"] == "http.response.body":
+                medidas['enviados'] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        metricas_http.iniciar_request()
+        token = sql_request_actual.set(contador)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive_medido, send_medido)
+        finally:
+            duracion = time.perf_counter() - inicio
+            sql_request_actual.reset(token)
+            if detector is not None:
+                detector.finalizar()
+            metricas_http.registrar(
+                scope.get("method", ""), getattr(scope.get("route"), "path", None), medidas['status'], duracion,
+                medidas['recibidos'], medidas['enviados'], contador.sentencias, contador.segundos,
+            )
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila con cProfile las requests que lo piden con X-Perfilar o
+    ?perfilar= (ver api.perfilado). Exige token de administrador: sin él
+    responde 403. El resto de las requests pasa sin costo adicional.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        modo = perfilado.modo_pedido(scope) if scope["type"] == "http" else None
+        if modo is None:
+            await self.app(scope, receive, send)
+            return
+        if not await run_in_threadpool(perfilado.es_admin, scope):
+            respuesta = JSONResponse({"detail": "El perfilado requiere permisos de administrador"}, status_code=403)
+            await respuesta(scope, receive, send)
+            return
+
+        perfil = cProfile.Profile()
+        nombre = {'valor': None}
+
+        async def send_perfilado(mensaje):
+            if modo == "texto":
+                return  # Se responde con el reporte al terminar
+            if mensaje["type"] == "http.response.start":
+                nombre['valor'] = perfilado.nombre_perfil(scope)
+                encabezados = list(mensaje.get("headers", []))
+                encabezados.append((perfilado.HEADER_PERFIL, nombre['valor'].encode()))
+                mensaje = {**mensaje, "headers": encabezados}
+            await send(mensaje)
+
+        token = perfilado.perfil_request.set(perfil)
+        try:
+            await self.app(scope, receive, send_perfilado)
+        finally:
+            perfilado.perfil_request.reset(token)
+
+        if modo == "texto":
+            await PlainTextResponse(perfilado.reporte_texto(perfil))(scope, receive, send)
+        else:
+            await run_in_threadpool(perfilado.guardar_perfil, perfil, nombre['valor'] or perfilado.nombre_perfil(scope))
+
+
+class TrazasMiddleware:
+    """
+    Traza por capas (ver trazas.py) una fracción TRAZAS_MUESTREO de las
+    requests y las que piden los administradores con el header X-Trazar (sin
+    token de administrador responde 403). Registra el tramo raíz de la
+    request, devuelve el nombre del archivo en el header X-Traza y lo escribe
+    en el threadpool al terminar.
+
+    Va dentro de ContextoRequestMiddleware para que la traza lleve el request id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        pedida = any(nombre == HEADER_TRAZAR for nombre, _ in scope.get("headers", []))
+        if not pedida and not trazas.muestrear():
+            await self.app(scope, receive, send)
+            return
+        if pedida and not await run_in_threadpool(perfilado.es_admin, scope):
+            respuesta = JSONResponse({"detail": "Las trazas a pedido requieren permisos de administrador"}, status_code=403)
+            await respuesta(scope, receive, send)
+            return
+
+        traza = trazas.Traza(f"{scope.get('method', '')} {scope.get('path', '')}", request_id_actual.get())
+        datos = {'status': 500, 'nombre': None}
+
+        async def send_trazado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                datos['status'] = mensaje["status"]
+                # El router ya completó scope['route']
+                ruta = getattr(scope.get("route"), "path", None)
+                if ruta is not None:
+                    traza.nombre = f"{scope.get('method', '')} {ruta}"
+                datos['nombre'] = trazas.nombre_archivo(traza)
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []), (HEADER_TRAZA, datos['nombre'].encode())]}
+            await send(mensaje)
+
+        token = trazas.traza_actual.set(traza)
+        inicio = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_trazado)
+        finally:
+            trazas.traza_actual.reset(token)
+            traza.agregar(traza.nombre, "request", inicio, time.perf_counter_ns(),
+                          {'status': datos['status'], 'request_id': traza.request_id})
+            try:
+                await run_in_threadpool(trazas.guardar, traza, datos['nombre'] or trazas.nombre_archivo(traza))
+            except OSError:
+                pass  # Sin directorio de trazas la request igual se responde
@@ -0,0 +1,148 @@
+"""
+Muestreador de pilas de baja sobrecarga para perfilar en producción.
+
+Un hilo lee `sys._current_frames()` cada `intervalo_ms` y cuenta cada pila
+(de la raíz a la hoja) en formato "collapsed": una línea por pila con los
+frames separados por `;` y la cantidad de muestras al final. Es el formato
+que aceptan flamegraph.pl, speedscope e inferno.
+
+A diferencia de cProfile no instrumenta cada llamada: el costo es recorrer
+las pilas de los hilos en cada muestra, independiente de lo que hagan los
+endpoints. Por defecto se descartan los hilos inactivos (esperando en un
+lock, una cola o el selector del event loop).
+
+Se maneja desde /api/diagnostico/muestreo; al terminar, el resultado se
+guarda en PERFILES_DIR como .folded.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from api.perfilado import PERFILES_DIR
+
+MUESTREO_INTERVALO_MS = float(os.getenv("MUESTREO_INTERVALO_MS", "10"))
+MUESTREO_MAX_SEGUNDOS = float(os.getenv("MUESTREO_MAX_SEGUNDOS", "300"))
+
+# Hoja de la pila de un hilo que está esperando (no consume CPU)
+_ARCHIVOS_ESPERA = ("threading.py", "queue.py", "selectors.py")
+_FUNCIONES_ESPERA = {"wait", "get", "select", "poll", "_wait_for_tstate_lock"}
+
+
+def _frame(codigo) -> str:
+    nombre = getattr(codigo, "co_qualname", codigo.co_name)
+    return f"{nombre} ({Path(codigo.co_filename).name})".replace(";", ":")
+
+
+def _inactivo(frame) -> bool:
+    codigo = frame.f_code
+    return codigo.co_name in _FUNCIONES_ESPERA and codigo.co_filename.endswith(_ARCHIVOS_ESPERA)
+
+
+class MuestreadorPilas:
+    """Hilo que muestrea las pilas de todos los hilos del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._pilas: Counter = Counter()
+        self.muestras = 0
+        self.inicio: Optional[float] = None
+        self.fin: Optional[float] = None
+        self.intervalo_ms = MUESTREO_INTERVALO_MS
+        self.incluir_inactivos = False
+        self.archivo: Optional[Path] = None
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self, segundos: float, intervalo_ms: float = MUESTREO_INTERVALO_MS,
+                incluir_inactivos: bool = False) -> Dict[str, Any]:
+        """
+        Empieza a muestrear durante `segundos` (tope MUESTREO_MAX_SEGUNDOS).
+
+        Raises:
+            ValueError: Si ya hay un muestreo en curso o los parámetros no son válidos
+        """
+        if segundos <= 0 or intervalo_ms <= 0:
+            raise ValueError("segundos e intervalo_ms deben ser positivos")
+        with self._lock:
+            if self.activo:
+                raise ValueError("Ya hay un muestreo en curso")
+            self._pilas = Counter()
+            self.muestras = 0
+            self.inicio, self.fin, self.archivo = time.time(), None, None
+            self.intervalo_ms = intervalo_ms
+            self.incluir_inactivos = incluir_inactivos
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, args=(min(segundos, MUESTREO_MAX_SEGUNDOS),),
+                                          name="muestreo-pilas", daemon=True)
+            self._hilo.start()
+        return self.estado()
+
+    def detener(self) -> Dict[str, Any]:
+        """Corta el muestreo en curso (el resultado queda disponible)."""
+        self._detener.set()
+        hilo = self._hilo
+        if hilo is not None:
+            hilo.join(timeout=5)
+        return self.estado()
+
+    def _bucle(self, segundos: float) -> None:
+        propio = threading.get_ident()
+        intervalo = self.intervalo_ms / 1000
+        limite = time.monotonic() + segundos
+        while not self._detener.is_set() and time.monotonic() < limite:
+            pilas = []
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or (not self.incluir_inactivos and _inactivo(frame)):
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append(_frame(frame.f_code))
+                    frame = frame.f_back
+                pilas.append(";".join(reversed(pila)))
+            with self._lock:
+                self._pilas.update(pilas)
+                self.muestras += 1
+            self._detener.wait(intervalo)
+        with self._lock:
+            self.fin = time.time()
+        self._guardar()
+
+    def _guardar(self) -> None:
+        try:
+            PERFILES_DIR.mkdir(parents=True, exist_ok=True)
+            destino = PERFILES_DIR / f"muestreo-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.inicio))}.folded"
+            destino.write_text(self.collapsed(), encoding="utf-8")
+            self.archivo = destino
+        except OSError:
+            self.archivo = None
+
+    def collapsed(self) -> str:
+        """Pilas en formato collapsed ("frame;frame;frame N"), de la más frecuente a la menos."""
+        with self._lock:
+            pilas = self._pilas.most_common()
+        return "".join(f"{pila} {cuenta}\n" for pila, cuenta in pilas)
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'activo': self.activo,
+                'inicio': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)) if self.inicio else None,
+                'fin': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.fin)) if self.fin else None,
+                'intervalo_ms': self.intervalo_ms,
+                'muestras': self.muestras,
+                'pilas_distintas': len(self._pilas),
+                'archivo': str(self.archivo) if self.archivo else None,
+            }
+
+
+# Instancia compartida por el proceso
+muestreador = MuestreadorPilas()
@@ -0,0 +1,180 @@
+"""
+Perfilado de la API a pedido (solo administradores).
+
+Perfil de una request con cProfile: se pide con el header `X-Perfilar` o el
+query param `perfilar`, con token de administrador.
+
+- `guardar` (o cualquier otro valor): la respuesta es la normal, el perfil
+  se guarda en PERFILES_DIR como .pstats y su nombre vuelve en el header
+  `X-Perfil`. Se descarga con GET /api/diagnostico/perfiles/{nombre}.
+- `texto`: en lugar de la respuesta se devuelve el reporte de pstats
+  (las PERFIL_LINEAS funciones con más tiempo acumulado).
+
+cProfile mide solo el hilo donde se activa, y los endpoints sincrónicos
+corren en el threadpool. Por eso `instrumentar_rutas()` envuelve el endpoint
+de cada ruta: la envoltura activa el perfil de la request en curso
+(`perfil_request`, lo fija PerfiladoMiddleware) en el hilo que ejecuta el
+endpoint. Sin perfil pedido, la envoltura solo lee un contextvar.
+
+La misma envoltura registra el tramo "router" de las trazas por capas
+(trazas.py).
+
+El muestreador de pilas (perfiles de baja sobrecarga en producción) está en
+api.muestreo.
+"""
+
+import asyncio
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi.routing import APIRoute
+
+import trazas
+
+PERFILES_DIR = Path(os.getenv("PERFILES_DIR", str(Path(__file__).parent.parent / "logs" / "perfiles")))
+
+# Perfiles .pstats que se conservan (se borran los más viejos)
+PERFILES_CONSERVAR = int(os.getenv("PERFILES_CONSERVAR", "50"))
+
+# Funciones del reporte en modo texto
+PERFIL_LINEAS = 40
+
+HEADER_PERFILAR = b"x-perfilar"
+HEADER_PERFIL = b"x-perfil"
+
+# Perfil de la request en curso (lo fija PerfiladoMiddleware); None = no se perfila
+perfil_request: ContextVar[Optional[cProfile.Profile]] = ContextVar("perfil_request", default=None)
+
+
+def _envolver(endpoint):
+    if getattr(endpoint, "perfilable", False):
+        return endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def envoltura(*args, **kwargs):
+            perfil = perfil_request.get()
+            if perfil is None:
+                return await endpoint(*args, **kwargs)
+            # En el event loop también se miden las otras tareas que corran en el medio
+            perfil.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                perfil.disable()
+    else:
+        @functools.wraps(endpoint)
+        def envoltura(*args, **kwargs):
+            perfil = perfil_request.get()
+            if perfil is None:
+                return endpoint(*args, **kwargs)
+            return perfil.runcall(endpoint, *args, **kwargs)
+    envoltura.perfilable = True
+    return envoltura
+
+
+def _rutas(rutas) -> List[APIRoute]:
+    encontradas = []
+    for ruta in rutas:
+        if isinstance(ruta, APIRoute):
+            encontradas.append(ruta)
+        elif getattr(ruta, "original_router", None) is not None:
+            # Routers incluidos que FastAPI resuelve al primer request
+            encontradas.extend(_rutas(ruta.original_router.routes))
+    return encontradas
+
+
+def instrumentar_rutas(app) -> int:
+    """
+    Envuelve el endpoint de todas las rutas para que se puedan perfilar y
+    trazar. Llamar después de registrar los routers y antes de atender requests.
+
+    Returns:
+        Cantidad de rutas instrumentadas
+    """
+    rutas = _rutas(app.routes)
+    for ruta in rutas:
+        envoltura = trazas.envolver(_envolver(ruta.endpoint), ruta.path, "router")
+        ruta.endpoint = envoltura
+        ruta.dependant.call = envoltura
+    return len(rutas)
+
+
+def modo_pedido(scope) -> Optional[str]:
+    """'guardar', 'texto' o None según el header X-Perfilar o el query param perfilar."""
+    for nombre, valor in scope.get("headers", []):
+        if nombre == HEADER_PERFILAR:
+            return "texto" if valor.decode("latin-1").strip().lower() == "texto" else "guardar"
+    consulta = re.search(r"(?:^|&)perfilar=([^&]*)", scope.get("query_string", b"").decode("latin-1"))
+    if consulta:
+        return "texto" if consulta.group(1).lower() == "texto" else "guardar"
+    return None
+
+
+def es_admin(scope) -> bool:
+    """True si el Authorization de la request es un token válido de administrador (consulta la base)."""
+    from repositories.rol_repository import RolRepository
+    from services.auth_service import AuthService
+
+    autorizacion = dict(scope.get("headers", [])).get(b"authorization", b"").decode("latin-1")
+    if not autorizacion.lower().startswith("bearer "):
+        return False
+    try:
+        usuario = AuthService.validar_token(autorizacion[7:].strip())
+        rol = RolRepository.obtener_por_id(usuario.id_rol)
+    except Exception:
+        return False
+    return bool(rol and rol.nombre_rol.lower() in ("admin", "administrador"))
+
+
+def reporte_texto(perfil: cProfile.Profile, lineas: int = PERFIL_LINEAS) -> str:
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).strip_dirs().sort_stats("cumulative").print_stats(lineas)
+    return salida.getvalue()
+
+
+def nombre_perfil(scope) -> str:
+    ruta = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+    ruta = re.sub(r"[^\w]+", "_", ruta).strip("_") or "raiz"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{scope.get('method', '')}-{ruta}.pstats"
+
+
+def guardar_perfil(perfil: cProfile.Profile, nombre: str) -> Path:
+    """Guarda el perfil en PERFILES_DIR y rota los más viejos."""
+    PERFILES_DIR.mkdir(parents=True, exist_ok=True)
+    destino = PERFILES_DIR / nombre
+    perfil.dump_stats(destino)
+    viejos = sorted(PERFILES_DIR.glob("*.pstats"))[:-PERFILES_CONSERVAR] if PERFILES_CONSERVAR > 0 else []
+    for archivo in viejos:
+        archivo.unlink(missing_ok=True)
+    return destino
+
+
+def listar_perfiles() -> List[dict]:
+    """Perfiles guardados, del más nuevo al más viejo."""
+    if not PERFILES_DIR.exists():
+        return []
+    return [
+        {'nombre': archivo.name, 'bytes': archivo.stat().st_size}
+        for archivo in sorted(PERFILES_DIR.glob("*.pstats"), reverse=True)
+    ]
+
+
+def ruta_perfil(nombre: str) -> Path:
+    """
+    Archivo de un perfil guardado.
+
+    Raises:
+        LookupError: Si el nombre no es válido o el perfil no existe
+    """
+    archivo = PERFILES_DIR / nombre
+    if Path(nombre).name != nombre or archivo.suffix != ".pstats" or not archivo.exists():
+        raise LookupError(f"Perfil {nombre} no encontrado")
+    return archivo
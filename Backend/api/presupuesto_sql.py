@@ -0,0 +1,134 @@
+"""
+Detector de consultas N+1 y presupuestos de sentencias SQL por endpoint.
+
+Con DETECTOR_N1=warn o DETECTOR_N1=error, MetricasMiddleware arma un
+`DetectorN1` por request y lo engancha al ContadorSQL de la request
+(database.contador_sql). Cada sentencia se agrupa por su forma normalizada
+(sin literales y con las listas `IN (?, ?, ...)` colapsadas). Hay dos
+reglas:
+
+- Una misma forma no puede repetirse más de N1_UMBRAL_REPETICIONES veces
+  (o el `max_repeticiones` del endpoint). Eso es el síntoma de un bucle que
+  llama a un repository por fila. No aplica a PRAGMA ni al control de
+  transacciones, que se repiten con cada conexión.
+- Un endpoint decorado con `@presupuesto_sql(max_sentencias=...)` no puede
+  superar esa cantidad total de sentencias.
+
+En modo `warn` las violaciones se loguean al terminar la request. En modo
+`error` la sentencia que cruza el límite lanza PresupuestoSQLExcedidoError
+y la request termina en 500. Es el modo para correr pruebas: una
+regresión N+1 no pasa. En los dos modos la respuesta lleva el header
+`X-SQL-Sentencias`.
+
+Por defecto está apagado (`off`): solo se cuentan sentencias y tiempo.
+tests/test_presupuesto_sql.py recorre los endpoints con presupuesto en modo
+`error`.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.consultas_lentas import forma_sentencia
+from database.errores import PresupuestoSQLExcedidoError
+
+logger = logging.getLogger(__name__)
+
+# off | warn | error
+DETECTOR_N1 = os.getenv("DETECTOR_N1", "off").lower()
+
+# Veces que puede repetirse una misma forma de sentencia en una request
+N1_UMBRAL_REPETICIONES = int(os.getenv("N1_UMBRAL_REPETICIONES", "10"))
+
+HEADER_SENTENCIAS = b"x-sql-sentencias"
+
+# Sentencias de conexión/transacción: cuentan para el total pero no como N+1
+_SIN_REGLA_REPETICION = ("PRAGMA", "BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def detector_habilitado() -> bool:
+    # Se lee en cada request (las pruebas cambian el modo en caliente)
+    return DETECTOR_N1 in ("warn", "error")
+
+
+def presupuesto_sql(max_sentencias: Optional[int] = None, max_repeticiones: Optional[int] = None):
+    """
+    Declara el presupuesto SQL de un endpoint (va debajo del decorador de la ruta).
+
+    Args:
+        max_sentencias: Sentencias totales permitidas por request (None = sin límite)
+        max_repeticiones: Repeticiones permitidas de una misma forma (None = N1_UMBRAL_REPETICIONES)
+    """
+    def decorador(endpoint):
+        endpoint.presupuesto_sql = {'max_sentencias': max_sentencias, 'max_repeticiones': max_repeticiones}
+        return endpoint
+    return decorador
+
+
+class DetectorN1:
+    """Cuenta las sentencias de una request por forma y aplica las reglas (ver docstring del módulo)."""
+
+    def __init__(self, scope: Dict, modo: Optional[str] = None):
+        self.scope = scope
+        self.estricto = (modo or DETECTOR_N1) == "error"
+        self.total = 0
+        self.por_forma: Dict[str, int] = {}
+        self.violaciones: List[str] = []
+        self._presupuesto: Optional[Dict] = None
+
+    def _limites(self) -> Dict:
+        # La ruta se resuelve después de crear el detector: se lee en la primera sentencia
+        if self._presupuesto is None:
+            endpoint = getattr(self.scope.get("route"), "endpoint", None)
+            declarado = getattr(endpoint, "presupuesto_sql", None) or {}
+            self._presupuesto = {
+                'max_sentencias': declarado.get('max_sentencias'),
+                'max_repeticiones': declarado.get('max_repeticiones') or N1_UMBRAL_REPETICIONES,
+            }
+        return self._presupuesto
+
+    def endpoint(self) -> str:
+        ruta = getattr(self.scope.get("route"), "path", None) or self.scope.get("path", "?")
+        return f"{self.scope.get('method', '')} {ruta}"
+
+    def verificar(self, sql: str) -> None:
+        """Hook del ContadorSQL: se llama antes de ejecutar cada sentencia."""
+        limites = self._limites()
+        forma = forma_sentencia(sql)
+        self.total += 1
+        repeticiones = self.por_forma[forma] = self.por_forma.get(forma, 0) + 1
+
+        nuevas = []
+        if repeticiones == limites['max_repeticiones'] + 1 and not forma.upper().startswith(_SIN_REGLA_REPETICION):
+            nuevas.append(f"posible N+1 en {self.endpoint()}: la sentencia se repitió más de "
+                          f"{limites['max_repeticiones']} veces: {forma}")
+        if limites['max_sentencias'] is not None and self.total == limites['max_sentencias'] + 1:
+            nuevas.append(f"{self.endpoint()} superó su presupuesto de "
+                          f"{limites['max_sentencias']} sentencias SQL")
+        self.violaciones.extend(nuevas)
+        if nuevas and self.estricto:
+            raise PresupuestoSQLExcedidoError("; ".join(nuevas))
+
+    def respuesta_error(self, sentencias: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Mensajes ASGI del 500 que reemplaza la respuesta en modo estricto."""
+        cuerpo = json.dumps({'detail': "; ".join(self.violaciones)}).encode()
+        inicio = {
+            'type': 'http.response.start',
+            'status': 500,
+            'headers': [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (HEADER_SENTENCIAS, str(sentencias).encode()),
+            ],
+        }
+        return inicio, {'type': 'http.response.body', 'body': cuerpo}
+
+    def finalizar(self) -> None:
+        """Loguea las violaciones de la request (modo warn) con las formas más repetidas."""
+        if not self.violaciones or self.estricto:
+            return
+        mas_repetidas = sorted(self.por_forma.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        detalle = "; ".join(f"{cuenta}x {forma}" for forma, cuenta in mas_repetidas)
+        for violacion in self.violaciones:
+            logger.warning("%s (%s sentencias; más repetidas: %s)", violacion, self.total, detalle)
@@ -8,12 +8,16 @@ from fastapi import FastAPI
 
 # Importamos cada router del paquete
 from .auth import router as auth_router
+from .cambios import router as cambios_router
 from .canchas import router as canchas_router
 from .clientes import router as clientes_router
+from .diagnostico import router as diagnostico_router
 from .equipos import router as equipos_router
 from .equipo_miembros import router as equipo_miembros_router
 from .equipo_torneo import router as equipo_torneo_router
+from .holds import router as holds_router
 from .pagos import router as pagos_router
+from .plantillas import router as plantillas_router
 from .reportes import router as reportes_router
 from .servicios_adicionales import router as servicios_adicionales_router
 from .torneos import router as torneos_router
@@ -22,12 +26,16 @@ from .usuarios import router as usuarios_router
 
 __all__ = [
 	"auth_router",
+	"cambios_router",
 	"canchas_router",
 	"clientes_router",
+	"diagnostico_router",
 	"equipos_router",
 	"equipo_miembros_router",
 	"equipo_torneo_router",
+	"holds_router",
 	"pagos_router",
+	"plantillas_router",
 	"reportes_router",
 	"servicios_adicionales_router",
 	"torneos_router",
@@ -45,12 +53,16 @@ def register_routers(app: FastAPI, prefix: str = "/api") -> None:
 		prefix: Prefijo opcional para todos los routers (ej: "/api")
 	"""
 	app.include_router(auth_router, prefix=prefix)
+	app.include_router(cambios_router, prefix=prefix)
 	app.include_router(canchas_router, prefix=prefix)
 	app.include_router(clientes_router, prefix=prefix)
+	app.include_router(diagnostico_router, prefix=prefix)
 	app.include_router(equipos_router, prefix=prefix)
 	app.include_router(equipo_miembros_router, prefix=prefix)
 	app.include_router(equipo_torneo_router, prefix=prefix)
+	app.include_router(holds_router, prefix=prefix)
 	app.include_router(pagos_router, prefix=prefix)
+	app.include_router(plantillas_router, prefix=prefix)
 	app.include_router(reportes_router, prefix=prefix)
 	app.include_router(servicios_adicionales_router, prefix=prefix)
 	app.include_router(torneos_router, prefix=prefix)
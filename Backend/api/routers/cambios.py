@@ -0,0 +1,30 @@
+"""Router FastAPI del feed de cambios (changelog) para sincronización incremental."""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.dependencies.auth import require_admin
+from models.usuario import Usuario
+from services import cambios_service
+
+router = APIRouter()
+
+
+@router.get("/cambios")
+def obtener_cambios(
+    desde_seq: int = Query(0, description="Último seq procesado (0 = desde el principio)"),
+    limit: int = Query(cambios_service.CAMBIOS_LIMITE_DEFECTO, description="Entradas por página"),
+    admin_check: Usuario = Depends(require_admin),
+):
+    """
+    Cambios en Turno, Pago, TurnoXServicio, Cliente y EquipoXTorneo posteriores a `desde_seq`.
+    
+    Usar `ultimo_seq` de la respuesta como próximo `desde_seq` mientras `hay_mas` sea true.
+    Si `resincronizar` es true el cursor es anterior a entradas ya purgadas: hay
+    que volver a leer las tablas completas y seguir desde `seq_actual`.
+    """
+    try:
+        return cambios_service.obtener_cambios(desde_seq, limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {e}")
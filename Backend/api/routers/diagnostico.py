@@ -0,0 +1,136 @@
+"""Router FastAPI con diagnósticos de la capa de datos y perfilado (solo administradores)."""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+import trazas
+from api import perfilado
+from api.dependencies.auth import require_admin
+from api.muestreo import muestreador
+from database import replica
+from database.consultas_lentas import consultas_lentas
+from database.contencion import contencion
+from models.usuario import Usuario
+from services.eventos_turnos import bus_turnos
+
+router = APIRouter()
+
+
+@router.get("/diagnostico/contencion")
+def obtener_contencion(admin_check: Usuario = Depends(require_admin)):
+    """
+    Esperas y reintentos por bloqueos de SQLite (SQLITE_BUSY/SQLITE_LOCKED)
+    desde el inicio o el último reinicio, por sentencia y por endpoint.
+    Muchos eventos en escrituras indican que conviene habilitar la cola de
+    escritura (COLA_ESCRITURA_HABILITADA=1) o separar bases.
+    """
+    return contencion.resumen()
+
+
+@router.get("/diagnostico/replica")
+def obtener_estado_replica(admin_check: Usuario = Depends(require_admin)):
+    """Atraso de la réplica: cambios pendientes de enviar y antigüedad del más viejo."""
+    if replica.REPLICA_PATH is None:
+        raise HTTPException(status_code=404, detail="No hay una réplica configurada (REPLICA_PATH)")
+    try:
+        return replica.estado()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/diagnostico/eventos")
+def obtener_estado_eventos(admin_check: Usuario = Depends(require_admin)):
+    """Conexiones SSE de /turnos/stream abiertas, eventos publicados y suscriptores descartados por lentos."""
+    return bus_turnos.estadisticas()
+
+
+@router.get("/diagnostico/consultas-lentas")
+def obtener_consultas_lentas(
+    limite: int = Query(20, ge=1, le=500, description="Cantidad de sentencias"),
+    orden: str = Query("total", description="'total' (tiempo acumulado) o 'max' (peor ejecución)"),
+    admin_check: Usuario = Depends(require_admin)
+):
+    """
+    Sentencias que superaron CONSULTA_LENTA_MS, agrupadas por forma, con la
+    ejecución más lenta de cada una (parámetros redactados, origen y plan).
+    El detalle de cada ejecución está en el archivo JSON lines.
+    """
+    if orden not in ("total", "max"):
+        raise HTTPException(status_code=400, detail="orden debe ser 'total' o 'max'")
+    return consultas_lentas.top(limite, orden)
+
+
+@router.post("/diagnostico/consultas-lentas/reiniciar")
+def reiniciar_consultas_lentas(admin_check: Usuario = Depends(require_admin)):
+    """Vacía el resumen en memoria de consultas lentas (el archivo no se toca)."""
+    consultas_lentas.reiniciar()
+    return {"message": "Resumen de consultas lentas reiniciado"}
+
+
+@router.post("/diagnostico/contencion/reiniciar")
+def reiniciar_contencion(admin_check: Usuario = Depends(require_admin)):
+    """Pone en cero las estadísticas de contención."""
+    contencion.reiniciar()
+    return {"message": "Estadísticas de contención reiniciadas"}
+
+
+@router.get("/diagnostico/perfiles")
+def listar_perfiles(admin_check: Usuario = Depends(require_admin)):
+    """Perfiles cProfile guardados con X-Perfilar (ver api.perfilado), del más nuevo al más viejo."""
+    return perfilado.listar_perfiles()
+
+
+@router.get("/diagnostico/perfiles/{nombre}")
+def descargar_perfil(nombre: str, admin_check: Usuario = Depends(require_admin)):
+    """Descarga un .pstats (se abre con `python -m pstats` o snakeviz)."""
+    try:
+        return FileResponse(perfilado.ruta_perfil(nombre), media_type="application/octet-stream", filename=nombre)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/diagnostico/muestreo/iniciar")
+def iniciar_muestreo(
+    segundos: float = Query(30, description="Duración del muestreo"),
+    intervalo_ms: float = Query(10, description="Intervalo entre muestras"),
+    incluir_inactivos: bool = Query(False, description="Incluir hilos bloqueados esperando"),
+    admin_check: Usuario = Depends(require_admin)
+):
+    """Arranca el muestreador de pilas (ver api.muestreo)."""
+    try:
+        return muestreador.iniciar(segundos, intervalo_ms, incluir_inactivos)
+    except ValueError as e:
+        raise HTTPException(status_code=409 if muestreador.activo else 400, detail=str(e))
+
+
+@router.post("/diagnostico/muestreo/detener")
+def detener_muestreo(admin_check: Usuario = Depends(require_admin)):
+    """Corta el muestreo en curso."""
+    return muestreador.detener()
+
+
+@router.get("/diagnostico/muestreo")
+def obtener_estado_muestreo(admin_check: Usuario = Depends(require_admin)):
+    """Estado del muestreador: si está activo, muestras tomadas y archivo .folded del último muestreo."""
+    return muestreador.estado()
+
+
+@router.get("/diagnostico/muestreo/collapsed", response_class=PlainTextResponse)
+def obtener_pilas_muestreo(admin_check: Usuario = Depends(require_admin)):
+    """Pilas del último muestreo en formato collapsed (flamegraph.pl, speedscope)."""
+    return muestreador.collapsed()
+
+
+@router.get("/diagnostico/trazas")
+def listar_trazas(admin_check: Usuario = Depends(require_admin)):
+    """Trazas por capas guardadas (ver trazas.py), de la más nueva a la más vieja."""
+    return trazas.listar()
+
+
+@router.get("/diagnostico/trazas/{nombre}")
+def descargar_traza(nombre: str, admin_check: Usuario = Depends(require_admin)):
+    """Descarga una traza en formato Trace Event (se abre en chrome://tracing o ui.perfetto.dev)."""
+    try:
+        return FileResponse(trazas.ruta(nombre), media_type="application/json", filename=nombre)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -3,6 +3,7 @@ Router para gestionar la relación EquipoXTorneo (inscripciones de equipos en to
 """
 from typing import List, Dict, Any
 from fastapi import APIRouter, HTTPException
+from api.presupuesto_sql import presupuesto_sql
 from services.equipo_torneo_service import (
     inscribir_equipo_a_torneo,
     inscribir_equipos_masivo,
@@ -43,6 +44,7 @@ def inscribir_equipo(payload: Dict[str, Any]):
 
 
 @router.post("/inscribir-masivo")
+@presupuesto_sql(max_sentencias=10)
 def inscribir_equipos_masivo_route(payload: Dict[str, Any]):
     """Inscribe múltiples equipos a un torneo"""
     try:
@@ -0,0 +1,77 @@
+"""Router FastAPI para holds (retenciones temporales) de turnos."""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, Optional
+
+from api.dependencies.auth import require_role
+from models.usuario import Usuario
+from services import holds_service
+
+router = APIRouter()
+
+
+@router.post("/turnos/{turno_id}/hold", status_code=status.HTTP_201_CREATED)
+def crear_hold(turno_id: int, payload: Dict[str, Any], current_user: Usuario = Depends(require_role("cliente"))):
+    """
+    Retiene un turno mientras el cliente completa el pago.
+    
+    Body:
+    {
+        "id_cliente": 1,
+        "ttl_segundos": 600   // Opcional
+    }
+    
+    Devuelve el token del hold y su vencimiento; si vence sin confirmarse el turno se libera.
+    """
+    try:
+        hold = holds_service.crear_hold(turno_id, payload.get("id_cliente"), payload.get("ttl_segundos"))
+        return hold.to_dict()
+    except ValueError as ve:
+        raise HTTPException(status_code=409, detail=str(ve))
+    except LookupError as le:
+        raise HTTPException(status_code=404, detail=str(le))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {e}")
+
+
+@router.get("/holds/{token}")
+def obtener_hold(token: str, current_user: Usuario = Depends(require_role("cliente"))):
+    """Consulta el estado de un hold."""
+    try:
+        return holds_service.obtener_hold(token).to_dict()
+    except LookupError as le:
+        raise HTTPException(status_code=404, detail=str(le))
+
+
+@router.post("/holds/{token}/confirmar")
+def confirmar_hold(token: str, payload: Optional[Dict[str, Any]] = None,
+                   current_user: Usuario = Depends(require_role("cliente"))):
+    """
+    Confirma el hold: reserva el turno y registra el pago.
+    
+    Body (opcional):
+    {
+        "metodo_pago": "tarjeta"
+    }
+    """
+    try:
+        return holds_service.confirmar_hold(token, (payload or {}).get("metodo_pago", "tarjeta"))
+    except ValueError as ve:
+        raise HTTPException(status_code=409, detail=str(ve))
+    except LookupError as le:
+        raise HTTPException(status_code=404, detail=str(le))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {e}")
+
+
+@router.post("/holds/{token}/cancelar")
+def cancelar_hold(token: str, current_user: Usuario = Depends(require_role("cliente"))):
+    """Cancela el hold y libera el turno."""
+    try:
+        return holds_service.cancelar_hold(token).to_dict()
+    except ValueError as ve:
+        raise HTTPException(status_code=409, detail=str(ve))
+    except LookupError as le:
+        raise HTTPException(status_code=404, detail=str(le))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {e}")
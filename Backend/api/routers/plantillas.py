@@ -0,0 +1,148 @@
+"""Router FastAPI para plantillas horarias semanales y generación automática de turnos."""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional, Dict, Any
+
+from api.dependencies.auth import require_admin
+from models.usuario import Usuario
+from services import plantillas_service
+
+router = APIRouter()
+
+
+# ====================================================
+# EXCEPCIONES (FERIADOS)
+# ====================================================
+
+@router.post("/plantillas-horario/excepciones", status_code=status.HTTP_201_CREATED)
+def crear_excepcion(payload: Dict[str, Any], current_user: Usuario = Depends(require_admin)):
+    """
+    Registra un feriado o día sin turnos y bloquea los turnos disponibles ya generados.
+    
+    Body:
+    {
+        "fecha": "2025-12-25",
+        "motivo": "Navidad",
+        "id_cancha": null   // Opcional: null aplica a todas las canchas
+    }
+    """
+    try:
+        return plantillas_service.crear_excepcion(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/plantillas-horario/excepciones")
+def listar_excepciones(
+    fecha_desde: str = Query(..., description="Fecha inicio (YYYY-MM-DD)"),
+    fecha_hasta: str = Query(..., description="Fecha fin (YYYY-MM-DD)"),
+    current_user: Usuario = Depends(require_admin)
+):
+    """Lista las excepciones de horario en un rango de fechas."""
+    excepciones = plantillas_service.listar_excepciones(fecha_desde, fecha_hasta)
+    return [e.to_dict() for e in excepciones]
+
+
+@router.delete("/plantillas-horario/excepciones/{excepcion_id}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_excepcion(excepcion_id: int, current_user: Usuario = Depends(require_admin)):
+    """Elimina una excepción de horario."""
+    try:
+        plantillas_service.eliminar_excepcion(excepcion_id)
+        return None
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+# ====================================================
+# GENERACIÓN AUTOMÁTICA
+# ====================================================
+
+@router.post("/plantillas-horario/materializar")
+def materializar_horizonte(
+    dias: Optional[int] = Query(None, ge=1, le=366, description="Horizonte en días (opcional)"),
+    current_user: Usuario = Depends(require_admin)
+):
+    """Genera ahora los turnos que faltan para cubrir el horizonte (lo mismo que hace la tarea periódica)."""
+    try:
+        return plantillas_service.materializar_horizonte(dias)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ====================================================
+# CRUD DE PLANTILLAS
+# ====================================================
+
+@router.post("/plantillas-horario/", status_code=status.HTTP_201_CREATED)
+def crear_plantilla(payload: Dict[str, Any], current_user: Usuario = Depends(require_admin)):
+    """
+    Crea la plantilla de un día de la semana para una cancha.
+    
+    Body:
+    {
+        "id_cancha": 1,
+        "dia_semana": 5,          // 0=lunes ... 6=domingo
+        "hora_apertura": "08:00",
+        "hora_cierre": "23:00",
+        "duracion_minutos": 60,
+        "precio_turno": 8000.0    // Opcional (por defecto precio_hora de la cancha)
+    }
+    """
+    try:
+        plantilla = plantillas_service.crear_plantilla(payload)
+        return plantilla.to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/plantillas-horario/")
+def listar_plantillas(
+    id_cancha: Optional[int] = Query(None, description="Filtrar por cancha"),
+    current_user: Usuario = Depends(require_admin)
+):
+    """Lista las plantillas horarias."""
+    plantillas = plantillas_service.listar_plantillas(id_cancha)
+    return [p.to_dict() for p in plantillas]
+
+
+@router.get("/plantillas-horario/{plantilla_id}")
+def obtener_plantilla(plantilla_id: int, current_user: Usuario = Depends(require_admin)):
+    """Obtiene una plantilla por su ID."""
+    try:
+        return plantillas_service.obtener_plantilla(plantilla_id).to_dict()
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.put("/plantillas-horario/{plantilla_id}")
+def actualizar_plantilla(plantilla_id: int, payload: Dict[str, Any],
+                         current_user: Usuario = Depends(require_admin)):
+    """Actualiza una plantilla (aplica a los días que todavía no se generaron)."""
+    try:
+        return plantillas_service.actualizar_plantilla(plantilla_id, payload).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/plantillas-horario/{plantilla_id}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_plantilla(plantilla_id: int, current_user: Usuario = Depends(require_admin)):
+    """Elimina una plantilla (los turnos ya generados se conservan)."""
+    try:
+        plantillas_service.eliminar_plantilla(plantilla_id)
+        return None
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
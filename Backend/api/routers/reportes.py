@@ -8,12 +8,14 @@ from datetime import datetime
 
 from services.reportes_service import ReportesService
 from api.dependencies.auth import require_admin
+from api.presupuesto_sql import presupuesto_sql
 from models.usuario import Usuario
 
 router = APIRouter()
 
 
 @router.get("/reportes/resumen", response_model=Dict[str, Any])
+@presupuesto_sql(max_sentencias=20)
 def obtener_resumen_general(
     current_user: Usuario = Depends(require_admin)
 ):
@@ -28,6 +30,7 @@ def obtener_resumen_general(
 
 
 @router.get("/reportes/reservas-por-cliente", response_model=List[Dict[str, Any]])
+@presupuesto_sql(max_sentencias=20)
 def obtener_reservas_por_cliente(
     id_cliente: Optional[int] = Query(None, description="ID del cliente (opcional)"),
     current_user: Usuario = Depends(require_admin)
@@ -44,6 +47,7 @@ def obtener_reservas_por_cliente(
 
 
 @router.get("/reportes/reservas-por-cancha", response_model=List[Dict[str, Any]])
+@presupuesto_sql(max_sentencias=20)
 def obtener_reservas_por_cancha(
     fecha_inicio: str = Query(..., description="Fecha inicio (YYYY-MM-DD)"),
     fecha_fin: str = Query(..., description="Fecha fin (YYYY-MM-DD)"),
@@ -77,6 +81,7 @@ def obtener_reservas_por_cancha(
 
 
 @router.get("/reportes/canchas-mas-utilizadas", response_model=List[Dict[str, Any]])
+@presupuesto_sql(max_sentencias=25)
 def obtener_canchas_mas_utilizadas(
     limite: int = Query(10, ge=1, le=50, description="Cantidad máxima de canchas"),
     current_user: Usuario = Depends(require_admin)
@@ -92,6 +97,7 @@ def obtener_canchas_mas_utilizadas(
 
 
 @router.get("/reportes/utilizacion-mensual", response_model=List[Dict[str, Any]])
+@presupuesto_sql(max_sentencias=20)
 def obtener_utilizacion_mensual(
     anio: Optional[int] = Query(None, ge=2000, le=2100, description="Año (opcional, default: actual)"),
     current_user: Usuario = Depends(require_admin)
@@ -1,12 +1,17 @@
 """Router FastAPI para gestión de Turnos y Reservas."""
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+import hashlib
+import json
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 from api.dependencies.auth import require_role, require_admin
+from api.presupuesto_sql import presupuesto_sql
 from models.usuario import Usuario
-from services import turnos_service, turno_servicios_service, reservas_service
+from services import turnos_service, turno_servicios_service, reservas_service, eventos_turnos
+from database.errores import ConflictoVersionError
 
 router = APIRouter()
 
@@ -16,85 +21,69 @@ router = APIRouter()
 # ====================================================
 
 @router.post("/turnos/{turno_id}/reservar", status_code=status.HTTP_200_OK)
+@presupuesto_sql(max_sentencias=40)
 def reservar_turno_endpoint(turno_id: int, request: Dict[str, Any],
                             current_user: Usuario = Depends(require_role("cliente"))):
     """
     CU-1: Registra una reserva sobre un turno disponible.
-    Orquesta: pagos_service (pagos), turnos_service (estados turno), turno_servicios_service (servicios).
+    Orquesta: holds_service (retención del turno, pago y servicios en la confirmación).
+    
+    El turno se retiene con un hold antes de cobrar: si el flujo falla el hold
+    se cancela, y si el proceso muere jobs.expiracion_holds lo libera al vencer.
+    El pago se registra en la misma transacción que la reserva.
     
     Body:
     {
         "id_cliente": 1,
-        "monto_turno": 5000.0,
         "metodo_pago": "tarjeta",  // Opcional
         "servicios": [{"id_servicio": 1, "cantidad": 1, "precio_unitario": 500}, ...]  // Opcional
     }
     """
     try:
-        from services import pagos_service, turno_servicios_service
+        from services import holds_service
         
         id_cliente = request.get("id_cliente")
-        monto_turno = request.get("monto_turno", 0.0)
         metodo_pago = request.get("metodo_pago", "tarjeta")
-        servicios = request.get("servicios", [])
-        
-        # Calcular monto de servicios
-        monto_servicios = sum(s.get('precio_unitario', 0) * s.get('cantidad', 1) for s in servicios)
-        
-        # 1. Validar que el turno existe y está disponible
-        turno = turnos_service.validar_turno_disponible(turno_id)
-        
-        # 2. Marcar turno como pendiente de pago
-        turnos_service.cambiar_estado_turno(turno_id, 'pendiente_pago')
-        
-        # 3. Crear el pago (estado 'iniciado')
-        pago = pagos_service.crear_pago_turno(
-            id_turno=turno_id,
-            id_cliente=id_cliente,
-            monto_turno=monto_turno,
-            monto_servicios=monto_servicios,
-            metodo_pago=metodo_pago
-        )
-        
-        # 4. Simular validación de pago (en producción: integración con gateway)
-        # TODO: Integrar con MercadoPago/Stripe/etc.
-        pago_valido = True  # Simulación: siempre válido para desarrollo
+        servicios = request.get("servicios") or []
         
-        if not pago_valido:
-            # Si falla: marcar pago fallido y liberar turno
-            pagos_service.marcar_pago_fallido(pago.id)
-            turnos_service.cambiar_estado_turno(turno_id, 'disponible')
-            raise HTTPException(status_code=402, detail="Pago rechazado")
-        
-        # 5. Confirmar el pago (estado 'completado')
-        pago_confirmado = pagos_service.confirmar_pago(
-            pago_id=pago.id,
-            metodo_pago=metodo_pago,
-            id_gateway_externo=f"SIM-{pago.id}-{datetime.now().timestamp()}"
-        )
+        # 1. Validar que el turno existe y está disponible (si no, sugerir alternativas)
+        try:
+            turnos_service.validar_turno_disponible(turno_id)
+        except ValueError as ve:
+            return _conflicto_con_alternativas(turno_id, str(ve))
         
-        # 6. Reservar el turno (estado 'reservado', actualiza id_cliente y reserva_created_at)
-        turno_reservado = reservas_service.ReservasService.registrar_reserva(
-            turno_id=turno_id,
-            id_cliente=id_cliente
-        )
+        # 2. Retener el turno ('pendiente_pago' con vencimiento); solo si sigue
+        #    'disponible', así de dos pedidos concurrentes uno solo llega a cobrar
+        try:
+            hold = holds_service.crear_hold(turno_id, id_cliente)
+        except ConflictoVersionError as ce:
+            return _conflicto_con_alternativas(turno_id, str(ce))
         
-        # 7. Agregar servicios adicionales si los hay
-        if servicios:
-            for servicio_data in servicios:
-                turno_servicios_service.agregar_servicio_desde_dict(
-                    id_turno=turno_id,
-                    id_servicio=servicio_data['id_servicio'],
-                    cantidad=servicio_data.get('cantidad', 1),
-                    precio_unitario=servicio_data['precio_unitario']
-                )
+        try:
+            # 3. Simular validación de pago (en producción: integración con gateway)
+            # TODO: Integrar con MercadoPago/Stripe/etc.
+            pago_valido = True  # Simulación: siempre válido para desarrollo
+            if not pago_valido:
+                raise HTTPException(status_code=402, detail="Pago rechazado")
+            
+            # 4. Reservar el turno, registrar el pago y los servicios (una transacción)
+            resultado = holds_service.confirmar_hold(hold.token, metodo_pago, servicios)
+        except Exception:
+            # Liberar el turno ya; si tampoco se puede, lo libera el vencimiento del hold
+            try:
+                holds_service.cancelar_hold(hold.token)
+            except Exception:
+                pass
+            raise
         
         return {
-            "turno": turno_reservado.to_dict(),
-            "pago": pago_confirmado.to_dict()
+            "turno": resultado['turno'],
+            "pago": resultado['pago']
         }
     except HTTPException:
         raise
+    except ConflictoVersionError as ce:
+        raise HTTPException(status_code=409, detail=str(ce))
     except ValueError as ve:
         raise HTTPException(status_code=409, detail=str(ve))
     except LookupError as le:
@@ -103,6 +92,128 @@ def reservar_turno_endpoint(turno_id: int, request: Dict[str, Any],
         raise HTTPException(status_code=500, detail=f"Error interno: {e}")
 
 
+@router.post("/turnos/reservar-serie", status_code=status.HTTP_200_OK)
+def reservar_serie_endpoint(request: Dict[str, Any], current_user: Usuario = Depends(require_role("cliente"))):
+    """
+    Reserva el mismo horario semanal de una cancha durante un rango de fechas
+    (ej. todos los martes 20:00 de la temporada) en una única transacción.
+    
+    Body:
+    {
+        "id_cancha": 1,
+        "id_cliente": 1,
+        "dia_semana": 1,              // 0=lunes ... 6=domingo
+        "hora": "20:00",
+        "fecha_desde": "2025-03-01",
+        "fecha_hasta": "2025-06-30",
+        "todo_o_nada": true,          // Opcional (por defecto true)
+        "modo_pago": "agregado",      // Opcional: "agregado" | "por_turno"
+        "metodo_pago": "tarjeta"      // Opcional
+    }
+    
+    Responde 409 con la lista de conflictos si no se reservó ningún turno.
+    """
+    try:
+        resultado = reservas_service.ReservasService.reservar_serie(request, id_usuario_registro=current_user.id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {e}")
+
+    if not resultado['reservados']:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "No se pudo reservar ningún turno de la serie", "conflictos": resultado['conflictos']}
+        )
+    return resultado
+
+
+@router.post("/turnos/reservar-carrito", status_code=status.HTTP_200_OK)
+def reservar_carrito_endpoint(request: Dict[str, Any], current_user: Usuario = Depends(require_role("cliente"))):
+    """
+    Reserva varios turnos con sus servicios en una única transacción (todos o ninguno).
+    
+    Body:
+    {
+        "id_cliente": 1,
+        "metodo_pago": "tarjeta",  // Opcional
+        "items": [
+            {"id_turno": 10, "servicios": [{"id_servicio": 1, "cantidad": 2}]},
+            {"id_turno": 11}
+        ]
+    }
+    
+    Responde 409 con los turnos en conflicto si alguno no estaba disponible.
+    """
+    try:
+        resultado = reservas_service.ReservasService.reservar_carrito(request, id_usuario_registro=current_user.id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except LookupError as le:
+        raise HTTPException(status_code=404, detail=str(le))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {e}")
+
+    if resultado['conflictos']:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "Algunos turnos del carrito no están disponibles", "conflictos": resultado['conflictos']}
+        )
+    return resultado
+
+
+def _conflicto_con_alternativas(turno_id: int, mensaje: str) -> JSONResponse:
+    """Respuesta 409 que incluye los turnos disponibles más cercanos al pedido."""
+    try:
+        alternativas = turnos_service.sugerir_alternativas(turno_id)
+    except Exception:
+        alternativas = []
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": mensaje, "alternativas": alternativas}
+    )
+
+
+def _etag_turno(turno) -> str:
+    """ETag fuerte de un turno: cambia con cada escritura (columna version)."""
+    return f'"turno-{turno.id}-{turno.version}"'
+
+
+def _version_if_match(turno_id: int, if_match: Optional[str]) -> Optional[int]:
+    """
+    Versión esperada según el header If-Match (None si no se envió o es '*').
+    Un ETag que no corresponde a este turno no puede coincidir: responde 412.
+    """
+    if if_match is None or if_match.strip() == '*':
+        return None
+    prefijo = f'turno-{turno_id}-'
+    for etag in if_match.split(','):
+        valor = etag.strip()
+        if valor.startswith('W/'):
+            valor = valor[2:]
+        valor = valor.strip('"')
+        if valor.startswith(prefijo) and valor[len(prefijo):].isdigit():
+            return int(valor[len(prefijo):])
+    raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="El ETag de If-Match no corresponde a este turno")
+
+
+def _respuesta_turno(turno) -> JSONResponse:
+    """Devuelve el turno con su ETag para el próximo If-Match."""
+    return JSONResponse(content=turno.to_dict(), headers={"ETag": _etag_turno(turno)})
+
+
+@router.get("/turnos/{turno_id}/alternativas")
+@presupuesto_sql(max_sentencias=15)
+def listar_alternativas(turno_id: int, k: int = Query(turnos_service.CANTIDAD_ALTERNATIVAS, description="Cantidad de alternativas")):
+    """Turnos disponibles más cercanos en el tiempo (misma cancha y canchas del mismo deporte)."""
+    try:
+        return turnos_service.sugerir_alternativas(turno_id, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get("/turnos/{turno_id}/detalle")
 def consultar_reserva_endpoint(
     turno_id: int,
@@ -144,8 +255,13 @@ def listar_reservas_cliente_endpoint(
 
 @router.patch("/turnos/{turno_id}/reserva")
 @router.patch("/turnos/{turno_id}")  # Alias para compatibilidad con tests
-def modificar_reserva_endpoint(turno_id: int, request: Dict[str, Any], current_user: Usuario = Depends(require_role("cliente"))):
-    """CU-3: Modifica una reserva existente."""
+def modificar_reserva_endpoint(turno_id: int, request: Dict[str, Any],
+                               current_user: Usuario = Depends(require_role("cliente")),
+                               if_match: Optional[str] = Header(None)):
+    """
+    CU-3: Modifica una reserva existente.
+    Con If-Match (ETag de GET /turnos/{id}) responde 412 si el turno cambió en el medio.
+    """
     try:
         id_usuario_mod = request.pop("id_usuario_mod", None)
         nuevos_datos = request
@@ -156,11 +272,15 @@ def modificar_reserva_endpoint(turno_id: int, request: Dict[str, Any], current_u
         turno = reservas_service.ReservasService.modificar_reserva(
             turno_id=turno_id,
             nuevos_datos=nuevos_datos,
-            id_usuario_mod=id_usuario_mod
+            id_usuario_mod=id_usuario_mod,
+            version_esperada=_version_if_match(turno_id, if_match)
         )
-        return turno.to_dict()
+        return _respuesta_turno(turno)
     except HTTPException:
         raise
+    except ConflictoVersionError as ce:
+        codigo = status.HTTP_412_PRECONDITION_FAILED if if_match else status.HTTP_409_CONFLICT
+        raise HTTPException(status_code=codigo, detail=str(ce))
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except LookupError as le:
@@ -210,7 +330,37 @@ def crear_turno(turno_data: Dict[str, Any], current_user: Usuario = Depends(requ
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/turnos/generar", status_code=status.HTTP_200_OK)
+def generar_turnos(payload: Dict[str, Any], current_user: Usuario = Depends(require_admin)):
+    """
+    Genera turnos en lote para varias canchas y un rango de fechas.
+    
+    Body:
+    {
+        "ids_canchas": [1, 2, 3],
+        "fecha_desde": "2025-12-01",
+        "fecha_hasta": "2025-12-31",
+        "hora_apertura": "08:00",
+        "hora_cierre": "23:00",
+        "duracion_minutos": 60,
+        "precio_final": 8000.0,     // Opcional (por defecto precio_hora de la cancha)
+        "dias_semana": [0, 1, 2],   // Opcional (0=lunes ... 6=domingo)
+        "dry_run": false            // Opcional: solo informa lo que se crearía
+    }
+    """
+    try:
+        payload['id_usuario_registro'] = current_user.id
+        return turnos_service.generar_turnos(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/turnos/")
+@presupuesto_sql(max_sentencias=10)
 def listar_turnos(id_cliente: Optional[int] = Query(None, description="Filtrar por cliente (legacy)")):
     """Lista turnos. Si se proporciona id_cliente, lista reservas de ese cliente."""
     if id_cliente is not None:
@@ -233,6 +383,7 @@ def listar_turnos_por_cancha(id_cancha: int):
 
 
 @router.get("/turnos/cliente/{id_cliente}")
+@presupuesto_sql(max_sentencias=15)
 def listar_turnos_por_cliente(id_cliente: int):
     """Lista turnos de un cliente específico con información de pago y servicios."""
     return turnos_service.listar_turnos_por_cliente_con_detalle(id_cliente)
@@ -256,6 +407,85 @@ def buscar_turnos_disponibles(
     return [t.to_dict() for t in turnos]
 
 
+@router.get("/turnos/grilla")
+@presupuesto_sql(max_sentencias=15)
+def obtener_grilla(
+    desde: Optional[str] = Query(None, description="Fecha/hora inicio (ISO). Por defecto, hoy"),
+    hasta: Optional[str] = Query(None, description="Fecha/hora fin exclusiva (ISO); una fecha sola incluye ese día"),
+    deporte: Optional[str] = Query(None, description="Tipo de deporte"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Grilla de disponibilidad (canchas × horarios) para el calendario de reservas.
+    Responde 304 si el ETag enviado en If-None-Match sigue vigente.
+    """
+    try:
+        etag = turnos_service.etag_grilla(desde, hasta, deporte)
+        if etag and if_none_match and etag in [e.strip() for e in if_none_match.split(',')]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        grilla = turnos_service.obtener_grilla(desde, hasta, deporte)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if etag is None:
+        # BD sin tabla Revision: el ETag se calcula sobre el contenido
+        contenido = json.dumps(grilla, separators=(',', ':'), sort_keys=True).encode()
+        etag = f'"grilla-{hashlib.sha1(contenido).hexdigest()[:20]}"'
+    return JSONResponse(content=grilla, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@router.get("/turnos/buscar")
+@presupuesto_sql(max_sentencias=10)
+def buscar_horarios(
+    deporte: Optional[str] = Query(None, description="Tipo de deporte"),
+    desde: Optional[str] = Query(None, description="Fecha/hora inicio (ISO). Por defecto, hoy"),
+    hasta: Optional[str] = Query(None, description="Fecha/hora fin exclusiva (ISO); una fecha sola incluye ese día"),
+    hora_desde: Optional[str] = Query(None, description="Inicio de la franja horaria diaria (HH:MM)"),
+    hora_hasta: Optional[str] = Query(None, description="Fin de la franja horaria diaria (HH:MM)"),
+    duracion_minutos: int = Query(60, description="Duración buscada en minutos"),
+    precio_max: Optional[float] = Query(None, description="Precio total máximo"),
+    limite: int = Query(turnos_service.LIMITE_BUSQUEDA, description="Cantidad máxima de resultados")
+):
+    """
+    Busca horarios libres en todas las canchas activas (ej. fútbol, sábado de 18 a 22,
+    1 hora, hasta $X). Une turnos contiguos si la duración abarca varios.
+    """
+    try:
+        return turnos_service.buscar_horarios(
+            deporte=deporte, desde=desde, hasta=hasta,
+            hora_desde=hora_desde, hora_hasta=hora_hasta,
+            duracion_minutos=duracion_minutos, precio_max=precio_max, limite=limite
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/turnos/stream")
+async def stream_turnos(canchas: Optional[str] = Query(None, description="IDs de cancha separados por coma (todas si se omite)")):
+    """
+    Server-Sent Events con los cambios de estado de turnos (reemplaza el polling de
+    /turnos/cancha/{id}).
+    
+    Eventos:
+    - `turno`: {id_turno, id_cancha, fecha_hora_inicio, fecha_hora_fin, estado}
+    - `recargar`: {id_cancha (null = todas), motivo}: cambiaron varios turnos, volver a pedir la grilla
+    - `descartado`: el cliente no consumió a tiempo; la conexión se cierra y hay que recargar
+    """
+    try:
+        ids_canchas = {int(x) for x in canchas.split(',') if x.strip()} if canchas else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="canchas debe ser una lista de IDs separados por coma")
+    suscripcion = eventos_turnos.bus_turnos.suscribir(ids_canchas or None)
+    if suscripcion is None:
+        raise HTTPException(status_code=503, detail="Demasiadas conexiones de eventos abiertas",
+                            headers={"Retry-After": "10"})
+    return StreamingResponse(
+        eventos_turnos.generar_sse(suscripcion),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/turnos/{turno_id}")
 def obtener_turno(turno_id: int, id_cliente: Optional[int] = Query(None, description="Validar pertenencia (opcional)")):
     """Obtiene un turno por su ID. Si se proporciona id_cliente, valida pertenencia."""
@@ -264,8 +494,8 @@ def obtener_turno(turno_id: int, id_cliente: Optional[int] = Query(None, descrip
             # Usar el servicio de reservas para validar pertenencia
             turno = reservas_service.ReservasService.consultar_turno_por_id(turno_id, id_cliente=id_cliente)
         else:
-            turno = turnos_service.obtener_turno_por_id(turno_id)
-        return turno.to_dict()
+            turno = turnos_service.obtener_turno_por_id(turno_id, historico=True)
+        return _respuesta_turno(turno)
     except PermissionError as pe:
         raise HTTPException(status_code=403, detail=str(pe))
     except LookupError as e:
@@ -283,11 +513,21 @@ def calcular_precio_total(turno_id: int):
 
 
 @router.put("/turnos/{turno_id}")
-def actualizar_turno(turno_id: int, turno_data: Dict[str, Any], admin_check: Usuario = Depends(require_admin)):
-    """Actualiza un turno existente."""
+def actualizar_turno(turno_id: int, turno_data: Dict[str, Any],
+                     admin_check: Usuario = Depends(require_admin),
+                     if_match: Optional[str] = Header(None)):
+    """
+    Actualiza un turno existente.
+    Con If-Match (ETag de GET /turnos/{id}) responde 412 si el turno cambió en el medio.
+    """
     try:
-        turno = turnos_service.actualizar_turno(turno_id, turno_data)
-        return turno.to_dict()
+        turno = turnos_service.actualizar_turno(turno_id, turno_data, _version_if_match(turno_id, if_match))
+        return _respuesta_turno(turno)
+    except HTTPException:
+        raise
+    except ConflictoVersionError as ce:
+        codigo = status.HTTP_412_PRECONDITION_FAILED if if_match else status.HTTP_409_CONFLICT
+        raise HTTPException(status_code=codigo, detail=str(ce))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except LookupError as e:
@@ -306,6 +546,8 @@ def cambiar_estado(turno_id: int, payload: Dict[str, str], admin_check: Usuario
         
         success = turnos_service.cambiar_estado_turno(turno_id, nuevo_estado)
         return {"success": success, "turno_id": turno_id, "nuevo_estado": nuevo_estado}
+    except ConflictoVersionError as ce:
+        raise HTTPException(status_code=409, detail=str(ce))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except LookupError as e:
@@ -4,9 +4,20 @@ Expone helpers de conexión e inicialización de la base de datos.
 """
 
 from .connection import get_connection, init_database, DB_PATH
+from .cola_escritura import ColaEscritura, DeshacerOperacion, cola_escritura, ejecutar_escritura
+from .lectura import get_read_connection, snapshot_lectura, en_snapshot, pool_lectura
+from . import consultas_lentas  # Registra su medición en los cursores (database.contencion)
 
 __all__ = [
 	"get_connection",
 	"init_database",
 	"DB_PATH",
+	"ColaEscritura",
+	"DeshacerOperacion",
+	"cola_escritura",
+	"ejecutar_escritura",
+	"get_read_connection",
+	"snapshot_lectura",
+	"en_snapshot",
+	"pool_lectura",
 ]
@@ -0,0 +1,325 @@
+"""
+Archivo histórico de turnos en una base aparte (archive.db).
+
+Turno solo crece y cada listado o reporte la recorre entera. `archivar()`
+mueve los turnos terminados (completado, finalizado, cancelado,
+no_disponible) de más de ARCHIVO_MESES meses, junto con su Pago y sus
+TurnoXServicio, a archive.db, que se adjunta con ATTACH como esquema
+`archivo`. Trabaja de a lotes:
+
+1. Copia el lote al archivo y confirma (una transacción).
+2. Borra de la base principal las filas copiadas que no cambiaron desde la
+   copia (otra transacción).
+
+Por ese orden una fila puede estar un instante en las dos bases, pero nunca
+en ninguna. Las vistas temporales TurnoHistorico, PagoHistorico y
+TurnoXServicioHistorico unen las dos bases y descartan la copia archivada de
+una fila que sigue en la principal. Las conexiones del pool de lectura
+adjuntan el archivo y crean las vistas al tomarse (database.lectura).
+
+Los repositories usan `tabla()` para elegir entre la tabla de la base
+principal y la vista histórica: la vista solo hace falta si el rango
+consultado llega a fechas archivadas. Además de los reportes, las lecturas
+por id, por cliente y los listados de pagos de la API pasan por las vistas;
+las escrituras trabajan solo con la base principal (un turno archivado ya
+terminó y no se modifica).
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from database import connection
+
+logger = logging.getLogger(__name__)
+
+# Archivo histórico (por defecto archive.db junto a la base principal)
+ARCHIVO_PATH = Path(os.environ["ARCHIVO_PATH"]) if os.getenv("ARCHIVO_PATH") else None
+
+# Antigüedad mínima (en meses) de un turno para archivarlo y turnos por lote
+ARCHIVO_MESES = int(os.getenv("ARCHIVO_MESES", "6"))
+ARCHIVO_LOTE = int(os.getenv("ARCHIVO_LOTE", "500"))
+
+# Pausa entre lotes para no acaparar el lock de escritura
+ARCHIVO_PAUSA_SEGUNDOS = float(os.getenv("ARCHIVO_PAUSA_SEGUNDOS", "0.05"))
+
+ESTADOS_ARCHIVABLES = ('completado', 'finalizado', 'cancelado', 'no_disponible')
+
+ESQUEMA = 'archivo'
+
+# Marca de "límite todavía no calculado" en la conexión de un snapshot (database.lectura)
+SIN_CALCULAR = object()
+
+# Tabla -> (vista histórica, columna que identifica la fila en las dos bases)
+TABLAS_ARCHIVADAS = {
+    'Turno': ('TurnoHistorico', 'id'),
+    'Pago': ('PagoHistorico', 'id'),
+    'TurnoXServicio': ('TurnoXServicioHistorico', None),  # Clave compuesta (id_turno, id_servicio)
+}
+
+_INDICES_ARCHIVO = (
+    ('idx_archivo_turno_fecha', 'Turno', '"fecha_hora_inicio"'),
+    ('idx_archivo_turno_cliente', 'Turno', '"id_cliente"'),
+    ('idx_archivo_pago_turno', 'Pago', '"id_turno"'),
+)
+
+
+def ruta_archivo() -> Path:
+    """Ruta de archive.db (ARCHIVO_PATH o junto a la base principal)."""
+    return ARCHIVO_PATH or Path(connection.DB_PATH).with_name('archive.db')
+
+
+def _columnas(conn: sqlite3.Connection, tabla: str, esquema: str = 'main') -> List[sqlite3.Row]:
+    return conn.execute(f'PRAGMA {esquema}.table_info("{tabla}")').fetchall()
+
+
+def _adjuntado(conn: sqlite3.Connection) -> bool:
+    # Las conexiones del pool de lectura ya lo saben (ConexionLectura.archivo_adjunto)
+    marca = getattr(conn, 'archivo_adjunto', None)
+    if marca is not None:
+        return marca
+    return any(fila[1] == ESQUEMA for fila in conn.execute("PRAGMA database_list"))
+
+
+def _crear_tablas(conn: sqlite3.Connection) -> None:
+    """Crea (o completa) en el archivo las tablas archivadas, sin FK ni AUTOINCREMENT."""
+    for tabla in TABLAS_ARCHIVADAS:
+        columnas = _columnas(conn, tabla)
+        existentes = {fila[1] for fila in _columnas(conn, tabla, ESQUEMA)}
+        if not existentes:
+            definiciones = [f'"{fila[1]}" {fila[2]}' for fila in columnas]
+            clave = [fila[1] for fila in sorted(columnas, key=lambda f: f[5]) if fila[5]]
+            definiciones.append('PRIMARY KEY (' + ', '.join(f'"{c}"' for c in clave) + ')')
+            conn.execute(f'CREATE TABLE {ESQUEMA}."{tabla}" ({", ".join(definiciones)})')
+        else:
+            # Columnas agregadas en la base principal después de crear el archivo
+            for fila in columnas:
+                if fila[1] not in existentes:
+                    conn.execute(f'ALTER TABLE {ESQUEMA}."{tabla}" ADD COLUMN "{fila[1]}" {fila[2]}')
+    for nombre, tabla, columnas_indice in _INDICES_ARCHIVO:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {ESQUEMA}."{nombre}" ON "{tabla}" ({columnas_indice})')
+
+
+def _crear_vistas(conn: sqlite3.Connection) -> None:
+    """Vistas temporales (por conexión) que unen la base principal y el archivo."""
+    for tabla, (vista, clave) in TABLAS_ARCHIVADAS.items():
+        lista = ', '.join(f'"{fila[1]}"' for fila in _columnas(conn, tabla))
+        if clave:
+            repetida = f'main."{tabla}" m WHERE m."{clave}" = a."{clave}"'
+        else:
+            repetida = f'main."{tabla}" m WHERE m."id_turno" = a."id_turno" AND m."id_servicio" = a."id_servicio"'
+        conn.execute(f'DROP VIEW IF EXISTS temp."{vista}"')
+        conn.execute(f"""
+            CREATE TEMP VIEW "{vista}" AS
+            SELECT {lista} FROM main."{tabla}"
+            UNION ALL
+            SELECT {lista} FROM {ESQUEMA}."{tabla}" a WHERE NOT EXISTS (SELECT 1 FROM {repetida})
+        """)
+
+
+def adjuntar(conn: sqlite3.Connection, solo_lectura: bool = False) -> bool:
+    """
+    Adjunta archive.db a la conexión como esquema `archivo` y crea las vistas
+    históricas. No se puede llamar dentro de una transacción.
+
+    Args:
+        conn: Conexión a la base principal
+        solo_lectura: Adjuntar con mode=ro (la conexión debe aceptar URIs); si el
+            archivo todavía no existe no se adjunta
+
+    Returns:
+        True si el archivo quedó adjuntado
+    """
+    ruta = ruta_archivo()
+    if solo_lectura and not ruta.exists():
+        # Sin consultar la conexión: el pool llama acá cada vez que entrega una
+        return False
+    if _adjuntado(conn):
+        return True
+    if solo_lectura:
+        conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (f"file:{ruta}?mode=ro",))
+        # Un archivo recién creado (sin tablas todavía) no tiene nada que unir
+        if not _columnas(conn, 'Turno', ESQUEMA):
+            conn.execute(f"DETACH DATABASE {ESQUEMA}")
+            return False
+    else:
+        conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (str(ruta),))
+        conn.execute(f"PRAGMA {ESQUEMA}.journal_mode = WAL")
+        _crear_tablas(conn)
+    _crear_vistas(conn)
+    return True
+
+
+def limite_archivado(conn: sqlite3.Connection) -> Optional[str]:
+    """
+    Fecha de inicio del turno archivado más reciente (None si no hay archivo).
+
+    Dentro de un snapshot de lectura el archivo no cambia: se consulta una vez
+    por snapshot y se guarda en la conexión.
+    """
+    if not _adjuntado(conn):
+        return None
+    en_snapshot = getattr(conn, 'retenida', False)
+    if en_snapshot and getattr(conn, 'limite_snapshot', SIN_CALCULAR) is not SIN_CALCULAR:
+        return conn.limite_snapshot
+    limite = conn.execute(f'SELECT MAX("fecha_hora_inicio") FROM {ESQUEMA}."Turno"').fetchone()[0]
+    if en_snapshot:
+        conn.limite_snapshot = limite
+    return limite
+
+
+def tabla(conn: sqlite3.Connection, nombre: str, desde: Optional[str] = None) -> str:
+    """
+    Nombre de la tabla a consultar: la de la base principal o la vista histórica.
+
+    Args:
+        conn: Conexión de la consulta (la vista existe solo si el archivo está adjuntado)
+        nombre: Tabla de la base principal ('Turno', 'Pago' o 'TurnoXServicio')
+        desde: Inicio del rango consultado (ISO). None = sin límite inferior
+
+    Returns:
+        La vista histórica si el rango llega a datos archivados; si no, la tabla
+    """
+    limite = limite_archivado(conn)
+    if limite is None or (desde is not None and desde > limite):
+        return nombre
+    return TABLAS_ARCHIVADAS[nombre][0]
+
+
+def fecha_corte(meses: int = ARCHIVO_MESES, ahora: Optional[datetime] = None) -> str:
+    """Fecha ISO antes de la cual un turno terminado se archiva (meses de 30 días)."""
+    return ((ahora or datetime.now()) - timedelta(days=30 * meses)).isoformat(timespec='seconds')
+
+
+def _copiar_lote(conn: sqlite3.Connection, ids: List[int]) -> None:
+    marcadores = ','.join('?' * len(ids))
+    for nombre, columna in (('Turno', 'id'), ('Pago', 'id_turno'), ('TurnoXServicio', 'id_turno')):
+        lista = ', '.join(f'"{fila[1]}"' for fila in _columnas(conn, nombre))
+        conn.execute(
+            f'INSERT OR REPLACE INTO {ESQUEMA}."{nombre}" ({lista}) '
+            f'SELECT {lista} FROM main."{nombre}" WHERE "{columna}" IN ({marcadores})',
+            ids,
+        )
+
+
+def _borrar_lote(conn: sqlite3.Connection, ids: List[int]) -> int:
+    """Borra de la base principal los turnos del lote que no cambiaron desde la copia."""
+    marcadores = ','.join('?' * len(ids))
+    sin_cambios = [
+        fila[0] for fila in conn.execute(
+            f'SELECT t."id" FROM main."Turno" t JOIN {ESQUEMA}."Turno" a ON a."id" = t."id" '
+            f'LEFT JOIN main."Pago" p ON p."id_turno" = t."id" '
+            f'LEFT JOIN {ESQUEMA}."Pago" ap ON ap."id" = p."id" '
+            f'WHERE t."id" IN ({marcadores}) AND t."version" = a."version" '
+            f'AND t."estado" IN ({",".join("?" * len(ESTADOS_ARCHIVABLES))}) '
+            f'AND (p."id" IS NULL OR p."version" = ap."version")',
+            (*ids, *ESTADOS_ARCHIVABLES),
+        )
+    ]
+    if not sin_cambios:
+        return 0
+    marcadores = ','.join('?' * len(sin_cambios))
+    con_changelog = conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'ChangeLog'").fetchone()
+    if con_changelog:
+        seq_previo = conn.execute('SELECT COALESCE(MAX("seq"), 0) FROM main."ChangeLog"').fetchone()[0]
+    # Pago y TurnoXServicio se borran por la cascada de la FK
+    conn.execute(f'DELETE FROM main."Turno" WHERE "id" IN ({marcadores})', sin_cambios)
+    if con_changelog:
+        # Para los consumidores del changelog las filas se archivaron, no se borraron
+        conn.execute('UPDATE main."ChangeLog" SET "op" = \'A\' WHERE "seq" > ? AND "op" = \'D\'', (seq_previo,))
+    return len(sin_cambios)
+
+
+def archivar(
+    meses: int = ARCHIVO_MESES,
+    lote: int = ARCHIVO_LOTE,
+    pausa_segundos: float = ARCHIVO_PAUSA_SEGUNDOS,
+    max_lotes: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Mueve al archivo los turnos terminados anteriores a la fecha de corte.
+
+    Args:
+        meses: Antigüedad mínima de los turnos a archivar
+        lote: Turnos por lote (cada lote son dos transacciones cortas)
+        pausa_segundos: Pausa entre lotes
+        max_lotes: Cortar después de esta cantidad de lotes (None = hasta terminar)
+
+    Returns:
+        Diccionario con la fecha de corte, turnos archivados, lotes y duración
+    """
+    corte = fecha_corte(meses)
+    inicio = time.monotonic()
+    archivados = lotes = 0
+    conn = connection.get_connection()
+    conn.isolation_level = None
+    try:
+        adjuntar(conn)
+        # Un lote que cambió después de copiado no se borra; se reintenta en la próxima corrida
+        ultimo_id = 0
+        while max_lotes is None or lotes < max_lotes:
+            ids = [
+                fila[0] for fila in conn.execute(
+                    f'SELECT "id" FROM main."Turno" WHERE "id" > ? AND "fecha_hora_fin" < ? '
+                    f'AND "estado" IN ({",".join("?" * len(ESTADOS_ARCHIVABLES))}) ORDER BY "id" LIMIT ?',
+                    (ultimo_id, corte, *ESTADOS_ARCHIVABLES, lote),
+                )
+            ]
+            if not ids:
+                break
+            ultimo_id = ids[-1]
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                _copiar_lote(conn, ids)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                archivados += _borrar_lote(conn, ids)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            lotes += 1
+            if pausa_segundos > 0:
+                time.sleep(pausa_segundos)
+    finally:
+        conn.close()
+
+    resultado = {
+        'corte': corte,
+        'turnos_archivados': archivados,
+        'lotes': lotes,
+        'archivo': str(ruta_archivo()),
+        'duracion_s': round(time.monotonic() - inicio, 3),
+    }
+    if archivados:
+        logger.info("Archivo: %s turnos anteriores a %s movidos en %s lotes (%.2fs)",
+                    archivados, corte, lotes, resultado['duracion_s'])
+    return resultado
+
+
+def estado() -> Dict[str, Any]:
+    """Filas en la base principal y en el archivo, y fecha del turno archivado más reciente."""
+    conn = connection.get_connection()
+    try:
+        resultado: Dict[str, Any] = {'archivo': str(ruta_archivo()), 'existe': ruta_archivo().exists()}
+        if resultado['existe']:
+            adjuntar(conn)
+        for nombre in TABLAS_ARCHIVADAS:
+            filas = {'principal': conn.execute(f'SELECT COUNT(*) FROM main."{nombre}"').fetchone()[0]}
+            if resultado['existe']:
+                filas['archivo'] = conn.execute(f'SELECT COUNT(*) FROM {ESQUEMA}."{nombre}"').fetchone()[0]
+            resultado[nombre] = filas
+        resultado['limite_archivado'] = limite_archivado(conn)
+        return resultado
+    finally:
+        conn.close()
@@ -0,0 +1,87 @@
+"""
+Changelog (change data capture) de las entidades que otros sistemas sincronizan.
+
+Triggers AFTER INSERT/UPDATE/DELETE sobre las tablas de TABLAS_CHANGELOG
+agregan una fila a ChangeLog por cada fila modificada:
+- `seq`: secuencia monótona (AUTOINCREMENT: no se reutiliza aunque se compacte)
+- `entidad` y `clave`: tabla y clave primaria de la fila (objeto JSON)
+- `op`: 'I', 'U' o 'D' ('A' = movida al archivo histórico, ver database.archivo)
+- `columnas`: columnas cambiadas en un UPDATE, separadas por coma
+
+Un UPDATE que no cambia ningún valor no genera entrada. Los triggers se
+generan a partir de las columnas actuales de cada tabla: después de agregar
+columnas hay que volver a instalarlos (scripts/init_database.py --migrar).
+Los consumidores leen el log con GET /api/cambios (repositories.cambio_repository).
+"""
+
+import sqlite3
+from typing import List
+
+# Tabla -> columnas de su clave primaria
+TABLAS_CHANGELOG = {
+    'Turno': ('id',),
+    'Pago': ('id',),
+    'TurnoXServicio': ('id_turno', 'id_servicio'),
+    'Cliente': ('id',),
+    'EquipoXTorneo': ('id_equipo', 'id_torneo'),
+}
+
+_OPERACIONES = {'INSERT': 'I', 'UPDATE': 'U', 'DELETE': 'D'}
+
+
+def _columnas(conn: sqlite3.Connection, tabla: str) -> List[str]:
+    return [fila[1] for fila in conn.execute(f'PRAGMA table_info("{tabla}")')]
+
+
+def quitar_triggers(conn: sqlite3.Connection) -> None:
+    """Borra los triggers del changelog (la tabla ChangeLog se conserva)."""
+    triggers = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_changelog_%'"
+    ).fetchall()
+    for (nombre,) in triggers:
+        conn.execute(f'DROP TRIGGER "{nombre}"')
+
+
+def instalar(conn: sqlite3.Connection) -> None:
+    """Crea ChangeLog y (re)crea sus triggers con las columnas actuales de cada tabla."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS "ChangeLog" (
+            "seq" INTEGER PRIMARY KEY AUTOINCREMENT,
+            "entidad" TEXT NOT NULL,
+            "clave" TEXT NOT NULL,
+            "op" TEXT NOT NULL,
+            "columnas" TEXT,
+            "creado_en" TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Para compactar: última entrada de cada entidad
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_changelog_entidad ON "ChangeLog"("entidad", "clave", "seq")')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS "ChangeLogEstado" (
+            "clave" TEXT PRIMARY KEY,
+            "valor" INTEGER NOT NULL
+        )
+    """)
+    quitar_triggers(conn)
+
+    for tabla, clave in TABLAS_CHANGELOG.items():
+        columnas = _columnas(conn, tabla)
+        for operacion, letra in _OPERACIONES.items():
+            fila = 'OLD' if operacion == 'DELETE' else 'NEW'
+            json_clave = 'json_object(' + ', '.join(f"'{c}', {fila}.\"{c}\"" for c in clave) + ')'
+            condicion = ''
+            cambiadas = 'NULL'
+            if operacion == 'UPDATE':
+                distintas = [f'OLD."{c}" IS NOT NEW."{c}"' for c in columnas]
+                condicion = 'WHEN ' + ' OR '.join(distintas)
+                cambiadas = "rtrim(" + ' || '.join(
+                    f"CASE WHEN OLD.\"{c}\" IS NOT NEW.\"{c}\" THEN '{c},' ELSE '' END" for c in columnas
+                ) + ", ',')"
+            conn.execute(f"""
+                CREATE TRIGGER "trg_changelog_{tabla.lower()}_{operacion.lower()}"
+                AFTER {operacion} ON "{tabla}" {condicion}
+                BEGIN
+                    INSERT INTO "ChangeLog" ("entidad", "clave", "op", "columnas")
+                    VALUES ('{tabla}', {json_clave}, '{letra}', {cambiadas});
+                END
+            """)
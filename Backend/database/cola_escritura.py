@@ -0,0 +1,232 @@
+"""
+Cola de escritura con un único hilo escritor (group commit).
+
+Con varios hilos escribiendo a la vez, SQLite serializa las transacciones y
+cada escritura chica paga su propio commit (y su fsync). Con la cola
+habilitada, las escrituras de los repositories se encolan como operaciones
+`operacion(cursor) -> resultado`. Un hilo dedicado toma todas las pendientes,
+las ejecuta en una sola transacción y confirma una vez. Cada operación corre
+dentro de un SAVEPOINT: si falla, se deshace solo esa y su Future recibe la
+excepción, sin afectar al resto del lote.
+
+Usan la cola todas las escrituras de turnos, pagos, reservas y holds
+(TurnoRepository, PagoRepository, ReservaRepository, HoldTurnoRepository).
+El resto de las entidades (clientes, canchas, servicios, usuarios, plantillas)
+se escriben con poca frecuencia y siguen usando una conexión propia.
+
+Una operación que decide no escribir después de haber ejecutado alguna
+sentencia lanza DeshacerOperacion(resultado): se deshace solo ella y el
+llamador recibe `resultado`.
+
+Si el escritor no empieza a ejecutar una operación dentro de
+COLA_ESCRITURA_TIMEOUT_SEGUNDOS, se cancela y se lanza
+ColaEscrituraDemoradaError (un BaseDatosOcupadaError: la API responde 503).
+
+Se habilita con COLA_ESCRITURA_HABILITADA=1 (por defecto cada escritura usa
+una conexión propia, con la misma transacción BEGIN IMMEDIATE). Cada proceso
+tiene su propio escritor: con varios workers de uvicorn se elimina la
+contención entre hilos de un mismo proceso, no entre procesos.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from database.connection import get_connection
+from database.errores import ColaEscrituraDemoradaError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Escrituras por la cola (group commit) en lugar de una conexión por operación
+COLA_ESCRITURA_HABILITADA = os.getenv("COLA_ESCRITURA_HABILITADA", "0") == "1"
+
+# Cantidad máxima de operaciones confirmadas en una misma transacción
+MAX_LOTE_ESCRITURA = int(os.getenv("MAX_LOTE_ESCRITURA", "256"))
+
+# Espera máxima hasta que el escritor toma una operación encolada
+COLA_ESCRITURA_TIMEOUT_SEGUNDOS = float(os.getenv("COLA_ESCRITURA_TIMEOUT_SEGUNDOS", "10"))
+
+Operacion = Callable[[sqlite3.Cursor], T]
+
+
+class DeshacerOperacion(Exception):
+    """Lanzada por una operación para deshacer lo que escribió y devolver `resultado`."""
+
+    def __init__(self, resultado: Any = None):
+        super().__init__("Operación deshecha")
+        self.resultado = resultado
+
+
+class ColaEscritura:
+    """Serializa las escrituras en un hilo daemon que las confirma por lotes."""
+
+    def __init__(self, habilitada: bool = COLA_ESCRITURA_HABILITADA, max_lote: int = MAX_LOTE_ESCRITURA,
+                 timeout_segundos: float = COLA_ESCRITURA_TIMEOUT_SEGUNDOS):
+        self.habilitada = habilitada
+        self.max_lote = max_lote
+        self.timeout_segundos = timeout_segundos
+        self._cola: "queue.Queue[Optional[Tuple[Operacion, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self.lotes = 0
+        self.operaciones = 0
+
+    def enviar(self, operacion: Operacion) -> Future:
+        """Encola una operación y devuelve un Future con su resultado (inicia el hilo si hace falta)."""
+        if self._hilo is not None and threading.current_thread() is self._hilo:
+            raise RuntimeError("Una operación de la cola de escritura no puede encolar otra")
+        self.iniciar()
+        futuro: Future = Future()
+        self._cola.put((operacion, futuro))
+        return futuro
+
+    def ejecutar(self, operacion: Operacion) -> T:
+        """
+        Encola una operación y espera a que su lote se confirme.
+
+        Raises:
+            ColaEscrituraDemoradaError: Si el escritor no la tomó dentro de
+                timeout_segundos (se cancela: no se escribe nada)
+        """
+        futuro = self.enviar(operacion)
+        try:
+            resultado = futuro.result(timeout=self.timeout_segundos)
+        except FutureTimeoutError:
+            if futuro.cancel():
+                raise ColaEscrituraDemoradaError(self.timeout_segundos)
+            # Ya se está ejecutando: esperar su lote para no informar un error de algo que se escribe
+            resultado = futuro.result()
+        if isinstance(resultado, DeshacerOperacion):
+            return resultado.resultado
+        return resultado
+
+    def iniciar(self) -> None:
+        """Inicia el hilo escritor (idempotente)."""
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="cola-escritura", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Procesa lo ya encolado y detiene el hilo."""
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo and hilo.is_alive():
+            self._cola.put(None)
+            hilo.join(timeout)
+
+    def _tomar_lote(self) -> Tuple[List[Tuple[Operacion, Future]], bool]:
+        """Espera la primera operación y junta las pendientes (hasta max_lote)."""
+        lote = []
+        item = self._cola.get()
+        while item is not None:
+            lote.append(item)
+            if len(lote) >= self.max_lote:
+                break
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                break
+        return lote, item is None
+
+    def _bucle(self) -> None:
+        conn = get_connection()
+        conn.isolation_level = None  # Control manual de la transacción
+        try:
+            while True:
+                lote, detener = self._tomar_lote()
+                if lote:
+                    self._confirmar_lote(conn, lote)
+                if detener:
+                    return
+        finally:
+            conn.close()
+
+    def _confirmar_lote(self, conn: sqlite3.Connection, lote: List[Tuple[Operacion, Future]]) -> None:
+        cursor = conn.cursor()
+        resultados = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for operacion, futuro in lote:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT operacion")
+                try:
+                    resultados.append((futuro, operacion(cursor), None))
+                except DeshacerOperacion as e:
+                    cursor.execute("ROLLBACK TO operacion")
+                    resultados.append((futuro, e, None))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO operacion")
+                    resultados.append((futuro, None, e))
+                cursor.execute("RELEASE operacion")
+            cursor.execute("COMMIT")
+        except Exception as e:
+            logger.exception("Error al confirmar un lote de %s escrituras", len(lote))
+            if conn.in_transaction:
+                conn.rollback()
+            # Nada del lote quedó escrito: todas las operaciones reciben el error
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        self.lotes += 1
+        self.operaciones += len(resultados)
+        for futuro, resultado, error in resultados:
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(resultado)
+
+
+# Instancia compartida por toda la aplicación
+cola_escritura = ColaEscritura()
+
+
+def ejecutar_escritura(operacion: Operacion) -> T:
+    """
+    Ejecuta una escritura y la confirma.
+
+    Con la cola habilitada va al hilo escritor (group commit); si no, se
+    ejecuta en una conexión propia dentro de BEGIN IMMEDIATE (el lock de
+    escritura se toma antes de la primera lectura, como en el lote). En ambos
+    casos, si la operación lanza una excepción no se escribe nada de ella y
+    la excepción se propaga; si lanza DeshacerOperacion, se devuelve su
+    resultado.
+
+    Args:
+        operacion: Función que recibe un cursor, ejecuta sus sentencias y devuelve un resultado
+
+    Returns:
+        El resultado de la operación, una vez confirmada
+
+    Raises:
+        ColaEscrituraDemoradaError: Si la cola no atendió la operación a tiempo
+    """
+    if cola_escritura.habilitada:
+        return cola_escritura.ejecutar(operacion)
+    conn = get_connection()
+    conn.isolation_level = None  # Control manual de la transacción
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        resultado = operacion(cursor)
+        cursor.execute("COMMIT")
+        return resultado
+    except DeshacerOperacion as e:
+        conn.rollback()
+        return e.resultado
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -1,47 +1,52 @@
+import logging
 import sqlite3
 import os
 from pathlib import Path
 
-# Ruta del archivo de base de datos
-DB_PATH = Path(__file__).parent.parent / "database.db"
+import trazas
+from database.contencion import ConexionInstrumentada, SQLITE_BUSY_TIMEOUT_MS
+
+logger = logging.getLogger(__name__)
+
+# Ruta del archivo de base de datos (DATABASE_PATH permite usar otra, ej. una réplica promovida)
+DB_PATH = Path(os.getenv("DATABASE_PATH", str(Path(__file__).parent.parent / "database.db")))
 
 
 def get_connection():
     """
     Obtiene una conexión a la base de datos SQLite.
-    Activa las claves foráneas.
+    Activa las claves foráneas. Las sentencias bloqueadas por otra conexión
+    se reintentan (ver database.contencion).
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON")
+    with trazas.tramo("get_connection", "db"):
+        conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, factory=ConexionInstrumentada)
+        conn.execute("PRAGMA foreign_keys = ON")
     conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
     return conn
 
 
 def init_database():
     """
-    Inicializa la base de datos ejecutando el script SQL.
+    Inicializa (o actualiza) la estructura de la base de datos.
+
+    Usa las mismas funciones que scripts/init_database.py: tablas, columnas
+    agregadas por migraciones, índices y triggers (Revision, ChangeLog). No
+    inserta datos de prueba.
     """
-    sql_script_path = Path(__file__).parent.parent / "DER_TP_DAO_V2.sql"
-    
-    if not sql_script_path.exists():
-        raise FileNotFoundError(f"No se encontró el archivo SQL en {sql_script_path}")
-    
-    conn = get_connection()
+    # Import diferido: scripts.init_database importa este módulo
+    from scripts import init_database as esquema
+
     try:
-        with open(sql_script_path, 'r', encoding='utf-8') as f:
-            sql_script = f.read()
-        
-        conn.executescript(sql_script)
-        conn.commit()
-        print(f"✓ Base de datos inicializada correctamente en {DB_PATH}")
+        esquema.crear_estructura()
+        logger.info("Base de datos inicializada correctamente en %s", DB_PATH)
     except Exception as e:
-        print(f"✗ Error al inicializar la base de datos: {e}")
+        logger.error("Error al inicializar la base de datos: %s", e)
         raise
-    finally:
-        conn.close()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Eliminar la base de datos existente si existe
     if DB_PATH.exists():
         os.remove(DB_PATH)
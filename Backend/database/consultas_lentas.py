@@ -0,0 +1,233 @@
+"""
+Registro de consultas lentas.
+
+El registro se engancha a los cursores con
+database.contencion.registrar_medicion: CursorInstrumentado mide cada
+sentencia desde el execute hasta la primera lectura de sus filas
+(fetchone/fetchmany/fetchall), que es donde SQLite hace la mayor parte del
+trabajo de un SELECT. Si la duración supera CONSULTA_LENTA_MS se llama a
+`consultas_lentas.registrar()`, que guarda:
+
+- la sentencia normalizada y sus parámetros (los de columnas sensibles
+  redactados, los textos largos recortados);
+- duración, filas devueltas (o afectadas) y endpoint de la request en curso;
+- el método del repository (o servicio) que la ejecutó;
+- su `EXPLAIN QUERY PLAN`.
+
+Cada registro se agrega como una línea JSON a CONSULTAS_LENTAS_ARCHIVO
+(rotado por tamaño; lo escribe un hilo de logging_config, no la request) y
+se acumula en memoria por forma de sentencia para
+GET /api/diagnostico/consultas-lentas. Las filas leídas iterando el cursor
+(`for fila in cursor`) no se cuentan.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from database.contencion import endpoint_actual, registrar_medicion
+from logging_config import en_segundo_plano
+
+# Umbral en milisegundos (CONSULTAS_LENTAS_HABILITADO=0 desactiva la medición)
+CONSULTA_LENTA_MS = float(os.getenv("CONSULTA_LENTA_MS", "100"))
+CONSULTAS_LENTAS_HABILITADO = os.getenv("CONSULTAS_LENTAS_HABILITADO", "1") == "1"
+
+# Archivo JSON lines y su rotación
+CONSULTAS_LENTAS_ARCHIVO = Path(os.getenv(
+    "CONSULTAS_LENTAS_ARCHIVO", str(Path(__file__).parent.parent / "logs" / "consultas_lentas.jsonl")))
+CONSULTAS_LENTAS_MAX_BYTES = int(os.getenv("CONSULTAS_LENTAS_MAX_BYTES", str(10 * 1024 * 1024)))
+CONSULTAS_LENTAS_ARCHIVOS = int(os.getenv("CONSULTAS_LENTAS_ARCHIVOS", "5"))
+
+# Formas distintas que se acumulan en memoria
+MAX_FORMAS = 500
+
+# Parámetros cuyo nombre de columna coincide se guardan como '***'
+_CAMPOS_SENSIBLES = re.compile(r"pass|contrase|token|hash|secret|mail|telefono|dni", re.IGNORECASE)
+LARGO_MAXIMO_TEXTO = 200
+
+_SENTENCIAS_CON_PLAN = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTA_PARAMETROS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_COLUMNA_ANTES_DE_PARAMETRO = re.compile(
+    r'"?(\w+)"?\s*(?:=|==|<>|!=|<=|>=|<|>|\bLIKE|\bGLOB|\bIN\s*\(|\bBETWEEN)\s*(?:\?\s*(?:,|\bAND)\s*)*$',
+    re.IGNORECASE)
+_INSERT = re.compile(r"INSERT\s+(?:OR\s+\w+\s+)?INTO\s+\S+\s*\(([^)]*)\)\s*VALUES\s*\(", re.IGNORECASE)
+
+_DIRECTORIO_DATABASE = str(Path(__file__).parent)
+_DIRECTORIO_REPOSITORIES = os.sep + "repositories" + os.sep
+
+
+def forma_sentencia(sql: str) -> str:
+    """Texto normalizado de una sentencia: las que solo difieren en valores quedan iguales."""
+    forma = _LITERAL_TEXTO.sub("?", sql)
+    forma = _LITERAL_NUMERO.sub("?", forma)
+    forma = " ".join(forma.split())
+    return _LISTA_PARAMETROS.sub("(?, ...)", forma)[:200]
+
+
+def _nombres_parametros(sql: str, cantidad: int) -> List[Optional[str]]:
+    """Columna a la que va cada `?` (None si no se puede deducir)."""
+    insert = _INSERT.search(sql)
+    if insert:
+        columnas = [c.strip().strip('"') for c in insert.group(1).split(",")]
+        return (columnas + [None] * cantidad)[:cantidad]
+    nombres: List[Optional[str]] = []
+    for posicion in (m.start() for m in re.finditer(r"\?", sql)):
+        columna = _COLUMNA_ANTES_DE_PARAMETRO.search(sql[:posicion])
+        nombres.append(columna.group(1) if columna else None)
+    return (nombres + [None] * cantidad)[:cantidad]
+
+
+def _valor_seguro(nombre: Optional[str], valor: Any) -> Any:
+    if nombre is not None and _CAMPOS_SENSIBLES.search(nombre):
+        return "***"
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return f"<blob {len(valor)} bytes>"
+    if isinstance(valor, str) and len(valor) > LARGO_MAXIMO_TEXTO:
+        return valor[:LARGO_MAXIMO_TEXTO] + "…"
+    return valor
+
+
+def redactar_parametros(sql: str, parametros: Any) -> Any:
+    """Parámetros listos para loguear (sensibles como '***', textos largos recortados)."""
+    if isinstance(parametros, dict):
+        return {clave: _valor_seguro(clave, valor) for clave, valor in parametros.items()}
+    valores = list(parametros or ())
+    return [_valor_seguro(nombre, valor) for nombre, valor in zip(_nombres_parametros(sql, len(valores)), valores)]
+
+
+def plan_de_consulta(conn: sqlite3.Connection, sql: str, parametros: Any) -> Optional[List[str]]:
+    """`EXPLAIN QUERY PLAN` de la sentencia (None si no aplica o falla)."""
+    if not sql.lstrip()[:7].upper().startswith(_SENTENCIAS_CON_PLAN):
+        return None
+    try:
+        # Cursor común de sqlite3: no se reintenta, no se cuenta ni se vuelve a medir
+        filas = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parametros or ()).fetchall()
+    except sqlite3.Error:
+        return None
+    return [fila[3] for fila in filas]
+
+
+def origen_sentencia() -> Optional[str]:
+    """Método del repository que ejecutó la sentencia (o el primer llamador fuera de database/)."""
+    marco = sys._getframe(1)
+    fuera_de_database = None
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if _DIRECTORIO_REPOSITORIES in archivo or (
+                fuera_de_database is None and not archivo.startswith(_DIRECTORIO_DATABASE)):
+            nombre = getattr(marco.f_code, "co_qualname", marco.f_code.co_name)
+            descripcion = f"{nombre} ({Path(archivo).name}:{marco.f_lineno})"
+            if _DIRECTORIO_REPOSITORIES in archivo:
+                return descripcion
+            fuera_de_database = descripcion
+        marco = marco.f_back
+    return fuera_de_database
+
+
+class RegistroConsultasLentas:
+    """Escribe las consultas lentas en el archivo JSON lines y las acumula por forma (thread-safe)."""
+
+    def __init__(self, umbral_ms: float = CONSULTA_LENTA_MS, archivo: Path = CONSULTAS_LENTAS_ARCHIVO,
+                 habilitado: bool = CONSULTAS_LENTAS_HABILITADO):
+        self.umbral_s = umbral_ms / 1000
+        self.archivo = archivo
+        self.habilitado = habilitado
+        self._lock = threading.Lock()
+        self._logger: Optional[logging.Logger] = None
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._por_forma: Dict[str, Dict[str, Any]] = {}
+            self._descartadas = 0
+            self.desde = time.time()
+
+    def _escritor(self) -> logging.Logger:
+        # El archivo se abre recién con la primera consulta lenta
+        with self._lock:
+            if self._logger is None:
+                self._logger = self._crear_escritor()
+            return self._logger
+
+    def _crear_escritor(self) -> logging.Logger:
+        self.archivo.parent.mkdir(parents=True, exist_ok=True)
+        logger = logging.getLogger("consultas_lentas")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        manejador = RotatingFileHandler(self.archivo, maxBytes=CONSULTAS_LENTAS_MAX_BYTES,
+                                        backupCount=CONSULTAS_LENTAS_ARCHIVOS, encoding="utf-8")
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(en_segundo_plano(manejador))
+        return logger
+
+    def medida(self, conn: sqlite3.Connection, sql: str, parametros: Any, duracion: float,
+               filas: Optional[int], ejecuciones: int = 1) -> None:
+        """Medición de CursorInstrumentado: registra la sentencia si superó el umbral."""
+        if duracion >= self.umbral_s:
+            self.registrar(conn, sql, parametros, duracion, filas, endpoint_actual(), ejecuciones)
+
+    def registrar(self, conn: sqlite3.Connection, sql: str, parametros: Any, duracion: float,
+                  filas: Optional[int], endpoint: str, ejecuciones: int = 1) -> None:
+        """Registra una sentencia que superó el umbral."""
+        forma = forma_sentencia(sql)
+        registro = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duracion_ms': round(duracion * 1000, 2),
+            'sql': forma,
+            'parametros': redactar_parametros(sql, parametros),
+            'ejecuciones': ejecuciones,
+            'filas': filas,
+            'origen': origen_sentencia(),
+            'endpoint': endpoint,
+            'plan': plan_de_consulta(conn, sql, parametros),
+        }
+        linea = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._lock:
+            fila = self._por_forma.get(forma)
+            if fila is None:
+                if len(self._por_forma) >= MAX_FORMAS:
+                    self._descartadas += 1
+                    fila = None
+                else:
+                    fila = self._por_forma[forma] = {'sql': forma, 'cantidad': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            if fila is not None:
+                fila['cantidad'] += 1
+                fila['total_ms'] += registro['duracion_ms']
+                if registro['duracion_ms'] >= fila['max_ms']:
+                    fila['max_ms'] = registro['duracion_ms']
+                    fila['mas_lenta'] = registro
+        try:
+            self._escritor().info(linea)
+        except OSError:
+            pass  # Sin archivo de log igual queda el resumen en memoria
+
+    def top(self, limite: int = 20, orden: str = 'total') -> Dict[str, Any]:
+        """Las `limite` formas más lentas, por tiempo total ('total') o por la peor ejecución ('max')."""
+        clave = 'max_ms' if orden == 'max' else 'total_ms'
+        with self._lock:
+            filas = sorted(self._por_forma.values(), key=lambda f: f[clave], reverse=True)[:limite]
+            filas = [{**f, 'total_ms': round(f['total_ms'], 2)} for f in filas]
+            descartadas, desde = self._descartadas, self.desde
+        return {
+            'desde': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(desde)),
+            'umbral_ms': self.umbral_s * 1000,
+            'archivo': str(self.archivo),
+            'formas_descartadas': descartadas,
+            'consultas': filas,
+        }
+
+
+# Instancia compartida por todas las conexiones del proceso
+consultas_lentas = RegistroConsultasLentas()
+registrar_medicion(consultas_lentas)
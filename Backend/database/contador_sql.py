@@ -0,0 +1,45 @@
+"""
+Sentencias SQL y tiempo en SQL por request.
+
+Si la request en curso publicó un ContadorSQL en `sql_request_actual` (lo
+hace api.middleware.MetricasMiddleware), cada sentencia suma ahí su
+cantidad y su duración, y pasa antes por su hook `verificar` si tiene uno
+(el detector de N+1 de api.presupuesto_sql). Se engancha a las conexiones
+con database.contencion.registrar_hook.
+"""
+
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from database.contencion import registrar_hook
+
+
+class ContadorSQL:
+    """Sentencias ejecutadas y tiempo total en SQL de una request."""
+
+    __slots__ = ('sentencias', 'segundos', 'verificar')
+
+    def __init__(self, verificar: Optional[Callable[[str], None]] = None):
+        self.sentencias = 0
+        self.segundos = 0.0
+        self.verificar = verificar  # Se llama con el SQL antes de ejecutarlo; puede lanzar
+
+
+# Contador de la request en curso (lo fija api.middleware); None = no se mide
+sql_request_actual: ContextVar[Optional[ContadorSQL]] = ContextVar("sql_request_actual", default=None)
+
+
+def _contar(sql: str) -> Optional[Callable[[int, int], None]]:
+    contador = sql_request_actual.get()
+    if contador is None:
+        return None
+    if contador.verificar is not None:
+        contador.verificar(sql)
+
+    def sumar(inicio_ns: int, fin_ns: int) -> None:
+        contador.sentencias += 1
+        contador.segundos += (fin_ns - inicio_ns) / 1e9
+    return sumar
+
+
+registrar_hook(_contar)
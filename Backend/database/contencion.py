@@ -0,0 +1,304 @@
+"""
+Capa de ejecución con reintentos ante bloqueos de SQLite y métricas de contención.
+
+get_connection() crea conexiones de la clase ConexionInstrumentada: toda
+sentencia (cursor.execute/executemany, conn.execute y commit) que falle con
+SQLITE_BUSY o SQLITE_LOCKED ("database is locked") se reintenta con backoff
+exponencial con jitter hasta un plazo máximo. Si el plazo se agota se lanza
+BaseDatosOcupadaError.
+
+Solo se reintenta cuando es seguro: sentencias fuera de una transacción
+explícita (la sentencia falla entera y puede repetirse), BEGIN y COMMIT.
+Dentro de una transacción que ya tomó locks, esperar no destraba nada (la
+otra conexión puede estar esperando a esta), así que el error se propaga.
+
+Cada sentencia que tuvo que esperar queda registrada por texto de sentencia
+y por endpoint (el de la request en curso, ver `request_actual`).
+
+Las mediciones que no son de contención se enganchan con hooks:
+
+- `registrar_hook(hook)`: `hook(sql)` se llama antes de cada sentencia (puede
+  lanzar para impedirla) y devuelve None o una función que recibe el inicio
+  y el fin de la sentencia en ns, reintentos incluidos. Lo usan
+  database.contador_sql y trazas.
+- `registrar_medicion(medicion)`: si `medicion.habilitado`, el cursor mide
+  cada sentencia hasta la primera lectura de sus filas y llama a
+  `medicion.medida(conn, sql, parametros, duracion, filas, ejecuciones)`.
+  Lo usa database.consultas_lentas.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from database.errores import BaseDatosOcupadaError
+
+# Espera interna de SQLite ante un lock antes de devolver SQLITE_BUSY (la de sqlite3 por defecto)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Plazo total de reintentos de una sentencia bloqueada
+REINTENTOS_PLAZO_SEGUNDOS = float(os.getenv("REINTENTOS_PLAZO_SEGUNDOS", "10"))
+
+# Backoff: espera base y máxima entre reintentos (se sortea entre 0 y el tope)
+REINTENTOS_ESPERA_BASE_SEGUNDOS = 0.01
+REINTENTOS_ESPERA_MAX_SEGUNDOS = 0.5
+
+# Scope ASGI de la request en curso (lo fija api.middleware); None fuera de una request
+request_actual: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_actual", default=None)
+
+
+# Hooks por sentencia y mediciones hasta la primera lectura (ver docstring del módulo)
+HookSentencia = Callable[[str], Optional[Callable[[int, int], None]]]
+_hooks: List[HookSentencia] = []
+_mediciones: List[Any] = []
+
+
+def registrar_hook(hook: HookSentencia) -> None:
+    """Agrega un hook que se llama antes de cada sentencia (registrarlo dos veces no lo duplica)."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def registrar_medicion(medicion: Any) -> None:
+    """Agrega una medición hasta la primera lectura de filas (registrarla dos veces no la duplica)."""
+    if medicion not in _mediciones:
+        _mediciones.append(medicion)
+
+
+_SENTENCIAS_SIEMPRE_REINTENTABLES = ("BEGIN", "COMMIT", "END")
+
+
+def es_bloqueo(error: sqlite3.OperationalError) -> bool:
+    """True si el error es SQLITE_BUSY o SQLITE_LOCKED (incluye sus códigos extendidos)."""
+    codigo = getattr(error, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    mensaje = str(error)
+    return "database is locked" in mensaje or "database table is locked" in mensaje
+
+
+def _normalizar_sentencia(sql: str) -> str:
+    return " ".join(sql.split())[:160]
+
+
+def endpoint_actual() -> str:
+    """Método y ruta de la request en curso, o "(fuera de request)"."""
+    scope = request_actual.get()
+    if scope is None:
+        return "(fuera de request)"
+    ruta = getattr(scope.get("route"), "path", None) or scope.get("path", "?")
+    return f"{scope.get('method', '')} {ruta}"
+
+
+class EstadisticasContencion:
+    """Acumula esperas y reintentos por sentencia y por endpoint (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._por_sentencia: Dict[str, Dict[str, float]] = {}
+            self._por_endpoint: Dict[str, Dict[str, float]] = {}
+            self.desde = time.time()
+
+    def registrar(self, sql: str, reintentos: int, espera: float, agotado: bool) -> None:
+        """Registra una sentencia que encontró la base bloqueada."""
+        claves = ((self._por_sentencia, _normalizar_sentencia(sql)), (self._por_endpoint, endpoint_actual()))
+        with self._lock:
+            for tabla, clave in claves:
+                fila = tabla.get(clave)
+                if fila is None:
+                    fila = tabla[clave] = {'eventos': 0, 'reintentos': 0, 'agotados': 0,
+                                           'espera_total_s': 0.0, 'espera_max_s': 0.0}
+                fila['eventos'] += 1
+                fila['reintentos'] += reintentos
+                fila['agotados'] += int(agotado)
+                fila['espera_total_s'] += espera
+                fila['espera_max_s'] = max(fila['espera_max_s'], espera)
+
+    def resumen(self) -> Dict[str, Any]:
+        """Totales y detalle por sentencia/endpoint, de mayor a menor espera total."""
+        def ordenar(tabla):
+            return [
+                {'clave': clave, **{k: round(v, 4) if isinstance(v, float) else v for k, v in fila.items()}}
+                for clave, fila in sorted(tabla.items(), key=lambda kv: kv[1]['espera_total_s'], reverse=True)
+            ]
+
+        with self._lock:
+            por_sentencia = ordenar(self._por_sentencia)
+            por_endpoint = ordenar(self._por_endpoint)
+            desde = self.desde
+        return {
+            'desde': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(desde)),
+            'configuracion': {
+                'busy_timeout_ms': SQLITE_BUSY_TIMEOUT_MS,
+                'plazo_reintentos_s': REINTENTOS_PLAZO_SEGUNDOS,
+            },
+            'eventos': sum(f['eventos'] for f in por_sentencia),
+            'reintentos': sum(f['reintentos'] for f in por_sentencia),
+            'agotados': sum(f['agotados'] for f in por_sentencia),
+            'espera_total_s': round(sum(f['espera_total_s'] for f in por_sentencia), 4),
+            'por_sentencia': por_sentencia,
+            'por_endpoint': por_endpoint,
+        }
+
+
+# Instancia compartida por todas las conexiones del proceso
+contencion = EstadisticasContencion()
+
+
+def ejecutar_con_reintentos(conn: sqlite3.Connection, sql: str, ejecutar: Callable[[], Any]) -> Any:
+    """
+    Ejecuta `ejecutar()` reintentando mientras la base esté bloqueada.
+
+    Args:
+        conn: Conexión sobre la que corre la sentencia (para saber si hay transacción abierta)
+        sql: Texto de la sentencia (para decidir si es reintentable y para las métricas)
+        ejecutar: Función que ejecuta la sentencia una vez
+
+    Returns:
+        Lo que devuelva `ejecutar()`
+    """
+    finales = None
+    for hook in _hooks:
+        final = hook(sql)
+        if final is not None:
+            finales = [final] if finales is None else finales + [final]
+    if finales is None:
+        return _ejecutar(conn, sql, ejecutar)
+    inicio = time.perf_counter_ns()
+    try:
+        return _ejecutar(conn, sql, ejecutar)
+    finally:
+        # Una sentencia se informa una vez; su tiempo incluye las esperas por bloqueo
+        fin = time.perf_counter_ns()
+        for final in finales:
+            final(inicio, fin)
+
+
+def _ejecutar(conn: sqlite3.Connection, sql: str, ejecutar: Callable[[], Any]) -> Any:
+    reintentable = not conn.in_transaction or sql.lstrip()[:6].upper().startswith(_SENTENCIAS_SIEMPRE_REINTENTABLES)
+    inicio = time.monotonic()
+    reintentos = 0
+    while True:
+        try:
+            resultado = ejecutar()
+        except sqlite3.OperationalError as e:
+            if not es_bloqueo(e):
+                raise
+            espera = time.monotonic() - inicio
+            if not reintentable:
+                contencion.registrar(sql, reintentos, espera, agotado=True)
+                raise
+            pausa = random.uniform(0, min(REINTENTOS_ESPERA_MAX_SEGUNDOS, REINTENTOS_ESPERA_BASE_SEGUNDOS * 2 ** reintentos))
+            if espera + pausa > REINTENTOS_PLAZO_SEGUNDOS:
+                contencion.registrar(sql, reintentos, espera, agotado=True)
+                raise BaseDatosOcupadaError(_normalizar_sentencia(sql), reintentos, espera) from e
+            time.sleep(pausa)
+            reintentos += 1
+            continue
+        if reintentos:
+            contencion.registrar(sql, reintentos, time.monotonic() - inicio, agotado=False)
+        return resultado
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """
+    Cursor cuyas sentencias se reintentan ante SQLITE_BUSY/SQLITE_LOCKED.
+
+    Con alguna medición habilitada (ver `registrar_medicion`), una sentencia
+    con filas queda pendiente (sql, parámetros, duración) hasta la primera
+    lectura y recién ahí se informa; sin filas, se informa en el execute.
+    """
+
+    _pendiente = None
+
+    def execute(self, sql, parameters=()):
+        if not _medicion_habilitada():
+            return ejecutar_con_reintentos(self.connection, sql, lambda: super(CursorInstrumentado, self).execute(sql, parameters))
+        self._cerrar_pendiente(None)
+        inicio = time.perf_counter()
+        ejecutar_con_reintentos(self.connection, sql, lambda: super(CursorInstrumentado, self).execute(sql, parameters))
+        duracion = time.perf_counter() - inicio
+        if self.description is None:
+            self._informar(sql, parameters, duracion, self.rowcount)
+        else:
+            self._pendiente = (sql, parameters, duracion)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        # Materializar los parámetros: un iterador se consumiría en el primer intento
+        parametros = list(seq_of_parameters)
+        if not _medicion_habilitada():
+            return ejecutar_con_reintentos(self.connection, sql, lambda: super(CursorInstrumentado, self).executemany(sql, parametros))
+        self._cerrar_pendiente(None)
+        inicio = time.perf_counter()
+        ejecutar_con_reintentos(self.connection, sql, lambda: super(CursorInstrumentado, self).executemany(sql, parametros))
+        if parametros:
+            self._informar(sql, parametros[0], time.perf_counter() - inicio, self.rowcount, len(parametros))
+        return self
+
+    def fetchone(self):
+        if self._pendiente is None:
+            return super().fetchone()
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._cerrar_pendiente(0 if fila is None else 1, time.perf_counter() - inicio)
+        return fila
+
+    def fetchmany(self, size=None):
+        if self._pendiente is None:
+            return super().fetchmany(self.arraysize if size is None else size)
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._cerrar_pendiente(len(filas), time.perf_counter() - inicio)
+        return filas
+
+    def fetchall(self):
+        if self._pendiente is None:
+            return super().fetchall()
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._cerrar_pendiente(len(filas), time.perf_counter() - inicio)
+        return filas
+
+    def close(self):
+        self._cerrar_pendiente(None)
+        super().close()
+
+    def _cerrar_pendiente(self, filas: Optional[int], lectura: float = 0.0) -> None:
+        if self._pendiente is not None:
+            sql, parametros, duracion = self._pendiente
+            self._pendiente = None
+            self._informar(sql, parametros, duracion + lectura, filas)
+
+    def _informar(self, sql, parametros, duracion: float, filas: Optional[int], ejecuciones: int = 1) -> None:
+        for medicion in _mediciones:
+            if medicion.habilitado:
+                medicion.medida(self.connection, sql, parametros, duracion, filas, ejecuciones)
+
+
+def _medicion_habilitada() -> bool:
+    return any(medicion.habilitado for medicion in _mediciones)
+
+
+class ConexionInstrumentada(sqlite3.Connection):
+    """Conexión que crea cursores instrumentados y reintenta el COMMIT."""
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        return ejecutar_con_reintentos(self, "COMMIT", super().commit)
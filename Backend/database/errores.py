@@ -0,0 +1,63 @@
+"""
+Errores de acceso a datos compartidos por los repositories.
+"""
+
+import sqlite3
+
+
+class ConflictoVersionError(ValueError):
+    """
+    La fila cambió desde que se leyó (control de concurrencia optimista).
+
+    Se lanza cuando un UPDATE condicionado a `version = ?` no afecta ninguna
+    fila aunque el registro existe: otra escritura lo modificó en el medio.
+    """
+
+    def __init__(self, entidad: str, entidad_id: int, version_esperada: int):
+        self.entidad = entidad
+        self.entidad_id = entidad_id
+        self.version_esperada = version_esperada
+        super().__init__(
+            f"El {entidad} {entidad_id} fue modificado por otra operación "
+            f"(versión esperada: {version_esperada}). Volvé a consultarlo e intentá de nuevo."
+        )
+
+
+class PresupuestoSQLExcedidoError(RuntimeError):
+    """
+    Una request superó su presupuesto de sentencias SQL o repitió una misma
+    sentencia más veces que lo permitido (posible N+1). Solo se lanza con
+    DETECTOR_N1=error (ver api.presupuesto_sql).
+    """
+
+
+class BaseDatosOcupadaError(sqlite3.OperationalError):
+    """
+    La base siguió bloqueada (SQLITE_BUSY/SQLITE_LOCKED) hasta agotar el plazo
+    de reintentos de database.contencion.
+    """
+
+    def __init__(self, sentencia: str, reintentos: int, espera: float):
+        self.sentencia = sentencia
+        self.reintentos = reintentos
+        self.espera = espera
+        super().__init__(
+            f"La base de datos está ocupada (database is locked): "
+            f"{reintentos} reintentos en {espera:.2f}s"
+        )
+
+
+class ColaEscrituraDemoradaError(BaseDatosOcupadaError):
+    """
+    La cola de escritura (database.cola_escritura) no llegó a ejecutar la
+    operación dentro de COLA_ESCRITURA_TIMEOUT_SEGUNDOS. La operación se
+    canceló: no se escribió nada.
+    """
+
+    def __init__(self, espera: float):
+        self.sentencia = None
+        self.reintentos = 0
+        self.espera = espera
+        sqlite3.OperationalError.__init__(
+            self, f"La base de datos está ocupada: la cola de escritura no atendió la operación en {espera:.2f}s"
+        )
@@ -0,0 +1,213 @@
+"""
+Pool de conexiones de solo lectura y snapshots para reportes y listados.
+
+Las conexiones del pool se abren con la URI `mode=ro`: no pueden escribir ni
+tomar el lock de escritura. Con la base en modo WAL, un lector nunca bloquea
+a un escritor ni es bloqueado por él.
+
+`snapshot_lectura()` abre una única transacción de lectura y la publica en
+un contextvar: mientras dura, get_read_connection() devuelve esa misma
+conexión, así todas las lecturas de un reporte (aunque pasen por varios
+repositories) ven el mismo estado de la base.
+
+Si existe el archivo histórico (database.archivo), cada conexión lo adjunta
+al tomarse del pool junto con las vistas que lo unen a la base principal.
+
+Con REPORTES_EN_REPLICA=1 y una réplica configurada (database.replica), los
+snapshots pedidos con `replica=True` (los reportes) leen de la réplica.
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import trazas
+from database import archivo, connection
+from database import replica as replica_bd
+from database.contencion import ConexionInstrumentada, SQLITE_BUSY_TIMEOUT_MS
+
+# Conexiones ociosas que conserva el pool de lectura
+POOL_LECTURA_TAMANIO = int(os.getenv("POOL_LECTURA_TAMANIO", "8"))
+
+# Los reportes leen de la réplica (si hay una configurada)
+REPORTES_EN_REPLICA = os.getenv("REPORTES_EN_REPLICA", "0") == "1"
+
+
+class ConexionLectura(ConexionInstrumentada):
+    """Conexión de solo lectura que al cerrarse vuelve al pool."""
+
+    pool: Optional["PoolLectura"] = None
+    retenida = False  # True mientras es la conexión de un snapshot
+    archivo_adjunto = False
+    limite_snapshot = archivo.SIN_CALCULAR  # archivo.limite_archivado() del snapshot en curso
+
+    def close(self):
+        if self.retenida:
+            return
+        if self.pool is None or not self.pool.devolver(self):
+            super().close()
+
+    def cerrar_definitivamente(self):
+        super().close()
+
+
+class PoolLectura:
+    """
+    Pool de conexiones `mode=ro` compartido por los hilos del proceso.
+    Por defecto sobre la base primaria; `ruta` permite apuntarlo a otro archivo.
+    """
+
+    def __init__(self, tamanio: int = POOL_LECTURA_TAMANIO, ruta: Optional[Callable[[], Path]] = None):
+        self.tamanio = tamanio
+        self._ruta = ruta
+        self._libres: List[ConexionLectura] = []
+        self._lock = threading.Lock()
+        self._db_path = None
+
+    def ruta(self) -> Path:
+        return self._ruta() if self._ruta else connection.DB_PATH
+
+    def _abrir(self) -> ConexionLectura:
+        conn = sqlite3.connect(
+            f"file:{self._db_path}?mode=ro",
+            uri=True,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            factory=ConexionLectura,
+            check_same_thread=False,  # Cada conexión la usa un hilo a la vez
+            isolation_level=None,  # Sin transacciones implícitas: las abre snapshot_lectura()
+        )
+        conn.row_factory = sqlite3.Row
+        conn.pool = self
+        return conn
+
+    def _activar_wal(self) -> None:
+        """Pone la base en modo WAL (persiste en el archivo; se hace una vez por proceso)."""
+        conn = connection.get_connection()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+
+    def tomar(self) -> ConexionLectura:
+        """Devuelve una conexión libre o abre una nueva (con el archivo histórico adjuntado si existe)."""
+        conn = self._tomar()
+        if not conn.archivo_adjunto:
+            conn.archivo_adjunto = archivo.adjuntar(conn, solo_lectura=True)
+        return conn
+
+    def _tomar(self) -> ConexionLectura:
+        with self._lock:
+            if self._db_path != self.ruta():
+                # Primera vez (o la ruta de la base cambió): descartar las conexiones viejas
+                viejas, self._libres = self._libres, []
+                self._db_path = self.ruta()
+                activar_wal = self._ruta is None
+            else:
+                viejas, activar_wal = [], False
+                if self._libres:
+                    return self._libres.pop()
+        for conn in viejas:
+            conn.cerrar_definitivamente()
+        if activar_wal:
+            self._activar_wal()
+        return self._abrir()
+
+    def devolver(self, conn: ConexionLectura) -> bool:
+        """Devuelve una conexión al pool. False si está lleno (el llamador la cierra)."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._libres) >= self.tamanio or self._db_path != self.ruta():
+                return False
+            self._libres.append(conn)
+            return True
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones ociosas."""
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            conn.cerrar_definitivamente()
+
+
+# Instancias compartidas por toda la aplicación
+pool_lectura = PoolLectura()
+pool_replica = PoolLectura(ruta=lambda: replica_bd.REPLICA_PATH)
+
+# Conexión del snapshot en curso (None fuera de snapshot_lectura)
+_snapshot_actual: ContextVar[Optional[ConexionLectura]] = ContextVar("snapshot_lectura", default=None)
+
+
+def get_read_connection() -> sqlite3.Connection:
+    """
+    Obtiene una conexión de solo lectura.
+
+    Dentro de snapshot_lectura() devuelve la conexión del snapshot (cerrarla no
+    tiene efecto); fuera, una del pool (cerrarla la devuelve al pool).
+    """
+    conn = _snapshot_actual.get()
+    if conn is not None:
+        return conn
+    with trazas.tramo("get_read_connection", "db"):
+        return pool_lectura.tomar()
+
+
+@contextmanager
+def snapshot_lectura(replica: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Ejecuta el bloque dentro de una única transacción de lectura.
+
+    Las lecturas hechas con get_read_connection() dentro del bloque ven todas
+    el mismo estado de la base, aunque haya escrituras concurrentes. Anidar
+    snapshots reutiliza el exterior.
+
+    Args:
+        replica: Leer de la réplica si REPORTES_EN_REPLICA está activo (puede estar atrasada)
+    """
+    actual = _snapshot_actual.get()
+    if actual is not None:
+        yield actual
+        return
+
+    usar_replica = replica and REPORTES_EN_REPLICA and replica_disponible()
+    conn = (pool_replica if usar_replica else pool_lectura).tomar()
+    conn.retenida = True
+    conn.limite_snapshot = archivo.SIN_CALCULAR
+    token = _snapshot_actual.set(conn)
+    try:
+        conn.execute("BEGIN")
+        # La primera lectura fija el snapshot
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        if conn.archivo_adjunto:
+            # Después de la principal: archivar() confirma la copia antes de borrar, así ninguna fila falta
+            conn.execute(f"SELECT 1 FROM {archivo.ESQUEMA}.sqlite_master LIMIT 1").fetchall()
+        yield conn
+    finally:
+        _snapshot_actual.reset(token)
+        conn.retenida = False
+        conn.limite_snapshot = archivo.SIN_CALCULAR
+        conn.close()
+
+
+def replica_disponible() -> bool:
+    """True si hay una réplica configurada y su archivo existe."""
+    return replica_bd.REPLICA_PATH is not None and replica_bd.REPLICA_PATH.exists()
+
+
+def en_snapshot(func=None, *, replica: bool = False):
+    """
+    Decorador: ejecuta la función dentro de snapshot_lectura().
+    Se usa como @en_snapshot o @en_snapshot(replica=True).
+    """
+    def decorador(f):
+        @functools.wraps(f)
+        def envoltura(*args, **kwargs):
+            with snapshot_lectura(replica=replica):
+                return f(*args, **kwargs)
+        return envoltura
+    return decorador(func) if func is not None else decorador
@@ -0,0 +1,326 @@
+"""
+Réplica en caliente (warm standby) de la base en otro archivo.
+
+Replicación por changelog con triggers (opt-in):
+- `inicializar()` crea en la primaria la tabla ReplicaLog y un trigger por
+  tabla y operación que anota (tabla, rowid, operación). Después copia la
+  base con la API de backup al destino, que queda como réplica.
+- `enviar_cambios()` lee las entradas nuevas del log y, en una sola
+  transacción de lectura, el estado actual de esas filas en la primaria.
+  En la réplica borra las filas que ya no existen y hace INSERT OR REPLACE
+  del resto, en una única transacción. Como se envía el estado actual y no
+  cada operación, aplicar un lote dos veces da el mismo resultado. Las
+  entradas enviadas se borran del log de la primaria.
+- `estado()` informa el atraso (cambios pendientes y antigüedad del más viejo).
+- `promover()` convierte la réplica en una base autónoma para usarla como
+  primaria (DATABASE_PATH=<ruta de la réplica>).
+
+Los cambios de esquema no se replican: tras una migración hay que volver a
+inicializar la réplica. La tabla Revision no se replica (la mantienen los
+triggers de cada base).
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from database import changelog, connection
+
+# Archivo de la réplica (vacío = replicación deshabilitada)
+REPLICA_PATH = Path(os.environ["REPLICA_PATH"]) if os.getenv("REPLICA_PATH") else None
+
+# Entradas del log enviadas por transacción
+REPLICA_LOTE = int(os.getenv("REPLICA_LOTE", "500"))
+
+# Tablas que no se replican
+TABLAS_EXCLUIDAS = ('ReplicaLog', 'ReplicaEstado', 'Revision')
+
+_OPERACIONES = {'INSERT': 'I', 'UPDATE': 'U', 'DELETE': 'D'}
+
+
+def _tablas_replicables(conn: sqlite3.Connection) -> List[str]:
+    filas = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    return [fila[0] for fila in filas if fila[0] not in TABLAS_EXCLUIDAS]
+
+
+def _alias_rowid(conn: sqlite3.Connection, tabla: str) -> Optional[str]:
+    """Columna INTEGER PRIMARY KEY de la tabla (alias de rowid), o None."""
+    claves = [fila for fila in conn.execute(f'PRAGMA table_info("{tabla}")') if fila[5]]
+    if len(claves) == 1 and claves[0][2].upper() == 'INTEGER':
+        return claves[0][1]
+    return None
+
+
+def instalar_log(conn: sqlite3.Connection) -> None:
+    """Crea ReplicaLog y los triggers que la alimentan (idempotente)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS "ReplicaLog" (
+            "seq" INTEGER PRIMARY KEY AUTOINCREMENT,
+            "tabla" TEXT NOT NULL,
+            "fila_id" INTEGER NOT NULL,
+            "op" TEXT NOT NULL,
+            "creado_en" REAL NOT NULL
+        )
+    """)
+    for tabla in _tablas_replicables(conn):
+        for operacion, letra in _OPERACIONES.items():
+            fila = 'OLD' if operacion == 'DELETE' else 'NEW'
+            extra = ''
+            if operacion == 'UPDATE':
+                # Si cambió la clave, la fila vieja desaparece
+                extra = f"""
+                    INSERT INTO "ReplicaLog" ("tabla", "fila_id", "op", "creado_en")
+                    SELECT '{tabla}', OLD.rowid, 'D', julianday('now') WHERE OLD.rowid <> NEW.rowid;"""
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS "trg_replica_{tabla.lower()}_{operacion.lower()}"
+                AFTER {operacion} ON "{tabla}"
+                BEGIN
+                    INSERT INTO "ReplicaLog" ("tabla", "fila_id", "op", "creado_en")
+                    VALUES ('{tabla}', {fila}.rowid, '{letra}', julianday('now'));{extra}
+                END
+            """)
+
+
+def _quitar_log(conn: sqlite3.Connection) -> None:
+    triggers = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_replica_%'"
+    ).fetchall()
+    for (nombre,) in triggers:
+        conn.execute(f'DROP TRIGGER "{nombre}"')
+    conn.execute('DROP TABLE IF EXISTS "ReplicaLog"')
+
+
+def _conectar_replica(ruta: Path) -> sqlite3.Connection:
+    if not Path(ruta).exists():
+        raise FileNotFoundError(f"No existe la réplica {ruta}. Ejecutá scripts/replica.py inicializar")
+    conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    # Las filas llegan en cualquier orden: sin FK (y sin cascadas) al aplicarlas
+    conn.execute("PRAGMA foreign_keys = OFF")
+    return conn
+
+
+def _leer_estado_replica(conn: sqlite3.Connection) -> Dict[str, str]:
+    return dict(conn.execute('SELECT "clave", "valor" FROM "ReplicaEstado"').fetchall())
+
+
+def inicializar(destino: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Activa el log de replicación en la primaria y crea (o recrea) la réplica.
+
+    Returns:
+        Diccionario con la ruta de la réplica, tablas replicadas y seq inicial
+    """
+    destino = Path(destino or REPLICA_PATH or '')
+    if not destino.name:
+        raise ValueError("Indicá la ruta de la réplica (REPLICA_PATH o --destino)")
+    if destino.resolve() == Path(connection.DB_PATH).resolve():
+        raise ValueError("La réplica no puede ser el mismo archivo que la base primaria")
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    primaria = connection.get_connection()
+    primaria.isolation_level = None
+    try:
+        primaria.execute("BEGIN IMMEDIATE")
+        instalar_log(primaria)
+        primaria.execute("COMMIT")
+        tablas = _tablas_replicables(primaria)
+
+        # La copia incluye el log en el mismo estado que los datos: su último seq es el punto de partida
+        temporal = destino.with_name(destino.name + '.tmp')
+        copia = sqlite3.connect(temporal, isolation_level=None)
+        try:
+            primaria.backup(copia)
+            seq = copia.execute('SELECT COALESCE(MAX("seq"), 0) FROM "ReplicaLog"').fetchone()[0]
+            copia.execute("BEGIN")
+            _quitar_log(copia)
+            # ChangeLog llega replicado desde la primaria: sus triggers no deben correr en la réplica
+            changelog.quitar_triggers(copia)
+            copia.execute('CREATE TABLE IF NOT EXISTS "ReplicaEstado" ("clave" TEXT PRIMARY KEY, "valor" TEXT)')
+            copia.executemany(
+                'INSERT OR REPLACE INTO "ReplicaEstado" ("clave", "valor") VALUES (?, ?)',
+                [('rol', 'replica'), ('primaria', str(connection.DB_PATH)), ('ultimo_seq', str(seq)),
+                 ('aplicado_en', datetime.now().isoformat(timespec='seconds'))]
+            )
+            copia.execute("COMMIT")
+            copia.execute("PRAGMA journal_mode = WAL")
+        finally:
+            copia.close()
+        for sufijo in ('-wal', '-shm'):
+            Path(f"{destino}{sufijo}").unlink(missing_ok=True)
+        temporal.replace(destino)
+
+        # Lo anterior al backup ya está en la réplica
+        primaria.execute('DELETE FROM "ReplicaLog" WHERE "seq" <= ?', (seq,))
+    finally:
+        primaria.close()
+    return {'replica': str(destino), 'tablas': tablas, 'ultimo_seq': seq}
+
+
+def enviar_cambios(destino: Optional[Path] = None, lote: int = REPLICA_LOTE) -> Dict[str, Any]:
+    """
+    Envía a la réplica los cambios pendientes, de a `lote` entradas por transacción.
+
+    Returns:
+        Diccionario con entradas enviadas, filas aplicadas, último seq y duración
+    """
+    destino = Path(destino or REPLICA_PATH)
+    inicio = time.monotonic()
+    replica = _conectar_replica(destino)
+    primaria = connection.get_connection()
+    primaria.isolation_level = None
+    enviadas = aplicadas = 0
+    try:
+        estado_replica = _leer_estado_replica(replica)
+        if estado_replica.get('rol') != 'replica':
+            raise ValueError(f"{destino} ya no es una réplica (rol: {estado_replica.get('rol')})")
+        ultimo_seq = int(estado_replica['ultimo_seq'])
+        while True:
+            # Log y filas se leen en la misma transacción: el estado enviado corresponde al seq
+            primaria.execute("BEGIN")
+            entradas = primaria.execute(
+                'SELECT "seq", "tabla", "fila_id" FROM "ReplicaLog" WHERE "seq" > ? ORDER BY "seq" LIMIT ?',
+                (ultimo_seq, lote)
+            ).fetchall()
+            if not entradas:
+                primaria.execute("COMMIT")
+                break
+            por_tabla: Dict[str, set] = {}
+            for entrada in entradas:
+                por_tabla.setdefault(entrada['tabla'], set()).add(entrada['fila_id'])
+            filas = {}
+            for tabla, ids in por_tabla.items():
+                marcadores = ", ".join("?" for _ in ids)
+                filas[tabla] = primaria.execute(
+                    f'SELECT rowid AS "__rowid__", * FROM "{tabla}" WHERE rowid IN ({marcadores})', tuple(ids)
+                ).fetchall()
+            primaria.execute("COMMIT")
+            nuevo_seq = entradas[-1]['seq']
+
+            replica.execute("BEGIN IMMEDIATE")
+            try:
+                for tabla, ids in por_tabla.items():
+                    presentes = {fila['__rowid__'] for fila in filas[tabla]}
+                    borrados = [(fila_id,) for fila_id in ids - presentes]
+                    if borrados:
+                        replica.executemany(f'DELETE FROM "{tabla}" WHERE rowid = ?', borrados)
+                    if filas[tabla]:
+                        columnas = [c for c in filas[tabla][0].keys() if c != '__rowid__']
+                        alias = _alias_rowid(replica, tabla)
+                        lista = ([] if alias else ['rowid']) + [f'"{c}"' for c in columnas]
+                        replica.executemany(
+                            f'INSERT OR REPLACE INTO "{tabla}" ({", ".join(lista)}) '
+                            f'VALUES ({", ".join("?" for _ in lista)})',
+                            [([] if alias else [fila['__rowid__']]) + [fila[c] for c in columnas] for fila in filas[tabla]]
+                        )
+                    aplicadas += len(ids)
+                replica.executemany(
+                    'UPDATE "ReplicaEstado" SET "valor" = ? WHERE "clave" = ?',
+                    [(str(nuevo_seq), 'ultimo_seq'), (datetime.now().isoformat(timespec='seconds'), 'aplicado_en')]
+                )
+                replica.execute("COMMIT")
+            except Exception:
+                replica.execute("ROLLBACK")
+                raise
+
+            # Ya aplicado en la réplica: se puede podar el log de la primaria
+            primaria.execute('DELETE FROM "ReplicaLog" WHERE "seq" <= ?', (nuevo_seq,))
+            enviadas += len(entradas)
+            ultimo_seq = nuevo_seq
+            if len(entradas) < lote:
+                break
+    finally:
+        if primaria.in_transaction:
+            primaria.rollback()
+        primaria.close()
+        replica.close()
+    return {
+        'entradas_enviadas': enviadas,
+        'filas_aplicadas': aplicadas,
+        'ultimo_seq': ultimo_seq,
+        'duracion_s': round(time.monotonic() - inicio, 4),
+    }
+
+
+def estado(destino: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Atraso de la réplica respecto de la primaria.
+
+    Returns:
+        Diccionario con último seq aplicado, cambios pendientes y antigüedad (s) del más viejo
+    """
+    destino = Path(destino or REPLICA_PATH)
+    replica = _conectar_replica(destino)
+    try:
+        estado_replica = _leer_estado_replica(replica)
+    finally:
+        replica.close()
+    resultado = {
+        'replica': str(destino),
+        'rol': estado_replica.get('rol'),
+        'ultimo_seq': int(estado_replica.get('ultimo_seq', 0)),
+        'aplicado_en': estado_replica.get('aplicado_en'),
+    }
+    if estado_replica.get('rol') != 'replica':
+        return resultado
+
+    primaria = connection.get_connection()
+    try:
+        pendientes, mas_viejo, ultimo = primaria.execute(
+            """
+            SELECT COUNT(*), (julianday('now') - MIN("creado_en")) * 86400, MAX("seq")
+            FROM "ReplicaLog" WHERE "seq" > ?
+            """,
+            (resultado['ultimo_seq'],)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        pendientes, mas_viejo, ultimo = None, None, None  # La primaria no tiene el log instalado
+    finally:
+        primaria.close()
+    resultado.update({
+        'seq_primaria': ultimo if ultimo is not None else resultado['ultimo_seq'],
+        'lag_cambios': pendientes,
+        'lag_segundos': round(mas_viejo, 3) if mas_viejo is not None else 0.0,
+    })
+    return resultado
+
+
+def promover(destino: Optional[Path] = None, sincronizar: bool = True) -> Dict[str, Any]:
+    """
+    Convierte la réplica en una base primaria autónoma.
+
+    Args:
+        destino: Ruta de la réplica
+        sincronizar: Si es True intenta enviar los últimos cambios antes (si la primaria responde)
+
+    Returns:
+        Diccionario con la ruta promovida, si se sincronizó y el resultado del integrity_check
+    """
+    destino = Path(destino or REPLICA_PATH)
+    sincronizado = None
+    if sincronizar:
+        try:
+            sincronizado = enviar_cambios(destino)
+        except Exception as e:
+            sincronizado = {'error': str(e)}
+
+    replica = _conectar_replica(destino)
+    try:
+        verificacion = replica.execute("PRAGMA integrity_check").fetchone()[0]
+        replica.execute("BEGIN IMMEDIATE")
+        replica.execute('UPDATE "ReplicaEstado" SET "valor" = ? WHERE "clave" = ?', ('primaria', 'rol'))
+        if replica.execute("SELECT 1 FROM sqlite_master WHERE name = 'ChangeLog'").fetchone():
+            changelog.instalar(replica)
+        replica.execute(
+            'INSERT OR REPLACE INTO "ReplicaEstado" ("clave", "valor") VALUES (?, ?)',
+            ('promovida_en', datetime.now().isoformat(timespec='seconds'))
+        )
+        replica.execute("COMMIT")
+        replica.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        replica.close()
+    return {'primaria': str(destino), 'sincronizacion': sincronizado, 'integrity_check': verificacion}
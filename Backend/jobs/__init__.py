@@ -0,0 +1,20 @@
+"""Tareas en segundo plano de la API.
+
+Expone el planificador compartido donde cada módulo registra sus
+tareas periódicas (ver `jobs.scheduler`) y el gestor que libera los
+holds de turnos vencidos (ver `jobs.expiracion_holds`). Las tareas de
+mantenimiento, backup, replicación, archivado y compactación del
+changelog están en `jobs.mantenimiento_bd`, `jobs.backup_bd`,
+`jobs.replicacion_bd`, `jobs.archivo_turnos` y `jobs.changelog_bd`.
+"""
+
+from .scheduler import Planificador, TareaPeriodica, planificador
+from .expiracion_holds import GestorHolds, gestor_holds
+
+__all__ = [
+    "Planificador",
+    "TareaPeriodica",
+    "planificador",
+    "GestorHolds",
+    "gestor_holds",
+]
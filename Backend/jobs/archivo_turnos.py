@@ -0,0 +1,21 @@
+"""
+Archivado periódico de turnos viejos (ver `database.archivo`).
+
+Mueve a archive.db los turnos terminados de más de ARCHIVO_MESES meses con
+sus pagos y servicios. Está apagado por defecto: se activa con
+ARCHIVO_HABILITADO=1 (los backups de jobs.backup_bd incluyen archive.db).
+"""
+
+import os
+
+from database import archivo
+
+ARCHIVO_HABILITADO = os.getenv("ARCHIVO_HABILITADO", "0") == "1"
+INTERVALO_ARCHIVO_HORAS = float(os.getenv("INTERVALO_ARCHIVO_HORAS", "24"))
+
+
+def registrar_tareas(planificador) -> None:
+    """Registra el archivado en el planificador (si está habilitado)."""
+    if ARCHIVO_HABILITADO:
+        planificador.registrar("bd_archivo_turnos", archivo.archivar,
+                               intervalo_segundos=INTERVALO_ARCHIVO_HORAS * 3600, ejecutar_al_iniciar=False)
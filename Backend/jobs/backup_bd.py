@@ -0,0 +1,187 @@
+"""
+Backup en caliente de la base SQLite.
+
+Usa la API de backup de SQLite (`sqlite3.Connection.backup`): copia la base
+de a `paginas_por_paso` páginas y duerme entre pasos, así la API sigue
+atendiendo mientras corre. Copiar el archivo a mano con la API en marcha
+puede dejar una copia corrupta; la API de backup no.
+
+Si otra conexión escribe en la base mientras tanto, SQLite reinicia la copia
+desde la primera página. Con tráfico de reservas constante eso puede no
+terminar nunca, así que después de BACKUP_MAX_REINICIOS reinicios se copia
+todo en un único paso (una sola transacción de lectura: en modo WAL no
+bloquea a los que escriben). Si igual se supera BACKUP_PLAZO_SEGUNDOS el
+backup se aborta con TimeoutError en lugar de seguir ocupando el hilo del
+planificador.
+
+La copia se escribe con extensión .tmp, se verifica con
+`PRAGMA integrity_check` y recién entonces se renombra. Se conservan los
+últimos `conservar` backups y se borran los más viejos.
+Si existe archive.db (turnos archivados, ver database.archivo) se copia igual
+junto con la base, como archive-<fecha>.db.
+Lo usan scripts/backup.py y la tarea periódica `bd_backup`.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from database import archivo, connection
+
+logger = logging.getLogger(__name__)
+
+# Carpeta de los backups, cantidad a conservar y frecuencia de la tarea periódica
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", str(Path(__file__).parent.parent / "backups")))
+BACKUP_CONSERVAR = int(os.getenv("BACKUP_CONSERVAR", "7"))
+BACKUP_HABILITADO = os.getenv("BACKUP_HABILITADO", "1") == "1"
+INTERVALO_BACKUP_HORAS = float(os.getenv("INTERVALO_BACKUP_HORAS", "24"))
+
+# Páginas copiadas por paso y pausa entre pasos
+BACKUP_PAGINAS_POR_PASO = int(os.getenv("BACKUP_PAGINAS_POR_PASO", "256"))
+BACKUP_PAUSA_SEGUNDOS = float(os.getenv("BACKUP_PAUSA_SEGUNDOS", "0.05"))
+
+# Reinicios de la copia incremental antes de pasar a un único paso, y plazo total
+BACKUP_MAX_REINICIOS = int(os.getenv("BACKUP_MAX_REINICIOS", "3"))
+BACKUP_PLAZO_SEGUNDOS = float(os.getenv("BACKUP_PLAZO_SEGUNDOS", "600"))
+
+PREFIJO_BACKUP = "database-"
+PREFIJO_ARCHIVO = "archive-"
+
+
+class _CopiaReiniciada(Exception):
+    """La copia incremental se reinició demasiadas veces (otra conexión escribe sin parar)."""
+
+
+def rotar_backups(directorio: Path, conservar: int, prefijo: str = PREFIJO_BACKUP) -> list:
+    """
+    Borra los backups más viejos de `directorio` dejando los últimos `conservar`.
+
+    Returns:
+        Nombres de los archivos borrados
+    """
+    backups = sorted(directorio.glob(f"{prefijo}*.db"))
+    borrados = backups[:-conservar] if conservar > 0 else []
+    for backup in borrados:
+        backup.unlink()
+    return [backup.name for backup in borrados]
+
+
+def _copiar(origen: sqlite3.Connection, destino: Path, paginas_por_paso: int, pausa_segundos: float,
+            max_reinicios: int, plazo_segundos: float) -> Dict[str, Any]:
+    """Copia `origen` en `destino` con la API de backup, la verifica y la publica (cierra `origen`)."""
+    temporal = destino.with_suffix(".db.tmp")
+    pasos = {'cantidad': 0, 'reinicios': 0, 'restantes': None}
+    inicio = time.monotonic()
+
+    def progreso(estado, restantes, total):
+        pasos['cantidad'] += 1
+        if pasos['restantes'] is not None and restantes > pasos['restantes']:
+            # SQLite volvió a empezar porque otra conexión modificó la base
+            pasos['reinicios'] += 1
+            if pasos['reinicios'] > max_reinicios:
+                raise _CopiaReiniciada()
+        pasos['restantes'] = restantes
+        if time.monotonic() - inicio > plazo_segundos:
+            raise TimeoutError(f"El backup superó el plazo de {plazo_segundos:g}s")
+        # El parámetro sleep de backup() solo espera ante SQLITE_BUSY; la pausa entre pasos va acá
+        if restantes and pausa_segundos > 0:
+            time.sleep(pausa_segundos)
+
+    copia = sqlite3.connect(temporal)
+    try:
+        try:
+            origen.backup(copia, pages=paginas_por_paso, progress=progreso)
+        except _CopiaReiniciada:
+            logger.warning("Backup %s: la copia incremental se reinició %s veces, se copia en un único paso",
+                           destino.name, pasos['reinicios'])
+            pasos['restantes'] = None
+            origen.backup(copia, pages=-1, progress=progreso)
+        duracion = time.monotonic() - inicio
+        # La copia queda autocontenida (sin -wal) y se verifica antes de publicarla
+        copia.execute("PRAGMA journal_mode = DELETE")
+        verificacion = copia.execute("PRAGMA integrity_check").fetchone()[0]
+        paginas = copia.execute("PRAGMA page_count").fetchone()[0]
+        tamanio_pagina = copia.execute("PRAGMA page_size").fetchone()[0]
+    except Exception:
+        copia.close()
+        temporal.unlink(missing_ok=True)
+        raise
+    finally:
+        origen.close()
+    copia.close()
+
+    if verificacion != 'ok':
+        temporal.unlink(missing_ok=True)
+        raise Exception(f"El backup no pasó el integrity_check: {verificacion}")
+    temporal.replace(destino)
+
+    tamanio = paginas * tamanio_pagina
+    resultado = {
+        'archivo': str(destino),
+        'bytes': tamanio,
+        'paginas': paginas,
+        'pasos': pasos['cantidad'],
+        'reinicios': pasos['reinicios'],
+        'duracion_s': round(duracion, 3),
+        'mb_por_segundo': round(tamanio / (1024 * 1024) / duracion, 2) if duracion > 0 else None,
+        'integrity_check': verificacion,
+    }
+    logger.info("Backup %s: %s bytes en %.2fs (%s MB/s, %s pasos, %s reinicios)",
+                destino.name, tamanio, duracion, resultado['mb_por_segundo'], pasos['cantidad'], pasos['reinicios'])
+    return resultado
+
+
+def hacer_backup(
+    directorio: Optional[Path] = None,
+    paginas_por_paso: int = BACKUP_PAGINAS_POR_PASO,
+    pausa_segundos: float = BACKUP_PAUSA_SEGUNDOS,
+    conservar: int = BACKUP_CONSERVAR,
+    max_reinicios: int = BACKUP_MAX_REINICIOS,
+    plazo_segundos: float = BACKUP_PLAZO_SEGUNDOS,
+) -> Dict[str, Any]:
+    """
+    Hace un backup verificado de la base (y de archive.db si existe) y rota los anteriores.
+
+    Args:
+        directorio: Carpeta destino (por defecto BACKUP_DIR)
+        paginas_por_paso: Páginas copiadas en cada paso (-1 copia todo de una vez)
+        pausa_segundos: Pausa entre pasos para no acaparar la base
+        conservar: Cantidad de backups a conservar (0 = no rotar)
+        max_reinicios: Reinicios de la copia incremental antes de copiar en un único paso
+        plazo_segundos: Duración máxima de cada copia
+
+    Returns:
+        Diccionario con el archivo generado, tamaño, duración, MB/s y backups borrados;
+        en 'archivo_historico' el mismo detalle del backup de archive.db (None si no hay)
+
+    Raises:
+        TimeoutError: Si la copia supera `plazo_segundos` (la copia se descarta)
+        Exception: Si la copia falla o no pasa el integrity_check (la copia se descarta)
+    """
+    directorio = Path(directorio or BACKUP_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    sello = datetime.now().strftime('%Y%m%d-%H%M%S')
+    opciones = (paginas_por_paso, pausa_segundos, max_reinicios, plazo_segundos)
+
+    resultado = _copiar(connection.get_connection(), directorio / f"{PREFIJO_BACKUP}{sello}.db", *opciones)
+    resultado['borrados'] = rotar_backups(directorio, conservar)
+
+    # Los turnos archivados solo están en archive.db: sin este backup se perderían
+    ruta_historico = archivo.ruta_archivo()
+    resultado['archivo_historico'] = None
+    if ruta_historico.exists():
+        historico = _copiar(sqlite3.connect(ruta_historico), directorio / f"{PREFIJO_ARCHIVO}{sello}.db", *opciones)
+        historico['borrados'] = rotar_backups(directorio, conservar, PREFIJO_ARCHIVO)
+        resultado['archivo_historico'] = historico
+    return resultado
+
+
+def registrar_tareas(planificador) -> None:
+    """Registra el backup periódico en el planificador (si está habilitado)."""
+    if BACKUP_HABILITADO:
+        planificador.registrar("bd_backup", hacer_backup,
+                               intervalo_segundos=INTERVALO_BACKUP_HORAS * 3600, ejecutar_al_iniciar=False)
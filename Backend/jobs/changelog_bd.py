@@ -0,0 +1,29 @@
+"""
+Compactación periódica del changelog (ver `database.changelog` y
+`services.cambios_service`).
+"""
+
+import logging
+import os
+from typing import Any, Dict
+
+from services import cambios_service
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_CHANGELOG_HORAS = float(os.getenv("INTERVALO_CHANGELOG_HORAS", "6"))
+
+
+def compactar() -> Dict[str, Any]:
+    """Compacta y purga el changelog; loguea si borró entradas."""
+    resultado = cambios_service.compactar()
+    if resultado['compactadas'] or resultado['purgadas']:
+        logger.info("Changelog: %s entradas compactadas, %s purgadas (purgado hasta seq %s)",
+                    resultado['compactadas'], resultado['purgadas'], resultado['purgado_hasta'])
+    return resultado
+
+
+def registrar_tareas(planificador) -> None:
+    """Registra la compactación del changelog en el planificador."""
+    planificador.registrar("bd_changelog_compactar", compactar,
+                           intervalo_segundos=INTERVALO_CHANGELOG_HORAS * 3600, ejecutar_al_iniciar=False)
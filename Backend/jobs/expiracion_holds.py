@@ -0,0 +1,98 @@
+"""
+Expiración precisa de holds de turnos.
+
+Mantiene un min-heap de (expira_en, id_hold) y un hilo que duerme hasta el
+próximo vencimiento: liberar un hold vencido cuesta O(log n), sin recorrer
+tablas. Los holds confirmados o cancelados no se quitan del heap; al vencer,
+la liberación es condicional (estado = 'activo') y no hace nada.
+Al iniciar, el heap se reconstruye desde la BD con los holds activos.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GestorHolds:
+    """Libera los holds vencidos en un único hilo daemon."""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._condicion = threading.Condition()
+        self._detener = False
+        self._hilo: Optional[threading.Thread] = None
+        self.liberados = 0
+
+    def programar(self, hold_id: int, expira_en: datetime) -> None:
+        """Agrega el vencimiento de un hold; despierta al hilo si es el más próximo."""
+        with self._condicion:
+            heapq.heappush(self._heap, (expira_en, hold_id))
+            if self._heap[0] == (expira_en, hold_id):
+                self._condicion.notify()
+
+    def pendientes(self) -> int:
+        """Cantidad de vencimientos en el heap (incluye holds ya cerrados)."""
+        with self._condicion:
+            return len(self._heap)
+
+    def iniciar(self) -> None:
+        """Reconstruye el heap desde la BD e inicia el hilo (idempotente)."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        from repositories.hold_turno_repository import HoldTurnoRepository
+
+        try:
+            activos = HoldTurnoRepository.listar_activos()
+        except Exception:
+            logger.exception("No se pudieron cargar los holds activos")
+            activos = []
+        with self._condicion:
+            self._detener = False
+            self._heap = [(datetime.fromisoformat(h.expira_en), h.id) for h in activos]
+            heapq.heapify(self._heap)
+        self._hilo = threading.Thread(target=self._bucle, name="expiracion-holds", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo."""
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+        if self._hilo:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _bucle(self) -> None:
+        from repositories.hold_turno_repository import HoldTurnoRepository
+        from services.eventos_turnos import publicar_estado
+
+        while True:
+            with self._condicion:
+                while not self._detener:
+                    if not self._heap:
+                        self._condicion.wait()
+                        continue
+                    espera = (self._heap[0][0] - datetime.now()).total_seconds()
+                    if espera <= 0:
+                        break
+                    self._condicion.wait(espera)
+                if self._detener:
+                    return
+                _, hold_id = heapq.heappop(self._heap)
+
+            # La liberación va a la BD fuera del lock para no frenar a programar()
+            try:
+                id_turno = HoldTurnoRepository.liberar(hold_id, 'expirado')
+                if id_turno:
+                    self.liberados += 1
+                    publicar_estado(id_turno, 'disponible')
+            except Exception:
+                logger.exception("Error al liberar el hold vencido %s", hold_id)
+
+
+# Instancia compartida por toda la aplicación
+gestor_holds = GestorHolds()
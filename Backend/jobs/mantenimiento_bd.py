@@ -0,0 +1,175 @@
+"""
+Mantenimiento periódico de la base SQLite.
+
+Tareas que se registran en el planificador compartido:
+- checkpoint del WAL: PASSIVE cuando el WAL supera un tamaño; TRUNCATE
+  cuando supera un tamaño mayor o cuando la base quedó ociosa (ninguna
+  conexión confirmó escrituras desde la corrida anterior, según
+  `PRAGMA data_version`), para que el archivo no crezca sin límite.
+- optimización: ANALYZE completo si la base nunca se analizó, si no
+  `PRAGMA optimize` (solo reanaliza lo que cambió).
+- vacuum incremental: devuelve al sistema las páginas libres. Requiere
+  auto_vacuum = INCREMENTAL (ver scripts/init_database.py --migrar).
+
+Cada tarea registra en el log su duración y su resultado; el planificador
+guarda el último estado, que se expone en /health.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from database import connection
+
+logger = logging.getLogger(__name__)
+
+# Tamaño del WAL a partir del cual se hace un checkpoint PASSIVE / TRUNCATE
+WAL_CHECKPOINT_PASIVO_BYTES = int(os.getenv("WAL_CHECKPOINT_PASIVO_BYTES", str(4 * 1024 * 1024)))
+WAL_CHECKPOINT_TRUNCATE_BYTES = int(os.getenv("WAL_CHECKPOINT_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+
+# Intervalos de cada tarea
+INTERVALO_CHECKPOINT_SEGUNDOS = int(os.getenv("INTERVALO_CHECKPOINT_SEGUNDOS", "60"))
+INTERVALO_OPTIMIZAR_HORAS = float(os.getenv("INTERVALO_OPTIMIZAR_HORAS", "6"))
+INTERVALO_VACUUM_HORAS = float(os.getenv("INTERVALO_VACUUM_HORAS", "1"))
+
+# Páginas liberadas como máximo por corrida del vacuum incremental (0 = todas)
+VACUUM_PAGINAS_POR_CORRIDA = int(os.getenv("VACUUM_PAGINAS_POR_CORRIDA", "2000"))
+
+_MODOS_AUTO_VACUUM = {0: 'none', 1: 'full', 2: 'incremental'}
+
+# Conexión propia del checkpoint y su `PRAGMA data_version` en la corrida anterior.
+# data_version cambia cuando otra conexión confirma una escritura (no con los
+# checkpoints), así que el mismo valor en dos corridas seguidas = base ociosa.
+# El tamaño del WAL no sirve para eso: con carga, el WAL se reinicia y vuelve
+# a crecer hasta el mismo tamaño.
+_monitor: Dict[str, Any] = {'conn': None, 'data_version': None}
+
+
+def _tamanio_wal() -> int:
+    try:
+        return os.path.getsize(f"{connection.DB_PATH}-wal")
+    except OSError:
+        return 0
+
+
+def _data_version() -> Optional[int]:
+    try:
+        if _monitor['conn'] is None:
+            # La usa solo este job, una corrida a la vez (puede tocarle otro hilo del planificador)
+            _monitor['conn'] = sqlite3.connect(connection.DB_PATH, check_same_thread=False)
+        return _monitor['conn'].execute("PRAGMA data_version").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.warning("No se pudo leer PRAGMA data_version: %s", e)
+        _monitor['conn'] = None
+        return None
+
+
+def _conexion():
+    conn = connection.get_connection()
+    conn.isolation_level = None  # Los PRAGMA de mantenimiento no pueden ir dentro de una transacción
+    return conn
+
+
+def checkpoint_wal() -> Dict[str, Any]:
+    """
+    Hace un checkpoint del WAL si corresponde por tamaño o inactividad.
+
+    Returns:
+        Diccionario con el modo usado (o None si no hizo falta) y el tamaño del WAL antes y después
+    """
+    antes = _tamanio_wal()
+    version, anterior = _data_version(), _monitor['data_version']
+    _monitor['data_version'] = version
+    ocioso = antes > 0 and version is not None and version == anterior
+    if antes >= WAL_CHECKPOINT_TRUNCATE_BYTES or ocioso:
+        modo = 'TRUNCATE'
+    elif antes >= WAL_CHECKPOINT_PASIVO_BYTES:
+        modo = 'PASSIVE'
+    else:
+        return {'modo': None, 'wal_bytes': antes}
+
+    inicio = time.monotonic()
+    conn = _conexion()
+    try:
+        ocupado, paginas_log, paginas_copiadas = conn.execute(f"PRAGMA wal_checkpoint({modo})").fetchone()
+    finally:
+        conn.close()
+    despues = _tamanio_wal()
+    resultado = {
+        'modo': modo,
+        'motivo': 'inactividad' if ocioso and antes < WAL_CHECKPOINT_TRUNCATE_BYTES else 'tamaño',
+        'wal_bytes_antes': antes,
+        'wal_bytes_despues': despues,
+        'paginas_log': paginas_log,
+        'paginas_copiadas': paginas_copiadas,
+        'bloqueado': bool(ocupado),
+        'duracion_s': round(time.monotonic() - inicio, 4),
+    }
+    logger.info("Checkpoint %s del WAL: %s -> %s bytes (%s/%s páginas) en %.3fs",
+                modo, antes, despues, paginas_copiadas, paginas_log, resultado['duracion_s'])
+    return resultado
+
+
+def optimizar() -> Dict[str, Any]:
+    """
+    Actualiza las estadísticas del planificador de consultas.
+
+    Returns:
+        Diccionario con la operación hecha ('ANALYZE' u 'optimize') y su duración
+    """
+    inicio = time.monotonic()
+    conn = _conexion()
+    try:
+        analizada = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone() is not None
+        operacion = 'optimize' if analizada else 'ANALYZE'
+        conn.execute("PRAGMA optimize" if analizada else "ANALYZE")
+    finally:
+        conn.close()
+    duracion = round(time.monotonic() - inicio, 4)
+    logger.info("%s de la base en %.3fs", operacion, duracion)
+    return {'operacion': operacion, 'duracion_s': duracion}
+
+
+def vacuum_incremental() -> Dict[str, Any]:
+    """
+    Libera páginas vacías del archivo (PRAGMA incremental_vacuum).
+
+    Returns:
+        Diccionario con el modo de auto_vacuum y las páginas liberadas
+    """
+    inicio = time.monotonic()
+    conn = _conexion()
+    try:
+        modo = _MODOS_AUTO_VACUUM.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 'none')
+        if modo != 'incremental':
+            # Con auto_vacuum = none no hay vacuum incremental: hace falta migrar la base
+            return {'auto_vacuum': modo, 'paginas_liberadas': 0, 'migracion_requerida': modo == 'none'}
+        libres_antes = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript avanza la sentencia hasta el final (execute libera una sola página)
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGINAS_POR_CORRIDA})")
+        libres_despues = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        tamanio_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+    liberadas = libres_antes - libres_despues
+    duracion = round(time.monotonic() - inicio, 4)
+    logger.info("Vacuum incremental: %s páginas liberadas (%s bytes), %s libres restantes, en %.3fs",
+                liberadas, liberadas * tamanio_pagina, libres_despues, duracion)
+    return {
+        'auto_vacuum': modo,
+        'paginas_liberadas': liberadas,
+        'bytes_liberados': liberadas * tamanio_pagina,
+        'paginas_libres_restantes': libres_despues,
+        'duracion_s': duracion,
+    }
+
+
+def registrar_tareas(planificador) -> None:
+    """Registra las tareas de mantenimiento en el planificador."""
+    planificador.registrar("bd_checkpoint_wal", checkpoint_wal, intervalo_segundos=INTERVALO_CHECKPOINT_SEGUNDOS)
+    planificador.registrar("bd_optimizar", optimizar, intervalo_segundos=INTERVALO_OPTIMIZAR_HORAS * 3600)
+    planificador.registrar("bd_vacuum_incremental", vacuum_incremental, intervalo_segundos=INTERVALO_VACUUM_HORAS * 3600)
@@ -0,0 +1,37 @@
+"""
+Envío periódico de cambios a la réplica (ver `database.replica`).
+
+La tarea se registra solo si hay una réplica configurada (REPLICA_PATH) e
+inicializada con scripts/replica.py.
+"""
+
+import logging
+import os
+from typing import Any, Dict
+
+from database import replica
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se envían los cambios pendientes
+INTERVALO_REPLICA_SEGUNDOS = float(os.getenv("INTERVALO_REPLICA_SEGUNDOS", "2"))
+
+
+def enviar_cambios() -> Dict[str, Any]:
+    """Envía los cambios pendientes y loguea los lotes no vacíos."""
+    resultado = replica.enviar_cambios()
+    if resultado['entradas_enviadas']:
+        logger.info("Réplica: %s cambios enviados (%s filas) hasta seq %s en %.3fs",
+                    resultado['entradas_enviadas'], resultado['filas_aplicadas'],
+                    resultado['ultimo_seq'], resultado['duracion_s'])
+    return resultado
+
+
+def registrar_tareas(planificador) -> None:
+    """Registra el envío a la réplica en el planificador (si hay una réplica inicializada)."""
+    if replica.REPLICA_PATH is None:
+        return
+    if not replica.REPLICA_PATH.exists():
+        logger.warning("REPLICA_PATH=%s no existe: ejecutá scripts/replica.py inicializar", replica.REPLICA_PATH)
+        return
+    planificador.registrar("bd_replica", enviar_cambios, intervalo_segundos=INTERVALO_REPLICA_SEGUNDOS)
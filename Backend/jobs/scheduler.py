@@ -0,0 +1,126 @@
+"""
+Planificador de tareas periódicas en un hilo de fondo.
+
+Cada tarea se ejecuta cada `intervalo_segundos`; los errores se registran
+y no detienen al resto de las tareas.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TareaPeriodica:
+    """Tarea registrada en el planificador"""
+    nombre: str
+    funcion: Callable[[], Any]
+    intervalo_segundos: float
+    ejecutar_al_iniciar: bool = True
+    proxima_ejecucion: float = 0.0
+    ultima_ejecucion: Optional[float] = None
+    ultima_duracion: Optional[float] = None
+    ultimo_resultado: Any = None
+    ultimo_error: Optional[str] = None
+    ejecuciones: int = 0
+
+    def to_dict(self):
+        """Convierte el estado de la tarea a diccionario"""
+        return {
+            'nombre': self.nombre,
+            'intervalo_segundos': self.intervalo_segundos,
+            'ultima_ejecucion': self.ultima_ejecucion,
+            'ultima_duracion': self.ultima_duracion,
+            'ultimo_resultado': self.ultimo_resultado,
+            'ultimo_error': self.ultimo_error,
+            'ejecuciones': self.ejecuciones
+        }
+
+
+class Planificador:
+    """Ejecuta tareas periódicas en un único hilo daemon."""
+
+    def __init__(self):
+        self._tareas: Dict[str, TareaPeriodica] = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._despertar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def registrar(self, nombre: str, funcion: Callable[[], Any], intervalo_segundos: float,
+                  ejecutar_al_iniciar: bool = True) -> TareaPeriodica:
+        """Registra (o reemplaza) una tarea periódica."""
+        if intervalo_segundos <= 0:
+            raise ValueError("El intervalo de la tarea debe ser mayor a 0")
+
+        tarea = TareaPeriodica(
+            nombre=nombre,
+            funcion=funcion,
+            intervalo_segundos=intervalo_segundos,
+            ejecutar_al_iniciar=ejecutar_al_iniciar,
+        )
+        tarea.proxima_ejecucion = time.monotonic() + (0 if ejecutar_al_iniciar else intervalo_segundos)
+        with self._lock:
+            self._tareas[nombre] = tarea
+        self._despertar.set()
+        return tarea
+
+    def estado(self) -> List[Dict[str, Any]]:
+        """Devuelve el estado de todas las tareas registradas."""
+        with self._lock:
+            return [t.to_dict() for t in self._tareas.values()]
+
+    def iniciar(self) -> None:
+        """Inicia el hilo del planificador (idempotente)."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="planificador-tareas", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo del planificador."""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            ahora = time.monotonic()
+            with self._lock:
+                pendientes = [t for t in self._tareas.values() if t.proxima_ejecucion <= ahora]
+            for tarea in pendientes:
+                if self._detener.is_set():
+                    return
+                self._ejecutar(tarea)
+
+            with self._lock:
+                proxima = min((t.proxima_ejecucion for t in self._tareas.values()), default=None)
+            espera = 60.0 if proxima is None else max(0.0, proxima - time.monotonic())
+            self._despertar.wait(espera)
+            self._despertar.clear()
+
+    def _ejecutar(self, tarea: TareaPeriodica) -> None:
+        inicio = time.monotonic()
+        try:
+            tarea.ultimo_resultado = tarea.funcion()
+            tarea.ultimo_error = None
+        except Exception as e:
+            tarea.ultimo_error = str(e)
+            logger.exception("Error en la tarea periódica '%s'", tarea.nombre)
+        finally:
+            fin = time.monotonic()
+            tarea.ultima_ejecucion = time.time()
+            tarea.ultima_duracion = round(fin - inicio, 4)
+            tarea.ejecuciones += 1
+            tarea.proxima_ejecucion = fin + tarea.intervalo_segundos
+
+
+# Instancia compartida por toda la aplicación
+planificador = Planificador()
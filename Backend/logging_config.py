@@ -0,0 +1,178 @@
+"""
+Configuración del logging de la aplicación.
+
+Los loggers de los módulos (`logging.getLogger(__name__)`) escriben en un
+QueueHandler: el hilo que loguea (el de la request) solo arma el registro y
+lo encola. Un QueueListener en segundo plano lo formatea como una línea JSON
+y lo escribe en stdout (y en LOG_ARCHIVO si está configurado, rotado por
+tamaño).
+
+Antes de encolar se agregan al registro el request id y el endpoint de la
+request en curso. El request id lo fija api.middleware.ContextoRequestMiddleware
+en `request_id_actual` y se devuelve en el header X-Request-ID. Los DEBUG
+se muestrean: de cada línea de código que loguea en DEBUG pasa 1 de cada
+LOG_MUESTREO_DEBUG registros.
+
+Variables de entorno:
+- LOG_NIVEL: nivel raíz (INFO).
+- LOG_NIVELES: niveles por módulo, ej. "services.turnos_service=DEBUG,database=WARNING".
+- LOG_FORMATO: "json" (por defecto) o "texto".
+- LOG_ARCHIVO: archivo adicional de salida.
+- LOG_MUESTREO_DEBUG: 1 = sin muestreo.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Dict, List, Optional
+
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO").upper()
+LOG_NIVELES = os.getenv("LOG_NIVELES", "")
+LOG_FORMATO = os.getenv("LOG_FORMATO", "json").lower()
+LOG_ARCHIVO = os.getenv("LOG_ARCHIVO")
+LOG_ARCHIVO_MAX_BYTES = int(os.getenv("LOG_ARCHIVO_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ARCHIVO_CONSERVAR = int(os.getenv("LOG_ARCHIVO_CONSERVAR", "5"))
+LOG_MUESTREO_DEBUG = max(1, int(os.getenv("LOG_MUESTREO_DEBUG", "10")))
+
+# Request id de la request en curso (lo fija api.middleware); None fuera de una request
+request_id_actual: ContextVar[Optional[str]] = ContextVar("request_id_actual", default=None)
+
+# Atributos estándar de LogRecord: el resto vino por `extra=` y va al JSON
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "endpoint"}
+
+_listeners: List[QueueListener] = []
+_lock = threading.Lock()
+
+
+class FiltroContexto(logging.Filter):
+    """Agrega request_id y endpoint al registro (corre en el hilo que loguea, antes de encolar)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_actual.get()
+        if not hasattr(record, "endpoint"):
+            from database.contencion import request_actual
+            scope = request_actual.get()
+            record.endpoint = None if scope is None else (
+                f"{scope.get('method', '')} {getattr(scope.get('route'), 'path', None) or scope.get('path', '')}")
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar 1 de cada `cada` registros DEBUG por línea de código; los demás niveles pasan siempre."""
+
+    def __init__(self, cada: int = LOG_MUESTREO_DEBUG):
+        super().__init__()
+        self.cada = cada
+        self._cuentas: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.cada <= 1:
+            return True
+        clave = (record.pathname, record.lineno)
+        # Sin lock: una carrera solo corre el muestreo en uno
+        cuenta = self._cuentas.get(clave, 0)
+        self._cuentas[clave] = cuenta + 1
+        return cuenta % self.cada == 0
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            datos['request_id'] = record.request_id
+        if getattr(record, "endpoint", None):
+            datos['endpoint'] = record.endpoint
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD and not clave.startswith("_"):
+                datos[clave] = valor
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    QueueHandler que formatea la excepción antes de encolar (el traceback no
+    viaja entre hilos) pero deja el formateo del mensaje al listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def en_segundo_plano(*handlers: logging.Handler) -> QueueHandler:
+    """
+    Devuelve un handler que encola y escribe con `handlers` en un hilo aparte.
+    Lo usan la configuración general y los logs propios (ej. consultas lentas).
+    """
+    cola: SimpleQueue = SimpleQueue()
+    listener = QueueListener(cola, *handlers, respect_handler_level=True)
+    listener.start()
+    with _lock:
+        _listeners.append(listener)
+    return ColaHandler(cola)
+
+
+def _niveles_por_modulo(texto: str) -> Dict[str, str]:
+    niveles = {}
+    for parte in filter(None, (p.strip() for p in texto.split(","))):
+        modulo, _, nivel = parte.partition("=")
+        if modulo and nivel:
+            niveles[modulo.strip()] = nivel.strip().upper()
+    return niveles
+
+
+def configurar_logging() -> None:
+    """Configura el logger raíz (idempotente: se puede llamar desde la API y desde scripts)."""
+    raiz = logging.getLogger()
+    if any(getattr(h, "configurado_por_app", False) for h in raiz.handlers):
+        return
+
+    formato = FormatoJSON() if LOG_FORMATO == "json" else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+    salidas: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if LOG_ARCHIVO:
+        os.makedirs(os.path.dirname(os.path.abspath(LOG_ARCHIVO)), exist_ok=True)
+        salidas.append(RotatingFileHandler(LOG_ARCHIVO, maxBytes=LOG_ARCHIVO_MAX_BYTES,
+                                           backupCount=LOG_ARCHIVO_CONSERVAR, encoding="utf-8"))
+    for salida in salidas:
+        salida.setFormatter(formato)
+
+    cola = en_segundo_plano(*salidas)
+    cola.addFilter(FiltroMuestreo())
+    cola.addFilter(FiltroContexto())
+    cola.configurado_por_app = True
+    raiz.addHandler(cola)
+    raiz.setLevel(LOG_NIVEL)
+    for modulo, nivel in _niveles_por_modulo(LOG_NIVELES).items():
+        logging.getLogger(modulo).setLevel(nivel)
+
+
+def detener_logging() -> None:
+    """Escribe lo que quede en las colas y detiene los hilos de logging."""
+    with _lock:
+        listeners, _listeners[:] = list(_listeners), []
+    for listener in listeners:
+        listener.stop()
+
+
+atexit.register(detener_logging)
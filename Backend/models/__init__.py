@@ -11,6 +11,10 @@ from .equipo import Equipo
 from .equipo_miembro import EquipoMiembro
 from .equipo_torneo import EquipoTorneo
 from .pago import Pago
+from .plantilla_horario import PlantillaHorario
+from .excepcion_horario import ExcepcionHorario
+from .hold_turno import HoldTurno
+from .cambio import Cambio
 
 __all__ = [
     'Rol',
@@ -24,5 +28,9 @@ __all__ = [
     'Equipo',
     'EquipoMiembro',
     'EquipoTorneo',
-    'Pago'
+    'Pago',
+    'PlantillaHorario',
+    'ExcepcionHorario',
+    'HoldTurno',
+    'Cambio'
 ]
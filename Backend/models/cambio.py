@@ -0,0 +1,37 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Cambio:
+    """Entrada del changelog: una fila insertada, modificada o borrada (ver database.changelog)"""
+    seq: int = 0
+    entidad: str = ""
+    clave: Dict[str, Any] = field(default_factory=dict)
+    op: str = ""  # I | U | D | A (archivada)
+    columnas: List[str] = field(default_factory=list)
+    creado_en: Optional[str] = None
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'seq': self.seq,
+            'entidad': self.entidad,
+            'clave': self.clave,
+            'op': self.op,
+            'columnas': self.columnas,
+            'creado_en': self.creado_en
+        }
+    
+    @classmethod
+    def from_db_row(cls, row):
+        """Crea un objeto Cambio desde una fila de la base de datos"""
+        return cls(
+            seq=row['seq'],
+            entidad=row['entidad'],
+            clave=json.loads(row['clave']),
+            op=row['op'],
+            columnas=row['columnas'].split(',') if row['columnas'] else [],
+            creado_en=row['creado_en']
+        )
@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class ExcepcionHorario:
+    """Modelo de entidad para ExcepcionHorario (feriados / días sin turnos)"""
+    id: Optional[int] = None
+    id_cancha: Optional[int] = None  # None = aplica a todas las canchas
+    fecha: str = ""
+    motivo: Optional[str] = None
+    
+    def __post_init__(self):
+        """Validación básica"""
+        if self.id is not None and not self.fecha:
+            raise ValueError("La fecha de la excepción es obligatoria")
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'id': self.id,
+            'id_cancha': self.id_cancha,
+            'fecha': self.fecha,
+            'motivo': self.motivo
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Crea un objeto ExcepcionHorario desde un diccionario"""
+        return cls(
+            id=data.get('id'),
+            id_cancha=data.get('id_cancha'),
+            fecha=data.get('fecha', ''),
+            motivo=data.get('motivo')
+        )
+    
+    @classmethod
+    def from_db_row(cls, row):
+        """Crea un objeto ExcepcionHorario desde una fila de la base de datos"""
+        return cls(
+            id=row['id'],
+            id_cancha=row['id_cancha'],
+            fecha=row['fecha'],
+            motivo=row['motivo']
+        )
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class HoldTurno:
+    """Modelo de entidad para HoldTurno (retención temporal de un turno mientras se paga)"""
+    id: Optional[int] = None
+    id_turno: int = 0
+    id_cliente: int = 0
+    token: str = ""
+    estado: str = "activo"  # activo | confirmado | cancelado | expirado
+    creado_en: Optional[str] = None
+    expira_en: str = ""
+    
+    def __post_init__(self):
+        """Validación básica"""
+        if not self.id_turno:
+            raise ValueError("El id de turno es obligatorio")
+        if not self.id_cliente:
+            raise ValueError("El id de cliente es obligatorio")
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'id': self.id,
+            'id_turno': self.id_turno,
+            'id_cliente': self.id_cliente,
+            'token': self.token,
+            'estado': self.estado,
+            'creado_en': self.creado_en,
+            'expira_en': self.expira_en
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Crea un objeto HoldTurno desde un diccionario"""
+        return cls(
+            id=data.get('id'),
+            id_turno=data.get('id_turno', 0),
+            id_cliente=data.get('id_cliente', 0),
+            token=data.get('token', ''),
+            estado=data.get('estado', 'activo'),
+            creado_en=data.get('creado_en'),
+            expira_en=data.get('expira_en', '')
+        )
+    
+    @classmethod
+    def from_db_row(cls, row):
+        """Crea un objeto HoldTurno desde una fila de la base de datos"""
+        return cls(
+            id=row['id'],
+            id_turno=row['id_turno'],
+            id_cliente=row['id_cliente'],
+            token=row['token'],
+            estado=row['estado'],
+            creado_en=row['creado_en'],
+            expira_en=row['expira_en']
+        )
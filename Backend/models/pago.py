@@ -18,6 +18,8 @@ class Pago:
     fecha_creacion: Optional[str] = None
     fecha_expiracion: Optional[str] = None
     fecha_completado: Optional[str] = None
+    id_serie: Optional[str] = None  # Agrupa los pagos de una reserva de serie (un pago por turno)
+    version: int = 1  # Control de concurrencia optimista
     
     def __post_init__(self):
         """Validación básica"""
@@ -43,7 +45,9 @@ class Pago:
             'id_gateway_externo': self.id_gateway_externo,
             'fecha_creacion': self.fecha_creacion,
             'fecha_expiracion': self.fecha_expiracion,
-            'fecha_completado': self.fecha_completado
+            'fecha_completado': self.fecha_completado,
+            'id_serie': self.id_serie,
+            'version': self.version
         }
     
     @classmethod
@@ -62,7 +66,9 @@ class Pago:
             id_gateway_externo=data.get('id_gateway_externo'),
             fecha_creacion=data.get('fecha_creacion'),
             fecha_expiracion=data.get('fecha_expiracion'),
-            fecha_completado=data.get('fecha_completado')
+            fecha_completado=data.get('fecha_completado'),
+            id_serie=data.get('id_serie'),
+            version=data.get('version', 1)
         )
     
     @classmethod
@@ -81,5 +87,7 @@ class Pago:
             id_gateway_externo=row['id_gateway_externo'],
             fecha_creacion=row['fecha_creacion'],
             fecha_expiracion=row['fecha_expiracion'],
-            fecha_completado=row['fecha_completado']
+            fecha_completado=row['fecha_completado'],
+            id_serie=row['id_serie'] if 'id_serie' in row.keys() else None,
+            version=row['version'] if 'version' in row.keys() else 1
         )
@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class PlantillaHorario:
+    """Modelo de entidad para PlantillaHorario (horario semanal de una cancha)"""
+    id: Optional[int] = None
+    id_cancha: int = 0
+    dia_semana: int = 0  # 0=lunes ... 6=domingo
+    hora_apertura: str = "08:00"
+    hora_cierre: str = "23:00"
+    duracion_minutos: int = 60
+    precio_turno: Optional[float] = None
+    activa: int = 1
+    generado_hasta: Optional[str] = None  # Última fecha (YYYY-MM-DD) ya materializada
+    
+    def __post_init__(self):
+        """Validación básica"""
+        if self.dia_semana not in range(7):
+            raise ValueError("El día de la semana debe estar entre 0 (lunes) y 6 (domingo)")
+        if self.duracion_minutos <= 0:
+            raise ValueError("La duración del turno debe ser mayor a 0")
+        if self.precio_turno is not None and self.precio_turno < 0:
+            raise ValueError("El precio del turno no puede ser negativo")
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'id': self.id,
+            'id_cancha': self.id_cancha,
+            'dia_semana': self.dia_semana,
+            'hora_apertura': self.hora_apertura,
+            'hora_cierre': self.hora_cierre,
+            'duracion_minutos': self.duracion_minutos,
+            'precio_turno': self.precio_turno,
+            'activa': self.activa,
+            'generado_hasta': self.generado_hasta
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Crea un objeto PlantillaHorario desde un diccionario"""
+        return cls(
+            id=data.get('id'),
+            id_cancha=data.get('id_cancha', 0),
+            dia_semana=data.get('dia_semana', 0),
+            hora_apertura=data.get('hora_apertura', '08:00'),
+            hora_cierre=data.get('hora_cierre', '23:00'),
+            duracion_minutos=data.get('duracion_minutos', 60),
+            precio_turno=data.get('precio_turno'),
+            activa=data.get('activa', 1),
+            generado_hasta=data.get('generado_hasta')
+        )
+    
+    @classmethod
+    def from_db_row(cls, row):
+        """Crea un objeto PlantillaHorario desde una fila de la base de datos"""
+        return cls(
+            id=row['id'],
+            id_cancha=row['id_cancha'],
+            dia_semana=row['dia_semana'],
+            hora_apertura=row['hora_apertura'],
+            hora_cierre=row['hora_cierre'],
+            duracion_minutos=row['duracion_minutos'],
+            precio_turno=row['precio_turno'],
+            activa=row['activa'],
+            generado_hasta=row['generado_hasta']
+        )
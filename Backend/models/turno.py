@@ -16,6 +16,7 @@ class Turno:
     reserva_created_at: Optional[str] = None
     id_usuario_bloqueo: Optional[int] = None
     motivo_bloqueo: Optional[str] = None
+    version: int = 1  # Control de concurrencia optimista
     
     def __post_init__(self):
         """Validación básica"""
@@ -40,7 +41,8 @@ class Turno:
             'id_usuario_registro': self.id_usuario_registro,
             'reserva_created_at': self.reserva_created_at,
             'id_usuario_bloqueo': self.id_usuario_bloqueo,
-            'motivo_bloqueo': self.motivo_bloqueo
+            'motivo_bloqueo': self.motivo_bloqueo,
+            'version': self.version
         }
     
     @classmethod
@@ -57,7 +59,8 @@ class Turno:
             id_usuario_registro=data.get('id_usuario_registro'),
             reserva_created_at=data.get('reserva_created_at'),
             id_usuario_bloqueo=data.get('id_usuario_bloqueo'),
-            motivo_bloqueo=data.get('motivo_bloqueo')
+            motivo_bloqueo=data.get('motivo_bloqueo'),
+            version=data.get('version', 1)
         )
     
     @classmethod
@@ -74,5 +77,6 @@ class Turno:
             id_usuario_registro=row['id_usuario_registro'],
             reserva_created_at=row['reserva_created_at'],
             id_usuario_bloqueo=row['id_usuario_bloqueo'],
-            motivo_bloqueo=row['motivo_bloqueo']
+            motivo_bloqueo=row['motivo_bloqueo'],
+            version=row['version'] if 'version' in row.keys() else 1
         )
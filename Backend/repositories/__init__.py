@@ -17,6 +17,11 @@ from .pago_repository import PagoRepository
 from .rol_repository import RolRepository
 from .turno_repository import TurnoRepository
 from .turno_servicio_repository import TurnoXServicioRepository
+from .plantilla_horario_repository import PlantillaHorarioRepository
+from .excepcion_horario_repository import ExcepcionHorarioRepository
+from .revision_repository import RevisionRepository
+from .reserva_repository import ReservaRepository
+from .hold_turno_repository import HoldTurnoRepository
 
 __all__ = [
 	'ClienteRepository',
@@ -31,4 +36,9 @@ __all__ = [
     'RolRepository',
     'TurnoRepository',
     'TurnoXServicioRepository',
+    'PlantillaHorarioRepository',
+    'ExcepcionHorarioRepository',
+    'RevisionRepository',
+    'ReservaRepository',
+    'HoldTurnoRepository',
 ]
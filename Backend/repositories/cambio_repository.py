@@ -0,0 +1,111 @@
+"""
+Repository (DAO) para el changelog (tabla ChangeLog).
+La tabla la llenan triggers de la BD (ver database.changelog); acá solo se
+lee y se compacta.
+"""
+
+from typing import Any, Dict, List, Optional
+from models.cambio import Cambio
+from database.connection import get_connection
+from database.lectura import get_read_connection
+
+
+class CambioRepository:
+    """Repositorio para leer y compactar el changelog"""
+
+    @staticmethod
+    def listar_desde(desde_seq: int, limite: int) -> List[Cambio]:
+        """Entradas con seq mayor a `desde_seq`, en orden, hasta `limite`."""
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT * FROM "ChangeLog" WHERE "seq" > ? ORDER BY "seq" LIMIT ?',
+                (desde_seq, limite)
+            )
+            return [Cambio.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_limites() -> Dict[str, Optional[int]]:
+        """
+        Último seq emitido y seq hasta el que se purgó el log.
+
+        Returns:
+            {'ultimo_seq': ..., 'purgado_hasta': ...}: un consumidor con un
+            cursor menor a purgado_hasta perdió entradas y debe resincronizar
+        """
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'")
+            row = cursor.fetchone()
+            cursor.execute('SELECT "valor" FROM "ChangeLogEstado" WHERE "clave" = \'purgado_hasta\'')
+            purgado = cursor.fetchone()
+            return {
+                'ultimo_seq': row['seq'] if row else 0,
+                'purgado_hasta': purgado['valor'] if purgado else 0
+            }
+        finally:
+            conn.close()
+
+    @staticmethod
+    def compactar(creado_antes_de: str) -> int:
+        """
+        Borra las entradas anteriores a una fecha que tienen una entrada
+        posterior de la misma fila: de cada fila queda al menos la última.
+
+        Returns:
+            Cantidad de entradas borradas
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                DELETE FROM "ChangeLog"
+                WHERE "creado_en" < ?
+                  AND EXISTS (
+                      SELECT 1 FROM "ChangeLog" posterior
+                      WHERE posterior."entidad" = "ChangeLog"."entidad"
+                        AND posterior."clave" = "ChangeLog"."clave"
+                        AND posterior."seq" > "ChangeLog"."seq"
+                  )
+                """,
+                (creado_antes_de,)
+            )
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    @staticmethod
+    def purgar(creado_antes_de: str) -> Dict[str, Any]:
+        """
+        Borra todas las entradas anteriores a una fecha (incluidos los borrados)
+        y registra hasta qué seq se purgó.
+
+        Returns:
+            Diccionario con las entradas borradas y el nuevo purgado_hasta
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX("seq") AS seq FROM "ChangeLog" WHERE "creado_en" < ?', (creado_antes_de,))
+            hasta = cursor.fetchone()['seq']
+            if hasta is None:
+                return {'borradas': 0, 'purgado_hasta': None}
+            cursor.execute('DELETE FROM "ChangeLog" WHERE "seq" <= ?', (hasta,))
+            borradas = cursor.rowcount
+            cursor.execute(
+                """
+                INSERT INTO "ChangeLogEstado" ("clave", "valor") VALUES ('purgado_hasta', ?)
+                ON CONFLICT ("clave") DO UPDATE SET "valor" = MAX("valor", excluded."valor")
+                """,
+                (hasta,)
+            )
+            conn.commit()
+            return {'borradas': borradas, 'purgado_hasta': hasta}
+        finally:
+            conn.close()
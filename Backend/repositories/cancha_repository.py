@@ -6,6 +6,7 @@ Maneja todas las operaciones de base de datos relacionadas con canchas.
 from typing import List, Optional
 from models.cancha import Cancha
 from database.connection import get_connection
+from database.lectura import get_read_connection
 
 class CanchaRepository:
     """Repositorio para operaciones CRUD de Cancha"""
@@ -102,7 +103,7 @@ class CanchaRepository:
         Returns:
             Objeto Cancha o None si no existe
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Cancha WHERE id = ?", (cancha_id,))
@@ -127,7 +128,7 @@ class CanchaRepository:
         Returns:
             Objeto Cancha o None si no existe
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Cancha WHERE nombre = ?", (nombre,))
@@ -148,7 +149,7 @@ class CanchaRepository:
         Returns:
             Lista de objetos Cancha
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Cancha")
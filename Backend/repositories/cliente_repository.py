@@ -6,6 +6,7 @@ Maneja todas las operaciones de base de datos relacionadas con clientes.
 from typing import List, Optional
 from models.cliente import Cliente
 from database.connection import get_connection
+from database.lectura import get_read_connection
 
 
 class ClienteRepository:
@@ -53,7 +54,7 @@ class ClienteRepository:
         Returns:
             Objeto Cliente o None si no existe
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Cliente WHERE id = ?", (cliente_id,))
@@ -110,7 +111,7 @@ class ClienteRepository:
         Returns:
             Lista de objetos Cliente
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Cliente ORDER BY nombre, apellido")
@@ -138,7 +139,7 @@ class ClienteRepository:
         Returns:
             Lista de objetos Cliente que coinciden
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("""
@@ -250,7 +251,7 @@ class ClienteRepository:
         Returns:
             Número total de clientes
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM Cliente")
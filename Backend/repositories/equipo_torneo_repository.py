@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Set
 from database.connection import get_connection
 from models.equipo_torneo import EquipoTorneo
 
@@ -91,6 +91,24 @@ class EquipoTorneoRepository:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    def equipos_inscritos(id_torneo: int, ids_equipos: List[int]) -> Set[int]:
+        """Obtiene, de los equipos indicados, los que ya están inscritos en el torneo (una consulta)"""
+        if not ids_equipos:
+            return set()
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            marcadores = ", ".join("?" for _ in ids_equipos)
+            cursor.execute(f"""
+                SELECT id_equipo FROM EquipoXTorneo
+                WHERE id_torneo = ? AND id_equipo IN ({marcadores})
+            """, (id_torneo, *ids_equipos))
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
     @staticmethod
     def eliminar_inscripcion(id_equipo: int, id_torneo: int) -> bool:
         """Elimina la inscripción de un equipo a un torneo"""
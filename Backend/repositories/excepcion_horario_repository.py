@@ -0,0 +1,84 @@
+"""
+Repository (DAO) para la entidad ExcepcionHorario (feriados y días sin turnos).
+"""
+
+from typing import List, Optional
+from models.excepcion_horario import ExcepcionHorario
+from database.connection import get_connection
+
+
+class ExcepcionHorarioRepository:
+    """Repositorio para operaciones CRUD de ExcepcionHorario"""
+
+    @staticmethod
+    def crear(excepcion: ExcepcionHorario) -> int:
+        """
+        Crea una nueva excepción de horario.
+        
+        Args:
+            excepcion: Objeto ExcepcionHorario a crear
+            
+        Returns:
+            ID de la excepción creada
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO ExcepcionHorario (id_cancha, fecha, motivo) VALUES (?, ?, ?)",
+                (excepcion.id_cancha, excepcion.fecha, excepcion.motivo)
+            )
+            conn.commit()
+            return cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error al crear excepción de horario: {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_por_id(excepcion_id: int) -> Optional[ExcepcionHorario]:
+        """Obtiene una excepción por su ID."""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM ExcepcionHorario WHERE id = ?", (excepcion_id,))
+            row = cursor.fetchone()
+            return ExcepcionHorario.from_db_row(row) if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def listar_en_rango(fecha_desde: str, fecha_hasta: str) -> List[ExcepcionHorario]:
+        """
+        Lista las excepciones con fecha en [fecha_desde, fecha_hasta].
+        
+        Args:
+            fecha_desde: Fecha inicial (YYYY-MM-DD)
+            fecha_hasta: Fecha final (YYYY-MM-DD)
+            
+        Returns:
+            Lista de objetos ExcepcionHorario ordenados por fecha
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM ExcepcionHorario WHERE fecha BETWEEN ? AND ? ORDER BY fecha",
+                (fecha_desde, fecha_hasta)
+            )
+            return [ExcepcionHorario.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def eliminar(excepcion_id: int) -> bool:
+        """Elimina una excepción de horario."""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM ExcepcionHorario WHERE id = ?", (excepcion_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
@@ -0,0 +1,165 @@
+"""
+Repository (DAO) para la entidad HoldTurno.
+Cada operación cambia el hold y el estado del turno en la misma transacción.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Sequence
+from models.hold_turno import HoldTurno
+from models.pago import Pago
+from models.turno_servicio import TurnoServicio
+from database.connection import get_connection
+from database.cola_escritura import DeshacerOperacion
+from database.errores import BaseDatosOcupadaError
+from repositories.turno_indice import indice_turnos
+from repositories.pago_repository import INSERTAR_PAGO_SQL, PagoRepository
+
+
+class HoldTurnoRepository:
+    """Repositorio para retenciones temporales de turnos"""
+
+    @staticmethod
+    def crear(hold: HoldTurno) -> Optional[int]:
+        """
+        Retiene un turno disponible: lo pasa a 'pendiente_pago' y registra el hold.
+
+        Args:
+            hold: Objeto HoldTurno a crear (con token y expira_en)
+
+        Returns:
+            ID del hold creado, o None si el turno ya no estaba disponible
+        """
+        def operacion(cursor) -> Optional[int]:
+            cursor.execute(
+                "UPDATE Turno SET estado = 'pendiente_pago', version = version + 1 WHERE id = ? AND estado = 'disponible'",
+                (hold.id_turno,)
+            )
+            if cursor.rowcount == 0:
+                return None
+            cursor.execute(
+                """
+                INSERT INTO HoldTurno (id_turno, id_cliente, token, estado, creado_en, expira_en)
+                VALUES (?, ?, ?, 'activo', ?, ?)
+                """,
+                (hold.id_turno, hold.id_cliente, hold.token, hold.creado_en, hold.expira_en)
+            )
+            return cursor.lastrowid
+
+        def aplicar(hold_id: Optional[int]) -> None:
+            if hold_id is not None:
+                indice_turnos.cambiar_estado(hold.id_turno, 'pendiente_pago')
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al crear hold: {e}")
+
+    @staticmethod
+    def obtener_por_token(token: str) -> Optional[HoldTurno]:
+        """Obtiene un hold por su token."""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM HoldTurno WHERE token = ?", (token,))
+            row = cursor.fetchone()
+            return HoldTurno.from_db_row(row) if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def listar_activos() -> List[HoldTurno]:
+        """Lista los holds activos (para reconstruir los vencimientos al iniciar)."""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM HoldTurno WHERE estado = 'activo' ORDER BY expira_en")
+            return [HoldTurno.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def liberar(hold_id: int, estado: str) -> Optional[int]:
+        """
+        Cierra un hold activo ('cancelado' o 'expirado') y devuelve su turno a 'disponible'.
+
+        Returns:
+            ID del turno liberado, o None si el hold ya no estaba activo
+        """
+        def operacion(cursor) -> Optional[int]:
+            cursor.execute("SELECT id_turno FROM HoldTurno WHERE id = ? AND estado = 'activo'", (hold_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            id_turno = row['id_turno']
+            cursor.execute("UPDATE HoldTurno SET estado = ? WHERE id = ?", (estado, hold_id))
+            cursor.execute(
+                "UPDATE Turno SET estado = 'disponible', version = version + 1 WHERE id = ? AND estado = 'pendiente_pago'",
+                (id_turno,)
+            )
+            return id_turno
+
+        def aplicar(id_turno: Optional[int]) -> None:
+            if id_turno is not None:
+                indice_turnos.cambiar_estado(id_turno, 'disponible')
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al liberar hold: {e}")
+
+    @staticmethod
+    def confirmar(hold: HoldTurno, pago: Pago, servicios: Sequence[TurnoServicio] = ()) -> bool:
+        """
+        Confirma un hold vigente: reserva el turno para el cliente y registra el
+        pago (queda con su id) y los servicios adicionales.
+
+        Returns:
+            True si el hold seguía activo y sin vencer
+        """
+        ahora = datetime.now()
+
+        def operacion(cursor) -> bool:
+            cursor.execute(
+                "UPDATE HoldTurno SET estado = 'confirmado' WHERE id = ? AND estado = 'activo' AND expira_en > ?",
+                (hold.id, ahora.isoformat())
+            )
+            if cursor.rowcount == 0:
+                return False
+            cursor.execute(
+                """
+                UPDATE Turno SET
+                    estado = 'reservado', id_cliente = ?, reserva_created_at = ?,
+                    id_usuario_bloqueo = NULL, motivo_bloqueo = NULL, version = version + 1
+                WHERE id = ? AND estado = 'pendiente_pago'
+                """,
+                (hold.id_cliente, ahora.strftime('%Y-%m-%d %H:%M:%S'), hold.id_turno)
+            )
+            if cursor.rowcount == 0:
+                raise DeshacerOperacion(False)  # No dejar el hold confirmado sin turno
+            cursor.execute(INSERTAR_PAGO_SQL, PagoRepository.parametros_insert(pago))
+            pago.id = cursor.lastrowid
+            if servicios:
+                cursor.executemany(
+                    """
+                    INSERT INTO TurnoXServicio (
+                        id_turno, id_servicio, cantidad, precio_unitario_congelado
+                    ) VALUES (?, ?, ?, ?)
+                    """,
+                    [(s.id_turno, s.id_servicio, s.cantidad, s.precio_unitario_congelado) for s in servicios]
+                )
+            return True
+
+        def aplicar(confirmado: bool) -> None:
+            if confirmado:
+                indice_turnos.cambiar_estado(hold.id_turno, 'reservado')
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al confirmar hold: {e}")
@@ -1,64 +1,91 @@
 """
 Repository (DAO) para la entidad Pago.
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from models.pago import Pago
 from database.connection import get_connection
+from database.lectura import get_read_connection
+from database import archivo
+from database.errores import BaseDatosOcupadaError, ConflictoVersionError
+from database.cola_escritura import ejecutar_escritura
+
+# INSERT de Pago compartido con las reservas transaccionales (ver parametros_insert)
+INSERTAR_PAGO_SQL = """
+    INSERT INTO Pago (
+        id_turno, monto_turno, monto_servicios, monto_total,
+        id_cliente, id_usuario_registro, estado, metodo_pago, id_gateway_externo,
+        fecha_creacion, fecha_expiracion, fecha_completado, id_serie
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 
 class PagoRepository:
+    @staticmethod
+    def parametros_insert(pago: Pago) -> tuple:
+        """Parámetros de INSERTAR_PAGO_SQL para un pago."""
+        return (
+            pago.id_turno, pago.monto_turno, pago.monto_servicios,
+            pago.monto_total, pago.id_cliente, pago.id_usuario_registro, pago.estado,
+            pago.metodo_pago, pago.id_gateway_externo, pago.fecha_creacion,
+            pago.fecha_expiracion, pago.fecha_completado, pago.id_serie
+        )
+
     @staticmethod
     def crear(pago: Pago) -> int:
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO Pago (
-                    id_turno, monto_turno, monto_servicios, monto_total,
-                    id_cliente, id_usuario_registro, estado, metodo_pago, id_gateway_externo,
-                    fecha_creacion, fecha_expiracion, fecha_completado
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    pago.id_turno, pago.monto_turno, pago.monto_servicios,
-                    pago.monto_total, pago.id_cliente, pago.id_usuario_registro, pago.estado,
-                    pago.metodo_pago, pago.id_gateway_externo, pago.fecha_creacion,
-                    pago.fecha_expiracion, pago.fecha_completado
-                )
-            )
-            conn.commit()
+        def operacion(cursor) -> int:
+            cursor.execute(INSERTAR_PAGO_SQL, PagoRepository.parametros_insert(pago))
             return cursor.lastrowid
+
+        try:
+            return ejecutar_escritura(operacion)
+        except BaseDatosOcupadaError:
+            raise
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al crear pago: {e}")
-        finally:
-            conn.close()
 
     @staticmethod
-    def obtener_por_id(pago_id: int) -> Optional[Pago]:
-        conn = get_connection()
+    def obtener_por_id(pago_id: int, historico: bool = False) -> Optional[Pago]:
+        """Obtiene un pago por su ID. Con historico=True también busca en el archivo."""
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Pago WHERE id = ?", (pago_id,))
+            tabla = archivo.tabla(conn, 'Pago') if historico else 'Pago'
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id = ?", (pago_id,))
             row = cursor.fetchone()
             return Pago.from_db_row(row) if row else None
         finally:
             conn.close()
 
     @staticmethod
-    def obtener_por_turno(id_turno: int) -> Optional[Pago]:
-        """Obtiene el pago asociado a un turno específico"""
-        conn = get_connection()
+    def obtener_por_turno(id_turno: int, historico: bool = False) -> Optional[Pago]:
+        """Obtiene el pago asociado a un turno específico (con historico=True también archivado)"""
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Pago WHERE id_turno = ? ORDER BY id DESC LIMIT 1", (id_turno,))
+            tabla = archivo.tabla(conn, 'Pago') if historico else 'Pago'
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id_turno = ? ORDER BY id DESC LIMIT 1", (id_turno,))
             row = cursor.fetchone()
             return Pago.from_db_row(row) if row else None
         finally:
             conn.close()
 
+    @staticmethod
+    def obtener_por_turnos(id_turnos: List[int], historico: bool = False) -> Dict[int, Pago]:
+        """Último pago de cada turno, en una sola consulta (id_turno -> Pago; sin pago no aparece)"""
+        if not id_turnos:
+            return {}
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            tabla = archivo.tabla(conn, 'Pago') if historico else 'Pago'
+            marcadores = ", ".join("?" for _ in id_turnos)
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id_turno IN ({marcadores}) ORDER BY id", tuple(id_turnos))
+            # Ordenados por id: el último pago de cada turno pisa a los anteriores
+            return {row["id_turno"]: Pago.from_db_row(row) for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
     # MÉTODO DESHABILITADO: La tabla Inscripcion ya no existe
     # @staticmethod
     # def obtener_por_inscripcion(id_inscripcion: int) -> Optional[Pago]:
@@ -73,23 +100,26 @@ class PagoRepository:
     #         conn.close()
 
     @staticmethod
-    def listar_por_cliente(id_cliente: int) -> List[Pago]:
-        """Lista todos los pagos de un cliente"""
-        conn = get_connection()
+    def listar_por_cliente(id_cliente: int, historico: bool = False) -> List[Pago]:
+        """Lista todos los pagos de un cliente (con historico=True incluye los archivados)"""
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Pago WHERE id_cliente = ? ORDER BY fecha_creacion DESC", (id_cliente,))
+            tabla = archivo.tabla(conn, 'Pago') if historico else 'Pago'
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id_cliente = ? ORDER BY fecha_creacion DESC", (id_cliente,))
             return [Pago.from_db_row(r) for r in cursor.fetchall()]
         finally:
             conn.close()
 
     @staticmethod
-    def listar_todos() -> List[Pago]:
-        """Lista todos los pagos del sistema (para administradores)"""
-        conn = get_connection()
+    def listar_todos(historico: bool = False) -> List[Pago]:
+        """Lista todos los pagos del sistema (para administradores).
+        Con historico=True incluye los pagos archivados (reportes)."""
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Pago ORDER BY fecha_creacion DESC")
+            tabla = archivo.tabla(conn, 'Pago') if historico else 'Pago'
+            cursor.execute(f"SELECT * FROM {tabla} ORDER BY fecha_creacion DESC")
             return [Pago.from_db_row(r) for r in cursor.fetchall()]
         finally:
             conn.close()
@@ -115,63 +145,71 @@ class PagoRepository:
 
     @staticmethod
     def actualizar(pago: Pago) -> bool:
+        """
+        Actualiza un pago condicionado a la versión leída (pago.version).
+        Lanza ConflictoVersionError si otra operación lo modificó en el medio.
+        """
         if not pago.id:
             raise ValueError("El pago debe tener ID para actualizar")
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
+
+        def operacion(cursor) -> bool:
             cursor.execute(
                 """
                 UPDATE Pago
                 SET id_turno = ?, monto_turno = ?, monto_servicios = ?,
                     monto_total = ?, id_cliente = ?, id_usuario_registro = ?, estado = ?,
                     metodo_pago = ?, id_gateway_externo = ?, fecha_creacion = ?,
-                    fecha_expiracion = ?, fecha_completado = ?
-                WHERE id = ?
+                    fecha_expiracion = ?, fecha_completado = ?, version = version + 1
+                WHERE id = ? AND version = ?
                 """,
                 (
                     pago.id_turno, pago.monto_turno, pago.monto_servicios,
                     pago.monto_total, pago.id_cliente, pago.id_usuario_registro, pago.estado,
                     pago.metodo_pago, pago.id_gateway_externo, pago.fecha_creacion,
-                    pago.fecha_expiracion, pago.fecha_completado, pago.id
+                    pago.fecha_expiracion, pago.fecha_completado, pago.id, pago.version
                 )
             )
-            conn.commit()
-            return cursor.rowcount > 0
+            if cursor.rowcount == 0:
+                cursor.execute("SELECT 1 FROM Pago WHERE id = ?", (pago.id,))
+                if cursor.fetchone():
+                    raise ConflictoVersionError("pago", pago.id, pago.version)
+                return False
+            return True
+
+        try:
+            actualizado = ejecutar_escritura(operacion)
+        except (ConflictoVersionError, BaseDatosOcupadaError):
+            raise
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al actualizar pago: {e}")
-        finally:
-            conn.close()
+        if actualizado:
+            pago.version += 1
+        return actualizado
 
     @staticmethod
     def cambiar_estado(pago_id: int, nuevo_estado: str, fecha_completado: Optional[str] = None) -> bool:
         """Cambia el estado de un pago, opcionalmente actualizando fecha_completado"""
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
+        def operacion(cursor) -> bool:
             if fecha_completado:
                 cursor.execute(
-                    "UPDATE Pago SET estado = ?, fecha_completado = ? WHERE id = ?",
+                    "UPDATE Pago SET estado = ?, fecha_completado = ?, version = version + 1 WHERE id = ?",
                     (nuevo_estado, fecha_completado, pago_id)
                 )
             else:
-                cursor.execute("UPDATE Pago SET estado = ? WHERE id = ?", (nuevo_estado, pago_id))
-            conn.commit()
+                cursor.execute("UPDATE Pago SET estado = ?, version = version + 1 WHERE id = ?", (nuevo_estado, pago_id))
             return cursor.rowcount > 0
-        finally:
-            conn.close()
+
+        return ejecutar_escritura(operacion)
 
     @staticmethod
     def eliminar(pago_id: int) -> bool:
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
+        def operacion(cursor) -> bool:
             cursor.execute("DELETE FROM Pago WHERE id = ?", (pago_id,))
-            conn.commit()
             return cursor.rowcount > 0
+
+        try:
+            return ejecutar_escritura(operacion)
+        except BaseDatosOcupadaError:
+            raise
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al eliminar pago: {e}")
-        finally:
-            conn.close()
@@ -0,0 +1,186 @@
+"""
+Repository (DAO) para la entidad PlantillaHorario.
+Maneja las plantillas semanales usadas para generar turnos automáticamente.
+"""
+
+from typing import List, Optional, Tuple
+from models.plantilla_horario import PlantillaHorario
+from database.connection import get_connection
+
+
+class PlantillaHorarioRepository:
+    """Repositorio para operaciones CRUD de PlantillaHorario"""
+
+    @staticmethod
+    def crear(plantilla: PlantillaHorario) -> int:
+        """
+        Crea una nueva plantilla horaria.
+        
+        Args:
+            plantilla: Objeto PlantillaHorario a crear
+            
+        Returns:
+            ID de la plantilla creada
+            
+        Raises:
+            Exception: Si hay error al insertar
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO PlantillaHorario (
+                    id_cancha, dia_semana, hora_apertura, hora_cierre,
+                    duracion_minutos, precio_turno, activa, generado_hasta
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                plantilla.id_cancha, plantilla.dia_semana, plantilla.hora_apertura,
+                plantilla.hora_cierre, plantilla.duracion_minutos, plantilla.precio_turno,
+                plantilla.activa, plantilla.generado_hasta
+            ))
+            conn.commit()
+            return cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error al crear plantilla horaria: {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_por_id(plantilla_id: int) -> Optional[PlantillaHorario]:
+        """
+        Obtiene una plantilla por su ID.
+        
+        Args:
+            plantilla_id: ID de la plantilla
+            
+        Returns:
+            Objeto PlantillaHorario o None si no existe
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM PlantillaHorario WHERE id = ?", (plantilla_id,))
+            row = cursor.fetchone()
+            return PlantillaHorario.from_db_row(row) if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def listar(id_cancha: Optional[int] = None, solo_activas: bool = False) -> List[PlantillaHorario]:
+        """
+        Lista plantillas, opcionalmente filtradas por cancha y/o solo activas.
+        
+        Args:
+            id_cancha: ID de la cancha (opcional)
+            solo_activas: Si es True, excluye plantillas inactivas
+            
+        Returns:
+            Lista de objetos PlantillaHorario
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            sql = "SELECT * FROM PlantillaHorario"
+            params = []
+            conditions = []
+
+            if id_cancha is not None:
+                conditions.append("id_cancha = ?")
+                params.append(id_cancha)
+            if solo_activas:
+                conditions.append("activa = 1")
+
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += " ORDER BY id_cancha, dia_semana, hora_apertura"
+
+            cursor.execute(sql, tuple(params))
+            return [PlantillaHorario.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def actualizar(plantilla: PlantillaHorario) -> bool:
+        """
+        Actualiza una plantilla existente.
+        
+        Args:
+            plantilla: Objeto PlantillaHorario con datos actualizados (debe tener id)
+            
+        Returns:
+            True si se actualizó, False si no existe
+        """
+        if not plantilla.id:
+            raise ValueError("La plantilla debe tener un ID para actualizar")
+
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE PlantillaHorario SET
+                    id_cancha = ?, dia_semana = ?, hora_apertura = ?, hora_cierre = ?,
+                    duracion_minutos = ?, precio_turno = ?, activa = ?, generado_hasta = ?
+                WHERE id = ?
+            """, (
+                plantilla.id_cancha, plantilla.dia_semana, plantilla.hora_apertura,
+                plantilla.hora_cierre, plantilla.duracion_minutos, plantilla.precio_turno,
+                plantilla.activa, plantilla.generado_hasta, plantilla.id
+            ))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error al actualizar plantilla horaria: {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def actualizar_generado_hasta(avances: List[Tuple[int, str]]) -> int:
+        """
+        Registra hasta qué fecha se materializó cada plantilla, en una sola transacción.
+        
+        Args:
+            avances: Lista de tuplas (id_plantilla, fecha 'YYYY-MM-DD')
+            
+        Returns:
+            Cantidad de plantillas actualizadas
+        """
+        if not avances:
+            return 0
+
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE PlantillaHorario SET generado_hasta = ? WHERE id = ?",
+                [(fecha, plantilla_id) for plantilla_id, fecha in avances]
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error al registrar avance de plantillas: {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def eliminar(plantilla_id: int) -> bool:
+        """
+        Elimina una plantilla. Los turnos ya generados no se modifican.
+        
+        Args:
+            plantilla_id: ID de la plantilla
+            
+        Returns:
+            True si se eliminó correctamente
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM PlantillaHorario WHERE id = ?", (plantilla_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
@@ -0,0 +1,151 @@
+"""
+Repository (DAO) para reservas de varios turnos a la vez.
+Reserva los turnos y registra sus pagos (y servicios) dentro de una única transacción.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+from models.pago import Pago
+from models.turno_servicio import TurnoServicio
+from database.cola_escritura import DeshacerOperacion
+from database.errores import BaseDatosOcupadaError
+from repositories.turno_indice import indice_turnos
+from repositories.pago_repository import INSERTAR_PAGO_SQL, PagoRepository
+
+
+class ReservaRepository:
+    """Repositorio para reservas en lote (turnos + pagos en una transacción)"""
+
+    @staticmethod
+    def reservar_lote(
+        turno_ids: List[int],
+        id_cliente: int,
+        armar_pagos: Callable[[List[int]], List[Pago]],
+        todo_o_nada: bool = True
+    ) -> Tuple[List[int], List[int], List[int]]:
+        """
+        Reserva varios turnos para un cliente y registra sus pagos atómicamente.
+
+        Cada turno se reserva con un UPDATE condicionado a estado = 'disponible',
+        por lo que un turno tomado por otra transacción no se pisa. La
+        transacción (database.cola_escritura) se abre con BEGIN IMMEDIATE, que
+        toma el lock de escritura antes de la primera sentencia.
+
+        Args:
+            turno_ids: IDs de los turnos a reservar
+            id_cliente: ID del cliente
+            armar_pagos: Recibe los IDs efectivamente reservados y devuelve los pagos a insertar
+            todo_o_nada: Si es True y algún turno no se pudo reservar, no se reserva ninguno
+
+        Returns:
+            Tupla (ids reservados, ids no disponibles, ids de pagos creados)
+        """
+        reserva_created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        def operacion(cursor) -> Tuple[List[int], List[int], List[int]]:
+            reservados, no_disponibles = [], []
+            for turno_id in turno_ids:
+                cursor.execute(
+                    """
+                    UPDATE Turno SET
+                        estado = 'reservado', id_cliente = ?, reserva_created_at = ?,
+                        id_usuario_bloqueo = NULL, motivo_bloqueo = NULL, version = version + 1
+                    WHERE id = ? AND estado = 'disponible'
+                    """,
+                    (id_cliente, reserva_created_at, turno_id)
+                )
+                (reservados if cursor.rowcount else no_disponibles).append(turno_id)
+
+            if not reservados or (todo_o_nada and no_disponibles):
+                raise DeshacerOperacion(([], no_disponibles, []))
+
+            ids_pagos = []
+            for pago in armar_pagos(reservados):
+                cursor.execute(INSERTAR_PAGO_SQL, PagoRepository.parametros_insert(pago))
+                ids_pagos.append(cursor.lastrowid)
+            return reservados, no_disponibles, ids_pagos
+
+        def aplicar(resultado: Tuple[List[int], List[int], List[int]]) -> None:
+            for turno_id in resultado[0]:
+                indice_turnos.cambiar_estado(turno_id, 'reservado')
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al reservar turnos en lote: {e}")
+
+    @staticmethod
+    def reservar_carrito(
+        turno_ids: List[int],
+        id_cliente: int,
+        pagos: List[Pago],
+        servicios: List[TurnoServicio]
+    ) -> List[Dict[str, Any]]:
+        """
+        Reserva un conjunto de turnos (todos o ninguno) con sus pagos y servicios.
+
+        Dentro de la transacción se leen los estados de los turnos: si alguno ya
+        no está disponible no se escribe nada. Si no, un único UPDATE toma el
+        conjunto, se insertan los pagos (asignando su id a cada Pago) y los
+        servicios, y se confirma una sola vez.
+
+        Args:
+            turno_ids: IDs de los turnos a reservar (sin repetidos)
+            id_cliente: ID del cliente
+            pagos: Pagos a registrar (uno por turno); al confirmar quedan con su id
+            servicios: Servicios adicionales de los turnos
+
+        Returns:
+            Lista vacía si se reservó todo; si no, los turnos que impidieron la
+            reserva como [{'id_turno', 'estado'}] (estado None si no existe)
+        """
+        reserva_created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        marcadores = ", ".join("?" for _ in turno_ids)
+
+        def operacion(cursor) -> List[Dict[str, Any]]:
+            # Dentro de la transacción (lock de escritura tomado) los estados no cambian hasta confirmar
+            cursor.execute(f"SELECT id, estado FROM Turno WHERE id IN ({marcadores})", tuple(turno_ids))
+            estados = {row['id']: row['estado'] for row in cursor.fetchall()}
+            conflictos = [
+                {'id_turno': turno_id, 'estado': estados.get(turno_id)}
+                for turno_id in turno_ids if estados.get(turno_id) != 'disponible'
+            ]
+            if conflictos:
+                return conflictos
+
+            cursor.execute(
+                f"""
+                UPDATE Turno SET
+                    estado = 'reservado', id_cliente = ?, reserva_created_at = ?,
+                    id_usuario_bloqueo = NULL, motivo_bloqueo = NULL, version = version + 1
+                WHERE id IN ({marcadores}) AND estado = 'disponible'
+                """,
+                (id_cliente, reserva_created_at, *turno_ids)
+            )
+            # Uno por uno (no executemany) para conocer el id de cada pago
+            for pago in pagos:
+                cursor.execute(INSERTAR_PAGO_SQL, PagoRepository.parametros_insert(pago))
+                pago.id = cursor.lastrowid
+            cursor.executemany(
+                """
+                INSERT INTO TurnoXServicio (
+                    id_turno, id_servicio, cantidad, precio_unitario_congelado
+                ) VALUES (?, ?, ?, ?)
+                """,
+                [(s.id_turno, s.id_servicio, s.cantidad, s.precio_unitario_congelado) for s in servicios]
+            )
+            return []
+
+        def aplicar(conflictos: List[Dict[str, Any]]) -> None:
+            if not conflictos:
+                for turno_id in turno_ids:
+                    indice_turnos.cambiar_estado(turno_id, 'reservado')
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al reservar el carrito: {e}")
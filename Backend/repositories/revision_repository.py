@@ -0,0 +1,41 @@
+"""
+Repository (DAO) para la tabla Revision.
+La tabla la mantienen triggers de la BD: cada INSERT/UPDATE/DELETE sobre una
+tabla vigilada incrementa su versión. Sirve para armar ETags baratos.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, Optional
+from database.connection import get_connection
+
+
+class RevisionRepository:
+    """Repositorio de solo lectura para las revisiones por tabla"""
+
+    @staticmethod
+    def obtener(tablas: Iterable[str]) -> Optional[Dict[str, int]]:
+        """
+        Obtiene la versión actual de cada tabla pedida.
+
+        Args:
+            tablas: Nombres de tabla (ej. ['Turno', 'Cancha'])
+
+        Returns:
+            Diccionario tabla -> versión (0 si nunca se modificó), o None si la
+            BD no tiene la tabla Revision (creada por scripts/init_database.py)
+        """
+        tablas = list(tablas)
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            marcadores = ", ".join("?" for _ in tablas)
+            cursor.execute(
+                f"SELECT tabla, version FROM Revision WHERE tabla IN ({marcadores})",
+                tablas
+            )
+            versiones = {row['tabla']: row['version'] for row in cursor.fetchall()}
+            return {tabla: versiones.get(tabla, 0) for tabla in tablas}
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            conn.close()
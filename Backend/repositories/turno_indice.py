@@ -0,0 +1,437 @@
+"""
+Índice en memoria de intervalos de turnos por cancha.
+
+Permite responder "¿se solapa [inicio, fin) con algún turno de la cancha?" y
+"¿cuáles son los turnos disponibles más cercanos a tal hora?" en O(log n) sin
+ir a la base de datos. Cada cancha se carga de forma perezosa la
+primera vez que se consulta (solo turnos que terminan después de
+`ahora - MARGEN_CARGA_HORAS`) y se mantiene consistente con las
+escrituras de TurnoRepository.
+
+Otros procesos (varios workers) también escriben. Por eso cada consulta lee
+antes la versión de Turno en la tabla Revision (la incrementan triggers en
+cada INSERT/UPDATE/DELETE, de cualquier conexión) con una conexión del pool
+de lectura:
+
+- Las escrituras de este proceso pasan por `IndiceTurnos.escribir()`, que
+  lee la versión dentro de la misma transacción antes y después de escribir.
+  Si antes coincidía con la del índice, la nueva versión se adopta sin
+  recargar nada: el repository ya actualizó el índice en memoria.
+- Si la versión cambió por otra conexión, las filas de Turno modificadas se
+  buscan en ChangeLog (database.changelog) y se descartan solo sus canchas.
+  Sin ChangeLog, con el log purgado o con más de MAX_CAMBIOS_AJENOS cambios,
+  se descarta todo el índice.
+
+Si la BD no tiene la tabla Revision, cada cancha se recarga pasado
+INDICE_TURNOS_TTL_SEGUNDOS.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from database.cola_escritura import ejecutar_escritura
+from database.connection import get_connection
+from database.lectura import pool_lectura
+
+T = TypeVar("T")
+
+# Segundos tras los cuales una cancha se vuelve a cargar desde la BD (respaldo sin tabla Revision)
+INDICE_TURNOS_TTL_SEGUNDOS = float(os.getenv("INDICE_TURNOS_TTL_SEGUNDOS", "30"))
+
+# Permite desactivar el índice (todas las consultas van a SQL)
+INDICE_TURNOS_HABILITADO = os.getenv("INDICE_TURNOS_HABILITADO", "1") == "1"
+
+# Margen hacia atrás que se carga: un turno no dura más que esto
+MARGEN_CARGA_HORAS = 24
+
+# Con más filas de Turno cambiadas por otras conexiones se descarta todo el índice
+MAX_CAMBIOS_AJENOS = 500
+
+# Versión de Turno en Revision y último seq de ChangeLog (NULL si no hay tabla ChangeLog)
+_SQL_VERSION = """
+    SELECT COALESCE((SELECT "version" FROM "Revision" WHERE "tabla" = 'Turno'), 0),
+           COALESCE((SELECT MAX("seq") FROM "ChangeLog"), 0)
+"""
+_SQL_VERSION_SIN_CHANGELOG = """
+    SELECT COALESCE((SELECT "version" FROM "Revision" WHERE "tabla" = 'Turno'), 0), NULL
+"""
+
+# (versión de Turno, seq de ChangeLog o None)
+Version = Tuple[int, Optional[int]]
+
+
+def leer_version(conn: sqlite3.Connection) -> Optional[Version]:
+    """Versión de Turno (y seq de ChangeLog) vista por la conexión; None si no hay tabla Revision."""
+    for sql in (_SQL_VERSION, _SQL_VERSION_SIN_CHANGELOG):
+        try:
+            fila = conn.execute(sql).fetchone()
+        except sqlite3.OperationalError:
+            continue
+        return fila[0], fila[1]
+    return None
+
+
+def parsear_fecha_turno(valor: str) -> datetime:
+    """Parsea una fecha ISO de turno ignorando el sufijo UTC ('Z' / '+00:00')."""
+    return datetime.fromisoformat(str(valor).replace('Z', '').replace('+00:00', ''))
+
+
+class _IntervalosCancha:
+    """Intervalos de una cancha ordenados por inicio, más el subconjunto disponible."""
+
+    def __init__(self, desde_carga: datetime):
+        self.desde_carga = desde_carga
+        self.cargado_en = time.monotonic()
+        self.entradas: List[Tuple[datetime, int, datetime]] = []  # (inicio, id, fin)
+        self.inicios: List[datetime] = []
+        self.max_duracion = timedelta(0)
+        self.disponibles: List[Tuple[datetime, int]] = []  # (inicio, id) de los turnos 'disponible'
+
+    def agregar(self, turno_id: int, inicio: datetime, fin: datetime, estado: Optional[str] = None) -> None:
+        entrada = (inicio, turno_id, fin)
+        idx = bisect_left(self.entradas, entrada)
+        self.entradas.insert(idx, entrada)
+        self.inicios.insert(idx, inicio)
+        if fin - inicio > self.max_duracion:
+            self.max_duracion = fin - inicio
+        if estado == 'disponible':
+            insort(self.disponibles, (inicio, turno_id))
+
+    def quitar(self, turno_id: int, inicio: datetime) -> None:
+        self.marcar_disponible(turno_id, inicio, False)
+        idx = bisect_left(self.inicios, inicio)
+        while idx < len(self.entradas) and self.entradas[idx][0] == inicio:
+            if self.entradas[idx][1] == turno_id:
+                del self.entradas[idx]
+                del self.inicios[idx]
+                return
+            idx += 1
+
+    def marcar_disponible(self, turno_id: int, inicio: datetime, disponible: bool) -> None:
+        idx = bisect_left(self.disponibles, (inicio, turno_id))
+        presente = idx < len(self.disponibles) and self.disponibles[idx] == (inicio, turno_id)
+        if disponible and not presente:
+            self.disponibles.insert(idx, (inicio, turno_id))
+        elif not disponible and presente:
+            del self.disponibles[idx]
+
+    def cercanos(self, referencia: datetime, minimo: datetime, k: int) -> List[Tuple[timedelta, datetime, int]]:
+        """Los k turnos disponibles (con inicio >= minimo) más cercanos a `referencia`."""
+        resultado = []
+        piso = bisect_left(self.disponibles, (minimo,))
+        derecha = max(bisect_left(self.disponibles, (referencia,)), piso)
+        izquierda = derecha - 1
+        # Avanzar desde el punto de inserción hacia ambos lados, tomando siempre el más cercano
+        while len(resultado) < k:
+            candidato_izq = self.disponibles[izquierda] if izquierda >= piso else None
+            candidato_der = self.disponibles[derecha] if derecha < len(self.disponibles) else None
+            if candidato_izq is None and candidato_der is None:
+                break
+            if candidato_der is None or (
+                candidato_izq is not None and referencia - candidato_izq[0] <= candidato_der[0] - referencia
+            ):
+                resultado.append((referencia - candidato_izq[0], candidato_izq[0], candidato_izq[1]))
+                izquierda -= 1
+            else:
+                resultado.append((candidato_der[0] - referencia, candidato_der[0], candidato_der[1]))
+                derecha += 1
+        return resultado
+
+    def solapados(self, inicio: datetime, fin: datetime) -> Iterable[Tuple[datetime, int, datetime]]:
+        """Itera los intervalos que se solapan con [inicio, fin)."""
+        # Solo pueden solaparse los que empiezan antes de `fin` y después de `inicio - max_duracion`
+        idx = bisect_left(self.inicios, fin) - 1
+        cota = inicio - self.max_duracion
+        while idx >= 0 and self.entradas[idx][0] > cota:
+            if self.entradas[idx][2] > inicio:
+                yield self.entradas[idx]
+            idx -= 1
+
+
+class IndiceTurnos:
+    """Índice de intervalos de turnos por cancha, seguro para múltiples hilos."""
+
+    def __init__(self, ttl_segundos: float = INDICE_TURNOS_TTL_SEGUNDOS):
+        self.ttl_segundos = ttl_segundos
+        self._canchas: Dict[int, _IntervalosCancha] = {}
+        self._ubicacion: Dict[int, Tuple[int, datetime]] = {}  # id_turno -> (id_cancha, inicio)
+        self._version: Optional[Version] = None  # Versión con la que el índice está al día
+        self._lock = threading.RLock()
+
+    # ----------------------------------------------------
+    # Consultas
+    # ----------------------------------------------------
+
+    def existe_solapado(self, id_cancha: int, fecha_hora_inicio: str, fecha_hora_fin: str,
+                        excluir_id: Optional[int] = None) -> bool:
+        """
+        Verifica si existe algún turno en la cancha cuyo rango se solape con [inicio, fin).
+        Mismo criterio que TurnoRepository.existe_solapado; si el rango queda fuera de lo
+        cargado en memoria, delega en la consulta SQL.
+        """
+        try:
+            inicio = parsear_fecha_turno(fecha_hora_inicio)
+            fin = parsear_fecha_turno(fecha_hora_fin)
+        except ValueError:
+            return self._existe_solapado_sql(id_cancha, fecha_hora_inicio, fecha_hora_fin, excluir_id)
+
+        with self._lock:
+            self._verificar_version()
+            intervalos = self._obtener(id_cancha)
+            if intervalos is not None and inicio >= intervalos.desde_carga:
+                return any(turno_id != excluir_id for _, turno_id, _ in intervalos.solapados(inicio, fin))
+        return self._existe_solapado_sql(id_cancha, fecha_hora_inicio, fecha_hora_fin, excluir_id)
+
+    def filtrar_libres(self, id_cancha: int,
+                       candidatos: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+        """
+        Filtra los intervalos [inicio, fin) que no se solapan con ningún turno de la cancha.
+        Verifica la versión una sola vez para todo el lote.
+        """
+        libres = []
+        with self._lock:
+            self._verificar_version()
+            intervalos = self._obtener(id_cancha)
+            for inicio, fin in candidatos:
+                if intervalos is not None and inicio >= intervalos.desde_carga:
+                    ocupado = any(True for _ in intervalos.solapados(inicio, fin))
+                else:
+                    ocupado = self._existe_solapado_sql(id_cancha, inicio.isoformat(), fin.isoformat(), None)
+                if not ocupado:
+                    libres.append((inicio, fin))
+        return libres
+
+    def disponibles_cercanos(self, ids_canchas: List[int], referencia: datetime, k: int,
+                             excluir_id: Optional[int] = None) -> List[Tuple[timedelta, datetime, int, int]]:
+        """
+        Obtiene los k turnos disponibles y futuros más cercanos en el tiempo a `referencia`
+        entre las canchas indicadas (bisect sobre los inicios de cada cancha).
+
+        Returns:
+            Lista de (distancia, inicio, id_cancha, id_turno) ordenada por distancia
+        """
+        ahora = datetime.now()
+        candidatos = []
+        with self._lock:
+            self._verificar_version()
+            for id_cancha in ids_canchas:
+                intervalos = self._obtener(id_cancha)
+                if intervalos is None:
+                    continue
+                # k + 1 por si el excluido está entre los cercanos
+                for distancia, inicio, turno_id in intervalos.cercanos(referencia, ahora, k + 1):
+                    if turno_id != excluir_id:
+                        candidatos.append((distancia, inicio, id_cancha, turno_id))
+        return heapq.nsmallest(k, candidatos)
+
+    # ----------------------------------------------------
+    # Mantenimiento (llamado desde TurnoRepository tras cada escritura)
+    # ----------------------------------------------------
+
+    def registrar(self, turno_id: int, id_cancha: int, fecha_hora_inicio: str, fecha_hora_fin: str,
+                  estado: Optional[str] = None) -> None:
+        """Agrega o reemplaza un turno en el índice."""
+        with self._lock:
+            self.quitar(turno_id)
+            intervalos = self._canchas.get(id_cancha)
+            if intervalos is None:
+                return  # La cancha aún no está cargada: se leerá completa al consultarla
+            try:
+                inicio = parsear_fecha_turno(fecha_hora_inicio)
+                fin = parsear_fecha_turno(fecha_hora_fin)
+            except ValueError:
+                self.invalidar(id_cancha)
+                return
+            if fin > intervalos.desde_carga:
+                intervalos.agregar(turno_id, inicio, fin, estado)
+                self._ubicacion[turno_id] = (id_cancha, inicio)
+
+    def cambiar_estado(self, turno_id: int, estado: str) -> None:
+        """Actualiza si un turno figura como disponible."""
+        with self._lock:
+            ubicacion = self._ubicacion.get(turno_id)
+            if ubicacion is None:
+                return
+            id_cancha, inicio = ubicacion
+            intervalos = self._canchas.get(id_cancha)
+            if intervalos is not None:
+                intervalos.marcar_disponible(turno_id, inicio, estado == 'disponible')
+
+    def quitar(self, turno_id: int) -> None:
+        """Quita un turno del índice (si estaba cargado)."""
+        with self._lock:
+            ubicacion = self._ubicacion.pop(turno_id, None)
+            if ubicacion is None:
+                return
+            id_cancha, inicio = ubicacion
+            intervalos = self._canchas.get(id_cancha)
+            if intervalos is not None:
+                intervalos.quitar(turno_id, inicio)
+
+    def invalidar(self, id_cancha: Optional[int] = None) -> None:
+        """Descarta una cancha (o todas) para que se recargue en la próxima consulta."""
+        with self._lock:
+            canchas = list(self._canchas) if id_cancha is None else [id_cancha]
+            for cancha in canchas:
+                intervalos = self._canchas.pop(cancha, None)
+                if intervalos is None:
+                    continue
+                for _, turno_id, _ in intervalos.entradas:
+                    self._ubicacion.pop(turno_id, None)
+
+    # ----------------------------------------------------
+    # Carga
+    # ----------------------------------------------------
+
+    def _verificar_version(self) -> None:
+        """Descarta las canchas que otra conexión (de este u otro proceso) modificó."""
+        if not INDICE_TURNOS_HABILITADO:
+            return
+        conn = pool_lectura.tomar()
+        try:
+            actual = leer_version(conn)
+            if actual is None:
+                return  # BD sin tabla Revision: solo rige el TTL
+            if self._version is None or not self._canchas:
+                self._version = actual
+                return
+            if actual[0] != self._version[0]:
+                canchas = self._canchas_modificadas(conn, self._version[1], actual[1])
+                if canchas is None:
+                    self.invalidar()
+                else:
+                    for id_cancha in canchas:
+                        self.invalidar(id_cancha)
+            self._version = actual
+        finally:
+            conn.close()
+
+    def _canchas_modificadas(self, conn: sqlite3.Connection, desde_seq: Optional[int],
+                             hasta_seq: Optional[int]) -> Optional[set]:
+        """
+        Canchas con turnos modificados entre dos seq de ChangeLog (la de antes
+        y la de después si el turno cambió de cancha). None si no se puede
+        saber: sin ChangeLog, log purgado o demasiados cambios.
+        """
+        if desde_seq is None or hasta_seq is None:
+            return None
+        try:
+            purgado = conn.execute(
+                'SELECT "valor" FROM "ChangeLogEstado" WHERE "clave" = \'purgado_hasta\''
+            ).fetchone()
+            if purgado is not None and purgado[0] > desde_seq:
+                return None
+            ids = [fila[0] for fila in conn.execute(
+                """
+                SELECT DISTINCT json_extract("clave", '$.id') FROM "ChangeLog"
+                WHERE "seq" > ? AND "seq" <= ? AND "entidad" = 'Turno'
+                LIMIT ?
+                """,
+                (desde_seq, hasta_seq, MAX_CAMBIOS_AJENOS + 1),
+            )]
+        except sqlite3.OperationalError:
+            return None
+        if len(ids) > MAX_CAMBIOS_AJENOS:
+            return None
+
+        canchas = {self._ubicacion[turno_id][0] for turno_id in ids if turno_id in self._ubicacion}
+        if ids:
+            marcadores = ", ".join("?" for _ in ids)
+            canchas.update(fila[0] for fila in conn.execute(
+                f"SELECT DISTINCT id_cancha FROM Turno WHERE id IN ({marcadores})", ids
+            ))
+        return canchas
+
+    def escribir(self, operacion: Callable[[Any], T], aplicar: Optional[Callable[[T], None]] = None) -> T:
+        """
+        Ejecuta una escritura de Turno con ejecutar_escritura() y mantiene el índice.
+
+        Si nadie más escribió Turno desde la última verificación, el índice
+        adopta la versión que dejó la escritura y `aplicar(resultado)` refleja
+        el cambio en memoria (las dos cosas bajo el lock, así ninguna consulta
+        ve la versión nueva sin el cambio). Si hubo escrituras ajenas en el
+        medio, la próxima consulta descarta las canchas afectadas.
+        """
+        versiones: Dict[str, Optional[Version]] = {}
+
+        def con_version(cursor) -> T:
+            cambios = cursor.connection.total_changes
+            versiones['antes'] = leer_version(cursor.connection)
+            resultado = operacion(cursor)
+            if cursor.connection.total_changes != cambios:
+                versiones['despues'] = leer_version(cursor.connection)
+            return resultado
+
+        resultado = ejecutar_escritura(con_version)
+        if 'despues' not in versiones:
+            return resultado  # No escribió nada (o se deshizo con DeshacerOperacion)
+        antes, despues = versiones['antes'], versiones['despues']
+        with self._lock:
+            if (antes is not None and despues is not None and self._version is not None
+                    and self._version[0] == antes[0]):
+                self._version = despues
+            if aplicar is not None:
+                aplicar(resultado)
+        return resultado
+
+    def _obtener(self, id_cancha: int) -> Optional[_IntervalosCancha]:
+        if not INDICE_TURNOS_HABILITADO:
+            return None
+        intervalos = self._canchas.get(id_cancha)
+        if intervalos is not None and time.monotonic() - intervalos.cargado_en <= self.ttl_segundos:
+            return intervalos
+        self.invalidar(id_cancha)
+        intervalos = self._cargar(id_cancha)
+        if intervalos is not None:
+            self._canchas[id_cancha] = intervalos
+        return intervalos
+
+    def _cargar(self, id_cancha: int) -> Optional[_IntervalosCancha]:
+        desde_carga = datetime.now() - timedelta(hours=MARGEN_CARGA_HORAS)
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, fecha_hora_inicio, fecha_hora_fin, estado
+                FROM Turno
+                WHERE id_cancha = ? AND fecha_hora_inicio >= ?
+                ORDER BY fecha_hora_inicio
+                """,
+                (id_cancha, (desde_carga - timedelta(hours=MARGEN_CARGA_HORAS)).isoformat()),
+            )
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        intervalos = _IntervalosCancha(desde_carga)
+        try:
+            for row in rows:
+                inicio = parsear_fecha_turno(row['fecha_hora_inicio'])
+                fin = parsear_fecha_turno(row['fecha_hora_fin'])
+                if fin > desde_carga:
+                    intervalos.agregar(row['id'], inicio, fin, row['estado'])
+        except ValueError:
+            # Fechas con formato inesperado: esta cancha se resuelve siempre por SQL
+            return None
+
+        for inicio, turno_id, _ in intervalos.entradas:
+            self._ubicacion[turno_id] = (id_cancha, inicio)
+        return intervalos
+
+    @staticmethod
+    def _existe_solapado_sql(id_cancha: int, fecha_hora_inicio: str, fecha_hora_fin: str,
+                             excluir_id: Optional[int]) -> bool:
+        from repositories.turno_repository import TurnoRepository
+        return TurnoRepository.existe_solapado(id_cancha, fecha_hora_inicio, fecha_hora_fin, excluir_id)
+
+
+# Instancia compartida por el proceso
+indice_turnos = IndiceTurnos()
+
@@ -3,30 +3,39 @@ Repository (DAO) para la entidad Turno.
 Maneja todas las operaciones de base de datos relacionadas con turnos/reservas.
 """
 
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
 from models.turno import Turno
 from database.connection import get_connection
+from database.lectura import get_read_connection
+from database import archivo
+from database.errores import BaseDatosOcupadaError, ConflictoVersionError
+from repositories.turno_indice import indice_turnos
+
+# Duración máxima esperable de un turno; acota las búsquedas por rango
+MAX_DURACION_TURNO_HORAS = 24
 
 
 class TurnoRepository:
     """Repositorio para operaciones CRUD de Turno"""
 
     @staticmethod
-    def obtener_por_id(turno_id: int) -> Optional[Turno]:
+    def obtener_por_id(turno_id: int, historico: bool = False) -> Optional[Turno]:
         """
         Obtiene un turno (reserva, bloqueo, etc.) por su ID.
         
         Args:
             turno_id: ID del turno
+            historico: Buscar también en el archivo (lecturas de la API, no escrituras)
             
         Returns:
             Objeto Turno o None si no existe
         """
-        conn = get_connection()
+        conn = get_read_connection() if historico else get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Turno WHERE id = ?", (turno_id,))
+            tabla = archivo.tabla(conn, 'Turno') if historico else 'Turno'
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id = ?", (turno_id,))
             row = cursor.fetchone()
             
             if row:
@@ -40,6 +49,10 @@ class TurnoRepository:
         """
         Actualiza un turno completo en la base de datos.
         
+        La actualización está condicionada a la versión leída (turno.version):
+        si otra operación modificó el turno en el medio, no se pisa. Si se
+        actualiza, turno.version queda con la nueva versión.
+        
         Args:
             turno: Objeto Turno con datos actualizados (debe tener id)
             
@@ -48,14 +61,13 @@ class TurnoRepository:
             
         Raises:
             ValueError: Si el turno no tiene id
+            ConflictoVersionError: Si la versión no coincide
             Exception: Si hay error al actualizar
         """
         if not turno.id:
             raise ValueError("El turno debe tener un ID para actualizar")
             
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
+        def operacion(cursor) -> bool:
             sql = """
                 UPDATE Turno SET
                     id_cancha = ?, 
@@ -67,8 +79,9 @@ class TurnoRepository:
                     id_usuario_registro = ?, 
                     reserva_created_at = ?, 
                     id_usuario_bloqueo = ?, 
-                    motivo_bloqueo = ?
-                WHERE id = ?
+                    motivo_bloqueo = ?,
+                    version = version + 1
+                WHERE id = ? AND version = ?
             """
             
             cursor.execute(sql, (
@@ -82,15 +95,30 @@ class TurnoRepository:
                 turno.reserva_created_at,
                 turno.id_usuario_bloqueo,
                 turno.motivo_bloqueo,
-                turno.id
+                turno.id,
+                turno.version
             ))
-            conn.commit()
-            return cursor.rowcount > 0
+            if cursor.rowcount == 0:
+                cursor.execute("SELECT 1 FROM Turno WHERE id = ?", (turno.id,))
+                if cursor.fetchone():
+                    raise ConflictoVersionError("turno", turno.id, turno.version)
+                return False
+            return True
+
+        def aplicar(actualizado: bool) -> None:
+            if actualizado:
+                indice_turnos.registrar(turno.id, turno.id_cancha, turno.fecha_hora_inicio,
+                                        turno.fecha_hora_fin, turno.estado)
+
+        try:
+            actualizado = indice_turnos.escribir(operacion, aplicar)
+        except (ConflictoVersionError, BaseDatosOcupadaError):
+            raise
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al actualizar el turno: {e}")
-        finally:
-            conn.close()
+        if actualizado:
+            turno.version += 1
+        return actualizado
 
     @staticmethod
     def crear(turno: Turno) -> int:
@@ -106,9 +134,7 @@ class TurnoRepository:
         Raises:
             Exception: Si hay error al insertar
         """
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
+        def operacion(cursor) -> int:
             cursor.execute("""
                 INSERT INTO Turno (
                     id_cancha, fecha_hora_inicio, fecha_hora_fin, estado,
@@ -122,12 +148,270 @@ class TurnoRepository:
                 turno.id_usuario_registro, turno.reserva_created_at,
                 turno.id_usuario_bloqueo, turno.motivo_bloqueo
             ))
-            
-            conn.commit()
             return cursor.lastrowid
+
+        def aplicar(turno_id: int) -> None:
+            indice_turnos.registrar(turno_id, turno.id_cancha, turno.fecha_hora_inicio,
+                                    turno.fecha_hora_fin, turno.estado)
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al crear turno: {e}")
+
+    @staticmethod
+    def crear_lote(turnos: List[Turno], ignorar_duplicados: bool = False) -> int:
+        """
+        Crea varios turnos en una única transacción usando executemany.
+        
+        Args:
+            turnos: Lista de objetos Turno a crear
+            ignorar_duplicados: Si es True usa INSERT OR IGNORE, de modo que los
+                turnos que ya existen (mismo id_cancha y fecha_hora_inicio, índice
+                idx_turno_cancha_fecha) se omiten sin error
+            
+        Returns:
+            Cantidad de turnos insertados
+            
+        Raises:
+            Exception: Si hay error al insertar (no se inserta ninguno)
+        """
+        if not turnos:
+            return 0
+
+        def operacion(cursor) -> int:
+            cursor.executemany(f"""
+                INSERT {'OR IGNORE ' if ignorar_duplicados else ''}INTO Turno (
+                    id_cancha, fecha_hora_inicio, fecha_hora_fin, estado,
+                    precio_final, id_cliente, id_usuario_registro, 
+                    reserva_created_at, id_usuario_bloqueo, motivo_bloqueo
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    t.id_cancha, t.fecha_hora_inicio, t.fecha_hora_fin,
+                    t.estado, t.precio_final, t.id_cliente,
+                    t.id_usuario_registro, t.reserva_created_at,
+                    t.id_usuario_bloqueo, t.motivo_bloqueo
+                )
+                for t in turnos
+            ])
+            return cursor.rowcount
+
+        def aplicar(insertados: int) -> None:
+            # Los ids insertados no se conocen (executemany): recargar las canchas afectadas
+            for id_cancha in {t.id_cancha for t in turnos}:
+                indice_turnos.invalidar(id_cancha)
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al crear turnos en lote: {e}")
+
+    @staticmethod
+    def crear_lote_libres(turnos: List[Turno]) -> Dict[int, int]:
+        """
+        Crea varios turnos en una única transacción, omitiendo los que se solapan
+        con un turno existente de su cancha.
+
+        El solapamiento se verifica en el mismo INSERT (INSERT ... WHERE NOT
+        EXISTS), dentro de la transacción de escritura: un turno que otro proceso
+        creó después de la validación previa del llamador no queda duplicado,
+        aunque no empiece a la misma hora (idx_turno_cancha_fecha solo evita eso).
+
+        Args:
+            turnos: Lista de objetos Turno a crear
+
+        Returns:
+            Cantidad de turnos insertados por id_cancha
+        """
+        if not turnos:
+            return {}
+        por_cancha: Dict[int, List[Turno]] = {}
+        for t in turnos:
+            por_cancha.setdefault(t.id_cancha, []).append(t)
+
+        def operacion(cursor) -> Dict[int, int]:
+            insertados = {}
+            for id_cancha, lote in por_cancha.items():
+                cursor.executemany("""
+                    INSERT INTO Turno (
+                        id_cancha, fecha_hora_inicio, fecha_hora_fin, estado,
+                        precio_final, id_cliente, id_usuario_registro,
+                        reserva_created_at, id_usuario_bloqueo, motivo_bloqueo
+                    )
+                    SELECT :id_cancha, :inicio, :fin, :estado, :precio_final, :id_cliente,
+                           :id_usuario_registro, :reserva_created_at, :id_usuario_bloqueo, :motivo_bloqueo
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM Turno
+                        WHERE id_cancha = :id_cancha
+                          AND fecha_hora_inicio < :fin
+                          AND fecha_hora_fin > :inicio
+                    )
+                """, [
+                    {
+                        'id_cancha': t.id_cancha, 'inicio': t.fecha_hora_inicio, 'fin': t.fecha_hora_fin,
+                        'estado': t.estado, 'precio_final': t.precio_final, 'id_cliente': t.id_cliente,
+                        'id_usuario_registro': t.id_usuario_registro, 'reserva_created_at': t.reserva_created_at,
+                        'id_usuario_bloqueo': t.id_usuario_bloqueo, 'motivo_bloqueo': t.motivo_bloqueo,
+                    }
+                    for t in lote
+                ])
+                insertados[id_cancha] = cursor.rowcount
+            return insertados
+
+        def aplicar(insertados: Dict[int, int]) -> None:
+            for id_cancha, cantidad in insertados.items():
+                if cantidad:
+                    indice_turnos.invalidar(id_cancha)
+
+        try:
+            return indice_turnos.escribir(operacion, aplicar)
+        except BaseDatosOcupadaError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al crear turnos en lote: {e}")
+
+    @staticmethod
+    def obtener_en_rango(id_cancha: int, desde: str, hasta: str) -> List[Turno]:
+        """
+        Obtiene los turnos de una cancha cuyo rango [inicio, fin) se solapa
+        con [desde, hasta). Usa el índice (id_cancha, fecha_hora_inicio):
+        el límite inferior se acota a MAX_DURACION_TURNO_HORAS antes de 'desde'
+        para no recorrer todo el historial de la cancha.
+        
+        Args:
+            id_cancha: ID de la cancha
+            desde: Fecha/hora inicial (ISO)
+            hasta: Fecha/hora final (ISO)
+            
+        Returns:
+            Lista de objetos Turno ordenados por fecha_hora_inicio
+        """
+        cota_inferior = (
+            datetime.fromisoformat(desde) - timedelta(hours=MAX_DURACION_TURNO_HORAS)
+        ).isoformat()
+
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT * FROM Turno
+                WHERE id_cancha = ?
+                  AND fecha_hora_inicio >= ?
+                  AND fecha_hora_inicio < ?
+                  AND fecha_hora_fin > ?
+                ORDER BY fecha_hora_inicio
+                """,
+                (id_cancha, cota_inferior, hasta, desde)
+            )
+            rows = cursor.fetchall()
+            return [Turno.from_db_row(row) for row in rows]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_por_ids(turno_ids: List[int]) -> List[Turno]:
+        """
+        Obtiene varios turnos en una sola consulta.
+        
+        Args:
+            turno_ids: IDs de los turnos
+            
+        Returns:
+            Lista de objetos Turno (los IDs inexistentes se omiten)
+        """
+        if not turno_ids:
+            return []
+
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            marcadores = ", ".join("?" for _ in turno_ids)
+            cursor.execute(f"SELECT * FROM Turno WHERE id IN ({marcadores})", tuple(turno_ids))
+            return [Turno.from_db_row(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_grilla(ids_canchas: List[int], desde: str, hasta: str) -> List[Tuple]:
+        """
+        Obtiene en una sola consulta los turnos de varias canchas que empiezan
+        en [desde, hasta), como tuplas livianas en lugar de objetos Turno.
+        Con la lista de canchas, SQLite recorre el índice (id_cancha, fecha_hora_inicio)
+        un tramo por cancha.
+        
+        Args:
+            ids_canchas: IDs de las canchas a incluir
+            desde: Fecha/hora inicial (ISO)
+            hasta: Fecha/hora final, exclusiva (ISO)
+            
+        Returns:
+            Lista de tuplas (id, id_cancha, fecha_hora_inicio, fecha_hora_fin, estado, precio_final)
+            ordenadas por fecha_hora_inicio
+        """
+        if not ids_canchas:
+            return []
+
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            marcadores = ", ".join("?" for _ in ids_canchas)
+            cursor.execute(
+                f"""
+                SELECT id, id_cancha, fecha_hora_inicio, fecha_hora_fin, estado, precio_final
+                FROM Turno
+                WHERE id_cancha IN ({marcadores})
+                  AND fecha_hora_inicio >= ?
+                  AND fecha_hora_inicio < ?
+                ORDER BY fecha_hora_inicio
+                """,
+                (*ids_canchas, desde, hasta)
+            )
+            return [tuple(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_disponibles_en_rango(ids_canchas: List[int], desde: str, hasta: str) -> List[Tuple]:
+        """
+        Obtiene en una sola consulta los turnos disponibles de varias canchas que
+        empiezan en [desde, hasta), agrupados por cancha y ordenados por inicio
+        (el orden del índice (id_cancha, fecha_hora_inicio)).
+        
+        Args:
+            ids_canchas: IDs de las canchas a incluir
+            desde: Fecha/hora inicial (ISO)
+            hasta: Fecha/hora final, exclusiva (ISO)
+            
+        Returns:
+            Lista de tuplas (id, id_cancha, fecha_hora_inicio, fecha_hora_fin, precio_final)
+        """
+        if not ids_canchas:
+            return []
+
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            marcadores = ", ".join("?" for _ in ids_canchas)
+            cursor.execute(
+                f"""
+                SELECT id, id_cancha, fecha_hora_inicio, fecha_hora_fin, precio_final
+                FROM Turno
+                WHERE id_cancha IN ({marcadores})
+                  AND fecha_hora_inicio >= ?
+                  AND fecha_hora_inicio < ?
+                  AND estado = 'disponible'
+                ORDER BY id_cancha, fecha_hora_inicio
+                """,
+                (*ids_canchas, desde, hasta)
+            )
+            return [tuple(row) for row in cursor.fetchall()]
         finally:
             conn.close()
 
@@ -143,7 +427,7 @@ class TurnoRepository:
         Returns:
             Lista de objetos Turno
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             if estado:
@@ -170,7 +454,7 @@ class TurnoRepository:
         Returns:
             Lista de objetos Turno con estado 'disponible'
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             cursor.execute(
@@ -182,21 +466,23 @@ class TurnoRepository:
             conn.close()
 
     @staticmethod
-    def obtener_por_cliente(id_cliente: int) -> List[Turno]:
+    def obtener_por_cliente(id_cliente: int, historico: bool = False) -> List[Turno]:
         """
         Obtiene todos los turnos reservados por un cliente.
         
         Args:
             id_cliente: ID del cliente
+            historico: Incluir los turnos archivados
             
         Returns:
             Lista de objetos Turno
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
+            tabla = archivo.tabla(conn, 'Turno') if historico else 'Turno'
             cursor.execute(
-                "SELECT * FROM Turno WHERE id_cliente = ? ORDER BY fecha_hora_inicio DESC",
+                f"SELECT * FROM {tabla} WHERE id_cliente = ? ORDER BY fecha_hora_inicio DESC",
                 (id_cliente,)
             )
             rows = cursor.fetchall()
@@ -208,18 +494,25 @@ class TurnoRepository:
     def obtener_todos_filtrados(
         id_cancha: Optional[int] = None,
         estado: Optional[str] = None,
-        id_cliente: Optional[int] = None
+        id_cliente: Optional[int] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        historico: bool = False
     ) -> List[Turno]:
         """
         Obtiene una lista de turnos, permitiendo filtrar por cancha,
-        estado y/o cliente.
+        estado, cliente y/o rango de fecha de inicio.
+
+        Con historico=True (reportes) incluye los turnos archivados si el
+        rango llega a fechas archivadas (ver database.archivo).
         """
-        conn = get_connection()
+        conn = get_read_connection()
         try:
             cursor = conn.cursor()
             
             # Construcción dinámica de la consulta SQL
-            sql = "SELECT * FROM Turno"
+            tabla = archivo.tabla(conn, 'Turno', desde) if historico else 'Turno'
+            sql = f"SELECT * FROM {tabla}"
             params = []
             conditions = []
 
@@ -235,6 +528,14 @@ class TurnoRepository:
                 conditions.append("id_cliente = ?")
                 params.append(id_cliente)
 
+            if desde is not None:
+                conditions.append("fecha_hora_inicio >= ?")
+                params.append(desde)
+
+            if hasta is not None:
+                conditions.append("fecha_hora_inicio < ?")
+                params.append(hasta)
+
             # Si hay filtros, los añadimos al SQL
             if conditions:
                 sql += " WHERE " + " AND ".join(conditions)
@@ -255,18 +556,56 @@ class TurnoRepository:
     @staticmethod
     def marcar_pasados_no_disponible(now_iso: Optional[str] = None) -> int:
         """Marca como 'no_disponible' los turnos disponibles cuya fecha/hora fin ya pasó."""
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
-            now_value = now_iso or datetime.now().isoformat(timespec="minutes")
+        now_value = now_iso or datetime.now().isoformat(timespec="minutes")
+
+        def operacion(cursor) -> List[int]:
             cursor.execute(
-                "UPDATE Turno SET estado = 'no_disponible' WHERE estado = 'disponible' AND fecha_hora_fin < ?",
+                "UPDATE Turno SET estado = 'no_disponible', version = version + 1 "
+                "WHERE estado = 'disponible' AND fecha_hora_fin < ? RETURNING id",
                 (now_value,),
             )
-            conn.commit()
-            return cursor.rowcount
-        finally:
-            conn.close()
+            return [row['id'] for row in cursor.fetchall()]
+
+        def aplicar(marcados: List[int]) -> None:
+            for turno_id in marcados:
+                indice_turnos.cambiar_estado(turno_id, 'no_disponible')
+
+        return len(indice_turnos.escribir(operacion, aplicar))
+    
+    @staticmethod
+    def bloquear_disponibles_en_fecha(fecha: str, motivo: str, id_cancha: Optional[int] = None) -> int:
+        """
+        Bloquea los turnos disponibles de un día (todas las canchas o una en particular).
+        
+        Args:
+            fecha: Día a bloquear (YYYY-MM-DD)
+            motivo: Motivo del bloqueo
+            id_cancha: ID de la cancha (opcional, None = todas)
+            
+        Returns:
+            Cantidad de turnos bloqueados
+        """
+        dia_siguiente = (datetime.fromisoformat(fecha) + timedelta(days=1)).date().isoformat()
+        sql = """
+            UPDATE Turno SET estado = 'bloqueado', motivo_bloqueo = ?, version = version + 1
+            WHERE estado = 'disponible'
+              AND fecha_hora_inicio >= ?
+              AND fecha_hora_inicio < ?
+        """
+        params = [motivo, fecha, dia_siguiente]
+        if id_cancha is not None:
+            sql += " AND id_cancha = ?"
+            params.append(id_cancha)
+
+        def operacion(cursor) -> List[int]:
+            cursor.execute(sql + " RETURNING id", tuple(params))
+            return [row['id'] for row in cursor.fetchall()]
+
+        def aplicar(bloqueados: List[int]) -> None:
+            for turno_id in bloqueados:
+                indice_turnos.cambiar_estado(turno_id, 'bloqueado')
+
+        return len(indice_turnos.escribir(operacion, aplicar))
     
     @staticmethod
     def eliminar(turno_id: int) -> bool:
@@ -278,29 +617,51 @@ class TurnoRepository:
         Returns:
             True si se eliminó correctamente
         """
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
+        def operacion(cursor) -> bool:
             cursor.execute("DELETE FROM Turno WHERE id = ?", (turno_id,))
-            conn.commit()
             return cursor.rowcount > 0
-        finally:
-            conn.close()
+
+        return indice_turnos.escribir(operacion, lambda eliminado: indice_turnos.quitar(turno_id))
 
     @staticmethod
-    def cambiar_estado(turno_id: int, nuevo_estado: str) -> bool:
-        """Actualiza solo el estado de un turno."""
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
+    def cambiar_estado(turno_id: int, nuevo_estado: str, version_esperada: Optional[int] = None) -> bool:
+        """Actualiza solo el estado de un turno.
+        
+        Args:
+            turno_id: ID del turno
+            nuevo_estado: Estado a asignar
+            version_esperada: Versión leída del turno; si se indica, el cambio
+                solo se aplica si nadie lo modificó en el medio
+            
+        Returns:
+            True si se actualizó, False si no existe
+            
+        Raises:
+            ConflictoVersionError: Si la versión no coincide
+        """
+        def operacion(cursor) -> bool:
+            if version_esperada is None:
+                cursor.execute(
+                    "UPDATE Turno SET estado = ?, version = version + 1 WHERE id = ?",
+                    (nuevo_estado, turno_id),
+                )
+                return cursor.rowcount > 0
             cursor.execute(
-                "UPDATE Turno SET estado = ? WHERE id = ?",
-                (nuevo_estado, turno_id),
+                "UPDATE Turno SET estado = ?, version = version + 1 WHERE id = ? AND version = ?",
+                (nuevo_estado, turno_id, version_esperada),
             )
-            conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
+            if cursor.rowcount == 0:
+                cursor.execute("SELECT 1 FROM Turno WHERE id = ?", (turno_id,))
+                if cursor.fetchone():
+                    raise ConflictoVersionError("turno", turno_id, version_esperada)
+                return False
+            return True
+
+        def aplicar(actualizado: bool) -> None:
+            if actualizado:
+                indice_turnos.cambiar_estado(turno_id, nuevo_estado)
+
+        return indice_turnos.escribir(operacion, aplicar)
 
     @staticmethod
     def existe_solapado(
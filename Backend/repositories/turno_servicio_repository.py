@@ -3,10 +3,12 @@
 Maneja la relación muchos-a-muchos entre Turnos y Servicios Adicionales.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from models.turno_servicio import TurnoServicio
 from database.connection import get_connection
+from database.lectura import get_read_connection
+from database import archivo
 
 
 class TurnoXServicioRepository:
@@ -71,20 +73,22 @@ class TurnoXServicioRepository:
             conn.close()
 
     @staticmethod
-    def listar_por_turno(id_turno: int) -> List[TurnoServicio]:
+    def listar_por_turno(id_turno: int, historico: bool = False) -> List[TurnoServicio]:
         """Lista todos los servicios de un turno específico.
         
         Args:
             id_turno: ID del turno
+            historico: Buscar también en el archivo (turnos archivados)
             
         Returns:
             Lista de servicios del turno
         """
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         try:
+            tabla = archivo.tabla(conn, 'TurnoXServicio') if historico else 'TurnoXServicio'
             cursor.execute(
-                "SELECT * FROM TurnoXServicio WHERE id_turno = ?",
+                f"SELECT * FROM {tabla} WHERE id_turno = ?",
                 (id_turno,)
             )
             rows = cursor.fetchall()
@@ -100,6 +104,37 @@ class TurnoXServicioRepository:
         finally:
             conn.close()
 
+    @staticmethod
+    def listar_por_turnos(id_turnos: List[int], historico: bool = False) -> Dict[int, List[TurnoServicio]]:
+        """Servicios de varios turnos en una sola consulta.
+        
+        Args:
+            id_turnos: IDs de los turnos
+            historico: Buscar también en el archivo (turnos archivados)
+            
+        Returns:
+            Diccionario id_turno -> servicios (los turnos sin servicios no aparecen)
+        """
+        if not id_turnos:
+            return {}
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        try:
+            tabla = archivo.tabla(conn, 'TurnoXServicio') if historico else 'TurnoXServicio'
+            marcadores = ", ".join("?" for _ in id_turnos)
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id_turno IN ({marcadores})", tuple(id_turnos))
+            servicios: Dict[int, List[TurnoServicio]] = {}
+            for row in cursor.fetchall():
+                servicios.setdefault(row["id_turno"], []).append(TurnoServicio(
+                    id_turno=row["id_turno"],
+                    id_servicio=row["id_servicio"],
+                    cantidad=row["cantidad"],
+                    precio_unitario_congelado=row["precio_unitario_congelado"],
+                ))
+            return servicios
+        finally:
+            conn.close()
+
     @staticmethod
     def actualizar(turno_servicio: TurnoServicio) -> bool:
         """Actualiza un registro TurnoXServicio.
@@ -174,22 +209,24 @@ class TurnoXServicioRepository:
             conn.close()
 
     @staticmethod
-    def calcular_total_servicios(id_turno: int) -> float:
+    def calcular_total_servicios(id_turno: int, historico: bool = False) -> float:
         """Calcula el total de servicios adicionales de un turno.
         
         Args:
             id_turno: ID del turno
+            historico: Buscar también en el archivo (turnos archivados)
             
         Returns:
             Total en pesos de los servicios
         """
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         try:
+            tabla = archivo.tabla(conn, 'TurnoXServicio') if historico else 'TurnoXServicio'
             cursor.execute(
-                """
+                f"""
                 SELECT SUM(cantidad * precio_unitario_congelado) as total
-                FROM TurnoXServicio
+                FROM {tabla}
                 WHERE id_turno = ?
                 """,
                 (id_turno,)
@@ -198,3 +235,30 @@ class TurnoXServicioRepository:
             return row["total"] if row["total"] else 0.0
         finally:
             conn.close()
+
+    @staticmethod
+    def totales_por_turno(historico: bool = False) -> Dict[int, float]:
+        """Total de servicios adicionales de cada turno, en una sola consulta.
+        
+        Para los reportes que recorren muchos turnos (evita una consulta por turno).
+        
+        Args:
+            historico: Incluir los turnos archivados
+            
+        Returns:
+            Diccionario id_turno -> total en pesos (los turnos sin servicios no aparecen)
+        """
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        try:
+            tabla = archivo.tabla(conn, 'TurnoXServicio') if historico else 'TurnoXServicio'
+            cursor.execute(
+                f"""
+                SELECT id_turno, SUM(cantidad * precio_unitario_congelado) as total
+                FROM {tabla}
+                GROUP BY id_turno
+                """
+            )
+            return {row["id_turno"]: row["total"] or 0.0 for row in cursor.fetchall()}
+        finally:
+            conn.close()
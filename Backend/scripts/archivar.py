@@ -0,0 +1,52 @@
+"""
+Archivado de turnos viejos en archive.db (se puede correr con la API en marcha).
+
+Mueve los turnos completados, cancelados y no disponibles de más de N meses,
+con sus pagos y servicios, a la base de archivo (ver database/archivo.py).
+
+Uso:
+    python scripts/archivar.py                 # con ARCHIVO_MESES (6 por defecto)
+    python scripts/archivar.py --meses 3 --lote 1000
+    python scripts/archivar.py --estado        # solo muestra filas por base
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import archivo
+
+
+def mostrar_estado():
+    estado = archivo.estado()
+    print(f"\nArchivo: {estado['archivo']} ({'existe' if estado['existe'] else 'no existe'})")
+    for nombre in archivo.TABLAS_ARCHIVADAS:
+        filas = estado[nombre]
+        print(f"  {nombre:<16} principal: {filas['principal']:>7}   archivo: {filas.get('archivo', 0):>7}")
+    print(f"  Turno archivado más reciente: {estado['limite_archivado'] or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivado de turnos viejos")
+    parser.add_argument("--meses", type=int, default=archivo.ARCHIVO_MESES, help="Antigüedad mínima en meses")
+    parser.add_argument("--lote", type=int, default=archivo.ARCHIVO_LOTE, help="Turnos por lote")
+    parser.add_argument("--estado", action="store_true", help="Solo mostrar el estado del archivo")
+    args = parser.parse_args()
+
+    if not args.estado:
+        print(f"\nArchivando turnos anteriores a {archivo.fecha_corte(args.meses)}...")
+        try:
+            resultado = archivo.archivar(args.meses, args.lote)
+        except Exception as e:
+            print(f"✗ Error al archivar: {e}")
+            sys.exit(1)
+        print(f"✓ {resultado['turnos_archivados']} turnos archivados en {resultado['lotes']} lotes "
+              f"({resultado['duracion_s']}s)")
+    mostrar_estado()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Backup en caliente de la base de datos (se puede correr con la API en marcha).
+
+Copia la base con la API de backup de SQLite, verifica la copia con
+PRAGMA integrity_check y conserva los últimos N backups.
+
+Uso:
+    python scripts/backup.py
+    python scripts/backup.py --destino /ruta/backups --conservar 14
+    python scripts/backup.py --paginas-por-paso 1024 --pausa 0.01
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database.connection import DB_PATH
+from jobs.backup_bd import (
+    BACKUP_CONSERVAR,
+    BACKUP_DIR,
+    BACKUP_PAGINAS_POR_PASO,
+    BACKUP_PAUSA_SEGUNDOS,
+    hacer_backup,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup en caliente de la base SQLite")
+    parser.add_argument("--destino", type=Path, default=BACKUP_DIR, help="Carpeta de los backups")
+    parser.add_argument("--conservar", type=int, default=BACKUP_CONSERVAR, help="Backups a conservar (0 = no rotar)")
+    parser.add_argument("--paginas-por-paso", type=int, default=BACKUP_PAGINAS_POR_PASO, help="Páginas copiadas por paso")
+    parser.add_argument("--pausa", type=float, default=BACKUP_PAUSA_SEGUNDOS, help="Segundos de pausa entre pasos")
+    args = parser.parse_args()
+
+    if not DB_PATH.exists():
+        print(f"✗ No existe la base {DB_PATH}")
+        sys.exit(1)
+
+    print(f"\nBackup de {DB_PATH} en {args.destino}...")
+    try:
+        resultado = hacer_backup(args.destino, args.paginas_por_paso, args.pausa, args.conservar)
+    except Exception as e:
+        print(f"✗ Error al hacer el backup: {e}")
+        sys.exit(1)
+
+    print(f"✓ {resultado['archivo']}")
+    print(f"  {resultado['bytes'] / (1024 * 1024):.2f} MB en {resultado['duracion_s']}s "
+          f"({resultado['mb_por_segundo']} MB/s, {resultado['pasos']} pasos)")
+    print(f"  integrity_check: {resultado['integrity_check']}")
+    for nombre in resultado['borrados']:
+        print(f"  - rotado: {nombre}")
+    historico = resultado['archivo_historico']
+    if historico:
+        print(f"✓ {historico['archivo']} ({historico['bytes'] / (1024 * 1024):.2f} MB, "
+              f"integrity_check: {historico['integrity_check']})")
+        for nombre in historico['borrados']:
+            print(f"  - rotado: {nombre}")
+
+
+if __name__ == "__main__":
+    main()
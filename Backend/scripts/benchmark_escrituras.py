@@ -0,0 +1,110 @@
+"""
+Benchmark de escrituras: reservas por segundo con y sin la cola de escritura.
+
+Trabaja sobre una copia de la base (no modifica database.db). Cada reserva
+lee un turno disponible y lo pasa a 'reservado' con TurnoRepository.actualizar,
+desde varios hilos a la vez. Se mide primero con una conexión por escritura y
+después con la cola (group commit), cada corrida sobre una copia nueva.
+
+Uso:
+    python scripts/benchmark_escrituras.py
+    python scripts/benchmark_escrituras.py --reservas 2000 --hilos 16
+"""
+
+import argparse
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import database.connection as connection
+from database.cola_escritura import cola_escritura
+from database.contencion import contencion
+from repositories.turno_repository import TurnoRepository
+
+
+def _turnos_disponibles(cantidad: int) -> list:
+    conn = connection.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM Turno WHERE estado = 'disponible' ORDER BY id LIMIT ?", (cantidad,))
+        return [row['id'] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _reservar(turno_id: int, id_cliente: int) -> None:
+    turno = TurnoRepository.obtener_por_id(turno_id)
+    turno.estado = 'reservado'
+    turno.id_cliente = id_cliente
+    turno.reserva_created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    TurnoRepository.actualizar(turno)
+
+
+def correr(origen: Path, reservas: int, hilos: int, con_cola: bool) -> dict:
+    """Reserva `reservas` turnos de una copia de `origen` y devuelve las métricas."""
+    with tempfile.TemporaryDirectory() as directorio:
+        copia = Path(directorio) / "benchmark.db"
+        shutil.copy(origen, copia)
+        connection.DB_PATH = copia
+
+        ids = _turnos_disponibles(reservas)
+        conn = connection.get_connection()
+        id_cliente = conn.execute("SELECT id FROM Cliente ORDER BY id LIMIT 1").fetchone()['id']
+        conn.close()
+
+        cola_escritura.habilitada = con_cola
+        lotes_previos = cola_escritura.lotes
+        contencion.reiniciar()
+        errores = 0
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = [pool.submit(_reservar, turno_id, id_cliente) for turno_id in ids]
+            for futuro in futuros:
+                try:
+                    futuro.result()
+                except Exception:
+                    errores += 1
+        duracion = time.perf_counter() - inicio
+        cola_escritura.detener()
+        cola_escritura.habilitada = False
+
+        return {
+            'modo': 'cola (group commit)' if con_cola else 'conexión por escritura',
+            'reservas': len(ids) - errores,
+            'errores': errores,
+            'segundos': duracion,
+            'por_segundo': (len(ids) - errores) / duracion if duracion else 0.0,
+            'commits': cola_escritura.lotes - lotes_previos if con_cola else len(ids) - errores,
+            'reintentos': contencion.resumen()['reintentos'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reservas por segundo con y sin cola de escritura")
+    parser.add_argument("--db", type=Path, default=connection.DB_PATH, help="Base a copiar (por defecto database.db)")
+    parser.add_argument("--reservas", type=int, default=1000, help="Cantidad de reservas por corrida")
+    parser.add_argument("--hilos", type=int, default=8, help="Hilos concurrentes")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"✗ No existe la base {args.db}. Ejecutá scripts/init_database.py primero.")
+        sys.exit(1)
+
+    print(f"\nSQLite {sqlite3.sqlite_version} · {args.reservas} reservas · {args.hilos} hilos\n")
+    print(f"{'Modo':<26}{'Reservas':>10}{'Errores':>9}{'Commits':>9}{'Reint.':>8}{'Seg.':>8}{'Res./s':>10}")
+    for con_cola in (False, True):
+        r = correr(args.db, args.reservas, args.hilos, con_cola)
+        print(f"{r['modo']:<26}{r['reservas']:>10}{r['errores']:>9}{r['commits']:>9}{r['reintentos']:>8}"
+              f"{r['segundos']:>8.2f}{r['por_segundo']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
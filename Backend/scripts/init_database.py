@@ -9,6 +9,7 @@ Este script:
 Uso:
     python scripts/init_database.py
     python scripts/init_database.py --reset  # Elimina y recrea todo
+    python scripts/init_database.py --migrar  # Solo actualiza la estructura (sin datos)
 """
 
 import sqlite3
@@ -21,6 +22,7 @@ from passlib.hash import pbkdf2_sha256  # ← Cambiado de bcrypt a pbkdf2_sha256
 sys.path.append(str(Path(__file__).parent.parent))
 
 from database.connection import get_connection
+from database import changelog
 
 
 def crear_tablas():
@@ -31,6 +33,12 @@ def crear_tablas():
     print("Creando tablas...")
     
     try:
+        # Vacuum incremental (jobs/mantenimiento_bd.py); solo tiene efecto en una base nueva
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        # WAL: los lectores (pool de solo lectura) no bloquean a los escritores
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
         # Tabla Rol
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS "Rol" (
@@ -102,6 +110,7 @@ def crear_tablas():
                 "reserva_created_at" TEXT DEFAULT CURRENT_TIMESTAMP,
                 "id_usuario_bloqueo" INTEGER,
                 "motivo_bloqueo" TEXT,
+                "version" INTEGER NOT NULL DEFAULT 1,
                 FOREIGN KEY ("id_cancha") REFERENCES "Cancha"("id") ON DELETE CASCADE,
                 FOREIGN KEY ("id_cliente") REFERENCES "Cliente"("id") ON DELETE SET NULL,
                 FOREIGN KEY ("id_usuario_registro") REFERENCES "Usuario"("id") ON DELETE SET NULL,
@@ -187,12 +196,66 @@ def crear_tablas():
                 "fecha_creacion" TEXT DEFAULT CURRENT_TIMESTAMP,
                 "fecha_expiracion" TEXT,
                 "fecha_completado" TEXT,
+                "id_serie" TEXT,
+                "version" INTEGER NOT NULL DEFAULT 1,
                 FOREIGN KEY ("id_turno") REFERENCES "Turno"("id") ON DELETE CASCADE,
                 FOREIGN KEY ("id_cliente") REFERENCES "Cliente"("id") ON DELETE CASCADE,
                 FOREIGN KEY ("id_usuario_registro") REFERENCES "Usuario"("id") ON DELETE SET NULL
             )
         """)
         
+        # Tabla PlantillaHorario (horario semanal por cancha para generar turnos)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS "PlantillaHorario" (
+                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
+                "id_cancha" INTEGER NOT NULL,
+                "dia_semana" INTEGER NOT NULL CHECK ("dia_semana" BETWEEN 0 AND 6),
+                "hora_apertura" TEXT NOT NULL,
+                "hora_cierre" TEXT NOT NULL,
+                "duracion_minutos" INTEGER NOT NULL DEFAULT 60,
+                "precio_turno" REAL,
+                "activa" INTEGER DEFAULT 1,
+                "generado_hasta" TEXT,
+                UNIQUE ("id_cancha", "dia_semana", "hora_apertura"),
+                FOREIGN KEY ("id_cancha") REFERENCES "Cancha"("id") ON DELETE CASCADE
+            )
+        """)
+        
+        # Tabla ExcepcionHorario (feriados; id_cancha NULL aplica a todas)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS "ExcepcionHorario" (
+                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
+                "id_cancha" INTEGER,
+                "fecha" TEXT NOT NULL,
+                "motivo" TEXT,
+                FOREIGN KEY ("id_cancha") REFERENCES "Cancha"("id") ON DELETE CASCADE
+            )
+        """)
+        
+        # Tabla HoldTurno (retención temporal de un turno mientras se completa el pago)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS "HoldTurno" (
+                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
+                "id_turno" INTEGER NOT NULL,
+                "id_cliente" INTEGER NOT NULL,
+                "token" TEXT NOT NULL UNIQUE,
+                "estado" TEXT NOT NULL DEFAULT 'activo',
+                "creado_en" TEXT DEFAULT CURRENT_TIMESTAMP,
+                "expira_en" TEXT NOT NULL,
+                FOREIGN KEY ("id_turno") REFERENCES "Turno"("id") ON DELETE CASCADE,
+                FOREIGN KEY ("id_cliente") REFERENCES "Cliente"("id") ON DELETE CASCADE
+            )
+        """)
+        
+        # Tabla Revision (versión por tabla, mantenida por triggers; usada para ETags)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS "Revision" (
+                "tabla" TEXT PRIMARY KEY,
+                "version" INTEGER NOT NULL DEFAULT 0,
+                "modificado_en" TEXT
+            )
+        """)
+        
         print("✓ Tablas creadas exitosamente")
         conn.commit()
         
@@ -230,6 +293,24 @@ def crear_indices():
             ON "Turno"("id_cancha")
         """)
         
+        # Índice de excepciones por fecha para la generación de turnos
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_excepcion_horario_fecha 
+            ON "ExcepcionHorario"("fecha")
+        """)
+        
+        # Un solo hold activo por turno; índice parcial para reconstruir los vencimientos
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_hold_turno_activo 
+            ON "HoldTurno"("id_turno") WHERE "estado" = 'activo'
+        """)
+        
+        # Pagos de una misma serie de reservas (índice parcial: la mayoría no tiene serie)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_pago_serie 
+            ON "Pago"("id_serie") WHERE "id_serie" IS NOT NULL
+        """)
+        
         print("✓ Índices creados exitosamente")
         conn.commit()
         
@@ -241,6 +322,95 @@ def crear_indices():
         conn.close()
 
 
+def migrar_columnas():
+    """Agrega a una base existente las columnas nuevas que CREATE TABLE IF NOT EXISTS no crea"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    print("\nMigrando columnas...")
+    
+    # (tabla, columna, definición)
+    columnas = [
+        ('Turno', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+        ('Pago', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+        ('Pago', 'id_serie', 'TEXT'),
+    ]
+    
+    try:
+        for tabla, columna, definicion in columnas:
+            cursor.execute(f'PRAGMA table_info("{tabla}")')
+            if columna not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute(f'ALTER TABLE "{tabla}" ADD COLUMN "{columna}" {definicion}')
+                print(f"  ✓ {tabla}.{columna} agregada")
+        
+        print("✓ Columnas al día")
+        conn.commit()
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error al migrar columnas: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def migrar_auto_vacuum():
+    """
+    Pasa una base existente a auto_vacuum = INCREMENTAL.
+    El modo solo cambia reconstruyendo el archivo con VACUUM (una única vez).
+    """
+    conn = get_connection()
+    conn.isolation_level = None  # VACUUM no puede ir dentro de una transacción
+    
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return
+        print("\nMigrando auto_vacuum a INCREMENTAL (VACUUM)...")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        print("✓ auto_vacuum = INCREMENTAL")
+    except Exception as e:
+        print(f"✗ Error al migrar auto_vacuum: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def crear_triggers():
+    """Crea los triggers que incrementan la versión de las tablas vigiladas y los del changelog"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    print("\nCreando triggers...")
+    
+    try:
+        for tabla in ('Turno', 'Cancha'):
+            for operacion in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_revision_{tabla.lower()}_{operacion.lower()}
+                    AFTER {operacion} ON "{tabla}"
+                    BEGIN
+                        INSERT INTO "Revision" ("tabla", "version", "modificado_en")
+                        VALUES ('{tabla}', 1, CURRENT_TIMESTAMP)
+                        ON CONFLICT ("tabla") DO UPDATE
+                        SET "version" = "version" + 1, "modificado_en" = CURRENT_TIMESTAMP;
+                    END
+                """)
+        
+        # Changelog (se recrean con las columnas actuales de cada tabla)
+        changelog.instalar(conn)
+        
+        print("✓ Triggers creados exitosamente")
+        conn.commit()
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error al crear triggers: {e}")
+        raise
+    finally:
+        conn.close()
+
+
 def insertar_datos_basicos():
     """Inserta datos básicos necesarios para el sistema"""
     conn = get_connection()
@@ -668,7 +838,8 @@ def mostrar_resumen():
         # Contar registros en cada tabla
         tablas = [
             'Rol', 'Usuario', 'Cliente', 'Cancha', 'ServicioAdicional', 
-            'Turno', 'Torneo', 'Equipo', 'EquipoMiembro', 'EquipoXTorneo', 'Pago'
+            'Turno', 'Torneo', 'Equipo', 'EquipoMiembro', 'EquipoXTorneo', 'Pago',
+            'PlantillaHorario', 'ExcepcionHorario', 'HoldTurno'
         ]
         
         for tabla in tablas:
@@ -765,6 +936,19 @@ def resetear_base_datos():
         conn.close()
 
 
+def crear_estructura():
+    """
+    Crea o actualiza la estructura completa, sin datos: tablas, columnas
+    nuevas, auto_vacuum, índices y triggers. Es idempotente. También la usa
+    database.connection.init_database().
+    """
+    crear_tablas()
+    migrar_columnas()
+    migrar_auto_vacuum()
+    crear_indices()
+    crear_triggers()
+
+
 def main():
     """Función principal"""
     import sys
@@ -783,8 +967,11 @@ def main():
             return
     
     # Crear estructura
-    crear_tablas()
-    crear_indices()
+    crear_estructura()
+    
+    # Solo actualizar la estructura de una base existente
+    if len(sys.argv) > 1 and sys.argv[1] == '--migrar':
+        return
     
     # Insertar datos
     insertar_datos_basicos()
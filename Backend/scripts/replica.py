@@ -0,0 +1,95 @@
+"""
+Administración de la réplica (warm standby) de la base de datos.
+
+Uso:
+    python scripts/replica.py inicializar --destino /otro/volumen/replica.db
+    python scripts/replica.py enviar [--continuo --intervalo 2]
+    python scripts/replica.py estado
+    python scripts/replica.py verificar
+    python scripts/replica.py promover [--sin-sincronizar]
+
+La ruta de la réplica se toma de --destino o de la variable REPLICA_PATH.
+Después de promover, iniciar la API con DATABASE_PATH=<ruta de la réplica>.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import connection, replica
+
+
+def verificar(destino: Path) -> bool:
+    """Compara cantidad de filas y un checksum por tabla entre primaria y réplica."""
+    primaria = sqlite3.connect(f"file:{connection.DB_PATH}?mode=ro", uri=True)
+    copia = sqlite3.connect(f"file:{destino}?mode=ro", uri=True)
+    iguales = True
+    try:
+        for tabla in replica._tablas_replicables(copia):
+            consulta = f'SELECT COUNT(*), TOTAL(rowid) FROM "{tabla}"'
+            a, b = primaria.execute(consulta).fetchone(), copia.execute(consulta).fetchone()
+            filas_p = primaria.execute(f'SELECT * FROM "{tabla}" ORDER BY rowid').fetchall()
+            filas_r = copia.execute(f'SELECT * FROM "{tabla}" ORDER BY rowid').fetchall()
+            ok = a == b and filas_p == filas_r
+            iguales &= ok
+            print(f"  {'✓' if ok else '✗'} {tabla:<20} primaria={a[0]:<8} réplica={b[0]}")
+    finally:
+        primaria.close()
+        copia.close()
+    return iguales
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réplica de la base de datos")
+    parser.add_argument("comando", choices=["inicializar", "enviar", "estado", "verificar", "promover"])
+    parser.add_argument("--destino", type=Path, default=replica.REPLICA_PATH, help="Archivo de la réplica")
+    parser.add_argument("--continuo", action="store_true", help="enviar: repetir cada --intervalo segundos")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre envíos con --continuo")
+    parser.add_argument("--sin-sincronizar", action="store_true", help="promover: no intentar enviar lo pendiente")
+    args = parser.parse_args()
+
+    if args.destino is None:
+        print("✗ Indicá la réplica con --destino o REPLICA_PATH")
+        sys.exit(1)
+
+    try:
+        if args.comando == "inicializar":
+            resultado = replica.inicializar(args.destino)
+            print(f"✓ Réplica creada en {resultado['replica']} (seq {resultado['ultimo_seq']})")
+            print(f"  Tablas replicadas: {', '.join(resultado['tablas'])}")
+        elif args.comando == "enviar":
+            while True:
+                resultado = replica.enviar_cambios(args.destino)
+                if resultado['entradas_enviadas'] or not args.continuo:
+                    print(f"✓ {resultado['entradas_enviadas']} cambios enviados "
+                          f"(seq {resultado['ultimo_seq']}, {resultado['duracion_s']}s)")
+                if not args.continuo:
+                    break
+                time.sleep(args.intervalo)
+        elif args.comando == "estado":
+            for clave, valor in replica.estado(args.destino).items():
+                print(f"  {clave}: {valor}")
+        elif args.comando == "verificar":
+            if not verificar(args.destino):
+                print("✗ La réplica difiere de la primaria (¿hay cambios sin enviar?)")
+                sys.exit(1)
+            print("✓ La réplica coincide con la primaria")
+        elif args.comando == "promover":
+            resultado = replica.promover(args.destino, sincronizar=not args.sin_sincronizar)
+            print(f"✓ Réplica promovida: {resultado['primaria']} (integrity_check: {resultado['integrity_check']})")
+            print(f"  Sincronización final: {resultado['sincronizacion']}")
+            print(f"  Iniciá la API con DATABASE_PATH={resultado['primaria']}")
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
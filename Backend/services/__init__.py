@@ -14,8 +14,10 @@ __all__ = [
     "clientes_service",
     "equipo_miembros_service",
     "equipos_service",
+    "holds_service",
     "pagos_service",
     "pedidos_service",
+    "plantillas_service",
     "reservas_service",
     "roles_service",
     "servicios_adicionales_service",
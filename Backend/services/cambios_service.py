@@ -0,0 +1,72 @@
+"""Servicios del feed de cambios (changelog) para sincronización incremental.
+
+Un consumidor guarda el último `seq` procesado y pide las entradas
+siguientes con GET /api/cambios?desde_seq=. Cada entrada indica qué fila
+cambió; el consumidor vuelve a leer la entidad (o la borra si op es 'D').
+La compactación deja de cada fila solo su última entrada; la purga borra
+todo lo anterior a la retención: un cursor anterior a lo purgado debe
+resincronizar las tablas completas.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from database.lectura import snapshot_lectura
+from repositories.cambio_repository import CambioRepository
+
+# Límite por página del feed
+CAMBIOS_LIMITE_DEFECTO = 100
+CAMBIOS_LIMITE_MAXIMO = 1000
+
+# Antigüedad a partir de la cual se compactan / purgan las entradas
+CHANGELOG_COMPACTAR_HORAS = float(os.getenv("CHANGELOG_COMPACTAR_HORAS", "24"))
+CHANGELOG_RETENCION_DIAS = float(os.getenv("CHANGELOG_RETENCION_DIAS", "30"))
+
+
+def obtener_cambios(desde_seq: int = 0, limite: int = CAMBIOS_LIMITE_DEFECTO) -> Dict[str, Any]:
+    """Devuelve una página del changelog a partir de un cursor.
+    
+    Args:
+        desde_seq: Último seq ya procesado por el consumidor (0 = desde el principio)
+        limite: Entradas por página (máximo CAMBIOS_LIMITE_MAXIMO)
+        
+    Returns:
+        Diccionario con los cambios, el cursor para la próxima página
+        (`ultimo_seq`), si quedan más entradas y si hay que resincronizar
+        
+    Raises:
+        ValueError: Si el cursor o el límite son inválidos
+    """
+    if desde_seq < 0:
+        raise ValueError("desde_seq no puede ser negativo")
+    if not 1 <= limite <= CAMBIOS_LIMITE_MAXIMO:
+        raise ValueError(f"limit debe estar entre 1 y {CAMBIOS_LIMITE_MAXIMO}")
+
+    with snapshot_lectura():
+        cambios = CambioRepository.listar_desde(desde_seq, limite)
+        limites = CambioRepository.obtener_limites()
+
+    return {
+        'cambios': [c.to_dict() for c in cambios],
+        'ultimo_seq': cambios[-1].seq if cambios else desde_seq,
+        'hay_mas': len(cambios) == limite,
+        'resincronizar': desde_seq < limites['purgado_hasta'],
+        'seq_actual': limites['ultimo_seq'],
+    }
+
+
+def compactar(
+    compactar_horas: float = CHANGELOG_COMPACTAR_HORAS,
+    retencion_dias: float = CHANGELOG_RETENCION_DIAS,
+) -> Dict[str, Any]:
+    """Compacta las entradas viejas y purga las que superan la retención.
+    
+    Returns:
+        Diccionario con las entradas compactadas y el resultado de la purga
+    """
+    ahora = datetime.utcnow()  # creado_en es CURRENT_TIMESTAMP (UTC)
+    formato = '%Y-%m-%d %H:%M:%S'
+    compactadas = CambioRepository.compactar((ahora - timedelta(hours=compactar_horas)).strftime(formato))
+    purga = CambioRepository.purgar((ahora - timedelta(days=retencion_dias)).strftime(formato))
+    return {'compactadas': compactadas, 'purgadas': purga['borradas'], 'purgado_hasta': purga['purgado_hasta']}
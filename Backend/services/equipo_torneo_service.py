@@ -25,12 +25,13 @@ def inscribir_equipos_masivo(id_torneo: int, ids_equipos: List[int]) -> Dict[str
     if not ids_equipos:
         return {'inscritos': 0, 'errores': []}
     
-    # Filtrar equipos que ya están inscritos
+    # Filtrar equipos que ya están inscritos (una sola consulta para todo el lote)
+    ya_inscritos = EquipoTorneoRepository.equipos_inscritos(id_torneo, ids_equipos)
     equipos_a_inscribir = []
     errores = []
     
     for id_equipo in ids_equipos:
-        if EquipoTorneoRepository.existe_inscripcion(id_equipo, id_torneo):
+        if id_equipo in ya_inscritos:
             errores.append(f'Equipo {id_equipo} ya inscrito')
         else:
             equipos_a_inscribir.append(id_equipo)
@@ -0,0 +1,187 @@
+"""Eventos de cambios de turnos para las pantallas de reserva (Server-Sent Events).
+
+Los servicios que cambian el estado de un turno llaman a `publicar_turno()` /
+`publicar_estado()` después de confirmar la escritura; las operaciones en lote
+(generación, bloqueo de un día, vencimiento) publican `publicar_recarga()`
+para que el cliente vuelva a pedir la grilla de la cancha.
+
+`bus_turnos` reparte cada evento a los suscriptores de GET /api/turnos/stream
+(en este proceso). Cada suscriptor tiene una cola acotada: si se llena porque
+el cliente no consume a tiempo, se lo descarta (recibe un evento
+`descartado` y se cierra la conexión; EventSource reconecta solo y el cliente
+debe recargar). Así un consumidor lento nunca frena a los demás ni acumula
+memoria. Publicar sin suscriptores no hace nada.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from models.turno import Turno
+from repositories.turno_repository import TurnoRepository
+
+logger = logging.getLogger(__name__)
+
+# Eventos pendientes por suscriptor antes de descartarlo
+SSE_COLA_TAMANIO = int(os.getenv("SSE_COLA_TAMANIO", "100"))
+
+# Conexiones SSE simultáneas por proceso
+SSE_MAX_SUSCRIPTORES = int(os.getenv("SSE_MAX_SUSCRIPTORES", "500"))
+
+# Comentario de keep-alive para que proxies no corten la conexión
+SSE_KEEPALIVE_SEGUNDOS = float(os.getenv("SSE_KEEPALIVE_SEGUNDOS", "15"))
+
+# Espera sugerida al navegador antes de reconectar (ms)
+SSE_RETRY_MS = 3000
+
+
+class Suscripcion:
+    """Suscriptor del bus: cola acotada en el event loop de su conexión."""
+
+    def __init__(self, canchas: Optional[Set[int]], loop: asyncio.AbstractEventLoop, tamanio: int):
+        self.canchas = canchas  # None = todas
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=tamanio)
+        self.descartada = False
+
+    def acepta(self, evento: Dict[str, Any]) -> bool:
+        id_cancha = evento.get('id_cancha')
+        return self.canchas is None or id_cancha is None or id_cancha in self.canchas
+
+
+class BusEventos:
+    """Pub/sub en memoria: publica desde cualquier hilo y entrega en el loop de cada suscriptor."""
+
+    def __init__(self, tamanio_cola: int = SSE_COLA_TAMANIO, max_suscriptores: int = SSE_MAX_SUSCRIPTORES):
+        self.tamanio_cola = tamanio_cola
+        self.max_suscriptores = max_suscriptores
+        self._suscriptores: List[Suscripcion] = []
+        self._lock = threading.Lock()
+        self._secuencia = 0
+        self._publicados = 0
+        self._descartados = 0
+
+    def suscribir(self, canchas: Optional[Set[int]] = None) -> Optional[Suscripcion]:
+        """
+        Registra un suscriptor (llamar desde el event loop que va a consumir).
+
+        Returns:
+            La suscripción, o None si se alcanzó max_suscriptores
+        """
+        suscripcion = Suscripcion(canchas, asyncio.get_running_loop(), self.tamanio_cola)
+        with self._lock:
+            if len(self._suscriptores) >= self.max_suscriptores:
+                return None
+            self._suscriptores.append(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion: Suscripcion) -> None:
+        with self._lock:
+            if suscripcion in self._suscriptores:
+                self._suscriptores.remove(suscripcion)
+
+    def hay_suscriptores(self) -> bool:
+        return bool(self._suscriptores)
+
+    def publicar(self, evento: Dict[str, Any]) -> None:
+        """Reparte un evento a los suscriptores interesados (no bloquea)."""
+        with self._lock:
+            self._secuencia += 1
+            self._publicados += 1
+            evento = {**evento, 'seq': self._secuencia}
+            destinos = [s for s in self._suscriptores if s.acepta(evento)]
+        for suscripcion in destinos:
+            try:
+                suscripcion.loop.call_soon_threadsafe(self._entregar, suscripcion, evento)
+            except RuntimeError:
+                # El loop de la conexión ya se cerró
+                self.desuscribir(suscripcion)
+
+    def _entregar(self, suscripcion: Suscripcion, evento: Dict[str, Any]) -> None:
+        # Corre en el loop del suscriptor
+        if suscripcion.descartada:
+            return
+        try:
+            suscripcion.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            suscripcion.descartada = True
+            self.desuscribir(suscripcion)
+            with self._lock:
+                self._descartados += 1
+            logger.info("SSE: suscriptor descartado por no consumir (%s eventos pendientes)", suscripcion.cola.qsize())
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'suscriptores': len(self._suscriptores),
+                'eventos_publicados': self._publicados,
+                'suscriptores_descartados': self._descartados,
+            }
+
+
+# Instancia compartida por el proceso
+bus_turnos = BusEventos()
+
+
+def publicar_turno(turno: Turno) -> None:
+    """Publica el estado actual de un turno (hook de los servicios tras escribir)."""
+    if not bus_turnos.hay_suscriptores():
+        return
+    bus_turnos.publicar({
+        'tipo': 'turno',
+        'id_turno': turno.id,
+        'id_cancha': turno.id_cancha,
+        'fecha_hora_inicio': turno.fecha_hora_inicio,
+        'fecha_hora_fin': turno.fecha_hora_fin,
+        'estado': turno.estado,
+    })
+
+
+def publicar_estado(turno_id: int, estado: str) -> None:
+    """Como publicar_turno() cuando solo se conoce el id (lee el turno si hay suscriptores)."""
+    if not bus_turnos.hay_suscriptores():
+        return
+    try:
+        turno = TurnoRepository.obtener_por_id(turno_id)
+    except Exception as e:
+        logger.warning("SSE: no se pudo leer el turno %s para publicarlo: %s", turno_id, e)
+        return
+    if turno is None:
+        bus_turnos.publicar({'tipo': 'turno', 'id_turno': turno_id, 'id_cancha': None, 'estado': estado})
+        return
+    turno.estado = estado
+    publicar_turno(turno)
+
+
+def publicar_recarga(id_cancha: Optional[int] = None, motivo: str = '') -> None:
+    """Avisa que cambiaron varios turnos de una cancha (o de todas): el cliente recarga."""
+    if bus_turnos.hay_suscriptores():
+        bus_turnos.publicar({'tipo': 'recargar', 'id_cancha': id_cancha, 'motivo': motivo})
+
+
+def _formatear(nombre: str, datos: Dict[str, Any], id_evento: Optional[int] = None) -> str:
+    encabezado = f"id: {id_evento}\n" if id_evento is not None else ""
+    return f"{encabezado}event: {nombre}\ndata: {json.dumps(datos, default=str)}\n\n"
+
+
+async def generar_sse(suscripcion: Suscripcion) -> AsyncIterator[str]:
+    """Stream text/event-stream de una suscripción; al terminar la desuscribe."""
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), SSE_KEEPALIVE_SEGUNDOS)
+            except asyncio.TimeoutError:
+                if suscripcion.descartada:
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if suscripcion.descartada:
+                yield _formatear('descartado', {'motivo': 'El cliente no consumió los eventos a tiempo; recargar'})
+                break
+            yield _formatear(evento['tipo'], evento, evento['seq'])
+    finally:
+        bus_turnos.desuscribir(suscripcion)
@@ -0,0 +1,170 @@
+"""Servicios para holds (retenciones temporales) de turnos.
+
+Un hold pasa el turno a 'pendiente_pago' durante un TTL y devuelve un token
+(lease). Con el token se confirma la reserva (turno 'reservado' + pago) o se
+cancela; si vence antes, `jobs.expiracion_holds` devuelve el turno a 'disponible'.
+"""
+
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from models.hold_turno import HoldTurno
+from models.pago import Pago
+from models.turno_servicio import TurnoServicio
+from repositories.hold_turno_repository import HoldTurnoRepository
+from repositories.turno_repository import TurnoRepository
+from repositories.cliente_repository import ClienteRepository
+from database.errores import ConflictoVersionError
+from jobs import gestor_holds
+from services.eventos_turnos import publicar_turno, publicar_estado
+
+# Duración por defecto / máxima de un hold
+HOLD_TTL_SEGUNDOS = int(os.getenv("HOLD_TTL_SEGUNDOS", "600"))
+MAX_HOLD_TTL_SEGUNDOS = 1800
+
+
+def crear_hold(turno_id: int, id_cliente: int, ttl_segundos: Optional[int] = None) -> HoldTurno:
+    """Retiene un turno disponible para un cliente durante `ttl_segundos`.
+    
+    Args:
+        turno_id: ID del turno
+        id_cliente: ID del cliente
+        ttl_segundos: Duración del hold (por defecto HOLD_TTL_SEGUNDOS)
+        
+    Returns:
+        El hold creado, con su token y vencimiento
+        
+    Raises:
+        LookupError: Si el turno no existe
+        ValueError: Si el cliente no existe, el TTL es inválido o el turno no está disponible
+        ConflictoVersionError: Si el turno estaba disponible al leerlo pero otra
+            operación lo tomó antes de retenerlo
+    """
+    ttl = HOLD_TTL_SEGUNDOS if ttl_segundos is None else int(ttl_segundos)
+    if not 0 < ttl <= MAX_HOLD_TTL_SEGUNDOS:
+        raise ValueError(f"El TTL del hold debe estar entre 1 y {MAX_HOLD_TTL_SEGUNDOS} segundos")
+    if not id_cliente or not ClienteRepository.obtener_por_id(id_cliente):
+        raise ValueError(f"El cliente con ID {id_cliente} no existe")
+    turno = TurnoRepository.obtener_por_id(turno_id)
+    if not turno:
+        raise LookupError(f"Turno con ID {turno_id} no encontrado")
+
+    ahora = datetime.now()
+    hold = HoldTurno(
+        id_turno=turno_id,
+        id_cliente=id_cliente,
+        token=secrets.token_urlsafe(24),
+        creado_en=ahora.isoformat(),
+        expira_en=(ahora + timedelta(seconds=ttl)).isoformat(),
+    )
+    hold.id = HoldTurnoRepository.crear(hold)
+    if hold.id is None:
+        if turno.estado == 'disponible':
+            raise ConflictoVersionError('turno', turno_id, turno.version)
+        raise ValueError(f"El turno no está disponible (estado actual: {turno.estado})")
+    gestor_holds.programar(hold.id, datetime.fromisoformat(hold.expira_en))
+    turno.estado = 'pendiente_pago'
+    publicar_turno(turno)
+    return hold
+
+
+def obtener_hold(token: str) -> HoldTurno:
+    """Obtiene un hold por su token.
+    
+    Raises:
+        LookupError: Si el hold no existe
+    """
+    hold = HoldTurnoRepository.obtener_por_token(token)
+    if not hold:
+        raise LookupError("Hold no encontrado")
+    return hold
+
+
+def _validar_activo(hold: HoldTurno) -> None:
+    if hold.estado != 'activo':
+        raise ValueError(f"El hold no está activo (estado actual: {hold.estado})")
+    if datetime.fromisoformat(hold.expira_en) <= datetime.now():
+        raise ValueError("El hold expiró")
+
+
+def _servicios_del_pedido(id_turno: int, servicios: List[Dict[str, Any]]) -> List[TurnoServicio]:
+    """Servicios adicionales del cuerpo de una reserva ({id_servicio, cantidad, precio_unitario})."""
+    resultado = []
+    for servicio_data in servicios:
+        if not isinstance(servicio_data, dict) or 'id_servicio' not in servicio_data \
+                or 'precio_unitario' not in servicio_data:
+            raise ValueError("Cada servicio debe tener 'id_servicio' y 'precio_unitario'")
+        resultado.append(TurnoServicio(
+            id_turno=id_turno,
+            id_servicio=servicio_data['id_servicio'],
+            cantidad=servicio_data.get('cantidad', 1),
+            precio_unitario_congelado=servicio_data['precio_unitario'],
+        ))
+    return resultado
+
+
+def confirmar_hold(token: str, metodo_pago: str = 'tarjeta',
+                   servicios: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Confirma un hold: reserva el turno para el cliente y registra el pago.
+    
+    Args:
+        token: Token del hold
+        metodo_pago: Método de pago
+        servicios: Servicios adicionales [{id_servicio, cantidad, precio_unitario}] (opcional);
+            se guardan en la misma transacción y suman al monto del pago
+    
+    Returns:
+        Diccionario con el hold, el turno reservado y el pago
+        
+    Raises:
+        LookupError: Si el hold no existe
+        ValueError: Si el hold no está activo o expiró, o un servicio es inválido
+    """
+    hold = obtener_hold(token)
+    _validar_activo(hold)
+    turno = TurnoRepository.obtener_por_id(hold.id_turno)
+    adicionales = _servicios_del_pedido(hold.id_turno, servicios or [])
+    monto_servicios = sum(s.precio_unitario_congelado * s.cantidad for s in adicionales)
+
+    # Pago simulado como aprobado (igual que la reserva directa)
+    ahora = datetime.now().isoformat()
+    pago = Pago(
+        id_turno=hold.id_turno,
+        monto_turno=turno.precio_final,
+        monto_servicios=monto_servicios,
+        monto_total=turno.precio_final + monto_servicios,
+        id_cliente=hold.id_cliente,
+        estado='completado',
+        metodo_pago=metodo_pago,
+        id_gateway_externo=f"SIM-HOLD-{hold.id}-{datetime.now().timestamp()}",
+        fecha_creacion=ahora,
+        fecha_completado=ahora,
+    )
+    if not HoldTurnoRepository.confirmar(hold, pago, adicionales):
+        raise ValueError("El hold ya no está vigente")
+
+    hold.estado = 'confirmado'
+    turno = TurnoRepository.obtener_por_id(hold.id_turno)
+    publicar_turno(turno)
+    return {
+        'hold': hold.to_dict(),
+        'turno': turno.to_dict(),
+        'pago': pago.to_dict(),
+    }
+
+
+def cancelar_hold(token: str) -> HoldTurno:
+    """Cancela un hold activo y libera el turno.
+    
+    Raises:
+        LookupError: Si el hold no existe
+        ValueError: Si el hold ya no está activo
+    """
+    hold = obtener_hold(token)
+    if hold.estado != 'activo' or not HoldTurnoRepository.liberar(hold.id, 'cancelado'):
+        raise ValueError(f"El hold no está activo (estado actual: {hold.estado})")
+    hold.estado = 'cancelado'
+    publicar_estado(hold.id_turno, 'disponible')
+    return hold
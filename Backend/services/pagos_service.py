@@ -1,8 +1,12 @@
+import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
 from models.pago import Pago
 from repositories.pago_repository import PagoRepository
+from database.errores import ConflictoVersionError
+
+logger = logging.getLogger(__name__)
 
 
 def crear_pago_turno(
@@ -106,6 +110,8 @@ def confirmar_pago(
         # Eso lo hace registrar_reserva()
         
         return pago
+    except ConflictoVersionError:
+        raise
     except Exception as e:
         raise Exception(f'Error al confirmar pago: {e}')
 
@@ -150,7 +156,7 @@ def procesar_pagos_expirados() -> int:
                 contador += 1
             except Exception as e:
                 # Log error pero continuar con los demás
-                print(f'Error al procesar pago expirado {pago.id}: {e}')
+                logger.error("Error al procesar pago expirado %s: %s", pago.id, e)
         
         return contador
     except Exception as e:
@@ -158,29 +164,29 @@ def procesar_pagos_expirados() -> int:
 
 
 def obtener_pago_por_id(pago_id: int) -> Pago:
-    """Obtiene un pago por su ID"""
-    pago = PagoRepository.obtener_por_id(pago_id)
+    """Obtiene un pago por su ID (incluye los archivados)"""
+    pago = PagoRepository.obtener_por_id(pago_id, historico=True)
     if pago is None:
         raise LookupError(f'Pago con ID {pago_id} no encontrado')
     return pago
 
 
 def obtener_pago_por_turno(id_turno: int) -> Optional[Pago]:
-    """Obtiene el pago asociado a un turno"""
-    return PagoRepository.obtener_por_turno(id_turno)
+    """Obtiene el pago asociado a un turno (incluye los archivados)"""
+    return PagoRepository.obtener_por_turno(id_turno, historico=True)
 
 
 # FUNCIÓN ELIMINADA: obtener_pago_por_inscripcion ya no existe porque se eliminó la tabla Inscripcion
 
 
 def listar_pagos_por_cliente(id_cliente: int) -> List[Pago]:
-    """Lista todos los pagos de un cliente"""
-    return PagoRepository.listar_por_cliente(id_cliente)
+    """Lista todos los pagos de un cliente (incluye los archivados)"""
+    return PagoRepository.listar_por_cliente(id_cliente, historico=True)
 
 
 def listar_todos_pagos() -> List[Pago]:
-    """Lista todos los pagos del sistema (para administradores)"""
-    return PagoRepository.listar_todos()
+    """Lista todos los pagos del sistema (para administradores, incluye los archivados)"""
+    return PagoRepository.listar_todos(historico=True)
 
 
 def crear_pago_manual(
@@ -0,0 +1,254 @@
+"""Servicios para plantillas horarias semanales y generación automática de turnos.
+
+Cada cancha tiene una plantilla por día de la semana (horario de apertura,
+duración y precio de cada turno). `materializar_horizonte` mantiene creados los
+turnos 'disponible' de los próximos N días generando solo la cola que falta.
+"""
+
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from models.turno import Turno
+from models.plantilla_horario import PlantillaHorario
+from models.excepcion_horario import ExcepcionHorario
+from repositories.turno_repository import TurnoRepository
+from repositories.cancha_repository import CanchaRepository
+from repositories.plantilla_horario_repository import PlantillaHorarioRepository
+from repositories.excepcion_horario_repository import ExcepcionHorarioRepository
+from services.turnos_service import descartar_solapados, FORMATO_FECHA_TURNO
+from services.eventos_turnos import publicar_recarga
+from utils import generar_horarios_disponibles, calcular_precio_turno
+
+# Días hacia adelante que se mantienen generados
+HORIZONTE_TURNOS_DIAS = int(os.getenv("HORIZONTE_TURNOS_DIAS", "14"))
+
+# Cada cuánto corre la tarea de generación automática
+INTERVALO_GENERACION_MINUTOS = int(os.getenv("INTERVALO_GENERACION_MINUTOS", "60"))
+
+
+def _validar_plantilla(data: Dict[str, Any]) -> None:
+    """Valida los campos de una plantilla horaria."""
+    if not data.get('id_cancha'):
+        raise ValueError("El campo 'id_cancha' es requerido")
+    if data.get('dia_semana') is None:
+        raise ValueError("El campo 'dia_semana' es requerido")
+    for campo in ('hora_apertura', 'hora_cierre'):
+        if not data.get(campo):
+            raise ValueError(f"El campo '{campo}' es requerido")
+
+    if not CanchaRepository.obtener_por_id(data['id_cancha']):
+        raise LookupError(f"Cancha con ID {data['id_cancha']} no encontrada")
+
+    # Valida el formato de las horas y que entre al menos un turno
+    horarios = generar_horarios_disponibles(
+        date.today().isoformat(), data['hora_apertura'], data['hora_cierre'],
+        int(data.get('duracion_minutos', 60))
+    )
+    if not horarios:
+        raise ValueError("El horario de apertura y cierre no alcanza para ningún turno")
+
+
+def crear_plantilla(data: Dict[str, Any]) -> PlantillaHorario:
+    """Crea una plantilla horaria para un día de la semana de una cancha.
+    
+    Args:
+        data: Diccionario con id_cancha, dia_semana, hora_apertura, hora_cierre,
+            duracion_minutos y precio_turno (opcional)
+            
+    Returns:
+        Instancia de PlantillaHorario creada
+    """
+    _validar_plantilla(data)
+    data = {**data, 'generado_hasta': None}
+    plantilla = PlantillaHorario.from_dict(data)
+    plantilla.id = PlantillaHorarioRepository.crear(plantilla)
+    return plantilla
+
+
+def obtener_plantilla(plantilla_id: int) -> PlantillaHorario:
+    """Obtiene una plantilla por su ID.
+    
+    Raises:
+        LookupError: Si la plantilla no existe
+    """
+    plantilla = PlantillaHorarioRepository.obtener_por_id(plantilla_id)
+    if not plantilla:
+        raise LookupError(f"Plantilla con ID {plantilla_id} no encontrada")
+    return plantilla
+
+
+def listar_plantillas(id_cancha: Optional[int] = None) -> List[PlantillaHorario]:
+    """Lista plantillas, opcionalmente de una cancha."""
+    return PlantillaHorarioRepository.listar(id_cancha=id_cancha)
+
+
+def actualizar_plantilla(plantilla_id: int, data: Dict[str, Any]) -> PlantillaHorario:
+    """Actualiza una plantilla. Los cambios aplican a los días que aún no se generaron.
+    
+    Args:
+        plantilla_id: ID de la plantilla
+        data: Campos a modificar
+        
+    Returns:
+        Instancia de PlantillaHorario actualizada
+    """
+    existente = obtener_plantilla(plantilla_id)
+    merged = existente.to_dict()
+    merged.update({k: v for k, v in data.items() if k not in ('id', 'generado_hasta')})
+    _validar_plantilla(merged)
+
+    plantilla = PlantillaHorario.from_dict(merged)
+    plantilla.id = plantilla_id
+    if not PlantillaHorarioRepository.actualizar(plantilla):
+        raise Exception("No se pudo actualizar la plantilla")
+    return plantilla
+
+
+def eliminar_plantilla(plantilla_id: int) -> bool:
+    """Elimina una plantilla (los turnos ya generados se conservan)."""
+    obtener_plantilla(plantilla_id)
+    return PlantillaHorarioRepository.eliminar(plantilla_id)
+
+
+def crear_excepcion(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Registra un feriado/día sin turnos y bloquea los turnos disponibles ya generados.
+    
+    Args:
+        data: Diccionario con fecha (YYYY-MM-DD), motivo e id_cancha (opcional, None = todas)
+        
+    Returns:
+        Diccionario con la excepción creada y la cantidad de turnos bloqueados
+    """
+    if not data.get('fecha'):
+        raise ValueError("El campo 'fecha' es requerido")
+    try:
+        fecha = date.fromisoformat(str(data['fecha'])).isoformat()
+    except ValueError:
+        raise ValueError("Formato de fecha inválido. Usa YYYY-MM-DD")
+
+    id_cancha = data.get('id_cancha')
+    if id_cancha is not None and not CanchaRepository.obtener_por_id(id_cancha):
+        raise LookupError(f"Cancha con ID {id_cancha} no encontrada")
+
+    excepcion = ExcepcionHorario(id_cancha=id_cancha, fecha=fecha, motivo=data.get('motivo'))
+    excepcion.id = ExcepcionHorarioRepository.crear(excepcion)
+
+    bloqueados = TurnoRepository.bloquear_disponibles_en_fecha(
+        fecha, excepcion.motivo or 'Feriado', id_cancha=id_cancha
+    )
+    if bloqueados:
+        publicar_recarga(id_cancha, motivo='bloqueo')
+    return {'excepcion': excepcion.to_dict(), 'turnos_bloqueados': bloqueados}
+
+
+def listar_excepciones(fecha_desde: str, fecha_hasta: str) -> List[ExcepcionHorario]:
+    """Lista las excepciones en un rango de fechas."""
+    return ExcepcionHorarioRepository.listar_en_rango(fecha_desde, fecha_hasta)
+
+
+def eliminar_excepcion(excepcion_id: int) -> bool:
+    """Elimina una excepción (no desbloquea los turnos ya bloqueados)."""
+    if not ExcepcionHorarioRepository.obtener_por_id(excepcion_id):
+        raise LookupError(f"Excepción con ID {excepcion_id} no encontrada")
+    return ExcepcionHorarioRepository.eliminar(excepcion_id)
+
+
+def materializar_horizonte(dias: Optional[int] = None) -> Dict[str, Any]:
+    """Genera los turnos que faltan para cubrir los próximos `dias` días según las plantillas.
+    
+    Es incremental: cada plantilla recuerda hasta qué fecha se generó (`generado_hasta`)
+    y solo se procesa la cola nueva. Es idempotente: los turnos se insertan con
+    INSERT OR IGNORE sobre el índice único (id_cancha, fecha_hora_inicio).
+    
+    Args:
+        dias: Tamaño del horizonte en días (por defecto HORIZONTE_TURNOS_DIAS)
+        
+    Returns:
+        Diccionario con la cantidad de turnos creados y plantillas procesadas
+    """
+    dias = HORIZONTE_TURNOS_DIAS if dias is None else dias
+    if dias <= 0:
+        raise ValueError("El horizonte debe ser de al menos 1 día")
+
+    hoy = date.today()
+    limite = hoy + timedelta(days=dias)  # exclusivo
+    ahora = datetime.now()
+
+    plantillas = PlantillaHorarioRepository.listar(solo_activas=True)
+    pendientes = [
+        p for p in plantillas
+        if not p.generado_hasta or date.fromisoformat(p.generado_hasta) < limite - timedelta(days=1)
+    ]
+    if not pendientes:
+        return {'creados': 0, 'plantillas_procesadas': 0}
+
+    canchas = {c.id: c for c in CanchaRepository.listar_todas()}
+    excepciones = ExcepcionHorarioRepository.listar_en_rango(hoy.isoformat(), limite.isoformat())
+    feriados = {(e.id_cancha, e.fecha) for e in excepciones}
+
+    por_cancha: Dict[int, List[PlantillaHorario]] = defaultdict(list)
+    for plantilla in pendientes:
+        cancha = canchas.get(plantilla.id_cancha)
+        if cancha and cancha.activa:
+            por_cancha[plantilla.id_cancha].append(plantilla)
+
+    nuevos: List[Turno] = []
+    avances = []
+    for id_cancha, plantillas_cancha in por_cancha.items():
+        cancha = canchas[id_cancha]
+        candidatos = []
+        for plantilla in plantillas_cancha:
+            desde = hoy
+            if plantilla.generado_hasta:
+                desde = max(hoy, date.fromisoformat(plantilla.generado_hasta) + timedelta(days=1))
+
+            precio = plantilla.precio_turno
+            if precio is None:
+                precio = calcular_precio_turno(cancha.precio_hora or 0.0, plantilla.duracion_minutos / 60)
+
+            # Primer día de la semana correspondiente a partir de 'desde'
+            dia = desde + timedelta(days=(plantilla.dia_semana - desde.weekday()) % 7)
+            while dia < limite:
+                fecha = dia.isoformat()
+                if (None, fecha) not in feriados and (id_cancha, fecha) not in feriados:
+                    for inicio, fin in generar_horarios_disponibles(
+                        fecha, plantilla.hora_apertura, plantilla.hora_cierre,
+                        plantilla.duracion_minutos, FORMATO_FECHA_TURNO
+                    ):
+                        inicio_dt = datetime.fromisoformat(inicio)
+                        if inicio_dt >= ahora:
+                            candidatos.append((inicio_dt, datetime.fromisoformat(fin), precio))
+                dia += timedelta(days=7)
+
+            avances.append((plantilla.id, (limite - timedelta(days=1)).isoformat()))
+
+        # Si dos plantillas del mismo día se pisan, gana la que empieza primero
+        candidatos.sort(key=lambda c: c[0])
+        sin_pisarse = []
+        for inicio, fin, precio in candidatos:
+            if not sin_pisarse or inicio >= sin_pisarse[-1][1]:
+                sin_pisarse.append((inicio, fin, precio))
+        precios = {inicio: precio for inicio, _, precio in sin_pisarse}
+        libres = descartar_solapados(id_cancha, [(inicio, fin) for inicio, fin, _ in sin_pisarse])
+        nuevos.extend(
+            Turno(
+                id_cancha=id_cancha,
+                fecha_hora_inicio=inicio.strftime(FORMATO_FECHA_TURNO),
+                fecha_hora_fin=fin.strftime(FORMATO_FECHA_TURNO),
+                estado='disponible',
+                precio_final=precios[inicio],
+                reserva_created_at=None,
+            )
+            for inicio, fin in libres
+        )
+
+    # Vuelve a verificar el solapamiento en el INSERT (otro proceso pudo crear turnos en el medio)
+    insertados = TurnoRepository.crear_lote_libres(nuevos)
+    creados = sum(insertados.values())
+    for id_cancha, cantidad in insertados.items():
+        if cantidad:
+            publicar_recarga(id_cancha, motivo='generacion')
+    PlantillaHorarioRepository.actualizar_generado_hasta(avances)
+    return {'creados': creados, 'plantillas_procesadas': len(avances)}
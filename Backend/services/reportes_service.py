@@ -1,20 +1,31 @@
 """
 Servicio de reportes para estadísticas y análisis del sistema.
+
+Cada reporte corre dentro de un snapshot de lectura (database.lectura): todas
+sus consultas ven el mismo estado de la base y no compiten con las escrituras.
+Con REPORTES_EN_REPLICA=1 los reportes leen de la réplica (database.replica).
+Los reportes incluyen los turnos archivados (database.archivo) cuando su
+rango de fechas llega al archivo.
+
+Canchas, clientes y totales de servicios se leen una vez por reporte y se
+cruzan en memoria: una consulta por turno es un N+1 (ver api.presupuesto_sql).
 """
 
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from repositories.turno_repository import TurnoRepository
 from repositories.cancha_repository import CanchaRepository
 from repositories.cliente_repository import ClienteRepository
 from repositories.pago_repository import PagoRepository
 from repositories.turno_servicio_repository import TurnoXServicioRepository
+from database.lectura import en_snapshot
 
 
 class ReportesService:
     """Servicio para generar reportes y estadísticas"""
 
     @staticmethod
+    @en_snapshot(replica=True)
     def listado_reservas_por_cliente(id_cliente: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Lista todas las reservas agrupadas por cliente.
@@ -30,12 +41,17 @@ class ReportesService:
         )
         turnos_completados = TurnoRepository.obtener_todos_filtrados(
             estado='completado',
-            id_cliente=id_cliente
+            id_cliente=id_cliente,
+            historico=True
         )
         
         # Combinar ambas listas
         turnos = turnos_reservados + turnos_completados
         
+        canchas = {c.id: c for c in CanchaRepository.listar_todas()}
+        clientes = {c.id: c for c in ClienteRepository.listar_todos()}
+        totales_servicios = TurnoXServicioRepository.totales_por_turno(historico=True)
+        
         # Agrupar por cliente
         reservas_por_cliente: Dict[int, List[Dict[str, Any]]] = {}
         
@@ -45,11 +61,11 @@ class ReportesService:
                     reservas_por_cliente[turno.id_cliente] = []
                 
                 # Obtener información de la cancha
-                cancha = CanchaRepository.obtener_por_id(turno.id_cancha)
+                cancha = canchas.get(turno.id_cancha)
                 cancha_nombre = cancha.nombre if cancha else f"Cancha {turno.id_cancha}"
                 
-                # Calcular total de servicios adicionales
-                monto_servicios = TurnoXServicioRepository.calcular_total_servicios(turno.id)
+                # Total de servicios adicionales
+                monto_servicios = totales_servicios.get(turno.id, 0.0)
                 total = turno.precio_final + monto_servicios
                 
                 reservas_por_cliente[turno.id_cliente].append({
@@ -66,7 +82,7 @@ class ReportesService:
         # Construir resultado con información del cliente
         resultado = []
         for id_cliente, reservas in reservas_por_cliente.items():
-            cliente = ClienteRepository.obtener_por_id(id_cliente)
+            cliente = clientes.get(id_cliente)
             if cliente:
                 # Calcular totales
                 total_gastado = sum(r['total'] for r in reservas)
@@ -86,6 +102,7 @@ class ReportesService:
         return sorted(resultado, key=lambda x: x['cantidad_reservas'], reverse=True)
 
     @staticmethod
+    @en_snapshot(replica=True)
     def reservas_por_cancha_periodo(
         fecha_inicio: str,
         fecha_fin: str,
@@ -102,31 +119,30 @@ class ReportesService:
         Returns:
             Lista de diccionarios con reservas agrupadas por cancha
         """
-        # Obtener todos los turnos reservados y completados
+        # Rango [fecha_inicio, fecha_fin] inclusive, filtrado en la consulta
+        desde = datetime.fromisoformat(fecha_inicio).date().isoformat()
+        hasta = (datetime.fromisoformat(fecha_fin).date() + timedelta(days=1)).isoformat()
+
+        # Obtener los turnos reservados y completados del período
         turnos_reservados = TurnoRepository.obtener_todos_filtrados(
             estado='reservado',
-            id_cancha=id_cancha
+            id_cancha=id_cancha,
+            desde=desde,
+            hasta=hasta
         )
         turnos_completados = TurnoRepository.obtener_todos_filtrados(
             estado='completado',
-            id_cancha=id_cancha
+            id_cancha=id_cancha,
+            desde=desde,
+            hasta=hasta,
+            historico=True
         )
         
         # Combinar ambas listas
-        turnos = turnos_reservados + turnos_completados
-        
-        # Filtrar por fecha
-        fecha_inicio_dt = datetime.fromisoformat(fecha_inicio)
-        fecha_fin_dt = datetime.fromisoformat(fecha_fin)
+        turnos_filtrados = turnos_reservados + turnos_completados
         
-        turnos_filtrados = []
-        for turno in turnos:
-            try:
-                turno_fecha = datetime.fromisoformat(turno.fecha_hora_inicio.split()[0])
-                if fecha_inicio_dt <= turno_fecha <= fecha_fin_dt:
-                    turnos_filtrados.append(turno)
-            except:
-                continue
+        canchas = {c.id: c for c in CanchaRepository.listar_todas()}
+        clientes = {c.id: c for c in ClienteRepository.listar_todos()}
         
         # Agrupar por cancha
         reservas_por_cancha: Dict[int, List[Dict[str, Any]]] = {}
@@ -138,7 +154,7 @@ class ReportesService:
             # Obtener información del cliente
             cliente_nombre = "Sin información"
             if turno.id_cliente:
-                cliente = ClienteRepository.obtener_por_id(turno.id_cliente)
+                cliente = clientes.get(turno.id_cliente)
                 if cliente:
                     cliente_nombre = f"{cliente.nombre} {cliente.apellido or ''}".strip()
             
@@ -153,7 +169,7 @@ class ReportesService:
         # Construir resultado con información de la cancha
         resultado = []
         for id_cancha, reservas in reservas_por_cancha.items():
-            cancha = CanchaRepository.obtener_por_id(id_cancha)
+            cancha = canchas.get(id_cancha)
             if cancha:
                 ingresos_totales = sum(r['precio_final'] for r in reservas)
                 resultado.append({
@@ -168,6 +184,7 @@ class ReportesService:
         return sorted(resultado, key=lambda x: x['cantidad_reservas'], reverse=True)
 
     @staticmethod
+    @en_snapshot(replica=True)
     def canchas_mas_utilizadas(limite: int = 10) -> List[Dict[str, Any]]:
         """
         Retorna las canchas más utilizadas ordenadas por cantidad de reservas.
@@ -180,7 +197,7 @@ class ReportesService:
         """
         # Obtener todas las reservas (reservadas y completadas)
         turnos_reservados = TurnoRepository.obtener_todos_filtrados(estado='reservado')
-        turnos_completados = TurnoRepository.obtener_todos_filtrados(estado='completado')
+        turnos_completados = TurnoRepository.obtener_todos_filtrados(estado='completado', historico=True)
         todos_turnos = turnos_reservados + turnos_completados
         
         # Contar reservas por cancha
@@ -192,9 +209,10 @@ class ReportesService:
             ingresos_por_cancha[turno.id_cancha] = ingresos_por_cancha.get(turno.id_cancha, 0) + turno.precio_final
         
         # Construir resultado con información de la cancha
+        canchas = {c.id: c for c in CanchaRepository.listar_todas()}
         resultado = []
         for id_cancha, cantidad in conteo_por_cancha.items():
-            cancha = CanchaRepository.obtener_por_id(id_cancha)
+            cancha = canchas.get(id_cancha)
             if cancha:
                 resultado.append({
                     'id_cancha': id_cancha,
@@ -211,6 +229,7 @@ class ReportesService:
         return resultado_ordenado[:limite]
 
     @staticmethod
+    @en_snapshot(replica=True)
     def utilizacion_mensual_canchas(anio: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Retorna estadísticas de utilización mensual de canchas.
@@ -225,22 +244,16 @@ class ReportesService:
         if anio is None:
             anio = datetime.now().year
         
-        # Obtener todas las reservas del año (reservadas y completadas)
-        turnos_reservados = TurnoRepository.obtener_todos_filtrados(estado='reservado')
-        turnos_completados = TurnoRepository.obtener_todos_filtrados(estado='completado')
+        # Obtener las reservas del año (reservadas y completadas), filtradas en la consulta
+        desde, hasta = f"{anio:04d}-01-01", f"{anio + 1:04d}-01-01"
+        turnos_reservados = TurnoRepository.obtener_todos_filtrados(estado='reservado', desde=desde, hasta=hasta)
+        turnos_completados = TurnoRepository.obtener_todos_filtrados(
+            estado='completado', desde=desde, hasta=hasta, historico=True
+        )
         
         # Combinar ambas listas
-        todos_turnos = turnos_reservados + turnos_completados
-        
-        # Filtrar por año
-        turnos_anio = []
-        for turno in todos_turnos:
-            try:
-                fecha_turno = datetime.fromisoformat(turno.fecha_hora_inicio)
-                if fecha_turno.year == anio:
-                    turnos_anio.append(turno)
-            except:
-                continue
+        turnos_anio = turnos_reservados + turnos_completados
+        totales_servicios = TurnoXServicioRepository.totales_por_turno(historico=True)
         
         # Estructura: {mes: {id_cancha: cantidad}}
         utilizacion: Dict[int, Dict[int, int]] = {}
@@ -259,8 +272,8 @@ class ReportesService:
                     utilizacion[mes][turno.id_cancha] = 0
                     ingresos[mes][turno.id_cancha] = 0
                 
-                # Calcular servicios adicionales
-                monto_servicios = TurnoXServicioRepository.calcular_total_servicios(turno.id)
+                # Servicios adicionales
+                monto_servicios = totales_servicios.get(turno.id, 0.0)
                 total_turno = turno.precio_final + monto_servicios
                 
                 utilizacion[mes][turno.id_cancha] += 1
@@ -311,6 +324,7 @@ class ReportesService:
         return resultado
 
     @staticmethod
+    @en_snapshot(replica=True)
     def resumen_general() -> Dict[str, Any]:
         """
         Retorna un resumen general del sistema con métricas principales.
@@ -322,9 +336,9 @@ class ReportesService:
         todas_canchas = CanchaRepository.listar_todas()
         todos_clientes = ClienteRepository.listar_todos()
         turnos_reservados = TurnoRepository.obtener_todos_filtrados(estado='reservado')
-        turnos_completados = TurnoRepository.obtener_todos_filtrados(estado='completado')
+        turnos_completados = TurnoRepository.obtener_todos_filtrados(estado='completado', historico=True)
         todos_turnos = turnos_reservados + turnos_completados
-        todos_pagos = PagoRepository.listar_todos()
+        todos_pagos = PagoRepository.listar_todos(historico=True)
         
         # Calcular métricas
         total_ingresos = sum(p.monto_total for p in todos_pagos if p.estado == 'completado')
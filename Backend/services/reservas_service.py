@@ -5,12 +5,30 @@ Este servicio maneja específicamente las operaciones de reservas (CU-1 a CU-4):
 registrar, consultar, modificar y cancelar reservas con validaciones de negocio.
 """
 
-from typing import Optional, List
+import secrets
+from typing import Optional, List, Dict, Any
+from models.pago import Pago
 from models.turno import Turno
+from models.turno_servicio import TurnoServicio
 from repositories.turno_repository import TurnoRepository
+from repositories.reserva_repository import ReservaRepository
 from repositories.cliente_repository import ClienteRepository
 from repositories.usuario_repository import UsuarioRepository
-from datetime import datetime
+from repositories.servicio_adicional_repository import ServicioAdicionalRepository
+from repositories.turno_indice import parsear_fecha_turno
+from database.errores import ConflictoVersionError
+from services.eventos_turnos import publicar_turno, publicar_recarga
+from utils import desplazamiento_hora
+from datetime import date, datetime, timedelta
+
+# Rango máximo (en días) de una reserva en serie (una temporada)
+MAX_DIAS_SERIE = 366
+
+# Modos de pago de una serie: un pago por el total o uno por turno
+MODOS_PAGO_SERIE = ('agregado', 'por_turno')
+
+# Cantidad máxima de turnos en un carrito
+MAX_TURNOS_CARRITO = 50
 
 
 class ReservasService:
@@ -19,7 +37,8 @@ class ReservasService:
     @staticmethod
     def _expirar_turnos_pasados() -> None:
         """Marca como no disponibles los turnos disponibles vencidos."""
-        TurnoRepository.marcar_pasados_no_disponible()
+        if TurnoRepository.marcar_pasados_no_disponible():
+            publicar_recarga(motivo='vencimiento')
 
     @staticmethod
     def registrar_reserva(
@@ -77,7 +96,10 @@ class ReservasService:
             if not actualizado_ok:
                 raise Exception("No se pudo actualizar la base de datos (rowcount 0).")
                 
+            publicar_turno(turno_a_reservar)
             return turno_a_reservar
+        except ConflictoVersionError:
+            raise
         except Exception as e:
             raise Exception(f"No se pudo registrar la reserva: {e}")
     
@@ -91,7 +113,7 @@ class ReservasService:
         - Si no pertenece o no está reservado para él -> PermissionError.
         """
         ReservasService._expirar_turnos_pasados()
-        turno = TurnoRepository.obtener_por_id(turno_id)
+        turno = TurnoRepository.obtener_por_id(turno_id, historico=True)
         if not turno:
             raise LookupError(f"El turno con ID {turno_id} no existe.")
 
@@ -126,7 +148,8 @@ class ReservasService:
         turnos = TurnoRepository.obtener_todos_filtrados(
             id_cancha=id_cancha,
             estado=estado,
-            id_cliente=id_cliente
+            id_cliente=id_cliente,
+            historico=True
         )
         return turnos
 
@@ -164,12 +187,15 @@ class ReservasService:
     def modificar_reserva(
         turno_id: int, 
         nuevos_datos: dict,
-        id_usuario_mod: int # Opcional: para auditar quién hizo el cambio
+        id_usuario_mod: int, # Opcional: para auditar quién hizo el cambio
+        version_esperada: Optional[int] = None
     ) -> Turno:
         """
         Modifica los datos de una reserva existente (un turno 'reservado').
         'nuevos_datos' es un diccionario con los campos a cambiar.
         Campos permitidos para modificar: 'id_cliente', 'precio_final'.
+        Si se indica 'version_esperada' (If-Match) y el turno cambió desde
+        entonces, lanza ConflictoVersionError.
         """
 
         # 1. Validar el usuario (quién modifica)
@@ -182,6 +208,9 @@ class ReservasService:
         if not turno_a_modificar:
             raise LookupError(f"El turno con ID {turno_id} no existe.")
 
+        if version_esperada is not None and turno_a_modificar.version != version_esperada:
+            raise ConflictoVersionError('turno', turno_id, version_esperada)
+
         # 3. Validar Lógica de Negocio (Estado)
         if turno_a_modificar.estado != 'reservado':
             raise ValueError(f"Solo se pueden modificar turnos que estén 'reservados' (Estado actual: {turno_a_modificar.estado}).")
@@ -222,6 +251,8 @@ class ReservasService:
         try:
             TurnoRepository.actualizar(turno_a_modificar)
             return turno_a_modificar
+        except ConflictoVersionError:
+            raise
         except Exception as e:
             raise Exception(f"No se pudo modificar la reserva: {e}")
         
@@ -262,6 +293,258 @@ class ReservasService:
         # 5. Persistir el cambio en la base de datos
         try:
             TurnoRepository.actualizar(turno_a_cancelar)
+            publicar_turno(turno_a_cancelar)
             return turno_a_cancelar
+        except ConflictoVersionError:
+            raise
         except Exception as e:
             raise Exception(f"No se pudo cancelar la reserva: {e}")
+
+    @staticmethod
+    def reservar_serie(data: Dict[str, Any], id_usuario_registro: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reserva el mismo horario semanal de una cancha durante un rango de fechas
+        (ej. todos los martes a las 20:00 de la temporada) en una única transacción.
+
+        Args:
+            data: Diccionario con:
+                - id_cancha, id_cliente
+                - dia_semana: 0=lunes ... 6=domingo
+                - hora: Hora de inicio ('HH:MM')
+                - fecha_desde / fecha_hasta: Rango inclusivo (YYYY-MM-DD)
+                - todo_o_nada: Si es True (por defecto) y alguna fecha falla no se reserva ninguna
+                - modo_pago: 'agregado' (un cobro por el total) o 'por_turno' (un cobro por turno)
+                - metodo_pago: Método de pago (opcional, por defecto 'tarjeta')
+            id_usuario_registro: Usuario que registra la reserva (opcional)
+
+        Returns:
+            Diccionario con los turnos reservados, los IDs de pagos (uno por turno,
+            agrupados por id_serie), el monto total y la lista de conflictos
+            (fecha, id_turno, motivo)
+
+        Raises:
+            ValueError: Si los datos son inválidos
+        """
+        for campo in ('id_cancha', 'id_cliente', 'dia_semana', 'hora', 'fecha_desde', 'fecha_hasta'):
+            if data.get(campo) is None:
+                raise ValueError(f"El campo '{campo}' es requerido")
+
+        id_cliente = data['id_cliente']
+        if not ClienteRepository.obtener_por_id(id_cliente):
+            raise ValueError(f"El cliente con ID {id_cliente} no existe.")
+        dia_semana = data['dia_semana']
+        if dia_semana not in range(7):
+            raise ValueError("El día de la semana debe estar entre 0 (lunes) y 6 (domingo)")
+        hora = desplazamiento_hora(str(data['hora']))
+        try:
+            fecha_desde = date.fromisoformat(str(data['fecha_desde']))
+            fecha_hasta = date.fromisoformat(str(data['fecha_hasta']))
+        except ValueError:
+            raise ValueError("Formato de fecha inválido. Usa YYYY-MM-DD")
+        if fecha_hasta < fecha_desde:
+            raise ValueError("La fecha hasta debe ser igual o posterior a la fecha desde")
+        if (fecha_hasta - fecha_desde).days >= MAX_DIAS_SERIE:
+            raise ValueError(f"El rango no puede superar {MAX_DIAS_SERIE} días")
+        modo_pago = data.get('modo_pago', 'agregado')
+        if modo_pago not in MODOS_PAGO_SERIE:
+            raise ValueError(f"Modo de pago inválido. Valores permitidos: {list(MODOS_PAGO_SERIE)}")
+        todo_o_nada = bool(data.get('todo_o_nada', True))
+        metodo_pago = data.get('metodo_pago', 'tarjeta')
+
+        ReservasService._expirar_turnos_pasados()
+
+        # 1. Resolver los turnos de la serie con una sola consulta por rango
+        inicio_rango = datetime.combine(fecha_desde, datetime.min.time())
+        fin_rango = datetime.combine(fecha_hasta + timedelta(days=1), datetime.min.time())
+        turnos_por_fecha: Dict[date, Turno] = {}
+        for turno in TurnoRepository.obtener_en_rango(data['id_cancha'], inicio_rango.isoformat(), fin_rango.isoformat()):
+            try:
+                inicio = parsear_fecha_turno(turno.fecha_hora_inicio)
+            except ValueError:
+                continue
+            if inicio.weekday() == dia_semana and inicio - datetime.combine(inicio.date(), datetime.min.time()) == hora:
+                turnos_por_fecha[inicio.date()] = turno
+
+        # 2. Verificar disponibilidad de cada fecha
+        ahora = datetime.now()
+        conflictos = []
+        candidatos: List[Turno] = []
+        primera = fecha_desde + timedelta(days=(dia_semana - fecha_desde.weekday()) % 7)
+        fechas = [primera + timedelta(weeks=i) for i in range((fecha_hasta - primera).days // 7 + 1)] if primera <= fecha_hasta else []
+        for fecha in fechas:
+            turno = turnos_por_fecha.get(fecha)
+            if turno is None:
+                conflictos.append({'fecha': fecha.isoformat(), 'id_turno': None, 'motivo': 'sin_turno'})
+            elif datetime.combine(fecha, datetime.min.time()) + hora < ahora:
+                conflictos.append({'fecha': fecha.isoformat(), 'id_turno': turno.id, 'motivo': 'pasado'})
+            elif turno.estado != 'disponible':
+                conflictos.append({'fecha': fecha.isoformat(), 'id_turno': turno.id, 'motivo': 'no_disponible', 'estado': turno.estado})
+            else:
+                candidatos.append(turno)
+
+        if not fechas:
+            raise ValueError("No hay fechas para ese día de la semana en el rango indicado")
+        if not candidatos or (todo_o_nada and conflictos):
+            return {'reservados': [], 'pagos': [], 'monto_total': 0.0, 'conflictos': conflictos}
+
+        # 3. Reservar y registrar los pagos en una única transacción
+        precios = {t.id: t.precio_final or 0.0 for t in candidatos}
+        fecha_creacion = ahora.isoformat()
+        id_serie = f"SERIE-{secrets.token_hex(8)}"
+
+        def armar_pagos(reservados: List[int]) -> List[Pago]:
+            # Un pago por turno (Pago.id_turno es único), todos con el mismo id_serie.
+            # 'agregado': un único cobro por el total (misma transacción del gateway);
+            # 'por_turno': un cobro por turno. Pago simulado como aprobado (igual que la reserva individual)
+            return [
+                Pago(
+                    id_turno=turno_id,
+                    monto_turno=precios[turno_id],
+                    monto_servicios=0.0,
+                    monto_total=precios[turno_id],
+                    id_cliente=id_cliente,
+                    id_usuario_registro=id_usuario_registro,
+                    estado='completado',
+                    metodo_pago=metodo_pago,
+                    id_gateway_externo=(
+                        f"SIM-{id_serie}-{ahora.timestamp()}" if modo_pago == 'agregado'
+                        else f"SIM-SERIE-{turno_id}-{ahora.timestamp()}"
+                    ),
+                    fecha_creacion=fecha_creacion,
+                    fecha_completado=fecha_creacion,
+                    id_serie=id_serie,
+                )
+                for turno_id in reservados
+            ]
+
+        reservados, no_disponibles, ids_pagos = ReservaRepository.reservar_lote(
+            [t.id for t in candidatos], id_cliente, armar_pagos, todo_o_nada
+        )
+
+        # Turnos tomados por otra reserva entre la verificación y la transacción
+        fechas_por_id = {t.id: parsear_fecha_turno(t.fecha_hora_inicio).date().isoformat() for t in candidatos}
+        conflictos.extend(
+            {'fecha': fechas_por_id[turno_id], 'id_turno': turno_id, 'motivo': 'no_disponible'}
+            for turno_id in no_disponibles
+        )
+        conflictos.sort(key=lambda c: c['fecha'])
+
+        turnos_reservados = sorted(TurnoRepository.obtener_por_ids(reservados), key=lambda t: t.fecha_hora_inicio)
+        for turno in turnos_reservados:
+            publicar_turno(turno)
+        return {
+            'reservados': [t.to_dict() for t in turnos_reservados],
+            'pagos': ids_pagos,
+            'id_serie': id_serie,
+            'monto_total': sum(precios[turno_id] for turno_id in reservados),
+            'conflictos': conflictos,
+        }
+
+    @staticmethod
+    def reservar_carrito(data: Dict[str, Any], id_usuario_registro: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reserva varios turnos a la vez (ej. las canchas de una fecha de torneo),
+        cada uno con sus servicios adicionales: se reservan todos o ninguno.
+
+        Args:
+            data: Diccionario con:
+                - id_cliente
+                - items: [{"id_turno": 1, "servicios": [{"id_servicio": 1, "cantidad": 2}, ...]}, ...]
+                - metodo_pago: Método de pago (opcional, por defecto 'tarjeta')
+            id_usuario_registro: Usuario que registra la reserva (opcional)
+
+        Returns:
+            Diccionario con los turnos reservados, sus pagos, el monto total y la
+            lista de conflictos (vacía si se reservó todo)
+
+        Raises:
+            ValueError: Si los datos son inválidos
+            LookupError: Si algún servicio no existe
+        """
+        id_cliente = data.get('id_cliente')
+        if not id_cliente:
+            raise ValueError("El campo 'id_cliente' es requerido")
+        if not ClienteRepository.obtener_por_id(id_cliente):
+            raise ValueError(f"El cliente con ID {id_cliente} no existe.")
+        items = data.get('items') or []
+        if not isinstance(items, list) or not items:
+            raise ValueError("El campo 'items' debe ser una lista con al menos un turno")
+        if len(items) > MAX_TURNOS_CARRITO:
+            raise ValueError(f"El carrito no puede tener más de {MAX_TURNOS_CARRITO} turnos")
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError("Cada item debe ser un objeto con 'id_turno'")
+        turno_ids = [item.get('id_turno') for item in items]
+        if not all(isinstance(turno_id, int) and not isinstance(turno_id, bool) and turno_id > 0 for turno_id in turno_ids):
+            raise ValueError("Cada item debe indicar 'id_turno' (un ID entero)")
+        if len(set(turno_ids)) != len(turno_ids):
+            raise ValueError("El carrito tiene turnos repetidos")
+        metodo_pago = data.get('metodo_pago', 'tarjeta')
+
+        # Precios de servicios vigentes (una sola consulta)
+        catalogo = {s.id: s for s in ServicioAdicionalRepository.obtener_todos()}
+        servicios: List[TurnoServicio] = []
+        for item in items:
+            for servicio_data in item.get('servicios') or []:
+                servicio = catalogo.get(servicio_data.get('id_servicio'))
+                if not servicio:
+                    raise LookupError(f"Servicio con ID {servicio_data.get('id_servicio')} no encontrado")
+                if not servicio.activo:
+                    raise ValueError(f"El servicio '{servicio.nombre}' no está activo")
+                cantidad = servicio_data.get('cantidad', 1)
+                if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad <= 0:
+                    raise ValueError(f"La cantidad del servicio '{servicio.nombre}' debe ser un entero mayor a 0")
+                servicios.append(TurnoServicio(
+                    id_turno=item['id_turno'],
+                    id_servicio=servicio.id,
+                    cantidad=cantidad,
+                    precio_unitario_congelado=servicio.precio_actual,
+                ))
+
+        ReservasService._expirar_turnos_pasados()
+        turnos = {t.id: t for t in TurnoRepository.obtener_por_ids(turno_ids)}
+        sin_precio = [turno_id for turno_id in turno_ids if turno_id in turnos and turnos[turno_id].precio_final is None]
+        if sin_precio:
+            raise ValueError(f"Los turnos {sin_precio} no tienen precio definido: no se pueden cobrar")
+
+        # Un pago por turno (Pago.id_turno es único), simulado como aprobado
+        ahora = datetime.now().isoformat()
+        monto_servicios = {turno_id: 0.0 for turno_id in turno_ids}
+        for s in servicios:
+            monto_servicios[s.id_turno] += s.precio_unitario_congelado * s.cantidad
+        pagos = [
+            Pago(
+                id_turno=turno_id,
+                monto_turno=turnos[turno_id].precio_final,
+                monto_servicios=monto_servicios[turno_id],
+                monto_total=turnos[turno_id].precio_final + monto_servicios[turno_id],
+                id_cliente=id_cliente,
+                id_usuario_registro=id_usuario_registro,
+                estado='completado',
+                metodo_pago=metodo_pago,
+                id_gateway_externo=f"SIM-CARRITO-{turno_id}-{datetime.now().timestamp()}",
+                fecha_creacion=ahora,
+                fecha_completado=ahora,
+            )
+            for turno_id in turno_ids if turno_id in turnos
+        ]
+
+        # Verificación previa (evita abrir la transacción si ya se sabe que falla)
+        conflictos = [
+            {'id_turno': turno_id, 'estado': turnos[turno_id].estado if turno_id in turnos else None}
+            for turno_id in turno_ids
+            if turno_id not in turnos or turnos[turno_id].estado != 'disponible'
+        ]
+        if not conflictos:
+            conflictos = ReservaRepository.reservar_carrito(turno_ids, id_cliente, pagos, servicios)
+        if conflictos:
+            return {'reservados': [], 'pagos': [], 'monto_total': 0.0, 'conflictos': conflictos}
+
+        reservados = sorted(TurnoRepository.obtener_por_ids(turno_ids), key=lambda t: t.fecha_hora_inicio)
+        for turno in reservados:
+            publicar_turno(turno)
+        return {
+            'reservados': [t.to_dict() for t in reservados],
+            'pagos': [p.to_dict() for p in pagos],
+            'monto_total': sum(p.monto_total for p in pagos),
+            'conflictos': [],
+        }
@@ -3,13 +3,45 @@
 Este módulo implementa la lógica de negocio para gestionar turnos/reservas.
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timezone
+import hashlib
+import heapq
+import logging
+import math
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 
 from models.turno import Turno
 from repositories.turno_repository import TurnoRepository
+from repositories.turno_indice import indice_turnos, parsear_fecha_turno
 from repositories.turno_servicio_repository import TurnoXServicioRepository
 from repositories.cliente_repository import ClienteRepository
+from repositories.cancha_repository import CanchaRepository
+from repositories.revision_repository import RevisionRepository
+from database.errores import ConflictoVersionError
+from services.eventos_turnos import publicar_turno, publicar_recarga
+from utils import generar_horarios_disponibles, calcular_precio_turno, normalizar_texto, desplazamiento_hora
+
+logger = logging.getLogger(__name__)
+
+# Formato de fecha/hora con el que se guardan los turnos generados
+FORMATO_FECHA_TURNO = '%Y-%m-%dT%H:%M:%S'
+
+# Rango máximo (en días) aceptado por la generación en lote
+MAX_DIAS_GENERACION = 366
+
+# Rango máximo (en días) de la grilla de disponibilidad
+MAX_DIAS_GRILLA = 31
+
+# Columnas de cada celda de la grilla
+COLUMNAS_GRILLA = ['id_turno', 'estado', 'precio_final', 'duracion_minutos']
+
+# Cantidad de resultados por defecto / máxima de la búsqueda de horarios
+LIMITE_BUSQUEDA = 10
+MAX_LIMITE_BUSQUEDA = 100
+
+# Cantidad de alternativas sugeridas por defecto / máxima
+CANTIDAD_ALTERNATIVAS = 5
+MAX_ALTERNATIVAS = 20
 
 
 def validar_turno_disponible(turno_id: int) -> Turno:
@@ -54,7 +86,8 @@ def cambiar_estado_turno(turno_id: int, nuevo_estado: str) -> bool:
 
 def _expirar_turnos_pasados() -> None:
     """Marca como no disponibles los turnos vencidos que sigan en estado disponible."""
-    TurnoRepository.marcar_pasados_no_disponible()
+    if TurnoRepository.marcar_pasados_no_disponible():
+        publicar_recarga(motivo='vencimiento')
 
 
 def _validar_datos_turno(data: Dict[str, Any], para_actualizar: bool = False, turno_id: Optional[int] = None) -> None:
@@ -99,7 +132,7 @@ def _validar_datos_turno(data: Dict[str, Any], para_actualizar: bool = False, tu
 
     # Validar solapamiento de turnos en la misma cancha
     if data.get('id_cancha') and data.get('fecha_hora_inicio') and data.get('fecha_hora_fin'):
-        if TurnoRepository.existe_solapado(
+        if indice_turnos.existe_solapado(
             id_cancha=data['id_cancha'],
             fecha_hora_inicio=data['fecha_hora_inicio'],
             fecha_hora_fin=data['fecha_hora_fin'],
@@ -134,14 +167,183 @@ def crear_turno(data: Dict[str, Any]) -> Turno:
     
     turno_id = TurnoRepository.crear(turno)
     turno.id = turno_id
+    publicar_turno(turno)
     return turno
 
 
-def obtener_turno_por_id(turno_id: int) -> Turno:
+def descartar_solapados(id_cancha: int, candidatos: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Filtra los horarios candidatos de una cancha que se solapan con turnos existentes.
+    
+    Usa el índice de intervalos en memoria (una carga por cancha, O(log n) por candidato).
+    
+    Args:
+        id_cancha: ID de la cancha
+        candidatos: Lista de tuplas (inicio, fin)
+        
+    Returns:
+        Los candidatos que no se solapan con ningún turno existente
+    """
+    return indice_turnos.filtrar_libres(id_cancha, candidatos)
+
+
+def _es_entero(valor: Any) -> bool:
+    """True si el valor es un int de JSON (bool no cuenta, aunque sea subclase de int)."""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def generar_turnos(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Genera turnos en lote para varias canchas en un rango de fechas.
+    
+    Calcula en memoria todos los horarios candidatos, descarta los que se solapan
+    con turnos existentes (una consulta por rango por cancha) y los inserta todos
+    juntos en una única transacción. El INSERT vuelve a verificar el solapamiento:
+    los turnos que otro proceso creó en el medio se cuentan como omitidos.
+    
+    Args:
+        data: Diccionario con:
+            - ids_canchas: Lista de IDs de cancha (los repetidos se ignoran)
+            - fecha_desde / fecha_hasta: Rango de fechas inclusivo (YYYY-MM-DD)
+            - hora_apertura / hora_cierre: Horario de atención ('HH:MM')
+            - duracion_minutos: Duración de cada turno
+            - precio_final: Precio por turno (opcional, por defecto precio_hora de la cancha
+              proporcional a la duración)
+            - dias_semana: Días a generar, 0=lunes ... 6=domingo (opcional, por defecto todos)
+            - dry_run: Si es True no inserta nada, solo informa lo que se crearía
+            
+    Returns:
+        Diccionario con cantidades creadas/omitidas (y los turnos candidatos si es dry_run)
+        
+    Raises:
+        ValueError: Si los datos son inválidos
+        LookupError: Si alguna cancha no existe
+    """
+    ids_canchas = data.get('ids_canchas') or []
+    if not isinstance(ids_canchas, list) or not ids_canchas:
+        raise ValueError("El campo 'ids_canchas' debe ser una lista con al menos una cancha")
+    if any(not _es_entero(id_cancha) for id_cancha in ids_canchas):
+        raise ValueError("Los IDs de 'ids_canchas' deben ser números enteros")
+    # Una cancha repetida generaría dos veces los mismos turnos (violaría idx_turno_cancha_fecha)
+    ids_canchas = list(dict.fromkeys(ids_canchas))
+    for campo in ('fecha_desde', 'fecha_hasta', 'hora_apertura', 'hora_cierre', 'duracion_minutos'):
+        if not data.get(campo):
+            raise ValueError(f"El campo '{campo}' es requerido")
+
+    try:
+        fecha_desde = date.fromisoformat(str(data['fecha_desde']))
+        fecha_hasta = date.fromisoformat(str(data['fecha_hasta']))
+    except ValueError:
+        raise ValueError("Formato de fecha inválido. Usa YYYY-MM-DD")
+    if fecha_hasta < fecha_desde:
+        raise ValueError("La fecha hasta debe ser igual o posterior a la fecha desde")
+    if (fecha_hasta - fecha_desde).days >= MAX_DIAS_GENERACION:
+        raise ValueError(f"El rango no puede superar {MAX_DIAS_GENERACION} días")
+
+    if not _es_entero(data['duracion_minutos']):
+        raise ValueError("La duración del turno debe ser un número entero de minutos")
+    duracion = data['duracion_minutos']
+    if duracion <= 0:
+        raise ValueError("La duración del turno debe ser mayor a 0")
+
+    apertura = desplazamiento_hora(data['hora_apertura'])
+    cierre = desplazamiento_hora(data['hora_cierre'])
+    if apertura >= cierre:
+        raise ValueError("La hora de apertura debe ser anterior a la hora de cierre")
+
+    dias_semana = data.get('dias_semana')
+    if dias_semana is not None and (
+        not isinstance(dias_semana, list) or any(not _es_entero(d) or d not in range(7) for d in dias_semana)
+    ):
+        raise ValueError("Los días de la semana deben ser una lista de enteros entre 0 (lunes) y 6 (domingo)")
+
+    precio_fijo = data.get('precio_final')
+    if precio_fijo is not None:
+        if isinstance(precio_fijo, bool) or not isinstance(precio_fijo, (int, float)) or not math.isfinite(precio_fijo):
+            raise ValueError("El precio del turno debe ser un número")
+        if precio_fijo < 0:
+            raise ValueError("El precio del turno no puede ser negativo")
+
+    dry_run = bool(data.get('dry_run', False))
+
+    # Horarios candidatos de todos los días del rango (iguales para todas las canchas)
+    dias = (fecha_desde + timedelta(days=i) for i in range((fecha_hasta - fecha_desde).days + 1))
+    horarios = []
+    for dia in dias:
+        if dias_semana is not None and dia.weekday() not in dias_semana:
+            continue
+        horarios.extend(generar_horarios_disponibles(
+            dia.isoformat(), data['hora_apertura'], data['hora_cierre'], duracion, FORMATO_FECHA_TURNO
+        ))
+
+    ahora = datetime.now()
+    candidatos = [
+        (datetime.fromisoformat(inicio), datetime.fromisoformat(fin))
+        for inicio, fin in horarios
+    ]
+    futuros = [(inicio, fin) for inicio, fin in candidatos if inicio >= ahora]
+    omitidos_pasados = len(candidatos) - len(futuros)
+
+    nuevos: List[Turno] = []
+    omitidos_solapados = 0
+    por_cancha = []
+
+    for id_cancha in ids_canchas:
+        cancha = CanchaRepository.obtener_por_id(id_cancha)
+        if not cancha:
+            raise LookupError(f"Cancha con ID {id_cancha} no encontrada")
+
+        if precio_fijo is not None:
+            precio = float(precio_fijo)
+        else:
+            precio = calcular_precio_turno(cancha.precio_hora or 0.0, duracion / 60)
+
+        libres = descartar_solapados(id_cancha, futuros)
+        omitidos_solapados += len(futuros) - len(libres)
+        nuevos.extend(
+            Turno(
+                id_cancha=id_cancha,
+                fecha_hora_inicio=inicio.strftime(FORMATO_FECHA_TURNO),
+                fecha_hora_fin=fin.strftime(FORMATO_FECHA_TURNO),
+                estado='disponible',
+                precio_final=precio,
+                id_usuario_registro=data.get('id_usuario_registro'),
+                reserva_created_at=None,
+            )
+            for inicio, fin in libres
+        )
+        por_cancha.append({'id_cancha': id_cancha, 'creados': len(libres)})
+
+    resultado: Dict[str, Any] = {
+        'dry_run': dry_run,
+        'creados': len(nuevos),
+        'omitidos': omitidos_solapados + omitidos_pasados * len(ids_canchas),
+        'omitidos_solapados': omitidos_solapados,
+        'omitidos_pasados': omitidos_pasados * len(ids_canchas),
+        'por_cancha': por_cancha,
+    }
+
+    if dry_run:
+        resultado['turnos'] = [t.to_dict() for t in nuevos]
+        return resultado
+
+    insertados = TurnoRepository.crear_lote_libres(nuevos)
+    resultado['creados'] = sum(insertados.values())
+    for cancha in por_cancha:
+        # Los que no se insertaron chocaron con un turno creado después de descartar_solapados
+        creados = insertados.get(cancha['id_cancha'], 0)
+        resultado['omitidos_solapados'] += cancha['creados'] - creados
+        resultado['omitidos'] += cancha['creados'] - creados
+        cancha['creados'] = creados
+        if creados:
+            publicar_recarga(cancha['id_cancha'], motivo='generacion')
+    return resultado
+
+
+def obtener_turno_por_id(turno_id: int, historico: bool = False) -> Turno:
     """Obtiene un turno por su ID.
     
     Args:
         turno_id: ID del turno
+        historico: Buscar también en el archivo (solo para consultas, no para modificarlo)
         
     Returns:
         Instancia de Turno
@@ -150,7 +352,7 @@ def obtener_turno_por_id(turno_id: int) -> Turno:
         LookupError: Si el turno no existe
     """
     _expirar_turnos_pasados()
-    turno = TurnoRepository.obtener_por_id(turno_id)
+    turno = TurnoRepository.obtener_por_id(turno_id, historico=historico)
     if not turno:
         raise LookupError(f"Turno con ID {turno_id} no encontrado")
     return turno
@@ -186,46 +388,53 @@ def listar_turnos_por_cliente_con_detalle(id_cliente: int) -> List[Dict[str, Any
     from repositories.pago_repository import PagoRepository
     
     _expirar_turnos_pasados()
-    turnos = TurnoRepository.obtener_por_cliente(id_cliente)
+    turnos = TurnoRepository.obtener_por_cliente(id_cliente, historico=True)
+    ids = [turno.id for turno in turnos if turno.id]
+    
+    # Pagos y servicios de todos los turnos en una consulta cada uno (no una por turno)
+    try:
+        pagos = PagoRepository.obtener_por_turnos(ids, historico=True)
+    except Exception as e:
+        logger.warning("Error obteniendo pagos de los turnos del cliente %s: %s", id_cliente, e)
+        pagos = {}
+    try:
+        servicios_por_turno = TurnoXServicioRepository.listar_por_turnos(ids, historico=True)
+    except Exception as e:
+        logger.warning("Error obteniendo servicios de los turnos del cliente %s: %s", id_cliente, e)
+        servicios_por_turno = {}
     
     resultado = []
     for turno in turnos:
         turno_dict = turno.to_dict()
         
-        # Obtener pago asociado
+        # Pago asociado
         if turno.id:
-            try:
-                pago = PagoRepository.obtener_por_turno(turno.id)
-                if pago:
-                    turno_dict['pago'] = {
-                        'id': pago.id,
-                        'monto_turno': pago.monto_turno,
-                        'monto_servicios': pago.monto_servicios,
-                        'monto_total': pago.monto_total,
-                        'estado': pago.estado,
-                        'metodo_pago': pago.metodo_pago,
-                        'fecha_creacion': pago.fecha_creacion,
-                        'fecha_completado': pago.fecha_completado
-                    }
-                else:
-                    print(f"DEBUG: No hay pago para turno {turno.id}")
-            except Exception as e:
-                print(f"DEBUG: Error obteniendo pago para turno {turno.id}: {e}")
+            pago = pagos.get(turno.id)
+            if pago:
+                turno_dict['pago'] = {
+                    'id': pago.id,
+                    'monto_turno': pago.monto_turno,
+                    'monto_servicios': pago.monto_servicios,
+                    'monto_total': pago.monto_total,
+                    'estado': pago.estado,
+                    'metodo_pago': pago.metodo_pago,
+                    'fecha_creacion': pago.fecha_creacion,
+                    'fecha_completado': pago.fecha_completado
+                }
+            else:
+                logger.debug("No hay pago para turno %s", turno.id)
             
-            # Obtener servicios adicionales
-            try:
-                servicios = TurnoXServicioRepository.listar_por_turno(turno.id)
-                if servicios:
-                    turno_dict['servicios'] = [
-                        {
-                            'id_servicio': s.id_servicio,
-                            'cantidad': s.cantidad,
-                            'precio_unitario': s.precio_unitario_congelado
-                        }
-                        for s in servicios
-                    ]
-            except Exception as e:
-                print(f"DEBUG: Error obteniendo servicios para turno {turno.id}: {e}")
+            # Servicios adicionales
+            servicios = servicios_por_turno.get(turno.id)
+            if servicios:
+                turno_dict['servicios'] = [
+                    {
+                        'id_servicio': s.id_servicio,
+                        'cantidad': s.cantidad,
+                        'precio_unitario': s.precio_unitario_congelado
+                    }
+                    for s in servicios
+                ]
         
         resultado.append(turno_dict)
     
@@ -247,20 +456,285 @@ def buscar_disponibles(id_cancha: int, fecha_inicio: str, fecha_fin: str) -> Lis
     return [t for t in turnos if fecha_inicio <= t.fecha_hora_inicio <= fecha_fin]
 
 
-def actualizar_turno(turno_id: int, data: Dict[str, Any]) -> Turno:
+def _resolver_rango(desde: Optional[str], hasta: Optional[str], max_dias: int = MAX_DIAS_GRILLA) -> Tuple[str, str]:
+    """Resuelve un rango [desde, hasta) de consulta. Una fecha sin hora en 'hasta' incluye ese día."""
+    try:
+        inicio = datetime.fromisoformat(desde) if desde else datetime.combine(date.today(), datetime.min.time())
+        if hasta:
+            fin = datetime.fromisoformat(hasta)
+            if len(hasta) == 10:
+                fin += timedelta(days=1)
+        else:
+            fin = inicio + timedelta(days=1)
+    except ValueError:
+        raise ValueError("Fechas inválidas. Usa el formato YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS")
+
+    if fin <= inicio:
+        raise ValueError("'hasta' debe ser posterior a 'desde'")
+    if fin - inicio > timedelta(days=max_dias):
+        raise ValueError(f"El rango no puede superar {max_dias} días")
+    return inicio.strftime(FORMATO_FECHA_TURNO), fin.strftime(FORMATO_FECHA_TURNO)
+
+
+def etag_grilla(desde: Optional[str] = None, hasta: Optional[str] = None,
+                deporte: Optional[str] = None) -> Optional[str]:
+    """Calcula el ETag de la grilla sin armarla.
+    
+    Se deriva de la revisión de las tablas Turno y Cancha (mantenida por triggers)
+    y del rango resuelto, así que cambia ante cualquier escritura de turnos.
+    
+    Returns:
+        El ETag, o None si la BD no tiene la tabla Revision
+    """
+    inicio, fin = _resolver_rango(desde, hasta)
+    _expirar_turnos_pasados()
+    revision = RevisionRepository.obtener(['Turno', 'Cancha'])
+    if revision is None:
+        return None
+    clave = f"{inicio}|{fin}|{normalizar_texto(deporte)}"
+    return f'"grilla-{revision["Turno"]}.{revision["Cancha"]}-{hashlib.sha1(clave.encode()).hexdigest()[:12]}"'
+
+
+def obtener_grilla(desde: Optional[str] = None, hasta: Optional[str] = None,
+                   deporte: Optional[str] = None) -> Dict[str, Any]:
+    """Arma la grilla de disponibilidad (canchas × horarios) para el calendario.
+    
+    Los turnos se leen con una única consulta por rango y se codifican como
+    arreglos: cada fila de 'celdas' corresponde a una cancha y cada posición
+    a un horario; la celda es None o [id_turno, índice en 'estados', precio, duración].
+    
+    Args:
+        desde: Fecha/hora inicial (ISO). Por defecto, hoy a las 00:00
+        hasta: Fecha/hora final, exclusiva (ISO). Por defecto, un día después de 'desde'
+        deporte: Filtra por tipo de deporte (sin distinguir tildes ni mayúsculas)
+        
+    Returns:
+        Diccionario con desde, hasta, canchas, horarios, estados, columnas y celdas
+        
+    Raises:
+        ValueError: Si el rango es inválido o demasiado amplio
+    """
+    inicio, fin = _resolver_rango(desde, hasta)
+    _expirar_turnos_pasados()
+
+    canchas = [
+        c for c in CanchaRepository.listar_todas()
+        if c.activa and (not deporte or normalizar_texto(c.tipo_deporte) == normalizar_texto(deporte))
+    ]
+    canchas.sort(key=lambda c: c.id)
+    filas = TurnoRepository.obtener_grilla([c.id for c in canchas], inicio, fin)
+
+    # Las filas vienen ordenadas por inicio: los horarios salen ya ordenados
+    horarios: List[str] = []
+    posicion_horario: Dict[str, int] = {}
+    estados: List[str] = []
+    posicion_estado: Dict[str, int] = {}
+    for _, _, fecha_inicio, _, estado, _ in filas:
+        if fecha_inicio not in posicion_horario:
+            posicion_horario[fecha_inicio] = len(horarios)
+            horarios.append(fecha_inicio)
+        if estado not in posicion_estado:
+            posicion_estado[estado] = len(estados)
+            estados.append(estado)
+
+    posicion_cancha = {c.id: i for i, c in enumerate(canchas)}
+    celdas: List[List[Optional[list]]] = [[None] * len(horarios) for _ in canchas]
+    for turno_id, id_cancha, fecha_inicio, fecha_fin, estado, precio in filas:
+        try:
+            duracion = int((parsear_fecha_turno(fecha_fin) - parsear_fecha_turno(fecha_inicio)).total_seconds() // 60)
+        except ValueError:
+            duracion = None
+        celdas[posicion_cancha[id_cancha]][posicion_horario[fecha_inicio]] = [
+            turno_id, posicion_estado[estado], precio, duracion
+        ]
+
+    return {
+        'desde': inicio,
+        'hasta': fin,
+        'canchas': [[c.id, c.nombre, c.tipo_deporte] for c in canchas],
+        'horarios': horarios,
+        'estados': estados,
+        'columnas': COLUMNAS_GRILLA,
+        'celdas': celdas,
+    }
+
+
+def buscar_horarios(deporte: Optional[str] = None, desde: Optional[str] = None, hasta: Optional[str] = None,
+                    hora_desde: Optional[str] = None, hora_hasta: Optional[str] = None,
+                    duracion_minutos: int = 60, precio_max: Optional[float] = None,
+                    limite: int = LIMITE_BUSQUEDA) -> List[Dict[str, Any]]:
+    """Busca horarios libres en todas las canchas activas que cumplan las restricciones.
+    
+    Lee los turnos disponibles con una única consulta (agrupados por cancha y
+    ordenados por inicio) y en una sola pasada une turnos contiguos cuando la
+    duración pedida abarca varios: para cada turno inicial se toma la cadena
+    contigua más corta que cubra la duración.
+    
+    Args:
+        deporte: Tipo de deporte (sin distinguir tildes ni mayúsculas)
+        desde / hasta: Rango de fechas (ISO); una fecha sola en 'hasta' incluye ese día
+        hora_desde / hora_hasta: Franja horaria diaria ('HH:MM'), por defecto todo el día
+        duracion_minutos: Duración buscada
+        precio_max: Precio total máximo (suma de los turnos unidos)
+        limite: Cantidad máxima de resultados
+        
+    Returns:
+        Los primeros resultados ordenados por inicio y precio, cada uno con la cancha,
+        el rango, el precio total y los IDs de los turnos que lo componen
+        
+    Raises:
+        ValueError: Si algún filtro es inválido
+    """
+    inicio_rango, fin_rango = _resolver_rango(desde, hasta)
+    franja_desde = desplazamiento_hora(hora_desde or 0)
+    franja_hasta = desplazamiento_hora(hora_hasta or 24)
+    if franja_hasta <= franja_desde:
+        raise ValueError("'hora_hasta' debe ser posterior a 'hora_desde'")
+    if duracion_minutos <= 0:
+        raise ValueError("La duración debe ser mayor a 0")
+    if precio_max is not None and precio_max < 0:
+        raise ValueError("El precio máximo no puede ser negativo")
+    if not 0 < limite <= MAX_LIMITE_BUSQUEDA:
+        raise ValueError(f"El límite debe estar entre 1 y {MAX_LIMITE_BUSQUEDA}")
+    duracion = timedelta(minutes=duracion_minutos)
+
+    _expirar_turnos_pasados()
+    canchas = {
+        c.id: c for c in CanchaRepository.listar_todas()
+        if c.activa and (not deporte or normalizar_texto(c.tipo_deporte) == normalizar_texto(deporte))
+    }
+    filas = TurnoRepository.obtener_disponibles_en_rango(sorted(canchas), inicio_rango, fin_rango)
+
+    # Cadena actual de turnos contiguos: (id, inicio, fin, precio, id_cancha)
+    cadena: List[Tuple[int, datetime, datetime, float, int]] = []
+    resultados = []  # heap de máximos (claves negadas) con los `limite` mejores
+
+    for turno_id, id_cancha, fecha_inicio, fecha_fin, precio in filas:
+        try:
+            inicio, fin = parsear_fecha_turno(fecha_inicio), parsear_fecha_turno(fecha_fin)
+        except ValueError:
+            cadena = []
+            continue
+        medianoche = datetime.combine(inicio.date(), datetime.min.time())
+        if inicio < medianoche + franja_desde or fin > medianoche + franja_hasta:
+            cadena = []
+            continue
+        if cadena and (cadena[-1][4] != id_cancha or cadena[-1][2] != inicio):
+            cadena = []
+        cadena.append((turno_id, inicio, fin, precio or 0, id_cancha))
+
+        # Cada turno inicial cuya cadena recién alcanza la duración genera un resultado
+        while cadena and cadena[-1][2] - cadena[0][1] >= duracion:
+            tramo = cadena[:next(i for i, t in enumerate(cadena) if t[2] - cadena[0][1] >= duracion) + 1]
+            cadena.pop(0)
+            precio_total = sum(t[3] for t in tramo)
+            if precio_max is not None and precio_total > precio_max:
+                continue
+            clave = (-tramo[0][1].timestamp(), -precio_total, -id_cancha)
+            if len(resultados) == limite and clave <= resultados[0][0]:
+                continue
+            cancha = canchas[id_cancha]
+            resultado = {
+                'id_cancha': id_cancha,
+                'cancha': cancha.nombre,
+                'tipo_deporte': cancha.tipo_deporte,
+                'fecha_hora_inicio': tramo[0][1].strftime(FORMATO_FECHA_TURNO),
+                'fecha_hora_fin': tramo[-1][2].strftime(FORMATO_FECHA_TURNO),
+                'duracion_minutos': int((tramo[-1][2] - tramo[0][1]).total_seconds() // 60),
+                'precio_total': precio_total,
+                'ids_turnos': [t[0] for t in tramo],
+            }
+            if len(resultados) < limite:
+                heapq.heappush(resultados, (clave, resultado))
+            else:
+                heapq.heapreplace(resultados, (clave, resultado))
+
+    return [resultado for _, resultado in sorted(resultados, reverse=True)]
+
+
+def sugerir_alternativas(turno_id: int, k: int = CANTIDAD_ALTERNATIVAS) -> List[Dict[str, Any]]:
+    """Sugiere los k turnos disponibles más cercanos en el tiempo a un turno dado.
+    
+    Considera la misma cancha y las canchas activas del mismo deporte; usa el
+    índice en memoria (bisect sobre los inicios de cada cancha) y confirma el
+    estado de los elegidos contra la BD.
+    
+    Args:
+        turno_id: ID del turno de referencia (normalmente uno que ya no está disponible)
+        k: Cantidad de alternativas
+        
+    Returns:
+        Lista de turnos ordenada por cercanía, con la distancia en minutos y si
+        son de la misma cancha
+        
+    Raises:
+        LookupError: Si el turno no existe
+        ValueError: Si k está fuera de rango
+    """
+    if not 0 < k <= MAX_ALTERNATIVAS:
+        raise ValueError(f"La cantidad de alternativas debe estar entre 1 y {MAX_ALTERNATIVAS}")
+    turno = TurnoRepository.obtener_por_id(turno_id)
+    if not turno:
+        raise LookupError(f"Turno con ID {turno_id} no encontrado")
+    try:
+        referencia = parsear_fecha_turno(turno.fecha_hora_inicio)
+    except ValueError:
+        return []
+
+    canchas = CanchaRepository.listar_todas()
+    cancha_turno = next((c for c in canchas if c.id == turno.id_cancha), None)
+    deporte = normalizar_texto(cancha_turno.tipo_deporte) if cancha_turno else None
+    nombres = {
+        c.id: c.nombre for c in canchas
+        if c.id == turno.id_cancha or (deporte and c.activa and normalizar_texto(c.tipo_deporte) == deporte)
+    }
+
+    # Pedir de más por si el índice tiene algún estado desactualizado (escrituras de otro proceso)
+    cercanos = indice_turnos.disponibles_cercanos(list(nombres), referencia, 2 * k, excluir_id=turno_id)
+    vigentes = {
+        t.id: t for t in TurnoRepository.obtener_por_ids([turno_id_cercano for _, _, _, turno_id_cercano in cercanos])
+        if t.estado == 'disponible'
+    }
+
+    # A igual distancia se prefiere la misma cancha
+    cercanos.sort(key=lambda c: (c[0], c[2] != turno.id_cancha, c[1]))
+    alternativas = []
+    for distancia, _, id_cancha, turno_id_cercano in cercanos:
+        alternativa = vigentes.get(turno_id_cercano)
+        if alternativa is None:
+            continue
+        alternativas.append({
+            **alternativa.to_dict(),
+            'cancha': nombres[id_cancha],
+            'misma_cancha': id_cancha == turno.id_cancha,
+            'distancia_minutos': int(distancia.total_seconds() // 60),
+        })
+        if len(alternativas) == k:
+            break
+    return alternativas
+
+
+def actualizar_turno(turno_id: int, data: Dict[str, Any], version_esperada: Optional[int] = None) -> Turno:
     """Actualiza un turno existente.
     
     Args:
         turno_id: ID del turno a actualizar
         data: Datos a actualizar
+        version_esperada: Versión que el cliente leyó (If-Match); None para no verificarla
         
     Returns:
         Instancia de Turno actualizado
+
+    Raises:
+        ConflictoVersionError: Si el turno cambió desde la versión esperada
     """
     turno_existente = obtener_turno_por_id(turno_id)
+    if version_esperada is not None and turno_existente.version != version_esperada:
+        raise ConflictoVersionError('turno', turno_id, version_esperada)
 
     merged = turno_existente.to_dict()
-    merged.update(data)
+    # La versión la controla el repositorio, no el cuerpo del request
+    merged.update({k: v for k, v in data.items() if k != 'version'})
 
     _validar_datos_turno(merged, para_actualizar=True, turno_id=turno_id)
 
@@ -271,6 +745,10 @@ def actualizar_turno(turno_id: int, data: Dict[str, Any]) -> Turno:
     if not success:
         raise Exception("No se pudo actualizar el turno")
     
+    # Solo interesa a las pantallas de reserva si cambió el estado o el horario
+    if (turno_actualizado.estado, turno_actualizado.id_cancha, turno_actualizado.fecha_hora_inicio) != \
+            (turno_existente.estado, turno_existente.id_cancha, turno_existente.fecha_hora_inicio):
+        publicar_turno(turno_actualizado)
     return turno_actualizado
 
 
@@ -283,16 +761,24 @@ def cambiar_estado_turno(turno_id: int, nuevo_estado: str) -> bool:
         
     Returns:
         True si se actualizó correctamente
+
+    Raises:
+        ConflictoVersionError: Si el turno cambió desde que se leyó
     """
     # Validar que el turno exista
-    obtener_turno_por_id(turno_id)
+    turno = obtener_turno_por_id(turno_id)
     
     # Validar estados permitidos
     estados_validos = ['disponible', 'pendiente_pago', 'reservado', 'bloqueado', 'cancelado', 'finalizado', 'no_disponible']
     if nuevo_estado not in estados_validos:
         raise ValueError(f"Estado inválido. Debe ser uno de: {', '.join(estados_validos)}")
     
-    return TurnoRepository.cambiar_estado(turno_id, nuevo_estado)
+    # Condicionado a la versión leída: no pisa un cambio concurrente
+    actualizado = TurnoRepository.cambiar_estado(turno_id, nuevo_estado, turno.version)
+    if actualizado and turno.estado != nuevo_estado:
+        turno.estado = nuevo_estado
+        publicar_turno(turno)
+    return actualizado
 
 
 def eliminar_turno(turno_id: int) -> bool:
@@ -305,12 +791,16 @@ def eliminar_turno(turno_id: int) -> bool:
         True si se eliminó correctamente
     """
     # Validar que exista
-    obtener_turno_por_id(turno_id)
+    turno = obtener_turno_por_id(turno_id)
     
     # Eliminar servicios asociados primero
     TurnoXServicioRepository.eliminar_por_turno(turno_id)
     
-    return TurnoRepository.eliminar(turno_id)
+    eliminado = TurnoRepository.eliminar(turno_id)
+    if eliminado:
+        turno.estado = 'eliminado'
+        publicar_turno(turno)
+    return eliminado
 
 
 def reservar_turno(turno_id: int, id_cliente: int, id_usuario_registro: Optional[int] = None) -> Turno:
@@ -342,6 +832,7 @@ def reservar_turno(turno_id: int, id_cliente: int, id_usuario_registro: Optional
     turno.reserva_created_at = datetime.now().isoformat()
     
     TurnoRepository.actualizar(turno)
+    publicar_turno(turno)
     return turno
 
 
@@ -370,6 +861,7 @@ def cancelar_reserva(turno_id: int) -> Turno:
     turno.id_usuario_bloqueo = None
     turno.motivo_bloqueo = None
     TurnoRepository.actualizar(turno)
+    publicar_turno(turno)
     return turno
 
 
@@ -391,6 +883,7 @@ def bloquear_turno(turno_id: int, id_usuario: int, motivo: str) -> Turno:
     turno.motivo_bloqueo = motivo
     
     TurnoRepository.actualizar(turno)
+    publicar_turno(turno)
     return turno
 
 
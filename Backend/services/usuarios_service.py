@@ -1,3 +1,4 @@
+import logging
 from typing import List, Dict, Any, Tuple
 
 from models.usuario import Usuario
@@ -7,6 +8,8 @@ from passlib.hash import pbkdf2_sha256
 from services import clientes_service
 from services.auth_service import AuthService
 
+logger = logging.getLogger(__name__)
+
 
 def registrar_usuario(usuario_data: Dict[str, Any], cliente_data: Dict[str, Any]) -> Tuple[Usuario, Any, str]:
     """
@@ -77,9 +80,9 @@ def registrar_usuario(usuario_data: Dict[str, Any], cliente_data: Dict[str, Any]
         if usuario_creado and usuario_creado.id:
             try:
                 UsuarioRepository.eliminar(usuario_creado.id)
-                print(f"Rollback: Usuario {usuario_creado.id} eliminado por error de validación")
+                logger.info("Rollback: Usuario %s eliminado por error de validación", usuario_creado.id)
             except Exception as rollback_error:
-                print(f"Error en rollback: {rollback_error}")
+                logger.error("Error en rollback: %s", rollback_error)
         raise ve
         
     except Exception as e:
@@ -87,9 +90,9 @@ def registrar_usuario(usuario_data: Dict[str, Any], cliente_data: Dict[str, Any]
         if usuario_creado and usuario_creado.id:
             try:
                 UsuarioRepository.eliminar(usuario_creado.id)
-                print(f"Rollback: Usuario {usuario_creado.id} eliminado por error: {str(e)}")
+                logger.warning("Rollback: Usuario %s eliminado por error: %s", usuario_creado.id, e)
             except Exception as rollback_error:
-                print(f"Error en rollback: {rollback_error}")
+                logger.error("Error en rollback: %s", rollback_error)
         raise Exception(f'Error al registrar usuario: {e}')
     
 
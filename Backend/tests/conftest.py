@@ -0,0 +1,53 @@
+"""
+Fixtures compartidas de las pruebas.
+
+Las pruebas usan bases SQLite en un directorio temporal: nunca tocan
+Backend/database.db ni escriben en Backend/logs o Backend/backups.
+"""
+
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+# Antes de importar la aplicación: las rutas se leen al importar cada módulo
+TEMPORAL = Path(tempfile.mkdtemp(prefix="tp-dao-pruebas-"))
+os.environ["DATABASE_PATH"] = str(TEMPORAL / "database.db")
+os.environ["ARCHIVO_PATH"] = str(TEMPORAL / "archive.db")
+os.environ["BACKUP_DIR"] = str(TEMPORAL / "backups")
+os.environ["PERFILES_DIR"] = str(TEMPORAL / "perfiles")
+os.environ["TRAZAS_DIR"] = str(TEMPORAL / "trazas")
+os.environ["CONSULTAS_LENTAS_ARCHIVO"] = str(TEMPORAL / "consultas_lentas.jsonl")
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+
+
+@pytest.fixture(scope="session")
+def base_de_datos() -> Path:
+    """Base con el esquema completo y los datos de prueba de scripts/init_database.py."""
+    from database import connection
+    from scripts import init_database
+
+    random.seed(2024)
+    connection.init_database()
+    init_database.insertar_datos_basicos()
+    return connection.DB_PATH
+
+
+@pytest.fixture(scope="session")
+def api(base_de_datos):
+    """TestClient de la API con el token del administrador en los headers."""
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    cliente = TestClient(app)
+    respuesta = cliente.post("/api/login", json={"usuario": "admin", "password": "admin123"})
+    assert respuesta.status_code == 200, respuesta.text
+    cliente.headers["Authorization"] = f"Bearer {respuesta.json()['token']}"
+    return cliente
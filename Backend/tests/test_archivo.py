@@ -0,0 +1,56 @@
+"""
+Archivo histórico de turnos (database.archivo) sobre una base propia en
+tmp_path: archivar mueve filas y no debe tocar la base compartida de las
+demás pruebas.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import archivo, connection
+
+
+@pytest.fixture
+def base_propia(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_PATH", tmp_path / "database.db")
+    monkeypatch.setattr(archivo, "ARCHIVO_PATH", tmp_path / "archive.db")
+    connection.init_database()
+    conn = sqlite3.connect(connection.DB_PATH)
+    conn.execute("INSERT INTO Cancha (nombre) VALUES ('Cancha archivo')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _insertar_turno(conn: sqlite3.Connection, inicio: datetime, estado: str) -> int:
+    cursor = conn.execute(
+        "INSERT INTO Turno (id_cancha, fecha_hora_inicio, fecha_hora_fin, estado, precio_final) "
+        "VALUES (1, ?, ?, ?, 0)",
+        (inicio.isoformat(), (inicio + timedelta(hours=1)).isoformat(), estado),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_archiva_los_estados_terminados(base_propia):
+    viejo = datetime.now() - timedelta(days=400)
+    por_estado = {
+        estado: _insertar_turno(base_propia, viejo + timedelta(hours=2 * i), estado)
+        for i, estado in enumerate(('completado', 'finalizado', 'cancelado', 'no_disponible',
+                                    'reservado', 'disponible'))
+    }
+    reciente = _insertar_turno(base_propia, datetime.now() - timedelta(days=2), 'finalizado')
+
+    resultado = archivo.archivar(meses=6, pausa_segundos=0)
+
+    assert resultado['turnos_archivados'] == 4
+    quedan = {fila[0] for fila in base_propia.execute("SELECT id FROM Turno")}
+    assert quedan == {por_estado['reservado'], por_estado['disponible'], reciente}
+    archivados = sqlite3.connect(archivo.ruta_archivo())
+    try:
+        estados = {fila[0] for fila in archivados.execute("SELECT estado FROM Turno")}
+    finally:
+        archivados.close()
+    assert estados == set(archivo.ESTADOS_ARCHIVABLES)
@@ -0,0 +1,92 @@
+"""
+Cola de escritura (database.cola_escritura): operaciones deshechas y plazo
+de espera cuando el hilo escritor está ocupado.
+"""
+
+import importlib
+import sqlite3
+import threading
+
+import pytest
+
+from database.cola_escritura import ColaEscritura, DeshacerOperacion, ejecutar_escritura
+from database.errores import BaseDatosOcupadaError, ColaEscrituraDemoradaError
+
+# `database.cola_escritura` como atributo del paquete es la instancia compartida, no el módulo
+modulo_cola = importlib.import_module("database.cola_escritura")
+
+
+@pytest.fixture
+def tabla_prueba(base_de_datos):
+    conn = sqlite3.connect(base_de_datos)
+    conn.execute("CREATE TABLE IF NOT EXISTS PruebaCola (valor TEXT)")
+    conn.execute("DELETE FROM PruebaCola")
+    conn.commit()
+
+    def valores():
+        return [fila[0] for fila in conn.execute("SELECT valor FROM PruebaCola ORDER BY rowid")]
+
+    yield valores
+    conn.execute("DROP TABLE PruebaCola")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def cola_bloqueada():
+    """Una cola habilitada cuyo escritor queda ocupado hasta liberar el evento."""
+    cola = ColaEscritura(habilitada=True, timeout_segundos=0.2)
+    en_curso, liberar = threading.Event(), threading.Event()
+
+    def ocupar(cursor):
+        en_curso.set()
+        liberar.wait(5)
+
+    bloqueo = cola.enviar(ocupar)
+    assert en_curso.wait(5)
+    yield cola
+    liberar.set()
+    bloqueo.result(5)
+    cola.detener()
+
+
+def _insertar(valor):
+    def operacion(cursor):
+        cursor.execute("INSERT INTO PruebaCola (valor) VALUES (?)", (valor,))
+        return valor
+    return operacion
+
+
+def _insertar_y_deshacer(cursor):
+    cursor.execute("INSERT INTO PruebaCola (valor) VALUES ('deshecho')")
+    raise DeshacerOperacion("sin cambios")
+
+
+@pytest.mark.parametrize("habilitada", [False, True], ids=["conexion_propia", "cola"])
+def test_deshacer_devuelve_el_resultado_sin_escribir(tabla_prueba, monkeypatch, habilitada):
+    cola = ColaEscritura(habilitada=habilitada)
+    monkeypatch.setattr(modulo_cola, "cola_escritura", cola)
+    try:
+        assert ejecutar_escritura(_insertar("a")) == "a"
+        assert ejecutar_escritura(_insertar_y_deshacer) == "sin cambios"
+        assert ejecutar_escritura(_insertar("b")) == "b"
+    finally:
+        cola.detener()
+    assert tabla_prueba() == ["a", "b"]
+
+
+def test_timeout_cancela_la_operacion(tabla_prueba, cola_bloqueada):
+    with pytest.raises(ColaEscrituraDemoradaError) as error:
+        cola_bloqueada.ejecutar(_insertar("tarde"))
+    assert isinstance(error.value, BaseDatosOcupadaError)
+
+    # Liberado el escritor, la operación cancelada no se ejecuta
+    cola_bloqueada.detener()
+    assert tabla_prueba() == []
+
+
+def test_api_responde_503_si_la_cola_no_atiende(api, monkeypatch, cola_bloqueada):
+    monkeypatch.setattr(modulo_cola, "cola_escritura", cola_bloqueada)
+    respuesta = api.post("/api/turnos/1/hold", json={"id_cliente": 3})
+    assert respuesta.status_code == 503, respuesta.text
+    assert respuesta.headers["retry-after"] == "1"
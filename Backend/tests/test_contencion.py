@@ -0,0 +1,122 @@
+"""
+Conexiones instrumentadas (database.contencion): espera de SQLite ante locks
+y hooks por sentencia de las mediciones que se enganchan desde afuera.
+"""
+
+import sqlite3
+
+import pytest
+
+import trazas
+from database import connection, contencion
+from database.consultas_lentas import consultas_lentas
+from database.contador_sql import ContadorSQL, sql_request_actual
+
+
+@pytest.fixture
+def hooks(monkeypatch):
+    """Registros de hooks y mediciones propios del test (los globales quedan intactos)."""
+    monkeypatch.setattr(contencion, "_hooks", [])
+    monkeypatch.setattr(contencion, "_mediciones", [])
+    return contencion
+
+
+class _Medicion:
+    habilitado = True
+
+    def __init__(self):
+        self.medidas = []
+
+    def medida(self, conn, sql, parametros, duracion, filas, ejecuciones):
+        self.medidas.append((sql, parametros, filas, ejecuciones))
+
+
+def test_busy_timeout_por_defecto_es_el_de_sqlite3(base_de_datos):
+    assert contencion.SQLITE_BUSY_TIMEOUT_MS == 5000
+    conn = connection.get_connection()
+    try:
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    finally:
+        conn.close()
+
+
+def test_hook_se_llama_una_vez_por_sentencia(base_de_datos, hooks):
+    vistas, terminadas = [], []
+
+    def hook(sql):
+        vistas.append(sql)
+        return lambda inicio, fin: terminadas.append(fin - inicio)
+
+    hooks.registrar_hook(hook)
+    hooks.registrar_hook(hook)
+    conn = connection.get_connection()
+    try:
+        conn.execute("SELECT COUNT(*) FROM Cancha").fetchone()
+        conn.executemany("UPDATE Cancha SET nombre = nombre WHERE id = ?", [(1,), (2,)])
+        conn.rollback()
+    finally:
+        conn.close()
+
+    assert vistas == ["PRAGMA foreign_keys = ON", "SELECT COUNT(*) FROM Cancha",
+                     "UPDATE Cancha SET nombre = nombre WHERE id = ?"]
+    assert len(terminadas) == 3 and all(duracion >= 0 for duracion in terminadas)
+
+
+def test_hook_que_lanza_impide_la_sentencia(base_de_datos, hooks):
+    conn = connection.get_connection()
+    try:
+        def prohibir(sql):
+            if sql.startswith("INSERT"):
+                raise RuntimeError("prohibida")
+
+        hooks.registrar_hook(prohibir)
+        with pytest.raises(RuntimeError):
+            conn.execute("INSERT INTO Cancha (nombre) VALUES ('no debe quedar')")
+        assert conn.execute("SELECT COUNT(*) FROM Cancha WHERE nombre = 'no debe quedar'").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_medicion_espera_la_primera_lectura(base_de_datos, hooks):
+    medicion = _Medicion()
+    hooks.registrar_medicion(medicion)
+    conn = connection.get_connection()
+    try:
+        cursor = conn.execute("SELECT id FROM Cancha WHERE id <= ?", (2,))
+        assert all(sql != "SELECT id FROM Cancha WHERE id <= ?" for sql, *_ in medicion.medidas)
+        cursor.fetchall()
+        assert medicion.medidas[-1] == ("SELECT id FROM Cancha WHERE id <= ?", (2,), 2, 1)
+
+        medicion.habilitado = False
+        conn.execute("SELECT 1").fetchall()
+        assert medicion.medidas[-1][0] != "SELECT 1"
+    finally:
+        conn.close()
+
+
+def test_mediciones_registradas_al_importar(base_de_datos):
+    # El contador por request y el registro de consultas lentas se enganchan solos
+    assert consultas_lentas in contencion._mediciones
+    contador = ContadorSQL()
+    token = sql_request_actual.set(contador)
+    try:
+        conn = connection.get_connection()
+        conn.execute("SELECT 1").fetchone()
+        conn.close()
+    finally:
+        sql_request_actual.reset(token)
+    assert contador.sentencias == 2 and contador.segundos > 0
+
+
+def test_traza_agrega_un_tramo_por_sentencia(base_de_datos):
+    trazas.instrumentar_capas()
+    traza = trazas.Traza("prueba")
+    token = trazas.traza_actual.set(traza)
+    try:
+        conn = connection.get_connection()
+        conn.execute("SELECT id FROM Cancha WHERE id = 1").fetchone()
+        conn.close()
+    finally:
+        trazas.traza_actual.reset(token)
+    sql = [tramo[5]['sql'] for tramo in traza.tramos if tramo[0] == "sql"]
+    assert sql == ["PRAGMA foreign_keys = ON", "SELECT id FROM Cancha WHERE id = ?"]
@@ -0,0 +1,37 @@
+"""
+database.connection.init_database() crea la misma estructura que
+scripts/init_database.py (tablas, columnas, índices y triggers).
+"""
+
+import sqlite3
+
+from database import connection
+
+
+def _estructura(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        objetos = set(conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"
+        ).fetchall())
+        columnas = {
+            nombre: [fila[1:] for fila in conn.execute(f'PRAGMA table_info("{nombre}")')]
+            for tipo, nombre in objetos if tipo == 'table'
+        }
+        return objetos, columnas
+    finally:
+        conn.close()
+
+
+def test_init_database_crea_el_esquema_completo(tmp_path, base_de_datos, monkeypatch):
+    monkeypatch.setattr(connection, "DB_PATH", tmp_path / "nueva.db")
+    connection.init_database()
+    # Idempotente: una segunda corrida (ej. al actualizar) no falla ni cambia nada
+    connection.init_database()
+
+    objetos, columnas = _estructura(tmp_path / "nueva.db")
+    assert (objetos, columnas) == _estructura(base_de_datos)
+    for tabla in ('PlantillaHorario', 'ExcepcionHorario', 'HoldTurno', 'Revision', 'ChangeLog'):
+        assert ('table', tabla) in objetos
+    assert any(tipo == 'trigger' and nombre.startswith('trg_revision_') for tipo, nombre in objetos)
+    assert 'version' in [columna[0] for columna in columnas['Turno']]
@@ -0,0 +1,44 @@
+"""
+Checkpoint del WAL (jobs.mantenimiento_bd): la base se considera ociosa
+solo si nadie confirmó escrituras entre dos corridas, aunque el WAL tenga
+el mismo tamaño.
+"""
+
+import sqlite3
+
+import pytest
+
+from jobs import mantenimiento_bd
+
+
+@pytest.fixture
+def checkpoint(base_de_datos, monkeypatch):
+    monkeypatch.setattr(mantenimiento_bd, "_monitor", {'conn': None, 'data_version': None})
+    # Umbrales altos: solo la inactividad dispara un checkpoint
+    monkeypatch.setattr(mantenimiento_bd, "WAL_CHECKPOINT_PASIVO_BYTES", 1 << 40)
+    monkeypatch.setattr(mantenimiento_bd, "WAL_CHECKPOINT_TRUNCATE_BYTES", 1 << 40)
+    monkeypatch.setattr(mantenimiento_bd, "_tamanio_wal", lambda: 32768)  # Siempre el mismo tamaño
+    yield mantenimiento_bd.checkpoint_wal
+    mantenimiento_bd._monitor['conn'].close()
+
+
+def _escribir(base_de_datos):
+    conn = sqlite3.connect(base_de_datos)
+    try:
+        conn.execute("UPDATE Cancha SET nombre = nombre WHERE id = 1")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_wal_del_mismo_tamanio_con_escrituras_no_es_ocioso(base_de_datos, checkpoint):
+    assert checkpoint()['modo'] is None  # Primera corrida: sin referencia
+    _escribir(base_de_datos)
+    assert checkpoint()['modo'] is None
+
+
+def test_sin_escrituras_entre_corridas_trunca_por_inactividad(base_de_datos, checkpoint):
+    checkpoint()
+    resultado = checkpoint()
+    assert resultado['modo'] == 'TRUNCATE'
+    assert resultado['motivo'] == 'inactividad'
@@ -0,0 +1,99 @@
+"""
+Presupuestos SQL de los endpoints (api.presupuesto_sql) en modo estricto.
+
+Con DETECTOR_N1=error una request que supera el presupuesto de su endpoint,
+o que repite una misma sentencia más de N1_UMBRAL_REPETICIONES veces,
+termina en 500. Cada caso falla ante una regresión N+1.
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from api import presupuesto_sql
+
+HOY = date.today().isoformat()
+MANANA = (date.today() + timedelta(days=1)).isoformat()
+
+# Las rutas con cuerpo se piden por POST: (ruta, cuerpo)
+
+ENDPOINTS = [
+    "/api/reportes/resumen",
+    "/api/reportes/reservas-por-cliente",
+    "/api/reportes/reservas-por-cliente?id_cliente=3",
+    f"/api/reportes/reservas-por-cancha?fecha_inicio={date.today().year}-01-01&fecha_fin={HOY}",
+    "/api/reportes/canchas-mas-utilizadas",
+    "/api/reportes/utilizacion-mensual",
+    "/api/turnos/",
+    "/api/turnos/cliente/3",
+    f"/api/turnos/grilla?desde={HOY}&hasta={MANANA}",
+    f"/api/turnos/buscar?desde={HOY}&hasta={MANANA}",
+    # Más equipos que N1_UMBRAL_REPETICIONES no alcanzan para verlo: lo corta el presupuesto
+    ("/api/equipo-torneo/inscribir-masivo", {"id_torneo": 1, "ids_equipos": list(range(1, 10))}),
+]
+
+
+@pytest.fixture(autouse=True)
+def modo_estricto(monkeypatch):
+    monkeypatch.setattr(presupuesto_sql, "DETECTOR_N1", "error")
+
+
+def _turnos_disponibles(base_de_datos, cantidad: int):
+    conn = sqlite3.connect(base_de_datos)
+    try:
+        filas = conn.execute(
+            "SELECT id FROM Turno WHERE estado = 'disponible' AND fecha_hora_inicio > datetime('now', 'localtime') "
+            "AND id NOT IN (SELECT id_turno FROM Pago WHERE id_turno IS NOT NULL) ORDER BY id LIMIT ?",
+            (cantidad,),
+        ).fetchall()
+    finally:
+        conn.close()
+    assert len(filas) == cantidad, "La base de prueba no tiene turnos disponibles"
+    return [fila[0] for fila in filas]
+
+
+@pytest.fixture
+def turno_disponible(base_de_datos) -> int:
+    return _turnos_disponibles(base_de_datos, 1)[0]
+
+
+@pytest.mark.parametrize("ruta", ENDPOINTS)
+def test_endpoint_dentro_del_presupuesto(api, ruta):
+    ruta, cuerpo = ruta if isinstance(ruta, tuple) else (ruta, None)
+    respuesta = api.get(ruta) if cuerpo is None else api.post(ruta, json=cuerpo)
+    assert respuesta.status_code == 200, respuesta.text
+    assert int(respuesta.headers["x-sql-sentencias"]) > 0
+
+
+def test_alternativas_dentro_del_presupuesto(api, turno_disponible):
+    respuesta = api.get(f"/api/turnos/{turno_disponible}/alternativas")
+    assert respuesta.status_code == 200, respuesta.text
+
+
+def test_reserva_dentro_del_presupuesto(api, turno_disponible):
+    respuesta = api.post(f"/api/turnos/{turno_disponible}/reservar",
+                         json={"id_cliente": 3, "metodo_pago": "efectivo", "servicios": []})
+    assert respuesta.status_code == 200, respuesta.text
+
+
+def test_reserva_con_servicios_no_suma_sentencias_por_servicio(api, base_de_datos):
+    sin_servicios, con_servicios = _turnos_disponibles(base_de_datos, 2)
+    servicios = [{"id_servicio": id_servicio, "cantidad": 1, "precio_unitario": 100}
+                 for id_servicio in range(1, 13)]
+    sentencias = []
+    for turno_id, pedidos in ((sin_servicios, []), (con_servicios, servicios)):
+        respuesta = api.post(f"/api/turnos/{turno_id}/reservar",
+                             json={"id_cliente": 3, "metodo_pago": "efectivo", "servicios": pedidos})
+        assert respuesta.status_code == 200, respuesta.text
+        sentencias.append(int(respuesta.headers["x-sql-sentencias"]))
+    # Los 12 servicios van en un único executemany dentro de la confirmación del hold
+    assert sentencias[1] <= sentencias[0] + 1
+
+
+def test_modo_estricto_corta_la_request(api, monkeypatch):
+    # Con umbral 0 la primera sentencia ya es una violación: el detector tiene que responder 500
+    monkeypatch.setattr(presupuesto_sql, "N1_UMBRAL_REPETICIONES", 0)
+    respuesta = api.get("/api/turnos/cliente/3")
+    assert respuesta.status_code == 500
+    assert "N+1" in respuesta.json()["detail"]
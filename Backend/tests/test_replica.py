@@ -0,0 +1,164 @@
+"""
+Réplica por changelog (database.replica y scripts/replica.py) sobre copias
+de la base de prueba en tmp_path.
+"""
+
+import sqlite3
+
+import pytest
+
+from database import connection, replica
+from scripts import replica as script_replica
+
+
+@pytest.fixture
+def primaria(tmp_path, base_de_datos, monkeypatch):
+    """Copia de la base de prueba usada como primaria (connection.DB_PATH apunta a ella)."""
+    ruta = tmp_path / "primaria.db"
+    origen = sqlite3.connect(base_de_datos)
+    copia = sqlite3.connect(ruta)
+    try:
+        origen.backup(copia)
+    finally:
+        origen.close()
+        copia.close()
+    monkeypatch.setattr(connection, "DB_PATH", ruta)
+    return ruta
+
+
+@pytest.fixture
+def destino(tmp_path, primaria):
+    replica.inicializar(tmp_path / "replica.db")
+    return tmp_path / "replica.db"
+
+
+def _escribir(ruta, *sentencias):
+    """Ejecuta sentencias en la primaria con una conexión propia (como otro proceso)."""
+    conn = sqlite3.connect(ruta)
+    try:
+        for sql, parametros in sentencias:
+            conn.execute(sql, parametros)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _consultar(ruta, sql, parametros=()):
+    conn = sqlite3.connect(ruta)
+    try:
+        return conn.execute(sql, parametros).fetchall()
+    finally:
+        conn.close()
+
+
+def _cambios_ida_y_vuelta(ruta):
+    """Un INSERT, un UPDATE y un DELETE en la primaria."""
+    _escribir(
+        ruta,
+        ("INSERT INTO Cliente (nombre, apellido, dni, email, telefono) VALUES (?, ?, ?, ?, ?)",
+         ("Réplica", "Prueba", "99999999", "replica@prueba.com", "111")),
+        ("UPDATE Cancha SET nombre = nombre || ' (editada)' WHERE id = 1", ()),
+        # TurnoXServicio no tiene alias de rowid (clave compuesta)
+        ("DELETE FROM TurnoXServicio WHERE rowid = (SELECT MIN(rowid) FROM TurnoXServicio)", ()),
+    )
+
+
+def test_inicializar_copia_la_primaria(primaria, tmp_path):
+    resultado = replica.inicializar(tmp_path / "replica.db")
+
+    assert "Turno" in resultado["tablas"] and "ReplicaLog" not in resultado["tablas"]
+    estado = dict(_consultar(tmp_path / "replica.db", 'SELECT clave, valor FROM "ReplicaEstado"'))
+    assert estado["rol"] == "replica"
+    assert int(estado["ultimo_seq"]) == resultado["ultimo_seq"]
+    # El log vive solo en la primaria, y sin las entradas ya copiadas
+    assert _consultar(tmp_path / "replica.db", "SELECT name FROM sqlite_master WHERE name = 'ReplicaLog'") == []
+    assert _consultar(primaria, 'SELECT COUNT(*) FROM "ReplicaLog"') == [(0,)]
+    assert script_replica.verificar(tmp_path / "replica.db")
+
+
+def test_inicializar_rechaza_la_misma_ruta(primaria):
+    with pytest.raises(ValueError):
+        replica.inicializar(primaria)
+
+
+def test_enviar_cambios_aplica_insert_update_y_delete(primaria, destino):
+    _cambios_ida_y_vuelta(primaria)
+    assert not script_replica.verificar(destino)
+
+    resultado = replica.enviar_cambios(destino)
+
+    assert resultado["entradas_enviadas"] >= 3
+    assert _consultar(destino, "SELECT nombre FROM Cliente WHERE dni = '99999999'") == [("Réplica",)]
+    assert _consultar(destino, "SELECT nombre FROM Cancha WHERE id = 1")[0][0].endswith("(editada)")
+    assert script_replica.verificar(destino)
+    assert replica.enviar_cambios(destino)["entradas_enviadas"] == 0
+
+
+def test_reenviar_un_lote_es_idempotente(primaria, destino):
+    _cambios_ida_y_vuelta(primaria)
+    log = _consultar(primaria, 'SELECT seq, tabla, fila_id, op, creado_en FROM "ReplicaLog" ORDER BY seq')
+    seq_previo = dict(_consultar(destino, 'SELECT clave, valor FROM "ReplicaEstado"'))["ultimo_seq"]
+    replica.enviar_cambios(destino)
+
+    # Como si la primaria no hubiera llegado a podar el log: el mismo lote se vuelve a enviar
+    _escribir(primaria, *[('INSERT INTO "ReplicaLog" VALUES (?, ?, ?, ?, ?)', entrada) for entrada in log])
+    _escribir(destino, ('UPDATE "ReplicaEstado" SET valor = ? WHERE clave = ?', (seq_previo, "ultimo_seq")))
+
+    assert replica.enviar_cambios(destino)["entradas_enviadas"] == len(log)
+    assert script_replica.verificar(destino)
+
+
+def test_estado_informa_el_atraso(primaria, destino):
+    assert replica.estado(destino)["lag_cambios"] == 0
+
+    _cambios_ida_y_vuelta(primaria)
+    atrasada = replica.estado(destino)
+    assert atrasada["lag_cambios"] >= 3
+    assert atrasada["seq_primaria"] > atrasada["ultimo_seq"]
+    assert atrasada["lag_segundos"] >= 0
+
+    replica.enviar_cambios(destino)
+    al_dia = replica.estado(destino)
+    assert al_dia["lag_cambios"] == 0
+    assert al_dia["ultimo_seq"] == atrasada["seq_primaria"]
+
+
+def test_promover_sincroniza_y_deja_de_ser_replica(primaria, destino):
+    _cambios_ida_y_vuelta(primaria)
+
+    resultado = replica.promover(destino)
+
+    assert resultado["integrity_check"] == "ok"
+    assert resultado["sincronizacion"]["entradas_enviadas"] >= 3
+    assert replica.estado(destino)["rol"] == "primaria"
+    assert script_replica.verificar(destino)
+    with pytest.raises(ValueError):
+        replica.enviar_cambios(destino)
+    # La promovida vuelve a registrar su propio changelog
+    if _consultar(destino, "SELECT name FROM sqlite_master WHERE name = 'ChangeLog'"):
+        assert _consultar(destino, "SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'trg_changelog_%'")[0][0] > 0
+
+
+def test_verificar_detecta_diferencias(primaria, destino, capsys):
+    assert script_replica.verificar(destino)
+    _escribir(primaria, ("UPDATE Cliente SET telefono = 'cambiado' WHERE id = 1", ()))
+
+    assert not script_replica.verificar(destino)
+    assert "✗ Cliente" in capsys.readouterr().out
+
+
+def test_cli_verificar_sale_con_error_si_hay_cambios_sin_enviar(primaria, destino, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["replica.py", "verificar", "--destino", str(destino)])
+    script_replica.main()
+    assert "✓ La réplica coincide" in capsys.readouterr().out
+
+    _cambios_ida_y_vuelta(primaria)
+    with pytest.raises(SystemExit) as salida:
+        script_replica.main()
+    assert salida.value.code == 1
+
+    monkeypatch.setattr("sys.argv", ["replica.py", "enviar", "--destino", str(destino)])
+    script_replica.main()
+    monkeypatch.setattr("sys.argv", ["replica.py", "estado", "--destino", str(destino)])
+    script_replica.main()
+    assert "lag_cambios: 0" in capsys.readouterr().out
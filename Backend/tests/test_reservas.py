@@ -0,0 +1,247 @@
+"""
+Reservas por la API: un turno (con hold), varios a la vez (serie semanal y carrito).
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _crear_serie(base_de_datos, primero: datetime, semanas: int, precio: float = 1500.0):
+    """Inserta un turno disponible por semana en la cancha 1 a partir de `primero`."""
+    conn = sqlite3.connect(base_de_datos)
+    try:
+        for semana in range(semanas):
+            inicio = primero + timedelta(weeks=semana)
+            conn.execute(
+                "INSERT INTO Turno (id_cancha, fecha_hora_inicio, fecha_hora_fin, estado, precio_final) "
+                "VALUES (1, ?, ?, 'disponible', ?)",
+                (inicio.isoformat(), (inicio + timedelta(hours=1)).isoformat(), precio + semana),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _crear_turno(base_de_datos, inicio: datetime, precio: float = 1500.0) -> int:
+    """Inserta un turno disponible de una hora en la cancha 1 y devuelve su id."""
+    _crear_serie(base_de_datos, inicio, 1, precio)
+    return _consultar(base_de_datos, "SELECT id FROM Turno WHERE id_cancha = 1 AND fecha_hora_inicio = ?",
+                      (inicio.isoformat(),))[0]["id"]
+
+
+def _consultar(base_de_datos, sql, parametros=()):
+    conn = sqlite3.connect(base_de_datos)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute(sql, parametros).fetchall()
+    finally:
+        conn.close()
+
+
+def _pagos(base_de_datos, ids_pagos):
+    conn = sqlite3.connect(base_de_datos)
+    conn.row_factory = sqlite3.Row
+    try:
+        marcadores = ", ".join("?" for _ in ids_pagos)
+        return conn.execute(f"SELECT * FROM Pago WHERE id IN ({marcadores})", ids_pagos).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("modo_pago", ["agregado", "por_turno"])
+def test_serie_registra_un_pago_por_turno(api, base_de_datos, modo_pago):
+    # Lejos de los turnos de prueba; una hora distinta por caso
+    primero = (datetime.now() + timedelta(days=300)).replace(
+        hour=8 if modo_pago == "agregado" else 9, minute=0, second=0, microsecond=0
+    )
+    _crear_serie(base_de_datos, primero, 2)
+    respuesta = api.post("/api/turnos/reservar-serie", json={
+        "id_cancha": 1,
+        "id_cliente": 3,
+        "dia_semana": primero.weekday(),
+        "hora": primero.strftime("%H:%M"),
+        "fecha_desde": primero.date().isoformat(),
+        "fecha_hasta": (primero + timedelta(weeks=1)).date().isoformat(),
+        "modo_pago": modo_pago,
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    resultado = respuesta.json()
+    reservados = {t["id"]: t for t in resultado["reservados"]}
+    assert len(reservados) == 2
+
+    pagos = _pagos(base_de_datos, resultado["pagos"])
+    assert sorted(p["id_turno"] for p in pagos) == sorted(reservados)
+    assert {p["id_serie"] for p in pagos} == {resultado["id_serie"]}
+    for pago in pagos:
+        assert pago["monto_total"] == reservados[pago["id_turno"]]["precio_final"]
+    assert sum(p["monto_total"] for p in pagos) == pytest.approx(resultado["monto_total"])
+    # 'agregado' es un único cobro en el gateway; 'por_turno', uno por turno
+    cobros = {p["id_gateway_externo"] for p in pagos}
+    assert len(cobros) == (1 if modo_pago == "agregado" else 2)
+
+    # Cada turno de la serie tiene su pago
+    for turno_id in reservados:
+        detalle = api.get(f"/api/pagos/turno/{turno_id}")
+        assert detalle.status_code == 200, detalle.text
+
+
+def test_carrito_devuelve_los_pagos_con_su_id(api, base_de_datos):
+    primero = (datetime.now() + timedelta(days=300)).replace(hour=10, minute=0, second=0, microsecond=0)
+    _crear_serie(base_de_datos, primero, 2, precio=2000.0)
+    conn = sqlite3.connect(base_de_datos)
+    try:
+        ids_turnos = [fila[0] for fila in conn.execute(
+            "SELECT id FROM Turno WHERE id_cancha = 1 AND fecha_hora_inicio IN (?, ?)",
+            (primero.isoformat(), (primero + timedelta(weeks=1)).isoformat()),
+        )]
+    finally:
+        conn.close()
+
+    respuesta = api.post("/api/turnos/reservar-carrito", json={
+        "id_cliente": 3,
+        "items": [{"id_turno": turno_id} for turno_id in ids_turnos],
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    pagos = respuesta.json()["pagos"]
+    assert all(p["id"] is not None for p in pagos)
+    guardados = {p["id"]: p["id_turno"] for p in _pagos(base_de_datos, [p["id"] for p in pagos])}
+    assert guardados == {p["id"]: p["id_turno"] for p in pagos}
+
+
+def test_carrito_con_turno_sin_precio_responde_400(api, monkeypatch):
+    from repositories.turno_repository import TurnoRepository
+
+    original = TurnoRepository.obtener_por_ids
+
+    def sin_precio(turno_ids):
+        turnos = original(turno_ids)
+        for turno in turnos:
+            turno.precio_final = None
+        return turnos
+
+    monkeypatch.setattr(TurnoRepository, "obtener_por_ids", staticmethod(sin_precio))
+    respuesta = api.post("/api/turnos/reservar-carrito", json={"id_cliente": 3, "items": [{"id_turno": 1}]})
+    assert respuesta.status_code == 400, respuesta.text
+    assert "precio" in respuesta.json()["detail"]
+
+
+@pytest.mark.parametrize("items", [
+    ["1"],
+    [{"id_turno": "1"}],
+    [{"id_turno": 1, "servicios": [{"id_servicio": 1, "cantidad": "dos"}]}],
+])
+def test_carrito_con_items_invalidos_responde_400(api, items):
+    respuesta = api.post("/api/turnos/reservar-carrito", json={"id_cliente": 3, "items": items})
+    assert respuesta.status_code == 400, respuesta.text
+
+
+def test_reservar_toma_un_hold_y_registra_pago_y_servicios(api, base_de_datos):
+    inicio = (datetime.now() + timedelta(days=300)).replace(hour=11, minute=0, second=0, microsecond=0)
+    turno_id = _crear_turno(base_de_datos, inicio, precio=3000.0)
+    servicios = [{"id_servicio": 1, "cantidad": 2, "precio_unitario": 800},
+                 {"id_servicio": 4, "precio_unitario": 1500}]
+
+    respuesta = api.post(f"/api/turnos/{turno_id}/reservar",
+                         json={"id_cliente": 3, "metodo_pago": "efectivo", "servicios": servicios})
+
+    assert respuesta.status_code == 200, respuesta.text
+    turno, pago = respuesta.json()["turno"], respuesta.json()["pago"]
+    assert turno["estado"] == "reservado" and turno["id_cliente"] == 3
+    assert pago["id"] and pago["estado"] == "completado"
+    assert (pago["monto_turno"], pago["monto_servicios"], pago["monto_total"]) == (3000.0, 3100.0, 6100.0)
+    assert _consultar(base_de_datos, "SELECT estado FROM HoldTurno WHERE id_turno = ?", (turno_id,))[0][0] == "confirmado"
+    filas = _consultar(base_de_datos, "SELECT id_servicio, cantidad FROM TurnoXServicio WHERE id_turno = ? "
+                                      "ORDER BY id_servicio", (turno_id,))
+    assert [tuple(f) for f in filas] == [(1, 2), (4, 1)]
+
+
+def test_reservar_libera_el_turno_si_falla_la_confirmacion(api, base_de_datos, monkeypatch):
+    from repositories.hold_turno_repository import HoldTurnoRepository
+
+    inicio = (datetime.now() + timedelta(days=300)).replace(hour=12, minute=0, second=0, microsecond=0)
+    turno_id = _crear_turno(base_de_datos, inicio)
+
+    def fallar(*args, **kwargs):
+        raise Exception("gateway caído")
+
+    monkeypatch.setattr(HoldTurnoRepository, "confirmar", staticmethod(fallar))
+    respuesta = api.post(f"/api/turnos/{turno_id}/reservar", json={"id_cliente": 3})
+
+    assert respuesta.status_code == 500
+    assert _consultar(base_de_datos, "SELECT estado FROM Turno WHERE id = ?", (turno_id,))[0][0] == "disponible"
+    assert _consultar(base_de_datos, "SELECT estado FROM HoldTurno WHERE id_turno = ?", (turno_id,))[0][0] == "cancelado"
+    assert _consultar(base_de_datos, "SELECT COUNT(*) FROM Pago WHERE id_turno = ?", (turno_id,))[0][0] == 0
+
+
+def test_reserva_concurrente_no_cobra_al_perdedor(api, base_de_datos, monkeypatch):
+    from services import turnos_service
+
+    inicio = (datetime.now() + timedelta(days=300)).replace(hour=13, minute=0, second=0, microsecond=0)
+    turno_id = _crear_turno(base_de_datos, inicio)
+    validar = turnos_service.validar_turno_disponible
+
+    def validar_y_perder(id_turno):
+        # Otro pedido toma el turno después de la validación de este
+        turno = validar(id_turno)
+        conn = sqlite3.connect(base_de_datos)
+        conn.execute("UPDATE Turno SET estado = 'pendiente_pago', version = version + 1 WHERE id = ?", (id_turno,))
+        conn.commit()
+        conn.close()
+        return turno
+
+    monkeypatch.setattr(turnos_service, "validar_turno_disponible", validar_y_perder)
+    respuesta = api.post(f"/api/turnos/{turno_id}/reservar", json={"id_cliente": 3})
+
+    assert respuesta.status_code == 409, respuesta.text
+    assert _consultar(base_de_datos, "SELECT COUNT(*) FROM Pago WHERE id_turno = ?", (turno_id,))[0][0] == 0
+    assert _consultar(base_de_datos, "SELECT COUNT(*) FROM HoldTurno WHERE id_turno = ?", (turno_id,))[0][0] == 0
+
+
+def test_hold_perdido_entre_lectura_y_escritura_responde_409_con_alternativas(api, base_de_datos, monkeypatch):
+    from services import holds_service
+
+    inicio = (datetime.now() + timedelta(days=300)).replace(hour=15, minute=0, second=0, microsecond=0)
+    turno_id = _crear_turno(base_de_datos, inicio)
+    obtener = holds_service.TurnoRepository.obtener_por_id
+    lecturas = []
+
+    def leer_y_perder(id_turno):
+        # El hold (segunda lectura) ve el turno disponible y otro pedido lo toma antes del UPDATE condicional
+        turno = obtener(id_turno)
+        lecturas.append(id_turno)
+        if len(lecturas) != 2:
+            return turno
+        conn = sqlite3.connect(base_de_datos)
+        conn.execute("UPDATE Turno SET estado = 'pendiente_pago', version = version + 1 WHERE id = ?", (id_turno,))
+        conn.commit()
+        conn.close()
+        return turno
+
+    monkeypatch.setattr(holds_service.TurnoRepository, "obtener_por_id", staticmethod(leer_y_perder))
+    respuesta = api.post(f"/api/turnos/{turno_id}/reservar", json={"id_cliente": 3})
+
+    assert respuesta.status_code == 409, respuesta.text
+    assert "alternativas" in respuesta.json()
+    assert _consultar(base_de_datos, "SELECT COUNT(*) FROM Pago WHERE id_turno = ?", (turno_id,))[0][0] == 0
+
+
+def test_cambiar_estado_con_version_vieja_responde_409(api, base_de_datos, monkeypatch):
+    from repositories.turno_repository import TurnoRepository
+    from services import turnos_service
+
+    inicio = (datetime.now() + timedelta(days=300)).replace(hour=14, minute=0, second=0, microsecond=0)
+    turno_id = _crear_turno(base_de_datos, inicio)
+    obtener = turnos_service.obtener_turno_por_id
+
+    def leer_y_perder(id_turno, *args, **kwargs):
+        turno = obtener(id_turno, *args, **kwargs)
+        TurnoRepository.cambiar_estado(id_turno, 'bloqueado')
+        return turno
+
+    monkeypatch.setattr(turnos_service, "obtener_turno_por_id", leer_y_perder)
+    respuesta = api.patch(f"/api/turnos/{turno_id}/estado", json={"estado": "no_disponible"})
+
+    assert respuesta.status_code == 409, respuesta.text
+    assert _consultar(base_de_datos, "SELECT estado FROM Turno WHERE id = ?", (turno_id,))[0][0] == "bloqueado"
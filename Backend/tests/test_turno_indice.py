@@ -0,0 +1,242 @@
+"""
+Índice de intervalos de turnos (repositories.turno_indice) contra la consulta
+SQL de TurnoRepository.existe_solapado.
+
+Las escrituras "de otro proceso" se hacen con una conexión sqlite3 propia,
+sin pasar por TurnoRepository: el índice no se entera salvo por la tabla
+Revision (o por el TTL si la BD no la tiene).
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import contencion
+from repositories import turno_indice
+from repositories.turno_indice import IndiceTurnos, _IntervalosCancha, indice_turnos
+from repositories.turno_repository import TurnoRepository
+from services import turnos_service
+
+# Bien lejos de los turnos de prueba de init_database.py
+BASE = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=400)
+
+
+@pytest.fixture
+def otro_proceso(base_de_datos):
+    """Inserta turnos con una conexión ajena a la aplicación; los borra al terminar."""
+    conn = sqlite3.connect(base_de_datos)
+    insertados = []
+
+    def insertar(id_cancha: int, inicio: datetime, fin: datetime, estado: str = 'disponible'):
+        """ID del turno insertado, o None si ya había uno con ese inicio en la cancha."""
+        try:
+            cursor = conn.execute(
+                "INSERT INTO Turno (id_cancha, fecha_hora_inicio, fecha_hora_fin, estado, precio_final) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (id_cancha, inicio.isoformat(), fin.isoformat(), estado),
+            )
+        except sqlite3.IntegrityError:
+            return None
+        conn.commit()
+        insertados.append(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def borrar(turno_id: int) -> None:
+        conn.execute("DELETE FROM Turno WHERE id = ?", (turno_id,))
+        conn.commit()
+
+    insertar.borrar = borrar
+    yield insertar
+    conn.executemany("DELETE FROM Turno WHERE id = ?", [(t,) for t in insertados])
+    conn.commit()
+    conn.close()
+
+
+def _intervalo_aleatorio(rng: random.Random, base: datetime, dias: int):
+    inicio = base + timedelta(minutes=15 * rng.randint(0, 4 * 24 * dias))
+    return inicio, inicio + timedelta(minutes=15 * rng.randint(1, 12))
+
+
+def _ids_canchas(base_de_datos):
+    conn = sqlite3.connect(base_de_datos)
+    try:
+        return [fila[0] for fila in conn.execute("SELECT id FROM Cancha ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_coincide_con_sql_sobre_los_datos_de_prueba(base_de_datos):
+    rng = random.Random(42)
+    indice = IndiceTurnos(ttl_segundos=3600)
+    hoy = datetime.now().replace(minute=0, second=0, microsecond=0)
+    canchas = _ids_canchas(base_de_datos)
+
+    for _ in range(2000):
+        id_cancha = rng.choice(canchas)
+        inicio, fin = _intervalo_aleatorio(rng, hoy, 30)
+        excluir = rng.choice([None, rng.randint(1, 3000)])
+        esperado = TurnoRepository.existe_solapado(id_cancha, inicio.isoformat(), fin.isoformat(), excluir)
+        assert indice.existe_solapado(id_cancha, inicio.isoformat(), fin.isoformat(), excluir) == esperado
+
+    # Las consultas se respondieron desde memoria, no por la delegación en SQL
+    assert set(indice._canchas) == set(canchas)
+
+
+def test_coincide_con_sql_con_altas_y_bajas_de_otro_proceso(base_de_datos, otro_proceso):
+    rng = random.Random(7)
+    indice = IndiceTurnos(ttl_segundos=3600)
+    vivos = [otro_proceso(1, *_intervalo_aleatorio(rng, BASE, 5)) for _ in range(200)]
+    vivos = [turno_id for turno_id in vivos if turno_id is not None]
+
+    for _ in range(1500):
+        operacion = rng.random()
+        if operacion < 0.05 and vivos:
+            otro_proceso.borrar(vivos.pop(rng.randrange(len(vivos))))
+        elif operacion < 0.10:
+            turno_id = otro_proceso(1, *_intervalo_aleatorio(rng, BASE, 5))
+            if turno_id is not None:
+                vivos.append(turno_id)
+        inicio, fin = _intervalo_aleatorio(rng, BASE, 5)
+        excluir = rng.choice([None] + vivos[:20])
+        esperado = TurnoRepository.existe_solapado(1, inicio.isoformat(), fin.isoformat(), excluir)
+        assert indice.existe_solapado(1, inicio.isoformat(), fin.isoformat(), excluir) == esperado
+
+
+def test_turno_de_otro_proceso_se_ve_sin_esperar_el_ttl(otro_proceso):
+    indice = IndiceTurnos(ttl_segundos=3600)
+    inicio, fin = BASE, BASE + timedelta(hours=1)
+    assert not indice.existe_solapado(2, inicio.isoformat(), fin.isoformat())
+
+    otro_proceso(2, inicio, fin)
+    assert indice.existe_solapado(2, inicio.isoformat(), fin.isoformat())
+    assert indice.filtrar_libres(2, [(inicio, fin), (fin, fin + timedelta(hours=1))]) == [
+        (fin, fin + timedelta(hours=1))
+    ]
+
+
+def test_sin_tabla_revision_rige_el_ttl(otro_proceso, monkeypatch):
+    monkeypatch.setattr(turno_indice, "leer_version", lambda conn: None)
+    inicio, fin = BASE + timedelta(days=1), BASE + timedelta(days=1, hours=1)
+
+    vigente = IndiceTurnos(ttl_segundos=3600)
+    vencido = IndiceTurnos(ttl_segundos=0)
+    assert not vigente.existe_solapado(3, inicio.isoformat(), fin.isoformat())
+    assert not vencido.existe_solapado(3, inicio.isoformat(), fin.isoformat())
+
+    otro_proceso(3, inicio, fin)
+    # Dentro del TTL el índice no ve la escritura ajena; vencido, recarga la cancha
+    assert not vigente.existe_solapado(3, inicio.isoformat(), fin.isoformat())
+    assert vencido.existe_solapado(3, inicio.isoformat(), fin.isoformat())
+
+
+def test_altas_propias_no_recargan_la_cancha(base_de_datos, monkeypatch):
+    sentencias = []
+    monkeypatch.setattr(contencion, "_hooks", [])
+    contencion.registrar_hook(lambda sql: sentencias.append(" ".join(sql.split())))
+    inicio = BASE + timedelta(days=20)
+    por_alta = []
+    creados = []
+    try:
+        for i in range(5):
+            sentencias.clear()
+            turno = turnos_service.crear_turno({
+                'id_cancha': 4,
+                'fecha_hora_inicio': (inicio + timedelta(hours=i)).isoformat(),
+                'fecha_hora_fin': (inicio + timedelta(hours=i + 1)).isoformat(),
+            })
+            creados.append(turno.id)
+            por_alta.append(list(sentencias))
+    finally:
+        for turno_id in creados:
+            TurnoRepository.eliminar(turno_id)
+
+    todas = [sql for alta in por_alta for sql in alta]
+    cargas = [sql for sql in todas if sql.startswith("SELECT id, fecha_hora_inicio, fecha_hora_fin, estado FROM Turno")]
+    assert len(cargas) <= 1  # La cancha se carga a lo sumo una vez
+    assert not any("COUNT(*)" in sql for sql in todas)  # Ni se delega el solapamiento en SQL
+    # Después de la primera (que puede ponerse al día con escrituras ajenas de otras
+    # pruebas), cada alta cuesta lo mismo y no busca cambios en ChangeLog
+    siguientes = por_alta[1:]
+    assert not any("ChangeLog\" WHERE" in sql for alta in siguientes for sql in alta)
+    assert len({len(alta) for alta in siguientes}) == 1
+
+
+def test_cambio_ajeno_descarta_solo_su_cancha(base_de_datos, otro_proceso):
+    indice = IndiceTurnos(ttl_segundos=3600)
+    inicio, fin = BASE + timedelta(days=30), BASE + timedelta(days=30, hours=1)
+    assert not indice.existe_solapado(5, inicio.isoformat(), fin.isoformat())
+    assert not indice.existe_solapado(6, inicio.isoformat(), fin.isoformat())
+    cargada = indice._canchas[6]
+
+    otro_proceso(5, inicio, fin)
+    assert indice.existe_solapado(5, inicio.isoformat(), fin.isoformat())
+    assert indice._canchas[6] is cargada
+
+
+def test_escritura_propia_avanza_la_version(base_de_datos):
+    inicio = BASE + timedelta(days=40)
+    assert not indice_turnos.existe_solapado(7, inicio.isoformat(), (inicio + timedelta(hours=1)).isoformat())
+    cargada = indice_turnos._canchas[7]
+    turno = turnos_service.crear_turno({
+        'id_cancha': 7,
+        'fecha_hora_inicio': inicio.isoformat(),
+        'fecha_hora_fin': (inicio + timedelta(hours=1)).isoformat(),
+    })
+    try:
+        assert indice_turnos.existe_solapado(7, inicio.isoformat(), (inicio + timedelta(hours=1)).isoformat())
+        assert indice_turnos._canchas[7] is cargada
+    finally:
+        TurnoRepository.eliminar(turno.id)
+    assert not indice_turnos.existe_solapado(7, inicio.isoformat(), (inicio + timedelta(hours=1)).isoformat())
+    assert indice_turnos._canchas[7] is cargada
+
+
+def test_fuera_de_lo_cargado_delega_en_sql(base_de_datos, monkeypatch):
+    indice = IndiceTurnos(ttl_segundos=3600)
+    llamadas = []
+    original = IndiceTurnos._existe_solapado_sql
+
+    def espiar(*args):
+        llamadas.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(IndiceTurnos, "_existe_solapado_sql", staticmethod(espiar))
+    hace_una_semana = datetime.now() - timedelta(days=7)
+    inicio, fin = hace_una_semana.isoformat(), (hace_una_semana + timedelta(hours=3)).isoformat()
+
+    assert indice.existe_solapado(1, inicio, fin) == TurnoRepository.existe_solapado(1, inicio, fin)
+    assert indice.existe_solapado(1, "no es fecha", fin) == TurnoRepository.existe_solapado(1, "no es fecha", fin)
+    assert len(llamadas) == 2
+
+
+def test_indice_deshabilitado_consulta_siempre_sql(base_de_datos, monkeypatch):
+    monkeypatch.setattr(turno_indice, "INDICE_TURNOS_HABILITADO", False)
+    indice = IndiceTurnos()
+    manana = datetime.now() + timedelta(days=1)
+    inicio, fin = manana.isoformat(), (manana + timedelta(hours=2)).isoformat()
+
+    assert indice.existe_solapado(1, inicio, fin) == TurnoRepository.existe_solapado(1, inicio, fin)
+    assert indice.disponibles_cercanos([1, 2], manana, 5) == []
+    assert indice._canchas == {}
+
+
+def test_cercanos_coinciden_con_ordenar_por_distancia():
+    rng = random.Random(42)
+    cercania = _IntervalosCancha(BASE)
+    inicios_disponibles = {}
+    for turno_id in range(1, 2001):
+        inicio, fin = _intervalo_aleatorio(rng, BASE, 30)
+        disponible = rng.random() < 0.5
+        cercania.agregar(turno_id, inicio, fin, 'disponible' if disponible else 'reservado')
+        if disponible:
+            inicios_disponibles[turno_id] = inicio
+    for turno_id in rng.sample(sorted(inicios_disponibles), 200):
+        cercania.marcar_disponible(turno_id, inicios_disponibles.pop(turno_id), False)
+
+    for _ in range(500):
+        referencia, _ = _intervalo_aleatorio(rng, BASE, 30)
+        minimo = BASE + timedelta(days=rng.randint(0, 10))
+        esperado = sorted(abs(i - referencia) for i in inicios_disponibles.values() if i >= minimo)[:7]
+        assert [d for d, _, _ in cercania.cercanos(referencia, minimo, 7)] == esperado
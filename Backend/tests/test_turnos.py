@@ -0,0 +1,90 @@
+"""
+Generación de turnos en lote (POST /api/turnos/generar): validación de la
+entrada, canchas repetidas y turnos creados por otro proceso en el medio.
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from services import turnos_service
+
+# Un rango propio por caso, lejos de los turnos de prueba
+BASE = date.today() + timedelta(days=500)
+
+
+def _payload(dias_despues: int, **cambios):
+    dia = (BASE + timedelta(days=dias_despues)).isoformat()
+    payload = {
+        "ids_canchas": [1],
+        "fecha_desde": dia,
+        "fecha_hasta": dia,
+        "hora_apertura": "08:00",
+        "hora_cierre": "12:00",
+        "duracion_minutos": 60,
+    }
+    payload.update(cambios)
+    return payload
+
+
+def test_canchas_repetidas_se_generan_una_vez(api):
+    respuesta = api.post("/api/turnos/generar", json=_payload(0, ids_canchas=[1, 1, 2, 1]))
+    assert respuesta.status_code == 200, respuesta.text
+    resultado = respuesta.json()
+    assert resultado["creados"] == 8
+    assert [c["id_cancha"] for c in resultado["por_cancha"]] == [1, 2]
+
+
+@pytest.mark.parametrize("cambios", [
+    {"precio_final": "abc"},
+    {"precio_final": True},
+    {"precio_final": -1},
+    {"duracion_minutos": "abc"},
+    {"duracion_minutos": 1.5},
+    {"duracion_minutos": [60]},
+    {"hora_apertura": "25:00"},
+    {"hora_apertura": "ocho"},
+    {"hora_apertura": "12:00", "hora_cierre": "08:00"},
+    {"dias_semana": 3},
+    {"dias_semana": ["lunes"]},
+    {"ids_canchas": ["1"]},
+    {"ids_canchas": [True]},
+    {"fecha_desde": "01/02/2030"},
+])
+def test_entrada_invalida_responde_400(api, cambios):
+    respuesta = api.post("/api/turnos/generar", json=_payload(1, dry_run=True, **cambios))
+    assert respuesta.status_code == 400, respuesta.text
+
+
+def test_cancha_inexistente_responde_404(api):
+    respuesta = api.post("/api/turnos/generar", json=_payload(2, ids_canchas=[1, 999999], dry_run=True))
+    assert respuesta.status_code == 404, respuesta.text
+
+
+def test_turno_ajeno_creado_despues_de_validar_no_se_solapa(api, base_de_datos, monkeypatch):
+    dia = (BASE + timedelta(days=3)).isoformat()
+    conn = sqlite3.connect(base_de_datos)
+    try:
+        # Otro proceso crea 09:30-10:30 entre la validación y el INSERT (no empieza a la misma hora)
+        conn.execute(
+            "INSERT INTO Turno (id_cancha, fecha_hora_inicio, fecha_hora_fin, estado, precio_final) "
+            "VALUES (1, ?, ?, 'disponible', 0)",
+            (f"{dia}T09:30:00", f"{dia}T10:30:00"),
+        )
+        conn.commit()
+        monkeypatch.setattr(turnos_service, "descartar_solapados", lambda id_cancha, candidatos: candidatos)
+
+        respuesta = api.post("/api/turnos/generar", json=_payload(3))
+        assert respuesta.status_code == 200, respuesta.text
+        resultado = respuesta.json()
+        assert (resultado["creados"], resultado["omitidos_solapados"]) == (2, 2)
+        assert resultado["por_cancha"] == [{"id_cancha": 1, "creados": 2}]
+
+        inicios = [fila[0] for fila in conn.execute(
+            "SELECT fecha_hora_inicio FROM Turno WHERE id_cancha = 1 AND fecha_hora_inicio LIKE ? "
+            "ORDER BY fecha_hora_inicio", (f"{dia}%",)
+        )]
+    finally:
+        conn.close()
+    assert inicios == [f"{dia}T08:00:00", f"{dia}T09:30:00", f"{dia}T11:00:00"]
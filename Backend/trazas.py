@@ -0,0 +1,283 @@
+"""
+Trazas de requests por capas (router, servicio, repository, SQL).
+
+Una fracción TRAZAS_MUESTREO de las requests se traza. También se trazan
+las de administrador que mandan el header X-Trazar. Para esas requests,
+api.middleware.TrazasMiddleware publica una `Traza` en `traza_actual`, y
+cada capa agrega un tramo (span) con su inicio, duración y el hilo donde
+corrió:
+
+- router: el endpoint (api.perfilado.instrumentar_rutas);
+- servicio: cada función de services/*_service.py y los métodos de sus
+  clases *Service;
+- repository: cada método de las clases *Repository;
+- db: get_connection() (apertura de conexión) y cada sentencia SQL (un
+  hook de database.contencion).
+
+Las capas se instrumentan una vez al arrancar (`instrumentar_capas()`).
+Fuera de una request trazada cada envoltura solo lee el contextvar.
+
+Cada traza se guarda en TRAZAS_DIR como JSON en formato Trace Event (el de
+chrome://tracing y Perfetto): los tramos de un mismo hilo se anidan por
+tiempo. `otherData` resume la cantidad y el tiempo de cada tramo.
+"""
+
+import functools
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Fracción de requests trazadas (0 = solo las pedidas con X-Trazar)
+TRAZAS_MUESTREO = float(os.getenv("TRAZAS_MUESTREO", "0"))
+
+TRAZAS_DIR = Path(os.getenv("TRAZAS_DIR", str(Path(__file__).parent / "logs" / "trazas")))
+TRAZAS_CONSERVAR = int(os.getenv("TRAZAS_CONSERVAR", "200"))
+
+# Tope de tramos por traza (una request con miles de sentencias no crece sin límite)
+MAX_TRAMOS = 20000
+
+# Paquetes instrumentados y módulos donde se reemplazan las referencias importadas por nombre
+PAQUETES_INSTRUMENTADOS = ("services", "repositories")
+PREFIJOS_REFERENCIAS = ("services.", "repositories.", "api.", "jobs.")
+
+
+class Traza:
+    """Tramos de una request (se agregan desde cualquier hilo)."""
+
+    def __init__(self, nombre: str, request_id: Optional[str] = None):
+        self.nombre = nombre
+        self.request_id = request_id
+        self.inicio_ns = time.perf_counter_ns()
+        self.fecha = time.time()
+        self.tramos: List[tuple] = []
+        self.hilos: Dict[int, str] = {}
+        self.descartados = 0
+
+    def agregar(self, nombre: str, categoria: str, inicio_ns: int, fin_ns: int,
+                args: Optional[Dict[str, Any]] = None) -> None:
+        if len(self.tramos) >= MAX_TRAMOS:
+            self.descartados += 1
+            return
+        hilo = threading.get_ident()
+        if hilo not in self.hilos:
+            self.hilos[hilo] = threading.current_thread().name
+        # list.append es atómico: no hace falta lock
+        self.tramos.append((nombre, categoria, inicio_ns, fin_ns, hilo, args))
+
+    def a_trace_events(self) -> Dict[str, Any]:
+        """La traza en formato Trace Event (JSON object format)."""
+        pid = os.getpid()
+        ids_hilo = {hilo: numero for numero, hilo in enumerate(self.hilos, start=1)}
+        eventos: List[Dict[str, Any]] = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ids_hilo[hilo], 'args': {'name': nombre}}
+            for hilo, nombre in self.hilos.items()
+        ]
+        resumen: Dict[str, Dict[str, float]] = {}
+        for nombre, categoria, inicio, fin, hilo, args in self.tramos:
+            evento = {
+                'name': nombre, 'cat': categoria, 'ph': 'X', 'pid': pid, 'tid': ids_hilo[hilo],
+                'ts': (inicio - self.inicio_ns) / 1000, 'dur': (fin - inicio) / 1000,
+            }
+            if args:
+                evento['args'] = args
+            eventos.append(evento)
+            fila = resumen.setdefault(f"{categoria}:{nombre}", {'cantidad': 0, 'total_ms': 0.0})
+            fila['cantidad'] += 1
+            fila['total_ms'] += (fin - inicio) / 1e6
+        return {
+            'traceEvents': eventos,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'request': self.nombre,
+                'request_id': self.request_id,
+                'fecha': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.fecha)),
+                'tramos_descartados': self.descartados,
+                'resumen': {clave: {**fila, 'total_ms': round(fila['total_ms'], 3)}
+                            for clave, fila in sorted(resumen.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)},
+            },
+        }
+
+
+# Traza de la request en curso (la fija api.middleware); None = no se traza
+traza_actual: ContextVar[Optional[Traza]] = ContextVar("traza_actual", default=None)
+
+
+def muestrear() -> bool:
+    """True si a la request le toca trazarse por muestreo."""
+    return TRAZAS_MUESTREO > 0 and random.random() < TRAZAS_MUESTREO
+
+
+@contextmanager
+def tramo(nombre: str, categoria: str = "app", **args) -> Iterator[None]:
+    """Registra el bloque como un tramo de la traza en curso (no hace nada si no hay traza)."""
+    traza = traza_actual.get()
+    if traza is None:
+        yield
+        return
+    inicio = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        traza.agregar(nombre, categoria, inicio, time.perf_counter_ns(), args or None)
+
+
+def envolver(func, nombre: str, categoria: str):
+    """Envuelve una función (sincrónica o async) para que registre un tramo por llamada."""
+    if getattr(func, "trazada", False):
+        return func
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def envoltura(*args, **kwargs):
+            traza = traza_actual.get()
+            if traza is None:
+                return await func(*args, **kwargs)
+            inicio = time.perf_counter_ns()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                traza.agregar(nombre, categoria, inicio, time.perf_counter_ns())
+    else:
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            traza = traza_actual.get()
+            if traza is None:
+                return func(*args, **kwargs)
+            inicio = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                traza.agregar(nombre, categoria, inicio, time.perf_counter_ns())
+    envoltura.trazada = True
+    return envoltura
+
+
+def _instrumentar_clase(clase, categoria: str, reemplazos: Dict[int, Any]) -> None:
+    for nombre, atributo in list(vars(clase).items()):
+        if nombre.startswith("__"):
+            continue
+        etiqueta = f"{clase.__name__}.{nombre}"
+        if isinstance(atributo, staticmethod):
+            original = atributo.__func__
+            envoltura = envolver(original, etiqueta, categoria)
+            setattr(clase, nombre, staticmethod(envoltura))
+        elif isinstance(atributo, classmethod):
+            original = atributo.__func__
+            envoltura = envolver(original, etiqueta, categoria)
+            setattr(clase, nombre, classmethod(envoltura))
+        elif inspect.isfunction(atributo):
+            original = atributo
+            envoltura = envolver(original, etiqueta, categoria)
+            setattr(clase, nombre, envoltura)
+        else:
+            continue
+        if envoltura is not original:
+            reemplazos[id(original)] = envoltura
+
+
+def _instrumentar_modulo(modulo, categoria: str, sufijo_clases: str, reemplazos: Dict[int, Any]) -> None:
+    corto = modulo.__name__.rsplit(".", 1)[-1]
+    for nombre, atributo in list(vars(modulo).items()):
+        if getattr(atributo, "__module__", None) != modulo.__name__:
+            continue  # Importado desde otro módulo
+        if inspect.isfunction(atributo) and categoria == "servicio":
+            envoltura = envolver(atributo, f"{corto}.{nombre}", categoria)
+            if envoltura is not atributo:
+                setattr(modulo, nombre, envoltura)
+                reemplazos[id(atributo)] = envoltura
+        elif inspect.isclass(atributo) and nombre.endswith(sufijo_clases):
+            _instrumentar_clase(atributo, categoria, reemplazos)
+
+
+def _tramo_sql(sql: str):
+    """Hook de database.contencion: agrega un tramo "db" por sentencia a la traza en curso."""
+    traza = traza_actual.get()
+    if traza is None:
+        return None
+
+    def agregar(inicio_ns: int, fin_ns: int) -> None:
+        # Import diferido: database importa este módulo
+        from database.consultas_lentas import forma_sentencia
+        traza.agregar("sql", "db", inicio_ns, fin_ns, {'sql': forma_sentencia(sql)})
+    return agregar
+
+
+def instrumentar_capas() -> int:
+    """
+    Instrumenta servicios y repositories, engancha el hook de sentencias SQL
+    y actualiza las referencias importadas por nombre (`from services.x
+    import f`) en los módulos de la aplicación ya cargados. Idempotente.
+
+    Returns:
+        Cantidad de funciones envueltas en esta llamada
+    """
+    from database.contencion import registrar_hook
+    registrar_hook(_tramo_sql)
+
+    reemplazos: Dict[int, Any] = {}
+    for paquete_nombre in PAQUETES_INSTRUMENTADOS:
+        paquete = importlib.import_module(paquete_nombre)
+        for info in pkgutil.iter_modules(paquete.__path__):
+            if paquete_nombre == "services" and not info.name.endswith("_service"):
+                continue  # eventos_turnos: publicaciones triviales y código async
+            modulo = importlib.import_module(f"{paquete_nombre}.{info.name}")
+            if paquete_nombre == "services":
+                _instrumentar_modulo(modulo, "servicio", "Service", reemplazos)
+            else:
+                _instrumentar_modulo(modulo, "repository", "Repository", reemplazos)
+
+    for nombre_modulo, modulo in list(sys.modules.items()):
+        if modulo is None or not nombre_modulo.startswith(PREFIJOS_REFERENCIAS):
+            continue
+        for nombre, atributo in list(vars(modulo).items()):
+            envoltura = reemplazos.get(id(atributo))
+            if envoltura is not None:
+                setattr(modulo, nombre, envoltura)
+    return len(reemplazos)
+
+
+def nombre_archivo(traza: Traza) -> str:
+    base = re.sub(r"[^\w]+", "_", traza.nombre).strip("_") or "request"
+    sufijo = traza.request_id or f"{int(traza.fecha * 1000) % 100000:05d}"
+    return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(traza.fecha))}-{base}-{sufijo}.json"
+
+
+def guardar(traza: Traza, nombre: str) -> Path:
+    """Escribe la traza en TRAZAS_DIR y rota las más viejas."""
+    TRAZAS_DIR.mkdir(parents=True, exist_ok=True)
+    destino = TRAZAS_DIR / nombre
+    destino.write_text(json.dumps(traza.a_trace_events(), ensure_ascii=False, default=str), encoding="utf-8")
+    viejas = sorted(TRAZAS_DIR.glob("*.json"))[:-TRAZAS_CONSERVAR] if TRAZAS_CONSERVAR > 0 else []
+    for archivo in viejas:
+        archivo.unlink(missing_ok=True)
+    return destino
+
+
+def listar() -> List[Dict[str, Any]]:
+    """Trazas guardadas, de la más nueva a la más vieja."""
+    if not TRAZAS_DIR.exists():
+        return []
+    return [{'nombre': a.name, 'bytes': a.stat().st_size} for a in sorted(TRAZAS_DIR.glob("*.json"), reverse=True)]
+
+
+def ruta(nombre: str) -> Path:
+    """
+    Archivo de una traza guardada.
+
+    Raises:
+        LookupError: Si el nombre no es válido o la traza no existe
+    """
+    archivo = TRAZAS_DIR / nombre
+    if Path(nombre).name != nombre or archivo.suffix != ".json" or not archivo.exists():
+        raise LookupError(f"Traza {nombre} no encontrada")
+    return archivo
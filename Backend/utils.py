@@ -3,8 +3,9 @@ Utilidades generales para el proyecto.
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 import re
+import unicodedata
 
 
 def validar_email(email: str) -> bool:
@@ -130,37 +131,64 @@ def calcular_precio_turno(precio_por_hora: float, duracion_horas: float) -> floa
     return round(precio_por_hora * duracion_horas, 2)
 
 
-def generar_horarios_disponibles(fecha: str, hora_inicio: int = 8, hora_fin: int = 23, 
-                                 duracion_turno: int = 60) -> list:
+def generar_horarios_disponibles(fecha: str, hora_inicio: Union[int, str] = 8, hora_fin: Union[int, str] = 23,
+                                 duracion_turno: int = 60,
+                                 formato: str = '%Y-%m-%d %H:%M:%S') -> list:
     """
     Genera una lista de horarios disponibles para un día.
     
     Args:
         fecha: Fecha en formato 'YYYY-MM-DD'
-        hora_inicio: Hora de inicio (0-23)
-        hora_fin: Hora de fin (0-23)
+        hora_inicio: Hora de inicio (0-23 o 'HH:MM')
+        hora_fin: Hora de fin (0-24 o 'HH:MM'); el último turno debe terminar antes o en esta hora
         duracion_turno: Duración de cada turno en minutos
+        formato: Formato de salida de las fechas
         
     Returns:
         Lista de tuplas (fecha_hora_inicio, fecha_hora_fin)
     """
+    if duracion_turno <= 0:
+        raise ValueError("La duración del turno debe ser mayor a 0")
+
+    dia = datetime.strptime(fecha, '%Y-%m-%d')
+    inicio = dia + desplazamiento_hora(hora_inicio)
+    limite = dia + desplazamiento_hora(hora_fin)
+    paso = timedelta(minutes=duracion_turno)
+
     horarios = []
-    hora_actual = hora_inicio
-    
-    while hora_actual < hora_fin:
-        inicio = datetime.strptime(f"{fecha} {hora_actual:02d}:00:00", '%Y-%m-%d %H:%M:%S')
-        fin = inicio + timedelta(minutes=duracion_turno)
-        
-        horarios.append((
-            inicio.strftime('%Y-%m-%d %H:%M:%S'),
-            fin.strftime('%Y-%m-%d %H:%M:%S')
-        ))
-        
-        hora_actual += duracion_turno // 60
+    while inicio + paso <= limite:
+        fin = inicio + paso
+        horarios.append((inicio.strftime(formato), fin.strftime(formato)))
+        inicio = fin
     
     return horarios
 
 
+def desplazamiento_hora(hora: Union[int, str]) -> timedelta:
+    """Convierte una hora (entero o 'HH:MM') en un desplazamiento desde las 00:00."""
+    if isinstance(hora, int):
+        horas, minutos = hora, 0
+    else:
+        try:
+            horas, minutos = (int(parte) for parte in str(hora).split(':')[:2])
+        except ValueError:
+            raise ValueError(f"Hora inválida: '{hora}'. Usa el formato HH:MM")
+    if not (0 <= horas <= 24 and 0 <= minutos < 60) or (horas == 24 and minutos):
+        raise ValueError(f"Hora fuera de rango: '{hora}'")
+    return timedelta(hours=horas, minutes=minutos)
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """
+    Normaliza un texto para comparaciones: sin tildes, minúsculas y sin espacios
+    en los extremos (ej. 'Pádel ' -> 'padel').
+    """
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).strip().casefold()
+
+
 def formatear_precio(precio: float, moneda: str = '$') -> str:
     """
     Formatea un precio para mostrar.
@@ -246,5 +274,6 @@ if __name__ == "__main__":
     
     # Formato de precio
     print("\n✓ Precio formateado:", formatear_precio(1500.50))
+    print("✓ Texto normalizado:", normalizar_texto(" Pádel"))
     
     print("\n✅ Todas las utilidades funcionan correctamente")